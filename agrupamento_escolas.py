@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Agrupamento de escolas por perfil de domínio dos descritores
+
+O README prometia "Clustering de escolas por perfil de desempenho", mas não
+havia código para isso. Para cada ano, disciplina e série:
+
+1. Uma consulta faz o pivot escola × descritor direto na
+   ``fato_resposta_aluno`` (agregação condicional, uma coluna por
+   descritor com a taxa de acerto da escola).
+2. Descritores sem respostas em uma escola recebem a média das demais
+   escolas; escolas com poucos alunos ficam de fora.
+3. MiniBatchKMeans (scikit-learn) agrupa as escolas. O k é fixo ou
+   escolhido pela silhueta (``k='auto'``).
+
+Os grupos são numerados pelo domínio médio do centróide (1 = menor
+domínio). Resultados nas tabelas ``agrupamento_escolas`` (grupo de cada
+escola e distância ao centróide) e ``agrupamento_centroides`` (domínio de
+cada descritor em cada grupo), lidas pela página
+dashboard_agrupamento_escolas.py.
+
+Uso:
+    python agrupamento_escolas.py                 # k = 4
+    python agrupamento_escolas.py --k auto --disciplina Matemática --sem-gravar
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+from saev_query import construir_where
+
+K_PADRAO = 4
+K_AUTOMATICO = range(2, 9)
+
+# Escolas com menos alunos que isso ficam fora do agrupamento
+MIN_ALUNOS_ESCOLA = 10
+
+# Amostra usada para a silhueta na escolha automática do k
+AMOSTRA_SILHUETA = 5_000
+
+SEMENTE = 42
+
+TABELA_ESCOLAS = "agrupamento_escolas"
+TABELA_CENTROIDES = "agrupamento_centroides"
+
+SQL_GRUPOS = """
+SELECT DISTINCT AVA_ANO, DIS_NOME, SER_NOME
+FROM fato_resposta_aluno
+WHERE DIS_NOME != 'Leitura' AND {where_clause}
+ORDER BY AVA_ANO, DIS_NOME, SER_NOME
+"""
+
+SQL_DESCRITORES = """
+SELECT DISTINCT MTI_CODIGO
+FROM fato_resposta_aluno
+WHERE DIS_NOME != 'Leitura' AND MTI_CODIGO IS NOT NULL AND {where_clause}
+ORDER BY MTI_CODIGO
+"""
+
+# Pivot escola × descritor: uma coluna por descritor (preenchida em montar_sql_pivot)
+SQL_PIVOT = """
+SELECT
+    ESC_INEP,
+    ANY_VALUE(MUN_NOME) AS MUN_NOME,
+    COUNT(DISTINCT ALU_ID) AS ALUNOS,
+    {colunas}
+FROM fato_resposta_aluno
+WHERE DIS_NOME != 'Leitura' AND {where_clause}
+GROUP BY ESC_INEP
+HAVING COUNT(DISTINCT ALU_ID) >= ?
+"""
+
+SQL_COLUNA_DESCRITOR = (
+    "SUM(ACERTO) FILTER (WHERE MTI_CODIGO = ?)::DOUBLE"
+    " / NULLIF(SUM(ACERTO + ERRO) FILTER (WHERE MTI_CODIGO = ?), 0) AS D{indice}"
+)
+
+
+def montar_sql_pivot(descritores, filtros, min_alunos=MIN_ALUNOS_ESCOLA):
+    """
+    Consulta do pivot escola × descritor para os filtros
+
+    Returns:
+        tuple: (SQL, parâmetros)
+    """
+    where_clause, params = construir_where(filtros, alias='')
+    colunas = ",\n    ".join(SQL_COLUNA_DESCRITOR.format(indice=i) for i in range(len(descritores)))
+    params_colunas = [codigo for codigo in descritores for _ in range(2)]
+    sql = SQL_PIVOT.format(colunas=colunas, where_clause=where_clause)
+    return sql, params_colunas + params + [min_alunos]
+
+
+def matriz_dominio(conn, filtros, min_alunos=MIN_ALUNOS_ESCOLA):
+    """
+    Matriz escola × descritor de taxas de acerto
+
+    Args:
+        conn: Conexão DuckDB
+        filtros (dict): Filtros de ``construir_where`` (um ano, disciplina e série)
+        min_alunos (int): Mínimo de alunos por escola
+
+    Returns:
+        tuple: (DataFrame ESC_INEP/MUN_NOME/ALUNOS, matriz numpy com NaN
+            onde a escola não tem respostas, lista de descritores)
+    """
+    where_clause, params = construir_where(filtros, alias='')
+    descritores = [linha[0] for linha in conn.execute(
+        SQL_DESCRITORES.format(where_clause=where_clause), params
+    ).fetchall()]
+    if not descritores:
+        return pd.DataFrame(columns=['ESC_INEP', 'MUN_NOME', 'ALUNOS']), np.empty((0, 0)), []
+
+    sql, params = montar_sql_pivot(descritores, filtros, min_alunos)
+    pivot = conn.execute(sql, params).df()
+    colunas = [f"D{i}" for i in range(len(descritores))]
+    return pivot[['ESC_INEP', 'MUN_NOME', 'ALUNOS']], pivot[colunas].to_numpy(dtype=float), descritores
+
+
+def escolher_k(x, candidatos=K_AUTOMATICO):
+    """k com a maior silhueta entre os candidatos (amostra de até AMOSTRA_SILHUETA escolas)"""
+    melhor_k, melhor = None, -np.inf
+    for k in candidatos:
+        if k >= len(x):
+            break
+        rotulos = MiniBatchKMeans(n_clusters=k, random_state=SEMENTE, n_init=3).fit_predict(x)
+        if len(np.unique(rotulos)) < 2:
+            continue
+        nota = silhouette_score(x, rotulos, sample_size=min(AMOSTRA_SILHUETA, len(x)),
+                                random_state=SEMENTE)
+        if nota > melhor:
+            melhor_k, melhor = k, nota
+    return melhor_k or 1
+
+
+def agrupar(x, k=K_PADRAO):
+    """
+    Agrupa as linhas de ``x`` com MiniBatchKMeans
+
+    Args:
+        x (numpy.ndarray): Escolas × descritores (sem NaN)
+        k (int | str): Número de grupos ou 'auto'
+
+    Returns:
+        tuple: (grupo de cada escola 1..k, centróides k × descritores, distâncias)
+    """
+    if k == 'auto':
+        k = escolher_k(x)
+    k = max(1, min(int(k), len(x)))
+
+    modelo = MiniBatchKMeans(n_clusters=k, random_state=SEMENTE, n_init=3,
+                             batch_size=min(1024, len(x)))
+    rotulos = modelo.fit_predict(x)
+    centroides = modelo.cluster_centers_
+
+    # Grupos numerados pelo domínio médio do centróide (1 = menor)
+    ordem = np.argsort(centroides.mean(axis=1))
+    novo_rotulo = np.empty(k, dtype=int)
+    novo_rotulo[ordem] = np.arange(1, k + 1)
+    distancias = np.linalg.norm(x - centroides[rotulos], axis=1)
+    return novo_rotulo[rotulos], centroides[ordem], distancias
+
+
+def agrupar_escolas(conn, filtros=None, k=K_PADRAO, min_alunos=MIN_ALUNOS_ESCOLA, verbose=False):
+    """
+    Agrupa as escolas de cada ano, disciplina e série
+
+    Args:
+        conn: Conexão DuckDB
+        filtros (dict): Filtros no formato de ``construir_where``
+        k (int | str): Número de grupos ou 'auto'
+        min_alunos (int): Mínimo de alunos por escola
+        verbose (bool): Mostra o resumo de cada agrupamento
+
+    Returns:
+        dict: DataFrames 'escolas' e 'centroides'
+    """
+    where_clause, params = construir_where(filtros, alias='')
+    grupos = conn.execute(SQL_GRUPOS.format(where_clause=where_clause), params).fetchall()
+
+    escolas, centroides = [], []
+    for ano, disciplina, serie in grupos:
+        inicio = time.perf_counter()
+        filtros_grupo = {**(filtros or {}), 'anos': ano, 'disciplinas': disciplina, 'series': serie}
+        info, x, descritores = matriz_dominio(conn, filtros_grupo, min_alunos)
+        if len(info) < 2:
+            continue
+
+        # Descritor sem respostas na escola: média das demais escolas
+        medias = np.nanmean(np.where(np.isnan(x).all(axis=0), 0, x), axis=0)
+        x = np.where(np.isnan(x), medias, x)
+
+        rotulos, centro, distancias = agrupar(x, k)
+        chave = {'AVA_ANO': ano, 'DIS_NOME': disciplina, 'SER_NOME': serie}
+        escolas.append(info.assign(
+            **chave,
+            GRUPO=rotulos,
+            DISTANCIA=distancias,
+            DOMINIO_MEDIO=x.mean(axis=1),
+        ))
+        qtd_grupos = len(centro)
+        centroides.append(pd.DataFrame({
+            **chave,
+            'GRUPO': np.repeat(np.arange(1, qtd_grupos + 1), len(descritores)),
+            'MTI_CODIGO': np.tile(descritores, qtd_grupos),
+            'DOMINIO': centro.ravel(),
+            'QTD_ESCOLAS': np.repeat(np.bincount(rotulos, minlength=qtd_grupos + 1)[1:],
+                                     len(descritores)),
+        }))
+        if verbose:
+            print(f"   {ano} · {disciplina} · {serie}: {len(info):,} escolas × "
+                  f"{len(descritores)} descritores, k={qtd_grupos}, "
+                  f"{time.perf_counter() - inicio:.2f}s")
+
+    colunas_escolas = ['AVA_ANO', 'DIS_NOME', 'SER_NOME', 'ESC_INEP', 'MUN_NOME', 'ALUNOS',
+                       'GRUPO', 'DISTANCIA', 'DOMINIO_MEDIO']
+    colunas_centroides = ['AVA_ANO', 'DIS_NOME', 'SER_NOME', 'GRUPO', 'MTI_CODIGO', 'DOMINIO',
+                          'QTD_ESCOLAS']
+    return {
+        'escolas': pd.concat(escolas, ignore_index=True)[colunas_escolas] if escolas
+        else pd.DataFrame(columns=colunas_escolas),
+        'centroides': pd.concat(centroides, ignore_index=True)[colunas_centroides] if centroides
+        else pd.DataFrame(columns=colunas_centroides),
+    }
+
+
+def gravar_agrupamento(conn, resultados):
+    """Grava os resultados de ``agrupar_escolas`` nas tabelas do banco"""
+    for tabela, chave in ((TABELA_ESCOLAS, 'escolas'), (TABELA_CENTROIDES, 'centroides')):
+        conn.register('_agrupamento', resultados[chave])
+        try:
+            conn.execute(f"CREATE OR REPLACE TABLE {tabela} AS SELECT * FROM _agrupamento")
+        finally:
+            conn.unregister('_agrupamento')
+
+
+def _valor_k(valor):
+    return valor if valor == 'auto' else int(valor)
+
+
+def main():
+    import duckdb
+
+    parser = argparse.ArgumentParser(description="Agrupamento de escolas por perfil de descritores")
+    parser.add_argument('--banco', default="db/avaliacao_prod.duckdb", help="Banco DuckDB")
+    parser.add_argument('--k', type=_valor_k, default=K_PADRAO, help="Número de grupos ou 'auto'")
+    parser.add_argument('--disciplina', action='append', help="Disciplina (repetível)")
+    parser.add_argument('--ano', action='append', type=int, help="Ano da avaliação (repetível)")
+    parser.add_argument('--min-alunos', type=int, default=MIN_ALUNOS_ESCOLA,
+                        help="Mínimo de alunos por escola")
+    parser.add_argument('--sem-gravar', action='store_true', help="Só mostra o resumo, sem gravar tabelas")
+    args = parser.parse_args()
+
+    print("🏫 AGRUPAMENTO DE ESCOLAS POR PERFIL DE DESCRITORES")
+    print("=" * 60)
+
+    conn = duckdb.connect(args.banco, read_only=args.sem_gravar)
+    try:
+        inicio = time.perf_counter()
+        resultados = agrupar_escolas(conn, {'disciplinas': args.disciplina, 'anos': args.ano},
+                                     args.k, args.min_alunos, verbose=True)
+        duracao = time.perf_counter() - inicio
+        if not args.sem_gravar:
+            gravar_agrupamento(conn, resultados)
+    finally:
+        conn.close()
+
+    escolas = resultados['escolas']
+    print(f"\n📋 {len(escolas):,} escolas agrupadas em {duracao:.1f}s")
+    if len(escolas):
+        resumo = escolas.groupby(['DIS_NOME', 'SER_NOME', 'GRUPO']) \
+            .agg(ESCOLAS=('ESC_INEP', 'count'), DOMINIO_MEDIO=('DOMINIO_MEDIO', 'mean')).round(3)
+        print(resumo.to_string())
+    if not args.sem_gravar:
+        print(f"💾 Tabelas: {TABELA_ESCOLAS}, {TABELA_CENTROIDES}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Tempo limite e cancelamento das consultas dos dashboards SAEV
+
+Quando o usuário muda um filtro durante uma consulta longa, o Streamlit
+pede uma nova execução do script, mas a consulta DuckDB antiga continua
+até o fim disputando threads com a nova. Consultas sem limite de tempo
+também podem prender a conexão indefinidamente.
+
+Cada consulta executada por ``saev_query`` ou pelo
+``duckdb_concurrent_solution`` é vigiada:
+- Tempo limite por consulta (SAEV_TIMEOUT_CONSULTA_S, padrão 60 s).
+- Token de cancelamento da execução Streamlit: a consulta é interrompida
+  quando a execução é substituída (rerun) ou encerrada (sessão fechada).
+
+Uma única thread vigia todas as consultas ativas e chama
+``conn.interrupt()`` quando uma delas deve parar; quem executou a
+consulta recebe ``ConsultaCancelada``. Os cancelamentos ficam registrados
+na telemetria (``get_stats``).
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import duckdb
+
+TIMEOUT_CONSULTA_SEGUNDOS = float(os.environ.get("SAEV_TIMEOUT_CONSULTA_S", "60"))
+
+# Intervalo entre verificações da thread vigia
+INTERVALO_VIGIA_SEGUNDOS = 0.1
+
+# Quantidade de cancelamentos recentes guardados na telemetria
+HISTORICO_CANCELAMENTOS = 50
+
+TIMEOUT = 'timeout'
+SUBSTITUIDA = 'substituida'
+
+
+class ConsultaCancelada(Exception):
+    """Consulta interrompida por tempo limite ou execução substituída"""
+
+    def __init__(self, motivo, duracao):
+        if motivo == TIMEOUT:
+            mensagem = f"Consulta excedeu o tempo limite ({duracao:.1f} s)"
+        else:
+            mensagem = f"Consulta cancelada: execução substituída ({duracao:.1f} s)"
+        super().__init__(mensagem)
+        self.motivo = motivo
+        self.duracao = duracao
+
+
+class TokenCancelamento:
+    """
+    Token de cancelamento compartilhado pelas consultas de uma execução
+
+    Args:
+        substituida (callable): Predicado que indica se a execução foi
+            substituída (None = apenas cancelamento manual)
+    """
+
+    def __init__(self, substituida=None):
+        self._substituida = substituida
+        self._cancelado = threading.Event()
+
+    def cancelar(self):
+        """Cancela todas as consultas vigiadas por este token"""
+        self._cancelado.set()
+
+    @property
+    def cancelado(self):
+        if self._cancelado.is_set():
+            return True
+        if self._substituida is not None and self._substituida():
+            self._cancelado.set()
+        return self._cancelado.is_set()
+
+
+def _execucao_substituida(ctx):
+    """
+    Indica se a execução do script foi substituída ou encerrada
+
+    Lê o estado de ``ScriptRequests`` sem consumi-lo. Reruns de fragmento
+    que não interrompem o script (mesma regra do Streamlit) são ignorados.
+    """
+    try:
+        pedidos = ctx.script_requests
+        estado = pedidos._state.name
+        if estado == 'STOP':
+            return True
+        if estado != 'RERUN':
+            return False
+        dados = pedidos._rerun_data
+        return not (dados.fragment_id_queue and not dados.is_fragment_scoped_rerun)
+    except AttributeError:
+        # Versão do Streamlit sem esses atributos: só o tempo limite vale
+        return False
+
+
+def token_da_execucao():
+    """Token ligado à execução Streamlit atual (None fora do Streamlit)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except ImportError:
+        ctx = None
+    if ctx is None:
+        return None
+    return TokenCancelamento(substituida=lambda: _execucao_substituida(ctx))
+
+
+class _Vigilancia:
+    """Uma consulta em andamento"""
+
+    __slots__ = ('conn', 'sql', 'inicio', 'prazo', 'token', 'motivo')
+
+    def __init__(self, conn, sql, timeout, token):
+        self.conn = conn
+        self.sql = sql
+        self.inicio = time.monotonic()
+        self.prazo = self.inicio + timeout if timeout else None
+        self.token = token
+        self.motivo = None
+
+
+class VigiaConsultas:
+    """Thread única que interrompe as consultas que devem parar"""
+
+    def __init__(self, intervalo=INTERVALO_VIGIA_SEGUNDOS):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._ativas = set()
+        self._thread = None
+        self._cancelamentos = deque(maxlen=HISTORICO_CANCELAMENTOS)
+        self._stats = {'consultas_vigiadas': 0, 'timeouts': 0, 'substituidas': 0}
+
+    def _iniciar_thread(self):
+        """Inicia a thread vigia; chamador deve deter o lock"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._vigiar_loop, name='saev-vigia-consultas', daemon=True
+            )
+            self._thread.start()
+
+    def _vigiar_loop(self):
+        while True:
+            time.sleep(self.intervalo)
+            agora = time.monotonic()
+            # O interrupt é feito sob o lock: depois que a vigilância sai do
+            # conjunto, a conexão não é mais interrompida (nem a próxima consulta)
+            with self._lock:
+                for vigilancia in list(self._ativas):
+                    if vigilancia.token is not None and vigilancia.token.cancelado:
+                        vigilancia.motivo = SUBSTITUIDA
+                    elif vigilancia.prazo is not None and agora >= vigilancia.prazo:
+                        vigilancia.motivo = TIMEOUT
+                    else:
+                        continue
+                    self._ativas.discard(vigilancia)
+                    try:
+                        vigilancia.conn.interrupt()
+                    except Exception:
+                        pass
+
+    def _registrar_cancelamento(self, vigilancia, duracao):
+        with self._lock:
+            self._stats['timeouts' if vigilancia.motivo == TIMEOUT else 'substituidas'] += 1
+            self._cancelamentos.append({
+                'instante': time.time(),
+                'motivo': vigilancia.motivo,
+                'duracao_s': round(duracao, 3),
+                'sql': ' '.join((vigilancia.sql or '').split())[:200],
+            })
+
+    @contextmanager
+    def vigiar(self, conn, sql=None, timeout=None, token=None):
+        """
+        Vigia a consulta executada dentro do bloco
+
+        Args:
+            conn: Conexão (ou cursor) DuckDB que executa a consulta
+            sql (str): Consulta (apenas para a telemetria)
+            timeout (float): Tempo limite em segundos (None = padrão,
+                0 = sem limite)
+            token (TokenCancelamento): Token da execução (None = token da
+                execução Streamlit atual, se houver)
+
+        Raises:
+            ConsultaCancelada: Se a consulta foi interrompida pela vigia
+        """
+        if timeout is None:
+            timeout = TIMEOUT_CONSULTA_SEGUNDOS
+        if token is None:
+            token = token_da_execucao()
+        vigilancia = _Vigilancia(conn, sql, timeout, token)
+
+        if token is not None and token.cancelado:
+            vigilancia.motivo = SUBSTITUIDA
+            self._registrar_cancelamento(vigilancia, 0.0)
+            raise ConsultaCancelada(SUBSTITUIDA, 0.0)
+
+        with self._lock:
+            self._stats['consultas_vigiadas'] += 1
+            self._ativas.add(vigilancia)
+            self._iniciar_thread()
+        try:
+            yield
+        except duckdb.InterruptException as e:
+            if vigilancia.motivo is None:
+                raise
+            duracao = time.monotonic() - vigilancia.inicio
+            self._registrar_cancelamento(vigilancia, duracao)
+            raise ConsultaCancelada(vigilancia.motivo, duracao) from e
+        finally:
+            with self._lock:
+                self._ativas.discard(vigilancia)
+
+    def get_stats(self):
+        """Retorna contadores e os cancelamentos recentes"""
+        with self._lock:
+            stats = self._stats.copy()
+            stats['consultas_ativas'] = len(self._ativas)
+            stats['timeout_padrao_s'] = TIMEOUT_CONSULTA_SEGUNDOS
+            stats['ultimos_cancelamentos'] = list(self._cancelamentos)
+            return stats
+
+
+# Instância global (uma thread vigia por processo)
+vigia_consultas = VigiaConsultas()
+vigiar_consulta = vigia_consultas.vigiar
+
+
+if __name__ == "__main__":
+    # Demonstração: consulta longa interrompida pelo tempo limite
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE t AS SELECT range AS i FROM range(20000000)")
+    print("⏱️ TESTE DE TEMPO LIMITE")
+    print("=" * 40)
+    try:
+        with vigiar_consulta(conn, "junção cartesiana", timeout=0.5):
+            conn.execute("SELECT COUNT(*) FROM t a, t b WHERE a.i + b.i = 7").fetchall()
+    except ConsultaCancelada as e:
+        print(f"🛑 {e}")
+    print(vigia_consultas.get_stats())
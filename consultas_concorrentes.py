@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Execução concorrente de consultas independentes do SAEV
+
+Relatórios como ``carregar_rollup`` (relatorio_descritores.py) executavam
+várias leituras independentes do mesmo banco, uma depois da outra. Aqui elas
+são disparadas em paralelo, cada uma em um cursor próprio (o DuckDB permite
+várias consultas simultâneas sobre a mesma instância do banco).
+
+- Um pool de threads limitado e um semáforo global compartilhado por todo o
+  processo (inclusive as sessões do Streamlit) evitam saturar o servidor.
+- Cada thread do pool mantém um cursor por conexão, reaproveitando os
+  prepared statements do ``saev_query`` entre chamadas.
+- ``iterar_concorrente`` entrega os resultados à medida que terminam.
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from saev_query import consultar_df
+
+# Limite global de consultas simultâneas (todas as sessões do processo)
+MAX_CONSULTAS_SIMULTANEAS = int(os.environ.get("SAEV_MAX_CONSULTAS_SIMULTANEAS", "4"))
+
+_semaforo_global = threading.BoundedSemaphore(MAX_CONSULTAS_SIMULTANEAS)
+_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONSULTAS_SIMULTANEAS,
+    thread_name_prefix="saev-consulta",
+)
+_cursores_thread = threading.local()
+
+
+def _cursor_da_thread(conn):
+    """Retorna o cursor desta thread para a conexão (criado sob demanda)"""
+    cursores = getattr(_cursores_thread, "cursores", None)
+    if cursores is None:
+        cursores = weakref.WeakKeyDictionary()
+        _cursores_thread.cursores = cursores
+
+    cursor = cursores.get(conn)
+    if cursor is None:
+        cursor = conn.cursor()
+        cursores[conn] = cursor
+    return cursor
+
+
+def _executar_em_cursor(conn, sql, params, executar):
+    """Executa uma consulta em um cursor próprio, respeitando o limite global"""
+    with _semaforo_global:
+        cursor = _cursor_da_thread(conn)
+        return executar(cursor, sql, params)
+
+
+def iterar_concorrente(conn, consultas, executar=consultar_df):
+    """
+    Executa consultas independentes em paralelo, entregando cada resultado
+    assim que fica pronto
+
+    Args:
+        conn: Conexão DuckDB de origem (os cursores são derivados dela)
+        consultas (dict): Nome -> (sql, params)
+        executar (callable): Função (cursor, sql, params) -> resultado
+
+    Yields:
+        tuple: (nome, resultado), na ordem de conclusão
+
+    Raises:
+        Exception: A primeira falha encontrada; as consultas ainda não
+            iniciadas são canceladas.
+    """
+    futuros = {
+        _executor.submit(_executar_em_cursor, conn, sql, params, executar): nome
+        for nome, (sql, params) in consultas.items()
+    }
+    try:
+        for futuro in as_completed(futuros):
+            yield futuros[futuro], futuro.result()
+    finally:
+        for futuro in futuros:
+            futuro.cancel()
+
+
+def executar_concorrente(conn, consultas, executar=consultar_df):
+    """
+    Executa consultas independentes em paralelo e retorna todos os resultados
+
+    A latência total tende à da consulta mais lenta, e não à soma de todas.
+
+    Args:
+        conn: Conexão DuckDB de origem
+        consultas (dict): Nome -> (sql, params)
+        executar (callable): Função (cursor, sql, params) -> resultado
+
+    Returns:
+        dict: Nome -> resultado, na mesma ordem de ``consultas``
+    """
+    resultados = dict(iterar_concorrente(conn, consultas, executar))
+    return {nome: resultados[nome] for nome in consultas}
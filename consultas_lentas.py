@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Registro de consultas lentas com perfil EXPLAIN ANALYZE
+
+A telemetria (telemetria_consultas) mostra quais consultas passam do
+aceitável, mas não por quê: sem o plano executado não dá para saber se o
+tempo foi da junção, da varredura ou da agregação (ex.: a auto-junção de
+``get_estatisticas_gerais`` em saev_rankings.py ou a junção com
+dim_descritor em saev_streamlit2.py).
+
+Quando uma consulta da camada de acesso (``saev_query`` e
+``duckdb_concurrent_solution``) passa do limiar (SAEV_LIMIAR_LENTA_MS,
+padrão 1000 ms; 0 desativa), ela é executada de novo em segundo plano com
+``EXPLAIN (ANALYZE, FORMAT JSON)`` e os mesmos parâmetros. O perfil JSON é
+gravado junto com SQL, parâmetros e duração em JSON Lines
+(SAEV_CONSULTAS_LENTAS_ARQUIVO, padrão reports/consultas_lentas.jsonl).
+
+A taxa de capturas é controlada: uma captura por vez, no máximo uma por
+impressão digital a cada SAEV_INTERVALO_PERFIL_S (padrão 600 s) e um
+intervalo mínimo entre capturas quaisquer. Consultas canceladas por tempo
+limite não são reexecutadas.
+
+Uso (relatório):
+    python consultas_lentas.py                    # piores impressões digitais
+    python consultas_lentas.py --impressao 72af25fcd43f   # plano da pior captura
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from cancelamento_consultas import TokenCancelamento, vigiar_consulta
+from telemetria_consultas import impressao_digital, telemetria
+
+LIMIAR_LENTA_MS = float(os.environ.get("SAEV_LIMIAR_LENTA_MS", "1000"))
+INTERVALO_POR_IMPRESSAO_S = float(os.environ.get("SAEV_INTERVALO_PERFIL_S", "600"))
+ARQUIVO_LENTAS = os.environ.get("SAEV_CONSULTAS_LENTAS_ARQUIVO", "reports/consultas_lentas.jsonl")
+
+# Intervalo mínimo entre duas capturas quaisquer
+INTERVALO_GLOBAL_S = 10.0
+
+# Operadores listados no resumo de cada captura
+OPERADORES_RESUMO = 5
+
+
+def operadores_do_perfil(perfil):
+    """
+    Lista os operadores do perfil JSON do DuckDB (pré-ordem)
+
+    Returns:
+        list: Dicionários com nome, profundidade, tempo (s), linhas
+            produzidas, linhas lidas e extra_info de cada operador
+    """
+    operadores = []
+    pendentes = [(filho, 0) for filho in reversed(perfil.get('children', []))]
+    while pendentes:
+        no, profundidade = pendentes.pop()
+        nome = no.get('operator_name') or no.get('operator_type') or '?'
+        if nome != 'EXPLAIN_ANALYZE':
+            operadores.append({
+                'operador': nome.strip(),
+                'profundidade': profundidade,
+                'tempo_s': no.get('operator_timing', 0.0),
+                'linhas': no.get('operator_cardinality'),
+                'linhas_lidas': no.get('operator_rows_scanned'),
+                'extra_info': no.get('extra_info') or {},
+            })
+            profundidade += 1
+        pendentes.extend((filho, profundidade) for filho in reversed(no.get('children', [])))
+    return operadores
+
+
+def resumir_operadores(perfil, limite=OPERADORES_RESUMO):
+    """
+    Tempo por tipo de operador, do mais caro para o mais barato
+
+    Returns:
+        list: [{'operador', 'tempo_ms', 'percentual', 'linhas'}]
+    """
+    tempos = defaultdict(float)
+    linhas = defaultdict(int)
+    for operador in operadores_do_perfil(perfil):
+        tempos[operador['operador']] += operador['tempo_s']
+        linhas[operador['operador']] += operador['linhas'] or 0
+    total = sum(tempos.values()) or 1.0
+    resumo = [
+        {
+            'operador': nome,
+            'tempo_ms': round(tempo * 1000, 2),
+            'percentual': round(tempo / total * 100, 1),
+            'linhas': linhas[nome],
+        }
+        for nome, tempo in tempos.items()
+    ]
+    resumo.sort(key=lambda item: item['tempo_ms'], reverse=True)
+    return resumo[:limite]
+
+
+class CapturaConsultasLentas:
+    """Reexecuta consultas lentas com EXPLAIN ANALYZE, com taxa controlada"""
+
+    def __init__(self, limiar_ms=LIMIAR_LENTA_MS, intervalo_impressao=INTERVALO_POR_IMPRESSAO_S,
+                 intervalo_global=INTERVALO_GLOBAL_S, arquivo=ARQUIVO_LENTAS):
+        self.limiar_ms = limiar_ms
+        self.intervalo_impressao = intervalo_impressao
+        self.intervalo_global = intervalo_global
+        self.arquivo = arquivo
+        self._lock = threading.Lock()
+        self._ultima_por_impressao = {}
+        self._ultima_captura = 0.0
+        self._em_andamento = False
+        self._stats = {'lentas': 0, 'capturadas': 0, 'limitadas': 0, 'falhas': 0}
+
+    def _permitir(self, impressao, agora):
+        """Aplica os limites de taxa; chamador deve deter o lock"""
+        if self._em_andamento or agora - self._ultima_captura < self.intervalo_global:
+            return False
+        ultima = self._ultima_por_impressao.get(impressao)
+        if ultima is not None and agora - ultima < self.intervalo_impressao:
+            return False
+        self._em_andamento = True
+        self._ultima_captura = agora
+        self._ultima_por_impressao[impressao] = agora
+        return True
+
+    def avaliar(self, conn, sql, params, duracao, abrir_cursor=None):
+        """
+        Agenda a captura do perfil se a consulta passou do limiar
+
+        Chamado pela camada de acesso logo após a consulta. A captura roda
+        em outra thread, em um cursor próprio da mesma conexão.
+
+        Args:
+            conn: Conexão (ou cursor) DuckDB que executou a consulta
+            sql (str): Consulta com placeholders '?'
+            params (list): Parâmetros usados
+            duracao (float): Duração da consulta, em segundos
+            abrir_cursor (callable): Abre o cursor da captura (padrão:
+                ``conn.cursor``). Necessário quando ``conn`` é fechado logo
+                após a consulta: fechar um cursor fecha os derivados dele.
+
+        Returns:
+            bool: True se a captura foi agendada
+        """
+        if self.limiar_ms <= 0 or duracao * 1000 < self.limiar_ms:
+            return False
+
+        impressao, _ = impressao_digital(sql)
+        with self._lock:
+            self._stats['lentas'] += 1
+            if not self._permitir(impressao, time.monotonic()):
+                self._stats['limitadas'] += 1
+                return False
+
+        contexto = {
+            'instante': time.time(),
+            'impressao': impressao,
+            'origem': telemetria.origem_atual(),
+            'duracao_ms': round(duracao * 1000, 2),
+            'sql': sql,
+            'params': params,
+        }
+        try:
+            cursor = abrir_cursor() if abrir_cursor else conn.cursor()
+            threading.Thread(target=self._capturar, args=(cursor, contexto),
+                             name='saev-perfil-lenta', daemon=True).start()
+        except Exception:
+            self._concluir(falha=True)
+            return False
+        return True
+
+    def _capturar(self, cursor, contexto):
+        """Executa o EXPLAIN ANALYZE e grava a captura"""
+        falha = False
+        try:
+            inicio = time.perf_counter()
+            # Token próprio: a captura não é cancelada quando a sessão muda de
+            # filtros, apenas pelo tempo limite
+            with vigiar_consulta(cursor, contexto['sql'], token=TokenCancelamento()):
+                linhas = cursor.execute(
+                    "EXPLAIN (ANALYZE, FORMAT JSON) " + contexto['sql'], contexto['params'] or None
+                ).fetchall()
+            perfil = json.loads(linhas[0][1])
+            registro = dict(
+                contexto,
+                duracao_perfil_ms=round((time.perf_counter() - inicio) * 1000, 2),
+                operadores=resumir_operadores(perfil),
+                perfil=perfil,
+            )
+            self._gravar(registro)
+        except Exception:
+            # Inclui ConsultaCancelada (tempo limite na reexecução)
+            falha = True
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+            self._concluir(falha)
+
+    def _concluir(self, falha):
+        with self._lock:
+            self._em_andamento = False
+            self._stats['falhas' if falha else 'capturadas'] += 1
+
+    def _gravar(self, registro):
+        """Acrescenta a captura ao arquivo JSON Lines"""
+        pasta = os.path.dirname(self.arquivo)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        linha = json.dumps(registro, ensure_ascii=False, default=str)
+        with self._lock, open(self.arquivo, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(linha + "\n")
+
+    def get_stats(self):
+        """Retorna contadores das capturas"""
+        with self._lock:
+            stats = self._stats.copy()
+            stats['limiar_ms'] = self.limiar_ms
+            stats['arquivo'] = self.arquivo
+            return stats
+
+
+# Instância global (limites de taxa compartilhados pelo processo)
+captura_lentas = CapturaConsultasLentas()
+avaliar_consulta_lenta = captura_lentas.avaliar
+
+
+def ler_capturas(caminho=ARQUIVO_LENTAS):
+    """Lê as capturas gravadas (lista vazia se o arquivo não existe)"""
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, encoding='utf-8') as arquivo:
+        return [json.loads(linha) for linha in arquivo if linha.strip()]
+
+
+def piores_consultas(capturas, limite=10):
+    """
+    Agrupa as capturas por impressão digital, da pior para a melhor
+    (maior duração observada)
+
+    Returns:
+        list: Dicionários com impressão, SQL, origem, número de capturas,
+            durações e os operadores dominantes da pior captura
+    """
+    grupos = defaultdict(list)
+    for captura in capturas:
+        grupos[captura['impressao']].append(captura)
+
+    resumo = []
+    for impressao, itens in grupos.items():
+        pior = max(itens, key=lambda c: c['duracao_ms'])
+        resumo.append({
+            'impressao': impressao,
+            'sql': impressao_digital(pior['sql'])[1],
+            'origem': pior.get('origem'),
+            'capturas': len(itens),
+            'duracao_max_ms': pior['duracao_ms'],
+            'duracao_mediana_ms': round(statistics.median(c['duracao_ms'] for c in itens), 2),
+            'ultima': max(c['instante'] for c in itens),
+            'operadores': pior['operadores'],
+        })
+    resumo.sort(key=lambda item: item['duracao_max_ms'], reverse=True)
+    return resumo[:limite]
+
+
+def _imprimir_ranking(capturas, limite):
+    piores = piores_consultas(capturas, limite)
+    print(f"🐢 {len(capturas)} capturas, {len(piores)} impressões digitais listadas\n")
+    for posicao, item in enumerate(piores, start=1):
+        ultima = datetime.fromtimestamp(item['ultima']).strftime('%d/%m/%Y %H:%M')
+        print(f"{posicao}. [{item['impressao']}] {item['origem'] or '(sem origem)'}")
+        print(f"   Máx {item['duracao_max_ms']:,.0f} ms · mediana {item['duracao_mediana_ms']:,.0f} ms "
+              f"· {item['capturas']} capturas · última {ultima}")
+        print(f"   {item['sql'][:160]}")
+        for operador in item['operadores'][:3]:
+            print(f"   ⚙️ {operador['operador']:<24} {operador['tempo_ms']:>10,.1f} ms "
+                  f"({operador['percentual']:.0f}%) · {operador['linhas']:,} linhas")
+        print()
+
+
+def _imprimir_detalhe(capturas, impressao):
+    itens = [c for c in capturas if c['impressao'].startswith(impressao)]
+    if not itens:
+        print(f"❌ Nenhuma captura para a impressão {impressao}")
+        return 1
+    pior = max(itens, key=lambda c: c['duracao_ms'])
+    print(f"🔍 Impressão {pior['impressao']} ({len(itens)} capturas) — pior: {pior['duracao_ms']:,.0f} ms, "
+          f"perfil em {pior['duracao_perfil_ms']:,.0f} ms")
+    print(f"Origem: {pior.get('origem') or '(sem origem)'}")
+    print(f"Parâmetros: {json.dumps(pior['params'], ensure_ascii=False, default=str)}")
+    print(f"\nSQL:\n{pior['sql'].strip()}\n")
+    print("Plano executado (tempo · linhas produzidas · linhas lidas):")
+    for operador in operadores_do_perfil(pior['perfil']):
+        print(f"{'  ' * operador['profundidade']}{operador['operador']} · "
+              f"{operador['tempo_s'] * 1000:,.1f} ms · {operador['linhas'] or 0:,} · "
+              f"{operador['linhas_lidas'] or 0:,}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório das consultas lentas capturadas")
+    parser.add_argument('--arquivo', default=ARQUIVO_LENTAS, help="Arquivo JSON Lines das capturas")
+    parser.add_argument('--limite', type=int, default=10, help="Impressões digitais listadas")
+    parser.add_argument('--impressao', help="Mostra o plano da pior captura desta impressão")
+    args = parser.parse_args()
+
+    capturas = ler_capturas(args.arquivo)
+    if not capturas:
+        print(f"ℹ️ Nenhuma captura em {args.arquivo}")
+        return 0
+    if args.impressao:
+        return _imprimir_detalhe(capturas, args.impressao)
+    _imprimir_ranking(capturas, args.limite)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,209 @@
+"""
+📊 SAEV - Oficinas de IA do Espírito Santo
+🏫 Perfis de Escolas
+
+Mostra os grupos de escolas com perfil semelhante de domínio dos
+descritores, por ano, disciplina e série. Lê as tabelas geradas pelo ETL
+(agrupamento_escolas.py): o grupo de cada escola e o domínio de cada
+descritor no centróide do grupo.
+"""
+
+import streamlit as st
+from saev_recursos import conexao
+from saev_query import consultar_df, tabela_existe
+from importacao_tardia import modulo_tardio
+from telemetria_consultas import cache_com_telemetria
+from agrupamento_escolas import TABELA_CENTROIDES, TABELA_ESCOLAS
+
+# Plotly só é importado ao desenhar o primeiro gráfico
+px = modulo_tardio("plotly.express")
+
+# =================== CONFIGURAÇÃO DA PÁGINA ===================
+st.set_page_config(
+    page_title="SAEV - Perfis de Escolas",
+    page_icon="🏫",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# =================== DADOS ===================
+
+@cache_com_telemetria(ttl=3600, show_spinner=False)
+def agrupamento_disponivel():
+    """Indica se o banco já possui as tabelas de agrupamento geradas pelo ETL"""
+    conn = conexao()
+    return tabela_existe(conn, TABELA_ESCOLAS) and tabela_existe(conn, TABELA_CENTROIDES)
+
+@cache_com_telemetria(ttl=3600, show_spinner=False)
+def carregar_opcoes():
+    """Combinações de ano, disciplina e série agrupadas"""
+    return consultar_df(conexao(), f"""
+    SELECT DISTINCT AVA_ANO, DIS_NOME, SER_NOME
+    FROM {TABELA_ESCOLAS}
+    ORDER BY AVA_ANO DESC, DIS_NOME, SER_NOME
+    """)
+
+@cache_com_telemetria(show_spinner=False)
+def carregar_escolas(ano, disciplina, serie):
+    """Grupo de cada escola, com o nome da escola"""
+    return consultar_df(conexao(), f"""
+    SELECT a.ESC_INEP, COALESCE(e.ESC_NOME, a.ESC_INEP) AS ESC_NOME, a.MUN_NOME,
+           a.ALUNOS, a.GRUPO, a.DOMINIO_MEDIO, a.DISTANCIA
+    FROM {TABELA_ESCOLAS} a
+    LEFT JOIN dim_escola e ON e.ESC_INEP = a.ESC_INEP
+    WHERE a.AVA_ANO = ? AND a.DIS_NOME = ? AND a.SER_NOME = ?
+    ORDER BY a.GRUPO, a.DOMINIO_MEDIO DESC
+    """, [ano, disciplina, serie])
+
+@cache_com_telemetria(show_spinner=False)
+def carregar_centroides(ano, disciplina, serie):
+    """Domínio de cada descritor no centróide de cada grupo"""
+    return consultar_df(conexao(), f"""
+    SELECT c.GRUPO, c.MTI_CODIGO, COALESCE(d.MTI_DESCRITOR, c.MTI_CODIGO) AS MTI_DESCRITOR,
+           c.DOMINIO, c.QTD_ESCOLAS
+    FROM {TABELA_CENTROIDES} c
+    LEFT JOIN dim_descritor d ON d.MTI_CODIGO = c.MTI_CODIGO
+    WHERE c.AVA_ANO = ? AND c.DIS_NOME = ? AND c.SER_NOME = ?
+    ORDER BY c.GRUPO, c.MTI_CODIGO
+    """, [ano, disciplina, serie])
+
+# =================== SEÇÕES ===================
+
+def exibir_resumo(escolas):
+    """Métricas gerais do agrupamento"""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("🏫 Escolas agrupadas", f"{len(escolas):,}")
+    with col2:
+        st.metric("🧩 Grupos", f"{escolas['GRUPO'].nunique()}")
+    with col3:
+        st.metric("👥 Alunos", f"{int(escolas['ALUNOS'].sum()):,}")
+
+def exibir_centroides(centroides):
+    """Mapa de calor do domínio dos descritores em cada grupo"""
+    st.subheader("🗺️ Perfil de cada grupo")
+    matriz = centroides.pivot(index='GRUPO', columns='MTI_CODIGO', values='DOMINIO') * 100
+    matriz.index = [f"Grupo {g}" for g in matriz.index]
+
+    fig = px.imshow(
+        matriz,
+        text_auto='.0f',
+        color_continuous_scale='RdYlGn',
+        zmin=0,
+        zmax=100,
+        labels=dict(x="Descritor", y="", color="% de acerto"),
+        aspect='auto'
+    )
+    fig.update_layout(height=120 + 60 * len(matriz))
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption("Grupo 1 = menor domínio médio dos descritores")
+
+    with st.expander("📖 Descritores"):
+        st.dataframe(
+            centroides[['MTI_CODIGO', 'MTI_DESCRITOR']].drop_duplicates(),
+            use_container_width=True,
+            hide_index=True
+        )
+
+def exibir_tamanho_grupos(escolas):
+    """Escolas e domínio médio por grupo"""
+    st.subheader("📊 Escolas por grupo")
+    resumo = escolas.groupby('GRUPO', as_index=False).agg(
+        ESCOLAS=('ESC_INEP', 'count'),
+        DOMINIO=('DOMINIO_MEDIO', 'mean')
+    )
+    resumo['GRUPO'] = "Grupo " + resumo['GRUPO'].astype(str)
+    resumo['DOMINIO'] = resumo['DOMINIO'] * 100
+
+    fig = px.bar(
+        resumo,
+        x='GRUPO',
+        y='ESCOLAS',
+        color='DOMINIO',
+        color_continuous_scale='RdYlGn',
+        range_color=[0, 100],
+        labels={'GRUPO': '', 'ESCOLAS': 'Escolas', 'DOMINIO': '% de acerto'}
+    )
+    fig.update_layout(height=400)
+    st.plotly_chart(fig, use_container_width=True)
+
+def exibir_escolas(escolas):
+    """Tabela das escolas do grupo escolhido"""
+    st.subheader("🏫 Escolas")
+    grupos = sorted(escolas['GRUPO'].unique())
+    grupo = st.selectbox("Grupo:", ['Todos'] + [f"Grupo {g}" for g in grupos])
+
+    tabela = escolas if grupo == 'Todos' else escolas[escolas['GRUPO'] == int(grupo.split()[-1])]
+    tabela = tabela.assign(DOMINIO_MEDIO=(tabela['DOMINIO_MEDIO'] * 100).round(1))
+    st.dataframe(
+        tabela[['GRUPO', 'ESC_NOME', 'MUN_NOME', 'ALUNOS', 'DOMINIO_MEDIO']].rename(columns={
+            'GRUPO': 'Grupo', 'ESC_NOME': 'Escola', 'MUN_NOME': 'Município',
+            'ALUNOS': 'Alunos', 'DOMINIO_MEDIO': '% de acerto'
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+    return tabela
+
+# =================== APLICAÇÃO PRINCIPAL ===================
+
+def main():
+    """Função principal da página"""
+    st.title("🏫 SAEV - Perfis de Escolas")
+    st.markdown("---")
+
+    if not agrupamento_disponivel():
+        st.warning("⚠️ O agrupamento de escolas ainda não foi gerado (ou foi removido "
+                   "por uma carga sem `--analises`). "
+                   "Execute `python saev_etl.py --mode derived --analises`.")
+        return
+
+    opcoes = carregar_opcoes()
+    if opcoes.empty:
+        st.info("ℹ️ Nenhuma escola com alunos suficientes para o agrupamento.")
+        return
+
+    # Sidebar - Filtros
+    st.sidebar.header("🔍 Filtros")
+    ano = st.sidebar.selectbox("Ano:", sorted(opcoes['AVA_ANO'].unique(), reverse=True))
+    opcoes = opcoes[opcoes['AVA_ANO'] == ano]
+    disciplina = st.sidebar.selectbox("Disciplina:", sorted(opcoes['DIS_NOME'].unique()))
+    opcoes = opcoes[opcoes['DIS_NOME'] == disciplina]
+    serie = st.sidebar.selectbox("Série:", sorted(opcoes['SER_NOME'].unique()))
+
+    escolas = carregar_escolas(int(ano), disciplina, serie)
+    centroides = carregar_centroides(int(ano), disciplina, serie)
+
+    municipios = ['Todos'] + sorted(escolas['MUN_NOME'].dropna().unique())
+    municipio = st.sidebar.selectbox("Município:", municipios)
+    if municipio != 'Todos':
+        escolas = escolas[escolas['MUN_NOME'] == municipio]
+
+    if escolas.empty:
+        st.info("ℹ️ Nenhuma escola com os filtros selecionados.")
+        return
+
+    exibir_resumo(escolas)
+    st.markdown("---")
+
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        exibir_centroides(centroides)
+    with col2:
+        exibir_tamanho_grupos(escolas)
+
+    st.markdown("---")
+    tabela = exibir_escolas(escolas)
+
+    # Download das escolas
+    st.download_button(
+        label="📥 Download das Escolas",
+        data=tabela.to_csv(index=False),
+        file_name=f"perfis_escolas_{ano}_{disciplina}_{serie}.csv".replace(' ', '_'),
+        mime="text/csv"
+    )
+
+# =================== EXECUÇÃO ===================
+
+if __name__ == "__main__":
+    main()
@@ -6,28 +6,30 @@ Este dashboard trata a disciplina Leitura de forma diferenciada:
 - Métricas baseadas em níveis de proficiência
 - Visualizações específicas para distribuição de níveis
 - Rankings baseados no nível mais alto atingido
+- Distribuições, pivôs e top municípios agregados no banco já filtrados
 
 Autor: Sistema SAEV
 Data: 08/08/2025
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import duckdb
-from pathlib import Path
 from utils_leitura import (
-    get_nivel_leitura_numerico, 
-    get_descricao_nivel_leitura, 
-    get_cor_nivel_leitura,
-    calcular_metricas_leitura,
     NIVEIS_LEITURA,
-    CORES_NIVEIS
+    TABELA_NIVEIS,
+    rotular_niveis
 )
-from duckdb_manager import safe_get_dataframe, test_connection
-from duckdb_concurrent_solution import cached_query_safe, safe_dataframe
+from duckdb_concurrent_solution import safe_dataframe
+from saev_query import construir_where
+from saev_agregados import Agregado, carregar_agregados
+from saev_recursos import catalogo_filtros, conexao
+from filtros_catalogo import filtrar_catalogo, opcoes_em_cascata
+from tabela_paginada import exibir_tabela_paginada
+from importacao_tardia import modulo_tardio
+from telemetria_consultas import cache_com_telemetria
+
+# Plotly só é importado ao desenhar o primeiro gráfico
+px = modulo_tardio("plotly.express")
+go = modulo_tardio("plotly.graph_objects")
 
 # Configuração da página
 st.set_page_config(
@@ -37,129 +39,167 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-@st.cache_data
-def carregar_dados_leitura():
-    """Carrega dados específicos da disciplina Leitura usando gerenciador concorrente"""
-    
-    query = """
-    SELECT 
-        f.MUN_NOME,
-        f.ESC_INEP,
-        e.ESC_NOME,
-        f.SER_NOME,
-        f.ALU_ID,
-        a.ALU_NOME,
-        f.AVA_NOME,
-        f.AVA_ANO,
-        f.TES_NOME,
-        f.NIVEL_LEITURA,
-        f.NIVEL_NUMERICO
-    FROM fato_resposta_aluno f
-    JOIN dim_aluno a ON f.ALU_ID = a.ALU_ID
-    JOIN dim_escola e ON f.ESC_INEP = e.ESC_INEP
-    WHERE f.DIS_NOME = 'Leitura' 
-      AND f.NIVEL_LEITURA IS NOT NULL
-    ORDER BY f.MUN_NOME, f.SER_NOME, f.ALU_ID
-    """
-    
-    # Usar o gerenciador concorrente com cache
-    df = cached_query_safe(query)
-    
-    if df is None:
-        st.error("❌ Erro ao carregar dados de Leitura")
+# Melhor nível por aluno, calculado no banco (listagem paginada);
+# where_clause vem de filtros_leitura
+SQL_RANKING_LEITURA = """
+SELECT 
+    f.ALU_ID,
+    COALESCE(a.ALU_NOME, '') as ALU_NOME,
+    COALESCE(e.ESC_NOME, '') as ESC_NOME,
+    COALESCE(f.MUN_NOME, '') as MUN_NOME,
+    COALESCE(f.SER_NOME, '') as SER_NOME,
+    MAX(f.NIVEL_NUMERICO) as NIVEL_NUMERICO,
+    ARG_MAX(f.NIVEL_LEITURA, f.NIVEL_NUMERICO) as NIVEL_LEITURA
+FROM fato_resposta_aluno f
+JOIN dim_aluno a ON f.ALU_ID = a.ALU_ID
+JOIN dim_escola e ON f.ESC_INEP = e.ESC_INEP
+WHERE {where_clause}
+GROUP BY f.ALU_ID, a.ALU_NOME, e.ESC_NOME, f.MUN_NOME, f.SER_NOME
+"""
+
+ORDENACOES_RANKING_LEITURA = {
+    "🏆 Maior nível": [('NIVEL_NUMERICO', False), ('ALU_NOME', True)],
+    "⚠️ Menor nível": [('NIVEL_NUMERICO', True), ('ALU_NOME', True)],
+    "🔤 Nome do aluno": [('ALU_NOME', True)],
+    "🏫 Escola": [('ESC_NOME', True), ('ALU_NOME', True)],
+}
+
+# Restrição comum a todas as consultas da página
+FILTRO_LEITURA = "f.DIS_NOME = 'Leitura' AND f.NIVEL_LEITURA IS NOT NULL"
+
+# Agregados da página, calculados no banco em uma única varredura filtrada
+# (a população de Leitura nunca é trazida para a memória)
+AGREGADOS_LEITURA = [
+    Agregado('metricas', {}, ['total_registros', 'nivel_medio_leitura',
+                              'leitores_fluentes', 'nao_leitores']),
+    Agregado('distribuicao', {'NIVEL_LEITURA': 'f.NIVEL_LEITURA'}, ['total_registros']),
+    Agregado('por_serie', {'SER_NOME': 'f.SER_NOME', 'NIVEL_LEITURA': 'f.NIVEL_LEITURA'},
+             ['total_registros'], excluir_nulos=True),
+    Agregado('top_municipios', {'MUN_NOME': 'f.MUN_NOME'},
+             ['total_registros', 'leitores_fluentes', 'pct_fluentes'],
+             minimo=('total_registros', 10), ordem=[('pct_fluentes', False), ('MUN_NOME', True)],
+             limite=10, excluir_nulos=True),
+]
+
+# Ordem dos filtros da barra lateral (cascata pelo catálogo)
+ORDEM_FILTROS = ['MUN_NOME', 'SER_NOME', 'AVA_NOME']
+
+def formatar_pagina_leitura(pagina):
+    """Adiciona a descrição do nível à página exibida"""
+    return rotular_niveis(pagina).drop(columns='COR_NIVEL')
+
+def filtros_leitura(municipio, serie, avaliacao):
+    """Cláusula WHERE parametrizada da página ('Todos'/'Todas' = sem filtro)"""
+    where_clause, params = construir_where({
+        'municipios': None if municipio == 'Todos' else municipio,
+        'series': None if serie == 'Todas' else serie,
+        'avaliacoes': None if avaliacao == 'Todas' else avaliacao,
+    })
+    return f"{FILTRO_LEITURA} AND {where_clause}", params
+
+def carregar_catalogo_leitura():
+    """Combinações de filtros que têm dados de Leitura"""
+    try:
+        return filtrar_catalogo(catalogo_filtros(), {'DIS_NOME': ['Leitura']})
+    except Exception as e:
+        st.error(f"❌ Erro ao carregar opções dos filtros: {e}")
         st.stop()
-    
-    # Adicionar descrições
-    df['DESCRICAO_NIVEL'] = df['NIVEL_LEITURA'].apply(get_descricao_nivel_leitura)
-    df['COR_NIVEL'] = df['NIVEL_LEITURA'].apply(get_cor_nivel_leitura)
-    
-    return df
+
+@cache_com_telemetria
+def carregar_agregados_leitura(municipio='Todos', serie='Todas', avaliacao='Todas'):
+    """Distribuição de níveis, pivô por série e top municípios, agregados no banco"""
+    where_clause, params = filtros_leitura(municipio, serie, avaliacao)
+    return carregar_agregados(conexao(), AGREGADOS_LEITURA, where_clause, params)
+
+@cache_com_telemetria(ttl=3600, show_spinner="Preparando o CSV do ranking...")
+def gerar_csv_ranking(where_clause, params):
+    """CSV do ranking completo, consultado só quando o download é pedido"""
+    query = SQL_RANKING_LEITURA.format(where_clause=where_clause)
+    ranking = safe_dataframe(f"{query}ORDER BY NIVEL_NUMERICO DESC, ALU_NOME", params)
+    return formatar_pagina_leitura(ranking).to_csv(index=False).encode('utf-8')
 
 def main():
     st.title("📚 SAEV - Análise de Proficiência em Leitura")
     st.markdown("---")
     
-    # Carregar dados
-    df = carregar_dados_leitura()
+    # Opções dos filtros pelo catálogo (sem consultar a população de Leitura)
+    catalogo = carregar_catalogo_leitura()
     
-    if df.empty:
+    if catalogo.empty:
         st.warning("⚠️ Nenhum dado de Leitura encontrado no banco.")
         return
     
     # Sidebar - Filtros
     st.sidebar.header("🔍 Filtros")
+    selecoes = {}
     
     # Filtro por município
-    municipios = ['Todos'] + sorted(df['MUN_NOME'].unique().tolist())
-    municipio_selecionado = st.sidebar.selectbox("Município:", municipios)
-    
-    # Filtrar por município
+    opcoes = opcoes_em_cascata(catalogo, ORDEM_FILTROS, selecoes)
+    municipio_selecionado = st.sidebar.selectbox("Município:", ['Todos'] + opcoes['MUN_NOME'])
     if municipio_selecionado != 'Todos':
-        df_filtrado = df[df['MUN_NOME'] == municipio_selecionado]
-    else:
-        df_filtrado = df.copy()
+        selecoes['MUN_NOME'] = [municipio_selecionado]
     
     # Filtro por série
-    series = ['Todas'] + sorted(df_filtrado['SER_NOME'].unique().tolist())
-    serie_selecionada = st.sidebar.selectbox("Série:", series)
-    
+    opcoes = opcoes_em_cascata(catalogo, ORDEM_FILTROS, selecoes)
+    serie_selecionada = st.sidebar.selectbox("Série:", ['Todas'] + opcoes['SER_NOME'])
     if serie_selecionada != 'Todas':
-        df_filtrado = df_filtrado[df_filtrado['SER_NOME'] == serie_selecionada]
+        selecoes['SER_NOME'] = [serie_selecionada]
     
     # Filtro por avaliação
-    avaliacoes = ['Todas'] + sorted(df_filtrado['AVA_NOME'].unique().tolist())
-    avaliacao_selecionada = st.sidebar.selectbox("Avaliação:", avaliacoes)
+    opcoes = opcoes_em_cascata(catalogo, ORDEM_FILTROS, selecoes)
+    avaliacao_selecionada = st.sidebar.selectbox("Avaliação:", ['Todas'] + opcoes['AVA_NOME'])
+    
+    # Agregados já filtrados, calculados no banco
+    try:
+        dados = carregar_agregados_leitura(municipio_selecionado, serie_selecionada,
+                                           avaliacao_selecionada)
+    except Exception as e:
+        st.error(f"❌ Erro ao carregar dados de Leitura: {e}")
+        st.stop()
     
-    if avaliacao_selecionada != 'Todas':
-        df_filtrado = df_filtrado[df_filtrado['AVA_NOME'] == avaliacao_selecionada]
+    metricas = dados['metricas'].iloc[0] if not dados['metricas'].empty else None
+    total = int(metricas['total_registros']) if metricas is not None else 0
     
     # Estatísticas gerais
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("📊 Total de Alunos", f"{len(df_filtrado):,}")
+        st.metric("📊 Total de Alunos", f"{total:,}")
     
     with col2:
-        nivel_medio = df_filtrado['NIVEL_NUMERICO'].mean() if len(df_filtrado) > 0 else 0
+        nivel_medio = metricas['nivel_medio_leitura'] if total > 0 else 0
         st.metric("📈 Nível Médio", f"{nivel_medio:.2f}/6")
     
     with col3:
-        fluentes = (df_filtrado['NIVEL_LEITURA'] == 'fluente').sum()
-        pct_fluentes = (fluentes / len(df_filtrado) * 100) if len(df_filtrado) > 0 else 0
+        pct_fluentes = (metricas['leitores_fluentes'] / total * 100) if total > 0 else 0
         st.metric("🌟 Leitores Fluentes", f"{pct_fluentes:.1f}%")
     
     with col4:
-        nao_leitores = (df_filtrado['NIVEL_LEITURA'] == 'nao_leitor').sum()
-        pct_nao_leitores = (nao_leitores / len(df_filtrado) * 100) if len(df_filtrado) > 0 else 0
+        pct_nao_leitores = (metricas['nao_leitores'] / total * 100) if total > 0 else 0
         st.metric("⚠️ Não Leitores", f"{pct_nao_leitores:.1f}%")
     
     st.markdown("---")
     
+    # Distribuição com todos os níveis (rótulos e cores pela tabela de consulta)
+    distribuicao = TABELA_NIVEIS.merge(dados['distribuicao'], on='NIVEL_LEITURA', how='left')
+    distribuicao['total_registros'] = distribuicao['total_registros'].fillna(0).astype(int)
+    
     # Visualizações
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("📊 Distribuição por Níveis de Leitura")
         
-        # Contar por nível
-        distribuicao = df_filtrado['NIVEL_LEITURA'].value_counts()
-        
-        # Garantir que todos os níveis apareçam
-        distribuicao_completa = pd.Series(index=NIVEIS_LEITURA, dtype=int).fillna(0)
-        for nivel in distribuicao.index:
-            if nivel in distribuicao_completa.index:
-                distribuicao_completa[nivel] = distribuicao[nivel]
-        
         # Criar gráfico de barras
         fig_dist = go.Figure()
         
-        for i, nivel in enumerate(NIVEIS_LEITURA):
+        for nivel in distribuicao.itertuples(index=False):
             fig_dist.add_trace(go.Bar(
-                x=[get_descricao_nivel_leitura(nivel)],
-                y=[distribuicao_completa[nivel]],
-                name=get_descricao_nivel_leitura(nivel),
-                marker_color=CORES_NIVEIS[i],
-                text=[f"{distribuicao_completa[nivel]:,}"],
+                x=[nivel.DESCRICAO_NIVEL],
+                y=[nivel.total_registros],
+                name=nivel.DESCRICAO_NIVEL,
+                marker_color=nivel.COR_NIVEL,
+                text=[f"{nivel.total_registros:,}"],
                 textposition='auto'
             ))
         
@@ -176,13 +216,10 @@ def main():
         st.subheader("🥧 Percentual por Nível")
         
         # Gráfico de pizza
-        valores = [distribuicao_completa[nivel] for nivel in NIVEIS_LEITURA]
-        labels = [get_descricao_nivel_leitura(nivel) for nivel in NIVEIS_LEITURA]
-        
         fig_pizza = go.Figure(data=[go.Pie(
-            labels=labels,
-            values=valores,
-            marker_colors=CORES_NIVEIS,
+            labels=distribuicao['DESCRICAO_NIVEL'],
+            values=distribuicao['total_registros'],
+            marker_colors=distribuicao['COR_NIVEL'],
             textinfo='label+percent',
             textposition='auto'
         )])
@@ -194,32 +231,22 @@ def main():
     if municipio_selecionado == 'Todos' and serie_selecionada == 'Todas':
         st.subheader("📈 Distribuição por Série")
         
-        # Pivô por série e nível
-        pivot_serie = df_filtrado.pivot_table(
-            values='ALU_ID',
+        # Pivô das contagens já agregadas (séries x níveis)
+        pivot_serie = dados['por_serie'].pivot(
             index='SER_NOME',
             columns='NIVEL_LEITURA',
-            aggfunc='count',
-            fill_value=0
-        )
-        
-        # Garantir que todas as colunas existam
-        for nivel in NIVEIS_LEITURA:
-            if nivel not in pivot_serie.columns:
-                pivot_serie[nivel] = 0
-        
-        # Reordenar colunas
-        pivot_serie = pivot_serie[NIVEIS_LEITURA]
+            values='total_registros'
+        ).reindex(columns=NIVEIS_LEITURA).fillna(0).sort_index()
         
         # Gráfico de barras empilhadas
         fig_serie = go.Figure()
         
-        for i, nivel in enumerate(NIVEIS_LEITURA):
+        for nivel in TABELA_NIVEIS.itertuples(index=False):
             fig_serie.add_trace(go.Bar(
-                name=get_descricao_nivel_leitura(nivel),
+                name=nivel.DESCRICAO_NIVEL,
                 x=pivot_serie.index,
-                y=pivot_serie[nivel],
-                marker_color=CORES_NIVEIS[i]
+                y=pivot_serie[nivel.NIVEL_LEITURA],
+                marker_color=nivel.COR_NIVEL
             ))
         
         fig_serie.update_layout(
@@ -236,25 +263,12 @@ def main():
     if municipio_selecionado == 'Todos':
         st.subheader("🏛️ Top 10 Municípios - Maior % de Leitores Fluentes")
         
-        municipios_fluentes = df_filtrado.groupby('MUN_NOME').agg({
-            'ALU_ID': 'count',
-            'NIVEL_LEITURA': lambda x: (x == 'fluente').sum()
-        }).rename(columns={'ALU_ID': 'TOTAL', 'NIVEL_LEITURA': 'FLUENTES'})
-        
-        municipios_fluentes['PCT_FLUENTES'] = (
-            municipios_fluentes['FLUENTES'] / municipios_fluentes['TOTAL'] * 100
-        ).round(2)
-        
-        municipios_fluentes = municipios_fluentes[
-            municipios_fluentes['TOTAL'] >= 10
-        ].sort_values('PCT_FLUENTES', ascending=False).head(10)
-        
         fig_mun = px.bar(
-            municipios_fluentes.reset_index(),
+            dados['top_municipios'],
             x='MUN_NOME',
-            y='PCT_FLUENTES',
+            y='pct_fluentes',
             title="Percentual de Leitores Fluentes por Município",
-            color='PCT_FLUENTES',
+            color='pct_fluentes',
             color_continuous_scale='Viridis'
         )
         
@@ -269,26 +283,27 @@ def main():
     # Ranking de alunos
     st.subheader("🏆 Ranking de Alunos por Nível de Leitura")
     
-    # Melhor nível por aluno
-    ranking_alunos = df_filtrado.groupby(['ALU_ID', 'ALU_NOME', 'ESC_NOME', 'MUN_NOME', 'SER_NOME']).agg({
-        'NIVEL_NUMERICO': 'max',
-        'NIVEL_LEITURA': lambda x: x.iloc[x.values.argmax()]
-    }).reset_index()
-    
-    ranking_alunos['DESCRICAO_NIVEL'] = ranking_alunos['NIVEL_LEITURA'].apply(get_descricao_nivel_leitura)
-    ranking_alunos = ranking_alunos.sort_values(['NIVEL_NUMERICO', 'ALU_NOME'], ascending=[False, True])
-    
-    # Mostrar top 50
-    st.dataframe(
-        ranking_alunos.head(50)[['ALU_NOME', 'ESC_NOME', 'MUN_NOME', 'SER_NOME', 'DESCRICAO_NIVEL']].rename(columns={
+    # Lista completa, paginada no servidor (só uma tela vai ao navegador)
+    where_clause, params = filtros_leitura(municipio_selecionado, serie_selecionada,
+                                           avaliacao_selecionada)
+    exibir_tabela_paginada(
+        chave="ranking_leitura",
+        consultar=safe_dataframe,
+        fonte=SQL_RANKING_LEITURA.format(where_clause=where_clause),
+        params=params,
+        colunas={
             'ALU_NOME': 'Nome do Aluno',
             'ESC_NOME': 'Escola',
             'MUN_NOME': 'Município',
             'SER_NOME': 'Série',
             'DESCRICAO_NIVEL': 'Nível de Leitura'
-        }),
-        use_container_width=True,
-        height=400
+        },
+        ordenacoes=ORDENACOES_RANKING_LEITURA,
+        chave_unica=['ALU_ID', 'ESC_NOME', 'MUN_NOME', 'SER_NOME'],
+        coluna_busca='ALU_NOME',
+        rotulo_busca="🔎 Buscar aluno:",
+        formatar=formatar_pagina_leitura,
+        altura=400
     )
     
     # Download dos dados
@@ -298,7 +313,9 @@ def main():
     
     with col1:
         # CSV da distribuição
-        csv_distribuicao = distribuicao_completa.to_csv()
+        csv_distribuicao = distribuicao[
+            ['NIVEL_LEITURA', 'DESCRICAO_NIVEL', 'total_registros']
+        ].to_csv(index=False)
         st.download_button(
             label="📊 Download Distribuição por Níveis",
             data=csv_distribuicao,
@@ -307,14 +324,18 @@ def main():
         )
     
     with col2:
-        # CSV do ranking
-        csv_ranking = ranking_alunos.to_csv(index=False)
-        st.download_button(
-            label="🏆 Download Ranking de Alunos",
-            data=csv_ranking,
-            file_name=f"ranking_leitura_{municipio_selecionado.replace(' ', '_')}.csv",
-            mime="text/csv"
-        )
+        # CSV do ranking: gerado só depois do clique em "Preparar", não a cada
+        # execução da página, e guardado no cache para os mesmos filtros
+        filtros_csv = (where_clause, params)
+        if st.button("🏆 Preparar Ranking de Alunos"):
+            st.session_state['csv_ranking_leitura'] = filtros_csv
+        if st.session_state.get('csv_ranking_leitura') == filtros_csv:
+            st.download_button(
+                label="📥 Download Ranking de Alunos",
+                data=gerar_csv_ranking(where_clause, params),
+                file_name=f"ranking_leitura_{municipio_selecionado.replace(' ', '_')}.csv",
+                mime="text/csv"
+            )
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,215 @@
+"""
+📊 SAEV - Oficinas de IA do Espírito Santo
+🔀 Progressão da Leitura
+
+Mostra como os alunos passaram de um nível de leitura para outro entre duas
+avaliações consecutivas (ex.: Diagnóstica → Formativa 1), por município,
+escola e série. Lê as matrizes de transição materializadas pelo ETL
+(transicoes_leitura.py): cada tela consulta no máximo algumas centenas de
+células, sem cruzar o histórico dos alunos.
+"""
+
+import streamlit as st
+from saev_recursos import catalogo_filtros, conexao
+from saev_query import tabela_existe
+from filtros_catalogo import filtrar_catalogo, opcoes_em_cascata
+from importacao_tardia import modulo_tardio
+from telemetria_consultas import cache_com_telemetria
+from transicoes_leitura import (
+    TABELA_ESCOLA,
+    TABELA_MUNICIPIO,
+    carregar_matriz,
+    pares_avaliacoes,
+    percentuais_por_origem,
+    resumo_progressao,
+    rotular_matriz,
+)
+from utils_leitura import TABELA_NIVEIS
+
+# Plotly só é importado ao desenhar o primeiro gráfico
+px = modulo_tardio("plotly.express")
+go = modulo_tardio("plotly.graph_objects")
+
+# =================== CONFIGURAÇÃO DA PÁGINA ===================
+st.set_page_config(
+    page_title="SAEV - Progressão da Leitura",
+    page_icon="🔀",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+ORDEM_FILTROS = ['MUN_NOME', 'ESC_INEP', 'SER_NOME']
+
+# =================== DADOS ===================
+
+@cache_com_telemetria(ttl=3600, show_spinner=False)
+def transicoes_disponiveis():
+    """Indica se o banco já possui as tabelas de transição geradas pelo ETL"""
+    conn = conexao()
+    return tabela_existe(conn, TABELA_ESCOLA) and tabela_existe(conn, TABELA_MUNICIPIO)
+
+@cache_com_telemetria(ttl=3600, show_spinner=False)
+def carregar_pares():
+    """Pares de avaliações consecutivas com transições"""
+    return pares_avaliacoes(conexao())
+
+@cache_com_telemetria(show_spinner=False)
+def carregar_matriz_filtrada(ano, origem, destino, municipio=None, escola=None, serie=None):
+    """Matriz 6×6 de transições do par de avaliações e dos filtros"""
+    return carregar_matriz(conexao(), {
+        'anos': ano,
+        'origens': origem,
+        'destinos': destino,
+        'municipios': municipio,
+        'escolas': escola,
+        'series': serie,
+    })
+
+# =================== SEÇÕES ===================
+
+def exibir_resumo(resumo):
+    """Métricas de avanço, permanência e regressão"""
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("👥 Alunos nas duas avaliações", f"{resumo['total']:,}")
+    with col2:
+        st.metric("📈 Avançaram de nível", f"{resumo['pct_avancaram']:.1f}%",
+                  help=f"{resumo['avancaram']:,} alunos")
+    with col3:
+        st.metric("➡️ Mantiveram o nível", f"{resumo['pct_mantiveram']:.1f}%",
+                  help=f"{resumo['mantiveram']:,} alunos")
+    with col4:
+        st.metric("📉 Regrediram de nível", f"{resumo['pct_regrediram']:.1f}%",
+                  help=f"{resumo['regrediram']:,} alunos")
+
+def exibir_matriz(matriz, origem, destino, percentual):
+    """Mapa de calor da matriz de transição"""
+    st.subheader("🗺️ Matriz de Transição")
+    valores = percentuais_por_origem(matriz) if percentual else matriz
+    valores = rotular_matriz(valores)
+
+    fig = px.imshow(
+        valores,
+        text_auto='.1f' if percentual else True,
+        color_continuous_scale='Blues',
+        labels=dict(
+            x=f"Nível na {destino}",
+            y=f"Nível na {origem}",
+            color="% da origem" if percentual else "Alunos"
+        ),
+        aspect='auto'
+    )
+    fig.update_layout(height=500)
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption("Diagonal: alunos que mantiveram o nível · acima: avançaram · abaixo: regrediram")
+
+def exibir_destinos(matriz, destino):
+    """Distribuição dos destinos de cada nível de origem (barras empilhadas)"""
+    st.subheader("📊 Para onde foi cada nível")
+    percentuais = rotular_matriz(percentuais_por_origem(matriz))
+
+    fig = go.Figure()
+    for nivel in TABELA_NIVEIS.itertuples(index=False):
+        fig.add_trace(go.Bar(
+            name=nivel.DESCRICAO_NIVEL,
+            x=percentuais.index,
+            y=percentuais[nivel.DESCRICAO_NIVEL],
+            marker_color=nivel.COR_NIVEL
+        ))
+    fig.update_layout(
+        barmode='stack',
+        xaxis_title="Nível de origem",
+        yaxis_title=f"% dos alunos por nível na {destino}",
+        height=450,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+# =================== APLICAÇÃO PRINCIPAL ===================
+
+def main():
+    """Função principal da página"""
+    st.title("🔀 SAEV - Progressão da Leitura")
+    st.markdown("---")
+
+    if not transicoes_disponiveis():
+        st.warning("⚠️ As matrizes de transição ainda não foram geradas. "
+                   "Execute `python saev_etl.py --mode derived`.")
+        return
+
+    pares = carregar_pares()
+    if pares.empty:
+        st.info("ℹ️ Nenhum aluno com Leitura em duas avaliações consecutivas.")
+        return
+
+    # Sidebar - Filtros
+    st.sidebar.header("🔍 Filtros")
+    rotulos = {
+        i: f"{par.AVA_ANO} · {par.AVA_ORIGEM} → {par.AVA_DESTINO}"
+        for i, par in enumerate(pares.itertuples(index=False))
+    }
+    escolhido = st.sidebar.selectbox("Avaliações:", list(rotulos), format_func=rotulos.get)
+    par = pares.iloc[escolhido]
+
+    catalogo = filtrar_catalogo(catalogo_filtros(), {
+        'DIS_NOME': ['Leitura'],
+        'AVA_ANO': [par['AVA_ANO']],
+        'AVA_NOME': [par['AVA_ORIGEM']],
+    })
+    selecoes = {}
+
+    opcoes = opcoes_em_cascata(catalogo, ORDEM_FILTROS, selecoes)
+    municipio = st.sidebar.selectbox("Município:", ['Todos'] + opcoes['MUN_NOME'])
+    if municipio != 'Todos':
+        selecoes['MUN_NOME'] = [municipio]
+
+    # Escolas pelo código INEP (nomes podem se repetir), exibidas pelo nome
+    opcoes = opcoes_em_cascata(catalogo, ORDEM_FILTROS, selecoes)
+    nomes_escolas = (catalogo.drop_duplicates('ESC_INEP')
+                     .set_index('ESC_INEP')['ESC_NOME'].dropna().to_dict())
+    escolas = sorted(opcoes['ESC_INEP'], key=lambda inep: (str(nomes_escolas.get(inep)), inep))
+    escola = st.sidebar.selectbox(
+        "Escola:", ['Todas'] + escolas,
+        format_func=lambda inep: nomes_escolas.get(inep) or inep
+    )
+    if escola != 'Todas':
+        selecoes['ESC_INEP'] = [escola]
+
+    opcoes = opcoes_em_cascata(catalogo, ORDEM_FILTROS, selecoes)
+    serie = st.sidebar.selectbox("Série:", ['Todas'] + opcoes['SER_NOME'])
+
+    percentual = st.sidebar.toggle("Percentual por nível de origem", value=True)
+
+    matriz = carregar_matriz_filtrada(
+        int(par['AVA_ANO']), par['AVA_ORIGEM'], par['AVA_DESTINO'],
+        None if municipio == 'Todos' else municipio,
+        None if escola == 'Todas' else escola,
+        None if serie == 'Todas' else serie,
+    )
+
+    resumo = resumo_progressao(matriz)
+    if resumo['total'] == 0:
+        st.info("ℹ️ Nenhum aluno com os filtros selecionados.")
+        return
+
+    exibir_resumo(resumo)
+    st.markdown("---")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        exibir_matriz(matriz, par['AVA_ORIGEM'], par['AVA_DESTINO'], percentual)
+    with col2:
+        exibir_destinos(matriz, par['AVA_DESTINO'])
+
+    # Download da matriz
+    st.download_button(
+        label="📥 Download da Matriz de Transição",
+        data=rotular_matriz(matriz).to_csv(),
+        file_name=f"transicao_leitura_{par['AVA_ORIGEM']}_{par['AVA_DESTINO']}.csv".replace(' ', '_'),
+        mime="text/csv"
+    )
+
+# =================== EXECUÇÃO ===================
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+📊 SAEV - Oficinas de IA do Espírito Santo
+🩺 Diagnóstico das Consultas
+
+Página de diagnóstico do app: latências das consultas (telemetria_consultas),
+impressões digitais mais lentas e seus perfis (consultas_lentas),
+aproveitamento dos caches, cancelamentos e orçamento de memória. Os dados
+são do processo atual (todas as sessões).
+"""
+
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+from telemetria_consultas import telemetria
+from saev_query import cache_preparadas
+from cancelamento_consultas import vigia_consultas
+from orcamento_memoria import controle_memoria
+from consultas_lentas import captura_lentas, ler_capturas, piores_consultas
+
+# =================== CONFIGURAÇÃO DA PÁGINA ===================
+st.set_page_config(
+    page_title="SAEV - Diagnóstico",
+    page_icon="🩺",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+ROTULOS_GRUPOS = {
+    'todas': "Todas",
+    'hit': "Cache (hit)",
+    'miss': "Banco (miss)",
+    'sem_cache': "Banco (sem cache)",
+}
+
+# =================== SEÇÕES ===================
+
+def exibir_percentis(registros):
+    """Percentis de latência por estado de cache"""
+    st.header("⏱️ Latência das Consultas")
+    percentis = telemetria.percentis(registros)
+    colunas = st.columns(len(ROTULOS_GRUPOS))
+    for coluna, (grupo, rotulo) in zip(colunas, ROTULOS_GRUPOS.items()):
+        dados = percentis[grupo]
+        with coluna:
+            st.metric(f"{rotulo}: p95", f"{dados['p95_ms']:,.1f} ms" if dados['consultas'] else "–",
+                      help=f"{dados['consultas']:,} consultas")
+            if dados['consultas']:
+                st.caption(f"p50 {dados['p50_ms']:,.1f} · p99 {dados['p99_ms']:,.1f} · "
+                           f"máx {dados['max_ms']:,.1f} ms")
+
+    stats = telemetria.get_stats()
+    total_cache = stats['cache_hits'] + stats['cache_misses']
+    if total_cache:
+        st.caption(f"📦 Aproveitamento do cache do Streamlit: "
+                   f"{stats['cache_hits'] / total_cache:.1%} ({stats['cache_hits']:,} hits, "
+                   f"{stats['cache_misses']:,} misses)")
+
+def exibir_mais_lentas(registros, limite):
+    """Impressões digitais ordenadas pelo p95"""
+    st.header("🐢 Consultas Mais Lentas")
+    resumo = telemetria.resumo_por_impressao(registros, limite=limite)
+    if not resumo:
+        st.info("Nenhuma consulta registrada ainda.")
+        return
+
+    df = pd.DataFrame(resumo)
+    df['mb_total'] = df['bytes_total'] / 1024 ** 2
+    st.dataframe(
+        df[['impressao', 'origem', 'consultas', 'erros', 'cache_hits', 'p50_ms', 'p95_ms',
+            'p99_ms', 'max_ms', 'total_ms', 'espera_media_ms', 'linhas_media', 'mb_total', 'sql']],
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'impressao': "Impressão",
+            'origem': "Origem",
+            'consultas': "Consultas",
+            'erros': "Erros",
+            'cache_hits': "Hits",
+            'p50_ms': st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+            'p95_ms': st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+            'p99_ms': st.column_config.NumberColumn("p99 (ms)", format="%.1f"),
+            'max_ms': st.column_config.NumberColumn("Máx (ms)", format="%.1f"),
+            'total_ms': st.column_config.NumberColumn("Total (ms)", format="%.0f"),
+            'espera_media_ms': st.column_config.NumberColumn("Espera média (ms)", format="%.2f"),
+            'linhas_media': st.column_config.NumberColumn("Linhas (média)", format="%.0f"),
+            'mb_total': st.column_config.NumberColumn("MB devolvidos", format="%.2f"),
+            'sql': st.column_config.TextColumn("SQL normalizado", width="large"),
+        },
+    )
+
+def exibir_capturas_lentas(limite):
+    """Perfis EXPLAIN ANALYZE das consultas acima do limiar (consultas_lentas)"""
+    stats = captura_lentas.get_stats()
+    with st.expander(f"🔬 Perfis de consultas lentas (limiar {stats['limiar_ms']:,.0f} ms)"):
+        st.caption(f"{stats['lentas']:,} consultas lentas · {stats['capturadas']:,} perfis capturados · "
+                   f"{stats['limitadas']:,} limitadas pela taxa · {stats['falhas']:,} falhas · "
+                   f"`{stats['arquivo']}` · detalhes: `python consultas_lentas.py --impressao <impressão>`")
+        piores = piores_consultas(ler_capturas(stats['arquivo']), limite)
+        if not piores:
+            st.info("Nenhum perfil capturado ainda.")
+            return
+        df = pd.DataFrame(piores)
+        df['operadores'] = df['operadores'].apply(
+            lambda ops: " · ".join(f"{o['operador']} {o['percentual']:.0f}%" for o in ops[:3])
+        )
+        st.dataframe(
+            df[['impressao', 'origem', 'capturas', 'duracao_max_ms', 'duracao_mediana_ms',
+                'operadores', 'sql']],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+def exibir_recentes(registros, limite=100):
+    """Últimas consultas registradas"""
+    with st.expander(f"🕒 Últimas {limite} consultas"):
+        if not registros:
+            st.info("Nenhuma consulta registrada ainda.")
+            return
+        df = pd.DataFrame(registros[-limite:][::-1])
+        df['instante'] = pd.to_datetime(df['instante'], unit='s')
+        st.dataframe(
+            df[['instante', 'impressao', 'origem', 'cache', 'duracao_ms', 'espera_ms',
+                'linhas', 'bytes', 'erro']],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+def exibir_componentes():
+    """Estatísticas dos demais componentes (prepared statements, vigia, memória)"""
+    st.header("🧰 Componentes")
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.subheader("📝 Prepared statements")
+        st.json(cache_preparadas.get_stats())
+
+    with col2:
+        st.subheader("⏱️ Cancelamentos")
+        stats = vigia_consultas.get_stats()
+        cancelamentos = stats.pop('ultimos_cancelamentos')
+        st.json(stats)
+        if cancelamentos:
+            df = pd.DataFrame(cancelamentos)
+            df['instante'] = pd.to_datetime(df['instante'], unit='s')
+            st.dataframe(df, use_container_width=True, hide_index=True)
+
+    with col3:
+        st.subheader("🧮 Orçamento de memória")
+        st.json(controle_memoria.get_stats())
+
+# =================== APLICAÇÃO PRINCIPAL ===================
+
+def main():
+    """Função principal da página"""
+    st.title("🩺 SAEV - Diagnóstico das Consultas")
+    st.markdown("---")
+
+    stats = telemetria.get_stats()
+    st.sidebar.header("📡 Telemetria")
+    st.sidebar.metric("Consultas registradas", f"{stats['registradas']:,}")
+    st.sidebar.caption(f"Em memória: {stats['em_memoria']:,} de {stats['capacidade']:,}")
+    if stats['arquivo']:
+        st.sidebar.caption(f"💾 Persistência: `{stats['arquivo']}` ({stats['pendentes']} pendentes)")
+        if st.sidebar.button("💾 Gravar agora"):
+            telemetria.persistir()
+    else:
+        st.sidebar.caption("💾 Persistência desativada (defina SAEV_TELEMETRIA_ARQUIVO)")
+
+    limite = st.sidebar.slider("🐢 Impressões listadas", min_value=5, max_value=50, value=20, step=5)
+    if st.sidebar.button("🧹 Limpar registros em memória"):
+        telemetria.limpar()
+
+    registros = telemetria.registros()
+    exibir_percentis(registros)
+    exibir_mais_lentas(registros, limite)
+    exibir_capturas_lentas(limite)
+    exibir_recentes(registros)
+    exibir_componentes()
+
+    st.markdown("---")
+    st.caption(f"Atualizado em {datetime.now():%d/%m/%Y %H:%M:%S}")
+
+# =================== EXECUÇÃO ===================
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,10 @@ import random
 from pathlib import Path
 import streamlit as st
 from contextlib import contextmanager
+from cancelamento_consultas import ConsultaCancelada, vigiar_consulta
+from telemetria_consultas import cache_com_telemetria, medir_consulta
+from consultas_lentas import avaliar_consulta_lenta
+from saev_recursos import CAMINHO_BANCO, nova_conexao
 
 class DuckDBConcurrentManager:
     """Gerenciador avançado para acesso concorrente ao DuckDB"""
@@ -36,15 +40,17 @@ class DuckDBConcurrentManager:
     
     def __init__(self):
         if not getattr(self, '_initialized', False):
-            self.db_path = Path("db/avaliacao_prod.duckdb")
+            self.db_path = Path(CAMINHO_BANCO)
             self._connection_count = 0
             self._max_connections = 3  # Limite de conexões simultâneas
             self._connection_semaphore = threading.Semaphore(self._max_connections)
+            self._espera_local = threading.local()  # Espera pelo semáforo (telemetria)
             self._stats = {
                 'total_queries': 0,
                 'successful_queries': 0,
                 'retries': 0,
-                'failures': 0
+                'failures': 0,
+                'cancelled': 0
             }
             self._initialized = True
     
@@ -57,7 +63,9 @@ class DuckDBConcurrentManager:
         for attempt in range(max_retries):
             try:
                 # Tentar adquirir semáforo com timeout
+                inicio_espera = time.perf_counter()
                 acquired = self._connection_semaphore.acquire(timeout=10)
+                self._espera_local.segundos = time.perf_counter() - inicio_espera
                 if not acquired:
                     if attempt < max_retries - 1:
                         # Espera aleatória antes de tentar novamente
@@ -67,11 +75,12 @@ class DuckDBConcurrentManager:
                     else:
                         raise TimeoutError("Não foi possível adquirir conexão após múltiplas tentativas")
                 
-                # Tentar conectar
-                connection = duckdb.connect(
-                    str(self.db_path), 
-                    read_only=readonly
-                )
+                # Tentar conectar (leitura: cursor da conexão compartilhada
+                # pelas páginas do app, ver saev_recursos)
+                if readonly:
+                    connection = nova_conexao()
+                else:
+                    connection = duckdb.connect(str(self.db_path), read_only=False)
                 
                 # Configurações de otimização
                 if not readonly:
@@ -86,6 +95,11 @@ class DuckDBConcurrentManager:
                 self._stats['successful_queries'] += 1
                 return  # Sair do loop se bem-sucedido
                 
+            except ConsultaCancelada:
+                # Cancelamento não é falha transitória: não repetir
+                self._stats['cancelled'] += 1
+                raise
+                
             except Exception as e:
                 self._stats['failures'] += 1
                 
@@ -120,21 +134,43 @@ class DuckDBConcurrentManager:
                 if acquired:
                     self._connection_semaphore.release()
     
+    def _espera_semaforo(self):
+        """Espera pelo semáforo na última conexão obtida por esta thread"""
+        return getattr(self._espera_local, 'segundos', 0.0)
+    
+    def _avaliar_lenta(self, conn, query, params, inicio, readonly):
+        """Captura o perfil de consultas lentas (ver consultas_lentas)"""
+        # A conexão é fechada ao sair de get_connection: a captura usa um
+        # cursor novo da conexão compartilhada (somente leitura)
+        if readonly:
+            avaliar_consulta_lenta(conn, query, params, time.perf_counter() - inicio,
+                                   abrir_cursor=nova_conexao)
+    
     def execute_query_safe(self, query, params=None, readonly=True):
         """Executa query de forma segura com retry"""
-        with self.get_connection(readonly=readonly) as conn:
+        with self.get_connection(readonly=readonly) as conn, \
+                medir_consulta(query, self._espera_semaforo()) as medida, \
+                vigiar_consulta(conn, query):
+            inicio = time.perf_counter()
             if params:
-                return conn.execute(query, params).fetchall()
+                medida['resultado'] = conn.execute(query, params).fetchall()
             else:
-                return conn.execute(query).fetchall()
+                medida['resultado'] = conn.execute(query).fetchall()
+            self._avaliar_lenta(conn, query, params, inicio, readonly)
+            return medida['resultado']
     
     def get_dataframe_safe(self, query, params=None, readonly=True):
         """Retorna DataFrame de forma segura com retry"""
-        with self.get_connection(readonly=readonly) as conn:
+        with self.get_connection(readonly=readonly) as conn, \
+                medir_consulta(query, self._espera_semaforo()) as medida, \
+                vigiar_consulta(conn, query):
+            inicio = time.perf_counter()
             if params:
-                return conn.execute(query, params).df()
+                medida['resultado'] = conn.execute(query, params).df()
             else:
-                return conn.execute(query).df()
+                medida['resultado'] = conn.execute(query).df()
+            self._avaliar_lenta(conn, query, params, inicio, readonly)
+            return medida['resultado']
     
     def get_stats(self):
         """Retorna estatísticas de uso"""
@@ -147,7 +183,7 @@ class DuckDBConcurrentManager:
 concurrent_manager = DuckDBConcurrentManager()
 
 # Funções de conveniência para dashboards
-@st.cache_data(ttl=300, show_spinner=False)
+@cache_com_telemetria(ttl=300, show_spinner=False)
 def cached_query_safe(query, params=None):
     """Query com cache e tratamento de erros"""
     try:
@@ -165,7 +201,12 @@ def safe_dataframe(query, params=None):
     return concurrent_manager.get_dataframe_safe(query, params, readonly=True)
 
 def test_concurrent_solution():
-    """Testa a solução de acesso concorrente"""
+    """
+    Testa a solução de acesso concorrente
+
+    Verificação rápida de funcionamento; para medir latência e vazão com
+    usuários simultâneos use teste_carga.py.
+    """
     
     print("🧪 TESTANDO SOLUÇÃO DE ACESSO CONCORRENTE")
     print("=" * 60)
@@ -13,7 +13,7 @@ import duckdb
 import threading
 import time
 from pathlib import Path
-import streamlit as st
+from telemetria_consultas import cache_com_telemetria, medir_consulta
 
 class DuckDBConnectionManager:
     """Gerenciador de conexões DuckDB thread-safe"""
@@ -59,11 +59,14 @@ class DuckDBConnectionManager:
         """Executa query de forma thread-safe"""
         conn = None
         try:
+            inicio_espera = time.perf_counter()
             conn = self.get_connection()
-            if params:
-                result = conn.execute(query, params).fetchall()
-            else:
-                result = conn.execute(query).fetchall()
+            with medir_consulta(query, time.perf_counter() - inicio_espera) as medida:
+                if params:
+                    result = conn.execute(query, params).fetchall()
+                else:
+                    result = conn.execute(query).fetchall()
+                medida['resultado'] = result
             return result
         finally:
             if conn:
@@ -73,11 +76,14 @@ class DuckDBConnectionManager:
         """Retorna DataFrame de forma thread-safe"""
         conn = None
         try:
+            inicio_espera = time.perf_counter()
             conn = self.get_connection()
-            if params:
-                df = conn.execute(query, params).df()
-            else:
-                df = conn.execute(query).df()
+            with medir_consulta(query, time.perf_counter() - inicio_espera) as medida:
+                if params:
+                    df = conn.execute(query, params).df()
+                else:
+                    df = conn.execute(query).df()
+                medida['resultado'] = df
             return df
         finally:
             if conn:
@@ -96,7 +102,7 @@ class DuckDBConnectionManager:
 db_manager = DuckDBConnectionManager()
 
 # Funções de conveniência para uso nos dashboards
-@st.cache_data(ttl=300)  # Cache por 5 minutos
+@cache_com_telemetria(ttl=300)  # Cache por 5 minutos
 def cached_query(query, params=None):
     """Executa query com cache"""
     return db_manager.get_dataframe(query, params)
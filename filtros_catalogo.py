@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Catálogo de filtros com opções em cascata para os dashboards SAEV
+
+As barras laterais montavam suas opções com vários ``SELECT DISTINCT`` sobre
+a tabela fato inteira (e um JOIN com ``dim_escola`` só para listar nomes de
+escolas), e nenhuma lista dependia das outras.
+
+O ETL passa a gerar a tabela ``catalogo_filtros`` com as combinações válidas
+de (ano, município, escola, série, disciplina, teste, avaliação). Ela é
+pequena o bastante para ser carregada inteira uma vez; as opções de cada
+filtro são então calculadas em memória, restritas às seleções anteriores.
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import pandas as pd
+
+from saev_query import consultar_df, tabela_existe
+
+# Consulta usada pelo ETL para materializar o catálogo (e como fallback)
+SQL_CATALOGO_FILTROS = """
+SELECT
+    f.AVA_ANO,
+    f.MUN_NOME,
+    f.ESC_INEP,
+    e.ESC_NOME,
+    f.SER_NUMBER,
+    f.SER_NOME,
+    f.DIS_NOME,
+    f.TES_NOME,
+    f.AVA_NOME,
+    COUNT(DISTINCT f.ALU_ID) AS QTD_ALUNOS,
+    COUNT(*) AS QTD_REGISTROS
+FROM fato_resposta_aluno f
+LEFT JOIN dim_escola e ON f.ESC_INEP = e.ESC_INEP
+GROUP BY
+    f.AVA_ANO, f.MUN_NOME, f.ESC_INEP, e.ESC_NOME, f.SER_NUMBER,
+    f.SER_NOME, f.DIS_NOME, f.TES_NOME, f.AVA_NOME
+"""
+
+# Ordenação padrão das opções de cada coluna
+ORDENACAO_OPCOES = {
+    'SER_NOME': 'SER_NUMBER',
+}
+
+
+def carregar_catalogo(conn):
+    """
+    Carrega o catálogo de filtros completo
+
+    Usa a tabela ``catalogo_filtros`` gerada pelo ETL. Em bancos antigos,
+    sem a tabela, o catálogo é calculado em uma única varredura da fato.
+
+    Args:
+        conn: Conexão DuckDB
+
+    Returns:
+        pandas.DataFrame: Uma linha por combinação válida de filtros
+    """
+    if tabela_existe(conn, 'catalogo_filtros'):
+        return consultar_df(conn, "SELECT * FROM catalogo_filtros")
+    return consultar_df(conn, SQL_CATALOGO_FILTROS)
+
+
+def filtrar_catalogo(catalogo, selecoes):
+    """
+    Restringe o catálogo às linhas compatíveis com as seleções
+
+    Args:
+        catalogo (pandas.DataFrame): Catálogo completo
+        selecoes (dict): Coluna -> lista de valores (vazia = sem restrição)
+
+    Returns:
+        pandas.DataFrame: Linhas compatíveis
+    """
+    mascara = pd.Series(True, index=catalogo.index)
+    for coluna, valores in (selecoes or {}).items():
+        if valores is None:
+            continue
+        if not isinstance(valores, (list, tuple, set, frozenset)):
+            valores = [valores]
+        if len(valores) == 0:
+            continue
+        mascara &= catalogo[coluna].isin(valores)
+    return catalogo[mascara]
+
+
+def opcoes(catalogo, coluna, selecoes=None):
+    """
+    Lista as opções válidas de uma coluna, dadas as seleções anteriores
+
+    Args:
+        catalogo (pandas.DataFrame): Catálogo completo
+        coluna (str): Coluna cujas opções serão listadas
+        selecoes (dict): Seleções dos filtros anteriores na cascata
+
+    Returns:
+        list: Valores distintos, não nulos e ordenados
+    """
+    linhas = filtrar_catalogo(catalogo, selecoes)
+    ordenar_por = ORDENACAO_OPCOES.get(coluna, coluna)
+
+    colunas = [coluna] if ordenar_por == coluna else [coluna, ordenar_por]
+    valores = linhas[colunas].dropna(subset=[coluna]).drop_duplicates(subset=[coluna])
+    return valores.sort_values(ordenar_por)[coluna].tolist()
+
+
+def opcoes_em_cascata(catalogo, ordem, selecoes):
+    """
+    Calcula as opções de todos os filtros de uma barra lateral em cascata
+
+    Cada filtro é restrito pelas seleções dos filtros que o antecedem em
+    ``ordem`` (ex.: escolher um município reduz a lista de escolas).
+
+    Args:
+        catalogo (pandas.DataFrame): Catálogo completo
+        ordem (list): Colunas na ordem em que aparecem na barra lateral
+        selecoes (dict): Coluna -> valores atualmente selecionados
+
+    Returns:
+        dict: Coluna -> lista de opções válidas
+    """
+    resultado = {}
+    anteriores = {}
+    for coluna in ordem:
+        resultado[coluna] = opcoes(catalogo, coluna, anteriores)
+        anteriores[coluna] = selecoes.get(coluna)
+    return resultado
+
+
+def podar_selecao(valores, opcoes_validas):
+    """Remove da seleção valores que deixaram de ser opções válidas"""
+    validas = set(opcoes_validas)
+    return [valor for valor in (valores or []) if valor in validas]
+
+
+def podar_estado_widget(estado, chave, opcoes_validas):
+    """
+    Ajusta o valor guardado de um widget multiselect às novas opções
+
+    O Streamlit rejeita valores fora de ``options``; quando um filtro
+    anterior muda, as seleções que deixaram de existir são descartadas.
+
+    Args:
+        estado: ``st.session_state``
+        chave (str): Chave do widget
+        opcoes_validas (list): Opções atuais do widget
+    """
+    if chave in estado:
+        estado[chave] = podar_selecao(estado[chave], opcoes_validas)
+
+
+if __name__ == "__main__":
+    # Demonstração com um catálogo mínimo
+    catalogo = pd.DataFrame({
+        'MUN_NOME': ['Vitória', 'Vitória', 'Serra'],
+        'ESC_NOME': ['Escola A', 'Escola B', 'Escola C'],
+        'SER_NUMBER': [2, 5, 2],
+        'SER_NOME': ['2º Ano', '5º Ano', '2º Ano'],
+    })
+    print("🔍 TESTE DO CATÁLOGO DE FILTROS")
+    print("=" * 40)
+    print(opcoes_em_cascata(catalogo, ['MUN_NOME', 'ESC_NOME', 'SER_NOME'],
+                            {'MUN_NOME': ['Vitória']}))
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Gráficos estatísticos calculados no DuckDB para os dashboards SAEV
+
+``px.box``, ``px.histogram`` e ``px.scatter`` recebem os pontos brutos: o
+box plot de taxa de acerto enviava ao navegador uma linha por resposta da
+tabela fato. Aqui o DuckDB calcula o resumo e o Plotly apenas o desenha:
+- Box plot: quartis, cercas de Tukey (1,5 × IQR) e contagem de outliers,
+  uma linha por grupo.
+- Histograma: contagem por faixa de largura fixa, uma linha por faixa.
+- Dispersão: amostra estratificada determinística, limitada por estrato.
+
+O tamanho do que chega ao navegador depende do número de grupos/faixas/
+pontos pedidos, e não do número de linhas da fonte.
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+from importacao_tardia import modulo_tardio
+from saev_query import consultar_df
+
+px = modulo_tardio("plotly.express")
+go = modulo_tardio("plotly.graph_objects")
+
+# Pontos por estrato nas dispersões amostradas
+PONTOS_POR_ESTRATO = 500
+
+
+def resumo_box(conn, fonte, params, valor, grupo):
+    """
+    Calcula o resumo de box plot de ``valor`` por ``grupo``
+
+    Args:
+        conn: Conexão DuckDB
+        fonte (str): Consulta SQL de origem
+        params (list): Parâmetros da fonte
+        valor (str): Expressão numérica (valores nulos são ignorados)
+        grupo (str): Coluna de agrupamento
+
+    Returns:
+        pandas.DataFrame: grupo, n, q1, mediana, q3, cerca_inferior,
+            cerca_superior, outliers
+    """
+    sql = f"""
+    WITH valores AS (
+        SELECT {grupo} AS grupo, {valor} AS valor
+        FROM ({fonte}) fonte
+        WHERE {valor} IS NOT NULL
+    ),
+    quartis AS (
+        SELECT
+            grupo,
+            COUNT(*) AS n,
+            QUANTILE_CONT(valor, 0.25) AS q1,
+            QUANTILE_CONT(valor, 0.50) AS mediana,
+            QUANTILE_CONT(valor, 0.75) AS q3
+        FROM valores
+        GROUP BY grupo
+    )
+    SELECT
+        q.grupo AS {grupo},
+        q.n,
+        q.q1,
+        q.mediana,
+        q.q3,
+        MIN(v.valor) FILTER (WHERE v.valor >= q.q1 - 1.5 * (q.q3 - q.q1)) AS cerca_inferior,
+        MAX(v.valor) FILTER (WHERE v.valor <= q.q3 + 1.5 * (q.q3 - q.q1)) AS cerca_superior,
+        COUNT(*) FILTER (
+            WHERE v.valor < q.q1 - 1.5 * (q.q3 - q.q1)
+               OR v.valor > q.q3 + 1.5 * (q.q3 - q.q1)
+        ) AS outliers
+    FROM quartis q
+    JOIN valores v ON v.grupo IS NOT DISTINCT FROM q.grupo
+    GROUP BY q.grupo, q.n, q.q1, q.mediana, q.q3
+    ORDER BY q.grupo
+    """
+    return consultar_df(conn, sql, params)
+
+
+def figura_box(resumo, grupo, titulo, rotulo_valor, rotulo_grupo=None):
+    """Desenha um box plot a partir de ``resumo_box``"""
+    fig = go.Figure(go.Box(
+        x=resumo[grupo],
+        q1=resumo['q1'],
+        median=resumo['mediana'],
+        q3=resumo['q3'],
+        lowerfence=resumo['cerca_inferior'],
+        upperfence=resumo['cerca_superior'],
+        customdata=resumo[['n', 'outliers']],
+        hovertemplate="%{x}<br>n=%{customdata[0]:,}<br>outliers=%{customdata[1]:,}<extra></extra>",
+    ))
+    fig.update_layout(
+        title=titulo,
+        xaxis_title=rotulo_grupo or grupo,
+        yaxis_title=rotulo_valor,
+    )
+    return fig
+
+
+def resumo_histograma(conn, fonte, params, valor, cor=None, faixas=20):
+    """
+    Conta os valores de ``valor`` em ``faixas`` de largura fixa
+
+    Args:
+        conn: Conexão DuckDB
+        fonte (str): Consulta SQL de origem
+        params (list): Parâmetros da fonte
+        valor (str): Expressão numérica (valores nulos são ignorados)
+        cor (str): Coluna para separar as barras (opcional)
+        faixas (int): Número de faixas entre o mínimo e o máximo
+
+    Returns:
+        pandas.DataFrame: [cor,] faixa, inicio, fim, centro, contagem
+    """
+    coluna_cor = f"{cor} AS {cor}," if cor else ""
+    grupo_cor = f"{cor}," if cor else ""
+    sql = f"""
+    WITH valores AS (
+        SELECT {coluna_cor} {valor} AS valor
+        FROM ({fonte}) fonte
+        WHERE {valor} IS NOT NULL
+    ),
+    limites AS (
+        SELECT MIN(valor) AS minimo, (MAX(valor) - MIN(valor)) / {faixas} AS largura
+        FROM valores
+    ),
+    classificados AS (
+        SELECT
+            {grupo_cor}
+            CASE WHEN l.largura = 0 THEN 0
+                 ELSE LEAST(FLOOR((v.valor - l.minimo) / l.largura), {faixas - 1})
+            END AS faixa,
+            l.minimo,
+            l.largura
+        FROM valores v, limites l
+    )
+    SELECT
+        {grupo_cor}
+        CAST(faixa AS INTEGER) AS faixa,
+        minimo + faixa * largura AS inicio,
+        minimo + (faixa + 1) * largura AS fim,
+        minimo + (faixa + 0.5) * largura AS centro,
+        COUNT(*) AS contagem
+    FROM classificados
+    GROUP BY {grupo_cor} faixa, minimo, largura
+    ORDER BY {grupo_cor} faixa
+    """
+    return consultar_df(conn, sql, params)
+
+
+def figura_histograma(resumo, titulo, rotulo_valor, cor=None, rotulo_contagem="Contagem"):
+    """Desenha um histograma a partir de ``resumo_histograma``"""
+    fig = px.bar(
+        resumo,
+        x='centro',
+        y='contagem',
+        color=cor,
+        title=titulo,
+        labels={'centro': rotulo_valor, 'contagem': rotulo_contagem},
+        hover_data={'inicio': ':.2f', 'fim': ':.2f', 'centro': False},
+    )
+    if not resumo.empty:
+        largura = (resumo['fim'] - resumo['inicio']).iloc[0]
+        if largura > 0:
+            fig.update_traces(width=largura)
+    fig.update_layout(bargap=0)
+    return fig
+
+
+def amostra_estratificada(conn, fonte, params, estrato, chave,
+                          por_estrato=PONTOS_POR_ESTRATO):
+    """
+    Seleciona até ``por_estrato`` linhas de cada estrato
+
+    A escolha usa o hash de ``chave``: é aleatória em relação aos dados, mas
+    estável entre recarregamentos (o gráfico não "pula" a cada interação).
+
+    Args:
+        conn: Conexão DuckDB
+        fonte (str): Consulta SQL de origem
+        params (list): Parâmetros da fonte
+        estrato (str): Coluna de estratificação (ex.: disciplina)
+        chave (str): Expressão que identifica a linha
+        por_estrato (int): Máximo de linhas por estrato
+
+    Returns:
+        pandas.DataFrame: Linhas amostradas, com ``total_estrato`` (linhas
+            do estrato na fonte)
+    """
+    sql = f"""
+    SELECT * EXCLUDE (ordem_amostra)
+    FROM (
+        SELECT
+            *,
+            ROW_NUMBER() OVER (PARTITION BY {estrato} ORDER BY HASH({chave})) AS ordem_amostra,
+            COUNT(*) OVER (PARTITION BY {estrato}) AS total_estrato
+        FROM ({fonte}) fonte
+    )
+    WHERE ordem_amostra <= ?
+    """
+    return consultar_df(conn, sql, list(params or []) + [por_estrato])
+
+
+if __name__ == "__main__":
+    import duckdb
+
+    # Demonstração com dados sintéticos
+    conn = duckdb.connect()
+    conn.execute("""
+        CREATE TABLE notas AS
+        SELECT i % 3 AS grupo, (random() * 100)::DOUBLE AS nota
+        FROM range(100000) t(i)
+    """)
+    print("📦 RESUMO DE BOX PLOT")
+    print(resumo_box(conn, "SELECT * FROM notas", [], "nota", "grupo"))
+    print("\n📊 HISTOGRAMA (5 faixas)")
+    print(resumo_histograma(conn, "SELECT * FROM notas", [], "nota", faixas=5))
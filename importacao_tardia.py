@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Importação tardia de módulos pesados nos dashboards SAEV
+
+Os apps importavam ``plotly.express`` e ``plotly.graph_objects`` no topo do
+arquivo: o custo era pago antes de qualquer elemento aparecer na tela,
+mesmo em telas sem gráficos (ex.: antes de o usuário escolher filtros).
+
+``modulo_tardio`` devolve um substituto que só importa o módulo real no
+primeiro acesso a um atributo (``px.bar``, ``go.Figure``...). O restante do
+código continua usando ``px``/``go`` normalmente.
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import importlib
+
+
+class _ModuloTardio:
+    """Substituto que importa o módulo no primeiro acesso a atributo"""
+
+    def __init__(self, nome):
+        self._nome = nome
+        self._modulo = None
+
+    def __getattr__(self, atributo):
+        # Chamado apenas para atributos ausentes (_nome/_modulo existem)
+        if self._modulo is None:
+            self._modulo = importlib.import_module(self._nome)
+        return getattr(self._modulo, atributo)
+
+    def __repr__(self):
+        estado = "carregado" if self._modulo is not None else "não carregado"
+        return f"<módulo tardio {self._nome!r} ({estado})>"
+
+
+def modulo_tardio(nome):
+    """
+    Retorna um substituto de ``import nome`` que adia a importação
+
+    Args:
+        nome (str): Nome completo do módulo (ex.: "plotly.express")
+
+    Returns:
+        Objeto cujos atributos são os do módulo, importado no primeiro uso
+    """
+    return _ModuloTardio(nome)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    print("💤 TESTE DE IMPORTAÇÃO TARDIA")
+    print("=" * 40)
+    px = modulo_tardio("plotly.express")
+    print(px, "| plotly.express em sys.modules:", "plotly.express" in sys.modules)
+    inicio = time.perf_counter()
+    px.bar
+    print(px, f"| primeiro acesso: {time.perf_counter() - inicio:.3f}s")
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Intervalos de confiança das taxas de acerto e das posições nos rankings
+
+Os rankings de escolas (saev_rankings.py) e de municípios
+(saev_streamlit2.py) ordenam a taxa de acerto pontual. Com poucos alunos a
+taxa oscila e a escola pula de posição de uma avaliação para outra, sem que
+o painel mostre o quanto a posição é incerta.
+
+Para cada disciplina e teste, o ETL calcula por bootstrap:
+- o intervalo de confiança (95%) da taxa de acerto de cada escola e de
+  cada município
+- a faixa de posições que a unidade ocupa nas reamostragens (entre as
+  unidades elegíveis, com os mesmos mínimos dos rankings)
+
+A reamostragem é feita sobre o resumo de cada aluno (acertos e questões no
+teste): em cada réplica os alunos são sorteados com reposição dentro da
+própria escola (ou município) e a taxa é a razão entre os acertos e as
+questões sorteados. As réplicas são geradas em blocos vetorizados no NumPy
+e os testes são distribuídos entre processos. Os processos são criados por
+``spawn``, e não por ``fork``: o ETL chama este módulo com a conexão DuckDB
+aberta (e as threads dela), que não podem ser copiadas para um filho.
+
+Resultados nas tabelas ``ranking_escolas_intervalos`` e
+``ranking_municipios_intervalos``, ao lado de ``ranking_escolas``.
+
+Uso:
+    python incerteza_rankings.py                   # todas as disciplinas
+    python incerteza_rankings.py --replicas 2000 --disciplina Matemática --sem-gravar
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from saev_query import construir_where
+
+REPLICAS = 1000
+NIVEL_CONFIANCA = 0.95
+SEMENTE = 42
+
+# Processos usados na reamostragem (1 = sem pool)
+PROCESSOS_BOOTSTRAP = int(os.environ.get("SAEV_BOOTSTRAP_PROCESSOS", os.cpu_count() or 1))
+
+# Células (réplicas × alunos) sorteadas por bloco
+CELULAS_POR_BLOCO = 5_000_000
+
+# Mínimos para entrar na faixa de posições: (alunos, questões)
+MINIMOS = {
+    'escola': (10, 100),      # os mesmos de ranking_escolas
+    'municipio': (10, 500),   # os mesmos da tabela de municípios do painel
+}
+
+TABELA_ESCOLAS = "ranking_escolas_intervalos"
+TABELA_MUNICIPIOS = "ranking_municipios_intervalos"
+
+# Resumo por aluno em cada teste (a unidade reamostrada)
+SQL_RESUMO_ALUNOS = """
+SELECT
+    DIS_NOME,
+    TES_NOME,
+    MUN_NOME,
+    ESC_INEP,
+    ALU_ID,
+    CAST(SUM(ACERTO) AS INTEGER) AS ACERTOS,
+    CAST(SUM(ACERTO + ERRO) AS INTEGER) AS QUESTOES
+FROM fato_resposta_aluno
+WHERE (ACERTO + ERRO) > 0 AND {where_clause}
+GROUP BY DIS_NOME, TES_NOME, MUN_NOME, ESC_INEP, ALU_ID
+ORDER BY DIS_NOME, TES_NOME
+"""
+
+
+def bootstrap_unidades(unidade, acertos, questoes, minimos, replicas=REPLICAS,
+                       nivel_confianca=NIVEL_CONFIANCA, semente=SEMENTE):
+    """
+    Intervalos de taxa e de posição por unidade (escola ou município)
+
+    Args:
+        unidade (numpy.ndarray): Código 0..U-1 da unidade de cada aluno
+        acertos, questoes (numpy.ndarray): Resumo de cada aluno
+        minimos (tuple): (alunos, questões) para entrar na faixa de posições
+        replicas (int): Réplicas do bootstrap
+        nivel_confianca (float): Nível dos intervalos
+        semente: Semente (ou SeedSequence) do gerador
+
+    Returns:
+        dict: Arrays por unidade: alunos, questoes, taxa, taxa_ic_inf,
+            taxa_ic_sup, erro_padrao, elegivel, posicao_ic_melhor,
+            posicao_ic_pior (taxas em %, posições só para elegíveis)
+    """
+    rng = np.random.default_rng(semente)
+    ordem = np.argsort(unidade, kind='stable')
+    acertos = acertos[ordem].astype(np.float64)
+    questoes = questoes[ordem].astype(np.float64)
+
+    alunos = np.bincount(unidade)
+    inicio = np.r_[0, np.cumsum(alunos)[:-1]]
+    total_questoes = np.add.reduceat(questoes, inicio)
+    taxa = np.add.reduceat(acertos, inicio) / total_questoes
+    elegivel = (alunos >= minimos[0]) & (total_questoes >= minimos[1])
+
+    # Para cada posição da amostra: início e tamanho da sua unidade
+    inicio_aluno = np.repeat(inicio, alunos)
+    tamanho_aluno = np.repeat(alunos, alunos)
+
+    qtd_alunos = len(acertos)
+    por_bloco = max(1, CELULAS_POR_BLOCO // max(qtd_alunos, 1))
+    taxas = np.empty((replicas, len(alunos)))
+    for primeira in range(0, replicas, por_bloco):
+        ultima = min(primeira + por_bloco, replicas)
+        sorteio = inicio_aluno + (rng.random((ultima - primeira, qtd_alunos)) * tamanho_aluno).astype(np.int64)
+        taxas[primeira:ultima] = (
+            np.add.reduceat(acertos[sorteio], inicio, axis=1)
+            / np.add.reduceat(questoes[sorteio], inicio, axis=1)
+        )
+
+    alfa = (1 - nivel_confianca) / 2
+    ic_inf, ic_sup = np.quantile(taxas, [alfa, 1 - alfa], axis=0)
+
+    # Posição em cada réplica (1 = maior taxa) entre as unidades elegíveis
+    melhor = np.full(len(alunos), np.nan)
+    pior = np.full(len(alunos), np.nan)
+    if elegivel.any():
+        posicoes = (-taxas[:, elegivel]).argsort(axis=1, kind='stable').argsort(axis=1) + 1
+        melhor[elegivel], pior[elegivel] = np.quantile(
+            posicoes, [alfa, 1 - alfa], axis=0, method='inverted_cdf'
+        )
+
+    return {
+        'alunos': alunos,
+        'questoes': total_questoes.astype(np.int64),
+        'taxa': taxa * 100,
+        'taxa_ic_inf': ic_inf * 100,
+        'taxa_ic_sup': ic_sup * 100,
+        'erro_padrao': taxas.std(axis=0, ddof=1) * 100 if replicas > 1 else np.full(len(alunos), np.nan),
+        'elegivel': elegivel,
+        'posicao_ic_melhor': melhor,
+        'posicao_ic_pior': pior,
+    }
+
+
+def _executar_tarefa(tarefa):
+    """Executa o bootstrap de uma tarefa (função de módulo, para o pool de processos)"""
+    chave, nivel, nomes, unidade, acertos, questoes, replicas, nivel_confianca, semente = tarefa
+    resultado = bootstrap_unidades(unidade, acertos, questoes, MINIMOS[nivel],
+                                   replicas, nivel_confianca, semente)
+    return chave, nivel, nomes, resultado
+
+
+def _tarefas(resumo, replicas, nivel_confianca, semente):
+    """Uma tarefa por (disciplina, teste, nível), com sementes independentes"""
+    grupos = list(resumo.groupby(['DIS_NOME', 'TES_NOME'], sort=False).indices.items())
+    sementes = np.random.SeedSequence(semente).spawn(2 * len(grupos))
+    acertos = resumo['ACERTOS'].to_numpy()
+    questoes = resumo['QUESTOES'].to_numpy()
+
+    for i, (chave, indices) in enumerate(grupos):
+        for j, (nivel, coluna) in enumerate((('escola', 'ESC_INEP'), ('municipio', 'MUN_NOME'))):
+            unidade, nomes = pd.factorize(resumo[coluna].to_numpy()[indices])
+            yield (chave, nivel, np.asarray(nomes), unidade, acertos[indices], questoes[indices],
+                   replicas, nivel_confianca, sementes[2 * i + j])
+
+
+def _posicao_pontual(resultado, nomes):
+    """Posição pela taxa pontual entre as elegíveis (mesmo desempate dos rankings)"""
+    posicao = np.full(len(nomes), np.nan)
+    elegivel = np.flatnonzero(resultado['elegivel'])
+    ordem = np.lexsort((nomes[elegivel], -resultado['alunos'][elegivel],
+                        -np.round(resultado['taxa'][elegivel], 2)))
+    posicao[elegivel[ordem]] = np.arange(1, len(elegivel) + 1)
+    return posicao
+
+
+def calcular_intervalos(conn, filtros=None, replicas=REPLICAS, nivel_confianca=NIVEL_CONFIANCA,
+                        processos=PROCESSOS_BOOTSTRAP, semente=SEMENTE):
+    """
+    Intervalos de escolas e municípios para todos os testes selecionados
+
+    Args:
+        conn: Conexão DuckDB
+        filtros (dict): Filtros no formato de ``construir_where``
+        replicas (int): Réplicas do bootstrap
+        nivel_confianca (float): Nível dos intervalos
+        processos (int): Processos da reamostragem (1 = no próprio processo)
+        semente (int): Semente (resultados reprodutíveis)
+
+    Returns:
+        dict: DataFrames 'escolas' e 'municipios'
+    """
+    where_clause, params = construir_where(filtros, alias='')
+    resumo = conn.execute(SQL_RESUMO_ALUNOS.format(where_clause=where_clause), params).df()
+    tarefas = _tarefas(resumo, replicas, nivel_confianca, semente)
+
+    if processos > 1:
+        # spawn: um fork copiaria o estado da conexão DuckDB aberta (e de suas threads)
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+            resultados = list(executor.map(_executar_tarefa, tarefas))
+    else:
+        resultados = [_executar_tarefa(tarefa) for tarefa in tarefas]
+
+    tabelas = {'escola': [], 'municipio': []}
+    for (disciplina, teste), nivel, nomes, resultado in resultados:
+        coluna = 'ESC_INEP' if nivel == 'escola' else 'MUN_NOME'
+        tabela = pd.DataFrame({'DIS_NOME': disciplina, 'TES_NOME': teste, coluna: nomes})
+        tabela = tabela.assign(
+            total_alunos=resultado['alunos'],
+            total_questoes=resultado['questoes'],
+            taxa_acerto=np.round(resultado['taxa'], 2),
+            taxa_ic_inf=np.round(resultado['taxa_ic_inf'], 2),
+            taxa_ic_sup=np.round(resultado['taxa_ic_sup'], 2),
+            erro_padrao=np.round(resultado['erro_padrao'], 2),
+            elegivel=resultado['elegivel'],
+            posicao=_posicao_pontual(resultado, nomes),
+            posicao_ic_melhor=resultado['posicao_ic_melhor'],
+            posicao_ic_pior=resultado['posicao_ic_pior'],
+        )
+        tabelas[nivel].append(tabela)
+
+    saida = {}
+    for nivel, chave, coluna in (('escola', 'escolas', 'ESC_INEP'),
+                                 ('municipio', 'municipios', 'MUN_NOME')):
+        colunas = ['DIS_NOME', 'TES_NOME', coluna, 'total_alunos', 'total_questoes', 'taxa_acerto',
+                   'taxa_ic_inf', 'taxa_ic_sup', 'erro_padrao', 'elegivel', 'posicao',
+                   'posicao_ic_melhor', 'posicao_ic_pior']
+        tabela = pd.concat(tabelas[nivel], ignore_index=True) if tabelas[nivel] \
+            else pd.DataFrame(columns=colunas)
+        for posicao in ('posicao', 'posicao_ic_melhor', 'posicao_ic_pior'):
+            tabela[posicao] = tabela[posicao].astype('Int64')
+        saida[chave] = tabela[colunas].sort_values(
+            ['DIS_NOME', 'TES_NOME', 'posicao', coluna], na_position='last', ignore_index=True
+        )
+    return saida
+
+
+def gravar_intervalos(conn, resultados):
+    """Grava os resultados de ``calcular_intervalos`` nas tabelas do banco"""
+    for tabela, chave in ((TABELA_ESCOLAS, 'escolas'), (TABELA_MUNICIPIOS, 'municipios')):
+        conn.register('_intervalos', resultados[chave])
+        try:
+            conn.execute(f"CREATE OR REPLACE TABLE {tabela} AS SELECT * FROM _intervalos")
+        finally:
+            conn.unregister('_intervalos')
+
+
+def formatar_faixa_posicao(melhor, pior):
+    """Texto da faixa de posições (ex.: '3º–9º'); vazio para não elegíveis"""
+    if pd.isna(melhor) or pd.isna(pior):
+        return ""
+    if melhor == pior:
+        return f"{int(melhor)}º"
+    return f"{int(melhor)}º–{int(pior)}º"
+
+
+def main():
+    import duckdb
+
+    parser = argparse.ArgumentParser(description="Intervalos de confiança das taxas e posições nos rankings")
+    parser.add_argument('--banco', default="db/avaliacao_prod.duckdb", help="Banco DuckDB")
+    parser.add_argument('--replicas', type=int, default=REPLICAS, help="Réplicas do bootstrap")
+    parser.add_argument('--confianca', type=float, default=NIVEL_CONFIANCA, help="Nível de confiança")
+    parser.add_argument('--processos', type=int, default=PROCESSOS_BOOTSTRAP, help="Processos da reamostragem")
+    parser.add_argument('--disciplina', action='append', help="Disciplina (repetível)")
+    parser.add_argument('--teste', action='append', help="Teste (repetível)")
+    parser.add_argument('--sem-gravar', action='store_true', help="Só mostra o resumo, sem gravar tabelas")
+    args = parser.parse_args()
+
+    print("🎲 INTERVALOS DE CONFIANÇA DOS RANKINGS")
+    print("=" * 60)
+
+    conn = duckdb.connect(args.banco, read_only=args.sem_gravar)
+    try:
+        inicio = time.perf_counter()
+        resultados = calcular_intervalos(conn, {'disciplinas': args.disciplina, 'testes': args.teste},
+                                         args.replicas, args.confianca, args.processos)
+        duracao = time.perf_counter() - inicio
+        if not args.sem_gravar:
+            gravar_intervalos(conn, resultados)
+    finally:
+        conn.close()
+
+    escolas, municipios = resultados['escolas'], resultados['municipios']
+    print(f"📋 {len(escolas):,} escolas · {len(municipios):,} municípios "
+          f"({args.replicas} réplicas) em {duracao:.1f}s")
+    if len(escolas):
+        elegiveis = escolas[escolas['elegivel']]
+        largura = (elegiveis['posicao_ic_pior'] - elegiveis['posicao_ic_melhor']).astype(float)
+        print(f"   Largura mediana da faixa de posições das escolas: {largura.median():.0f} posições")
+        topo = elegiveis.head(10)
+        print(topo.assign(faixa=[formatar_faixa_posicao(m, p) for m, p in
+                                 zip(topo['posicao_ic_melhor'], topo['posicao_ic_pior'])])
+              [['TES_NOME', 'ESC_INEP', 'taxa_acerto', 'taxa_ic_inf', 'taxa_ic_sup', 'posicao', 'faixa']]
+              .to_string(index=False))
+    if not args.sem_gravar:
+        print(f"💾 Tabelas: {TABELA_ESCOLAS}, {TABELA_MUNICIPIOS}")
+
+
+if __name__ == "__main__":
+    main()
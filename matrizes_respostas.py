@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Armazém de matrizes aluno × item por teste, em arquivos mapeados em memória
+
+Toda análise por item (psicometria, TRI, padrões de resposta) precisava
+varrer de novo as linhas de texto da tabela ``avaliacao``. O ETL passa a
+exportar, para cada teste, matrizes binárias compactas em ``.npy``:
+
+- ``acertos.npy``: int8 alunos × itens (1 = acerto, 0 = erro,
+  -1 = item não respondido)
+- ``alternativas.npy``: int8 alunos × itens (1-5 = A-E, 0 = em branco
+  ou inválida, -1 = item não respondido)
+- ``alunos.npy``: ALU_ID de cada linha (ordenado)
+- ``itens.npy``: TEG_ORDEM de cada coluna (ordenado)
+
+``manifesto.json`` lista os testes, a pasta, as dimensões, os metadados e
+o descritor de cada item. ``abrir_matriz`` abre um teste com
+``np.load(mmap_mode='r')``: nada é lido até ser usado, sem cópia e sem
+interpretar texto. As matrizes ficam em int8 (e não em bits) para que
+fatias e índices do NumPy funcionem direto sobre o arquivo mapeado.
+
+A exportação lê as respostas com ``psicometria_itens.fluxo_testes`` (um
+teste em memória por vez). Cada exportação grava uma versão nova em
+``<armazém>/v<data e hora>/`` e só então troca o ponteiro ``ATUAL`` (um
+``os.replace`` de arquivo, atômico): quem lê sempre encontra uma versão
+completa. A versão anterior é mantida até a exportação seguinte, para quem
+ainda a está lendo. O ETL calcula a psicometria dos itens a partir deste
+armazém (``psicometria_do_armazem``), sem varrer as respostas de novo.
+
+Uso:
+    python matrizes_respostas.py                 # exporta ao lado do banco
+    python matrizes_respostas.py --listar
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+import unicodedata
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from psicometria_itens import (
+    ALTERNATIVAS,
+    SQL_ITENS,
+    fluxo_testes,
+    matrizes_teste,
+    psicometria_das_matrizes,
+)
+from saev_query import construir_where
+
+PASTA_MATRIZES = "matrizes"
+ARQUIVO_MANIFESTO = "manifesto.json"
+ARQUIVO_ATUAL = "ATUAL"
+VERSAO_ARMAZEM = 2
+
+# Pastas de versão: v20261018T153000123456-1234 (data, hora e processo)
+PADRAO_VERSAO = re.compile(r"^v\d{8}T\d{12}-\d+$")
+
+# Valor das células de itens que o aluno não respondeu
+NAO_RESPONDIDO = -1
+
+COLUNAS_TESTE = ('DIS_NOME', 'SER_NOME', 'AVA_NOME', 'AVA_ANO')
+
+
+def pasta_padrao(db_path):
+    """Pasta do armazém ao lado do arquivo do banco"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), PASTA_MATRIZES)
+
+
+def _nome_pasta(indice, teste):
+    """Nome de pasta legível e único para o teste"""
+    ascii_ = unicodedata.normalize('NFKD', teste).encode('ascii', 'ignore').decode()
+    return f"{indice:04d}_{re.sub(r'[^A-Za-z0-9]+', '_', ascii_).strip('_').lower()}"
+
+
+def _versao_atual(pasta):
+    """Nome da pasta da versão apontada por ``ATUAL`` (None se não houver)"""
+    try:
+        with open(os.path.join(pasta, ARQUIVO_ATUAL), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _apontar_versao(pasta, versao):
+    """Troca o ponteiro ``ATUAL`` de forma atômica"""
+    temporario = os.path.join(pasta, f"{ARQUIVO_ATUAL}.{os.getpid()}.tmp")
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(versao)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, os.path.join(pasta, ARQUIVO_ATUAL))
+
+
+def _remover_versoes(pasta, manter):
+    """Remove as pastas de versão fora de ``manter`` (inclui exportações interrompidas)"""
+    for nome in os.listdir(pasta):
+        if PADRAO_VERSAO.match(nome) and nome not in manter:
+            shutil.rmtree(os.path.join(pasta, nome), ignore_errors=True)
+
+
+def exportar_matrizes(conn, destino, filtros=None):
+    """
+    Exporta as matrizes de todos os testes para uma nova versão do armazém
+
+    Args:
+        conn: Conexão DuckDB
+        destino (str): Pasta do armazém
+        filtros (dict): Filtros no formato de ``construir_where``
+
+    Returns:
+        dict: Manifesto gravado (com a pasta da versão em 'diretorio')
+    """
+    where_clause, params = construir_where(filtros, alias='')
+    itens = conn.execute(SQL_ITENS.format(where_clause=where_clause), params).df()
+    metadados = itens.drop_duplicates('TES_NOME').set_index('TES_NOME')
+    descritores = {
+        nome: {int(ordem): None if pd.isna(codigo) else codigo
+               for ordem, codigo in zip(grupo['TEG_ORDEM'], grupo['MTI_CODIGO'])}
+        for nome, grupo in itens.groupby('TES_NOME')
+    }
+
+    os.makedirs(destino, exist_ok=True)
+    anterior = _versao_atual(destino)
+    versao = f"v{datetime.now():%Y%m%dT%H%M%S%f}-{os.getpid()}"
+    diretorio = os.path.join(destino, versao)
+    os.makedirs(diretorio)
+
+    testes = {}
+    for indice, (nome, respostas) in enumerate(fluxo_testes(conn, filtros)):
+        ordens, acertos, alternativas, presenca = matrizes_teste(respostas)
+        alunos = respostas['ALU_ID']
+        alunos = alunos[np.r_[True, alunos[1:] != alunos[:-1]]] if len(alunos) else alunos
+
+        acertos[~presenca] = NAO_RESPONDIDO
+        alternativas[~presenca] = NAO_RESPONDIDO
+
+        pasta = _nome_pasta(indice, nome)
+        os.makedirs(os.path.join(diretorio, pasta))
+        for arquivo, matriz in (('acertos', acertos), ('alternativas', alternativas),
+                                ('alunos', alunos.astype(np.int64)),
+                                ('itens', ordens.astype(np.int16))):
+            np.save(os.path.join(diretorio, pasta, f"{arquivo}.npy"), matriz)
+
+        testes[nome] = {
+            'pasta': pasta,
+            'alunos': int(acertos.shape[0]),
+            'itens': int(acertos.shape[1]),
+            **({chave: (int(metadados.at[nome, chave]) if chave == 'AVA_ANO'
+                        else metadados.at[nome, chave])
+                for chave in COLUNAS_TESTE} if nome in metadados.index else {}),
+            # Descritor de cada coluna, na ordem de TEG_ORDEM
+            'descritores': [descritores.get(nome, {}).get(ordem) for ordem in ordens.tolist()],
+        }
+
+    manifesto = {
+        'versao': VERSAO_ARMAZEM,
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'alternativas': ALTERNATIVAS,
+        'nao_respondido': NAO_RESPONDIDO,
+        'testes': testes,
+    }
+    with open(os.path.join(diretorio, ARQUIVO_MANIFESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+
+    # Publica a versão nova; a anterior fica para quem ainda a está lendo
+    _apontar_versao(destino, versao)
+    _remover_versoes(destino, {versao, anterior})
+    return dict(manifesto, diretorio=diretorio)
+
+
+def descartar_armazem(pasta):
+    """
+    Remove o armazém (ponteiro ``ATUAL`` e versões), quando os dados mudam
+    sem uma nova exportação
+
+    Quem ainda lê uma matriz já aberta continua lendo o arquivo mapeado.
+    """
+    if not os.path.isdir(pasta):
+        return
+    try:
+        os.remove(os.path.join(pasta, ARQUIVO_ATUAL))
+    except FileNotFoundError:
+        pass
+    _remover_versoes(pasta, set())
+
+
+def carregar_manifesto(pasta):
+    """
+    Lê o manifesto da versão atual do armazém
+
+    Returns:
+        dict: Manifesto, com a pasta da versão em 'diretorio'
+    """
+    versao = _versao_atual(pasta)
+    caminho = os.path.join(pasta, versao or '', ARQUIVO_MANIFESTO)
+    if versao is None or not os.path.exists(caminho):
+        raise FileNotFoundError(
+            f"Armazém de matrizes não encontrado em {pasta} (não exportado ou "
+            "descartado por uma carga sem --analises). "
+            "Execute `python saev_etl.py --mode derived --analises`."
+        )
+    with open(caminho, encoding='utf-8') as f:
+        manifesto = json.load(f)
+    if manifesto.get('versao') != VERSAO_ARMAZEM:
+        raise ValueError(f"Versão do armazém incompatível: {manifesto.get('versao')}")
+    manifesto['diretorio'] = os.path.join(pasta, versao)
+    return manifesto
+
+
+def abrir_matriz(pasta, teste, manifesto=None):
+    """
+    Abre as matrizes de um teste mapeadas em memória (somente leitura)
+
+    Args:
+        pasta (str): Pasta do armazém
+        teste (str): TES_NOME
+        manifesto (dict): Manifesto já carregado (opcional). Com ele, as
+            matrizes são lidas da mesma versão, mesmo que outra já tenha
+            sido publicada.
+
+    Returns:
+        dict: 'acertos', 'alternativas', 'alunos' e 'itens' (numpy.memmap)
+            e 'metadados' do manifesto
+    """
+    manifesto = manifesto or carregar_manifesto(pasta)
+    if teste not in manifesto['testes']:
+        raise KeyError(f"Teste não encontrado no armazém: {teste}")
+
+    metadados = manifesto['testes'][teste]
+    base = os.path.join(manifesto['diretorio'], metadados['pasta'])
+    matrizes = {
+        arquivo: np.load(os.path.join(base, f"{arquivo}.npy"), mmap_mode='r')
+        for arquivo in ('acertos', 'alternativas', 'alunos', 'itens')
+    }
+    matrizes['metadados'] = metadados
+    return matrizes
+
+
+def iterar_matrizes(pasta, manifesto=None):
+    """
+    Percorre os testes do armazém no formato de ``psicometria_itens.matrizes_teste``
+
+    Yields:
+        tuple: (TES_NOME, ordens, acertos, alternativas, presença), com as
+            células não respondidas zeradas e marcadas fora da presença
+    """
+    manifesto = manifesto or carregar_manifesto(pasta)
+    for teste in manifesto['testes']:
+        matrizes = abrir_matriz(pasta, teste, manifesto)
+        presenca = matrizes['acertos'] != NAO_RESPONDIDO
+        yield (
+            teste,
+            np.asarray(matrizes['itens']),
+            np.where(presenca, matrizes['acertos'], 0).astype(np.int8),
+            np.where(presenca, matrizes['alternativas'], 0).astype(np.int8),
+            presenca,
+        )
+
+
+def metadados_itens(pasta, manifesto):
+    """Metadados dos itens do armazém, com as colunas de ``psicometria_itens.SQL_ITENS``"""
+    linhas = [
+        {'TES_NOME': teste, **{chave: info.get(chave) for chave in COLUNAS_TESTE},
+         'TEG_ORDEM': ordem, 'MTI_CODIGO': descritor}
+        for teste, info in manifesto['testes'].items()
+        for ordem, descritor in zip(
+            abrir_matriz(pasta, teste, manifesto)['itens'].tolist(), info['descritores']
+        )
+    ]
+    return pd.DataFrame(linhas, columns=['TES_NOME', *COLUNAS_TESTE, 'TEG_ORDEM', 'MTI_CODIGO'])
+
+
+def psicometria_do_armazem(pasta):
+    """
+    Análise clássica de itens (``psicometria_itens``) lida do armazém
+
+    Returns:
+        dict: DataFrames 'testes', 'itens' e 'distratores'
+    """
+    manifesto = carregar_manifesto(pasta)
+    return psicometria_das_matrizes(iterar_matrizes(pasta, manifesto),
+                                    metadados_itens(pasta, manifesto))
+
+
+def main():
+    import duckdb
+
+    parser = argparse.ArgumentParser(description="Armazém de matrizes aluno × item por teste")
+    parser.add_argument('--banco', default="db/avaliacao_prod.duckdb", help="Banco DuckDB")
+    parser.add_argument('--destino', help="Pasta do armazém (padrão: 'matrizes' ao lado do banco)")
+    parser.add_argument('--listar', action='store_true', help="Só lista os testes já exportados")
+    args = parser.parse_args()
+
+    destino = args.destino or pasta_padrao(args.banco)
+    print("🧮 MATRIZES ALUNO × ITEM")
+    print("=" * 60)
+
+    if args.listar:
+        manifesto = carregar_manifesto(destino)
+    else:
+        conn = duckdb.connect(args.banco, read_only=True)
+        try:
+            inicio = time.perf_counter()
+            manifesto = exportar_matrizes(conn, destino)
+        finally:
+            conn.close()
+        print(f"💾 {len(manifesto['testes'])} testes exportados para {destino} "
+              f"em {time.perf_counter() - inicio:.1f}s")
+
+    for teste, info in manifesto['testes'].items():
+        matrizes = abrir_matriz(destino, teste, manifesto)
+        respondidos = matrizes['acertos'] >= 0
+        p_medio = matrizes['acertos'][respondidos].mean() if respondidos.any() else float('nan')
+        print(f"   {teste}: {info['alunos']:,} alunos × {info['itens']} itens, "
+              f"acerto médio {p_medio:.1%}")
+
+
+if __name__ == "__main__":
+    main()
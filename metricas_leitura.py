@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Métricas vetorizadas da disciplina Leitura por grupo
+
+``calcular_metricas_leitura`` convertia cada resposta com
+``.apply(get_nivel_leitura_numerico)``, gravava a coluna no DataFrame do
+chamador e calculava só a distribuição geral. Para obter as métricas de
+cada escola era preciso filtrar e chamar a função uma vez por escola.
+
+Aqui os níveis são codificados como códigos de categoria (0 = nível
+desconhecido/nulo, 1-6 = nível numérico) e, para quaisquer chaves de
+agrupamento, uma única passada produz a matriz de contagens grupo × nível
+(``np.bincount`` sobre ``grupo * 7 + código``). Distribuição, nível médio e
+percentuais de fluentes e não leitores saem dessa matriz.
+
+O mesmo cálculo funciona sobre relações DuckDB (``DuckDBPyRelation``): as
+contagens por nível são agregadas no banco com ``COUNT(*) FILTER`` e só a
+matriz de contagens vem para a memória.
+
+Os percentuais usam como denominador todos os registros do grupo, inclusive
+os de nível desconhecido, e o nível médio conta esses registros como 0, como
+em ``calcular_metricas_leitura``.
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import numpy as np
+import pandas as pd
+
+from saev_query import consultar_df, construir_where
+from utils_leitura import NIVEIS_LEITURA
+
+# Tipo categórico dos níveis (ordem crescente de proficiência)
+CATEGORIA_NIVEIS = pd.CategoricalDtype(NIVEIS_LEITURA, ordered=True)
+
+# Coluna 0 da matriz de contagens: nível desconhecido ou nulo
+QTD_CODIGOS = len(NIVEIS_LEITURA) + 1
+
+COLUNAS_QTD = [f"qtd_{nivel}" for nivel in NIVEIS_LEITURA]
+COLUNAS_PCT = [f"pct_{nivel}" for nivel in NIVEIS_LEITURA]
+
+
+def codificar_niveis(valores):
+    """
+    Converte níveis de leitura em códigos numéricos sem apply
+
+    Args:
+        valores: Série, array ou lista de níveis (ex.: 'fluente')
+
+    Returns:
+        numpy.ndarray: Códigos int8 - 1 a 6 para os níveis, 0 para
+            desconhecido/nulo (o mesmo que ``get_nivel_leitura_numerico``)
+    """
+    if isinstance(valores, pd.Series) and valores.dtype == CATEGORIA_NIVEIS:
+        codigos = valores.cat.codes.to_numpy()
+    else:
+        codigos = pd.Categorical(valores, dtype=CATEGORIA_NIVEIS).codes
+    return (codigos + 1).astype(np.int8)
+
+
+def _metricas_de_contagens(chaves, contagens):
+    """
+    Calcula as métricas a partir da matriz de contagens grupo × código
+
+    Args:
+        chaves (pandas.DataFrame): Uma linha por grupo (colunas de agrupamento)
+        contagens (numpy.ndarray): Matriz (grupos, QTD_CODIGOS)
+
+    Returns:
+        pandas.DataFrame: Chaves + métricas, uma linha por grupo
+    """
+    contagens = np.asarray(contagens, dtype=np.int64)
+    total = contagens.sum(axis=1)
+    conhecidos = contagens[:, 1:]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        percentuais = np.where(total[:, None] > 0, conhecidos * 100.0 / total[:, None], 0.0)
+        nivel_medio = np.where(total > 0, contagens @ np.arange(QTD_CODIGOS) / total, np.nan)
+
+    predominante = np.array(NIVEIS_LEITURA, dtype=object)[conhecidos.argmax(axis=1)]
+    predominante[conhecidos.sum(axis=1) == 0] = None
+
+    metricas = pd.DataFrame({
+        'total_alunos': total,
+        'nivel_medio': nivel_medio,
+        'percentual_fluentes': percentuais[:, NIVEIS_LEITURA.index('fluente')],
+        'percentual_nao_leitores': percentuais[:, NIVEIS_LEITURA.index('nao_leitor')],
+        'nivel_predominante': predominante,
+    })
+    metricas[COLUNAS_QTD] = conhecidos
+    metricas[COLUNAS_PCT] = percentuais.round(2)
+    return pd.concat([chaves.reset_index(drop=True), metricas], axis=1)
+
+
+def expressoes_contagem(coluna='NIVEL_LEITURA'):
+    """
+    Expressões SQL de agregação: total de registros e contagem por nível
+
+    Args:
+        coluna (str): Coluna (ou expressão) com o nível de leitura
+
+    Returns:
+        list: Expressões ``COUNT(*) ... AS ...``
+    """
+    expressoes = ["COUNT(*) AS total_registros"]
+    expressoes += [
+        f"COUNT(*) FILTER (WHERE {coluna} = '{nivel}') AS qtd_{nivel}"
+        for nivel in NIVEIS_LEITURA
+    ]
+    return expressoes
+
+
+def _contagens_agregadas(agregado, chaves):
+    """Separa chaves e matriz de contagens de um resultado de ``expressoes_contagem``"""
+    conhecidos = agregado[COLUNAS_QTD].to_numpy(dtype=np.int64)
+    desconhecidos = agregado['total_registros'].to_numpy(dtype=np.int64) - conhecidos.sum(axis=1)
+    return agregado[list(chaves)], np.column_stack([desconhecidos, conhecidos])
+
+
+def metricas_por_grupo(dados, chaves=None, coluna='NIVEL_LEITURA'):
+    """
+    Calcula as métricas de Leitura para cada grupo em uma única passada
+
+    Args:
+        dados: pandas.DataFrame ou relação DuckDB (``DuckDBPyRelation``)
+        chaves (list): Colunas de agrupamento (vazio/None = total geral)
+        coluna (str): Coluna com o nível de leitura
+
+    Returns:
+        pandas.DataFrame: Uma linha por grupo, com as chaves, total_alunos,
+            nivel_medio, percentual_fluentes, percentual_nao_leitores,
+            nivel_predominante e qtd_/pct_ de cada nível
+    """
+    chaves = list(chaves or [])
+
+    if not isinstance(dados, pd.DataFrame):
+        # Relação DuckDB: contagens agregadas no banco
+        agregado = dados.aggregate(
+            ", ".join(chaves + expressoes_contagem(coluna)), ", ".join(chaves)
+        ).df()
+        if chaves:
+            agregado = agregado.sort_values(chaves, kind='stable')
+        return _metricas_de_contagens(*_contagens_agregadas(agregado, chaves))
+
+    codigos = codificar_niveis(dados[coluna])
+    if chaves:
+        grupos = dados.groupby(chaves, sort=True, dropna=False, observed=True)
+        ids = grupos.ngroup().to_numpy()
+        tabela_chaves = grupos.size().index.to_frame(index=False)
+    else:
+        ids = np.zeros(len(dados), dtype=np.intp)
+        tabela_chaves = pd.DataFrame(index=range(1 if len(dados) else 0))
+
+    qtd_grupos = len(tabela_chaves)
+    contagens = np.bincount(
+        ids * QTD_CODIGOS + codigos, minlength=qtd_grupos * QTD_CODIGOS
+    ).reshape(qtd_grupos, QTD_CODIGOS)
+    return _metricas_de_contagens(tabela_chaves, contagens)
+
+
+def metricas_leitura_banco(conn, chaves=('ESC_INEP',), filtros=None):
+    """
+    Métricas de Leitura por grupo calculadas direto na tabela fato
+
+    Ex.: ``metricas_leitura_banco(conn)`` devolve as métricas de todas as
+    escolas em uma consulta.
+
+    Args:
+        conn: Conexão DuckDB
+        chaves (tuple): Colunas da tabela fato usadas no agrupamento
+        filtros (dict): Filtros no formato de ``construir_where``
+
+    Returns:
+        pandas.DataFrame: Uma linha por grupo (ver ``metricas_por_grupo``)
+    """
+    chaves = list(chaves or [])
+    where_clause, params = construir_where(filtros)
+    colunas = [f"f.{chave} AS {chave}" for chave in chaves]
+    agrupamento = f"GROUP BY {', '.join(f'f.{chave}' for chave in chaves)}" if chaves else ""
+    ordenacao = f"ORDER BY {', '.join(chaves)}" if chaves else ""
+    lista_colunas = ",\n        ".join(colunas + expressoes_contagem('f.NIVEL_LEITURA'))
+    sql = f"""
+    SELECT
+        {lista_colunas}
+    FROM fato_resposta_aluno f
+    WHERE f.DIS_NOME = 'Leitura' AND {where_clause}
+    {agrupamento}
+    {ordenacao}
+    """
+    agregado = consultar_df(conn, sql, params)
+    return _metricas_de_contagens(*_contagens_agregadas(agregado, chaves))
+
+
+if __name__ == "__main__":
+    # Demonstração com dados sintéticos
+    print("📚 TESTE DAS MÉTRICAS VETORIZADAS DE LEITURA")
+    print("=" * 40)
+
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        'ESC_INEP': rng.integers(1, 4, 1000),
+        'NIVEL_LEITURA': rng.choice(NIVEIS_LEITURA + [None], 1000),
+    })
+    print(metricas_por_grupo(df, ['ESC_INEP'])[
+        ['ESC_INEP', 'total_alunos', 'nivel_medio', 'percentual_fluentes',
+         'percentual_nao_leitores', 'nivel_predominante']
+    ])
+
+    import duckdb
+    relacao = duckdb.connect().from_df(df)
+    print(metricas_por_grupo(relacao, ['ESC_INEP'])[['ESC_INEP', 'total_alunos', 'nivel_medio']])
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Orçamento de memória e guarda de custo para as consultas dos dashboards SAEV
+
+Selecionar "Todos" os municípios e escolas sem outros filtros fazia
+``carregar_dados_filtrados`` materializar quase toda a tabela fato em
+memória, derrubando o servidor para todos os usuários.
+
+Antes de executar uma consulta de linhas brutas, estimamos seu tamanho:
+- Linhas: pelo ``catalogo_filtros`` (QTD_REGISTROS por combinação de
+  filtros, exato e sem consultar o banco) ou, na falta dele, pela
+  cardinalidade estimada do ``EXPLAIN``.
+- Bytes: linhas × bytes por linha, medidos em uma pequena amostra.
+
+O ``ControleMemoria`` registra o conjunto de dados ativo de cada sessão e
+recusa reservas acima do orçamento da sessão ou do orçamento global (um
+mesmo resultado compartilhado entre sessões conta uma única vez). Quem
+chama decide o fallback, tipicamente uma visão agregada.
+
+O cache que guarda esses conjuntos também guarda seleções que nenhuma
+sessão reservou mais. Como só entram nele conjuntos aceitos (cada um até o
+orçamento da sessão), limitá-lo a ``MAX_CONJUNTOS_CACHE`` entradas
+(orçamento global ÷ orçamento da sessão) mantém o total em memória dentro
+do orçamento global.
+
+Configuração (variáveis de ambiente):
+- SAEV_ORCAMENTO_SESSAO_MB (padrão 512)
+- SAEV_ORCAMENTO_GLOBAL_MB (padrão 2048)
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import json
+import os
+import threading
+import time
+
+from filtros_catalogo import filtrar_catalogo
+from saev_query import consultar_df
+
+MB = 1024 * 1024
+ORCAMENTO_SESSAO_MB = int(os.environ.get("SAEV_ORCAMENTO_SESSAO_MB", "512"))
+ORCAMENTO_GLOBAL_MB = int(os.environ.get("SAEV_ORCAMENTO_GLOBAL_MB", "2048"))
+
+# Conjuntos de linhas brutas mantidos em cache (cada um cabe no orçamento da
+# sessão, então o cache inteiro cabe no orçamento global)
+MAX_CONJUNTOS_CACHE = max(1, ORCAMENTO_GLOBAL_MB // ORCAMENTO_SESSAO_MB)
+
+# Reservas sem renovação por este tempo são descartadas (sessão encerrada)
+TTL_RESERVA_SEGUNDOS = 3600
+
+# Bytes por linha quando não há amostra (ex.: consulta sem resultado)
+BYTES_POR_LINHA_PADRAO = 200
+
+
+class OrcamentoExcedido(Exception):
+    """Consulta estimada acima do orçamento de memória"""
+
+    def __init__(self, mensagem, bytes_estimados, limite_bytes):
+        super().__init__(mensagem)
+        self.bytes_estimados = bytes_estimados
+        self.limite_bytes = limite_bytes
+
+
+def estimar_linhas_catalogo(catalogo, selecoes):
+    """
+    Estima as linhas da tabela fato para as seleções usando o catálogo
+
+    Args:
+        catalogo (pandas.DataFrame): Catálogo de filtros (com QTD_REGISTROS)
+        selecoes (dict): Coluna do catálogo -> valores selecionados
+
+    Returns:
+        int: Número de linhas (None se o catálogo não tiver QTD_REGISTROS)
+    """
+    if catalogo is None or 'QTD_REGISTROS' not in catalogo.columns:
+        return None
+    return int(filtrar_catalogo(catalogo, selecoes)['QTD_REGISTROS'].sum())
+
+
+def estimar_linhas_explain(conn, sql, params=None):
+    """
+    Estima as linhas de uma consulta pela cardinalidade do plano (EXPLAIN)
+
+    É uma estimativa do otimizador: grosseira para filtros IN, mas sem
+    executar a consulta.
+
+    Returns:
+        int: Cardinalidade estimada do operador mais alto que a informa
+    """
+    plano = conn.execute(f"EXPLAIN (FORMAT JSON) {sql}", params or []).fetchall()
+    pendentes = list(json.loads(plano[0][1]))
+    while pendentes:
+        no = pendentes.pop(0)
+        cardinalidade = no.get('extra_info', {}).get('Estimated Cardinality')
+        if cardinalidade is not None:
+            return int(cardinalidade)
+        pendentes.extend(no.get('children', []))
+    return 0
+
+
+def estimar_bytes_por_linha(conn, sql, params=None, amostra=1000):
+    """Mede a memória por linha do DataFrame em uma amostra do resultado"""
+    df = consultar_df(conn, f"SELECT * FROM ({sql}) amostra LIMIT {int(amostra)}", params)
+    if df.empty:
+        return BYTES_POR_LINHA_PADRAO
+    return df.memory_usage(deep=True, index=False).sum() / len(df)
+
+
+def id_sessao():
+    """Identificador da sessão Streamlit atual ('local' fora do Streamlit)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except ImportError:
+        ctx = None
+    return ctx.session_id if ctx else 'local'
+
+
+class ControleMemoria:
+    """Contabiliza a memória dos conjuntos de dados ativos por sessão"""
+
+    def __init__(self, orcamento_sessao=ORCAMENTO_SESSAO_MB * MB,
+                 orcamento_global=ORCAMENTO_GLOBAL_MB * MB, ttl=TTL_RESERVA_SEGUNDOS):
+        self.orcamento_sessao = orcamento_sessao
+        self.orcamento_global = orcamento_global
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessoes = {}   # sessão -> (chave do conjunto, bytes, instante)
+        self._stats = {'reservas': 0, 'recusadas_sessao': 0, 'recusadas_global': 0}
+
+    def _expirar(self, agora):
+        """Descarta reservas de sessões inativas; chamador deve deter o lock"""
+        for sessao in [s for s, (_, _, t) in self._sessoes.items() if agora - t > self.ttl]:
+            del self._sessoes[sessao]
+
+    def _uso_global(self, ignorar_sessao=None):
+        """Bytes dos conjuntos ativos (cada conjunto contado uma vez)"""
+        conjuntos = {
+            chave: tamanho
+            for sessao, (chave, tamanho, _) in self._sessoes.items()
+            if sessao != ignorar_sessao
+        }
+        return sum(conjuntos.values()), conjuntos
+
+    def reservar(self, sessao, chave, tamanho_bytes):
+        """
+        Registra o conjunto de dados ativo da sessão (substitui o anterior)
+
+        Args:
+            sessao (str): Identificador da sessão
+            chave: Identificador hashable do conjunto (ex.: filtros)
+            tamanho_bytes (float): Memória estimada do conjunto
+
+        Raises:
+            OrcamentoExcedido: Se exceder o orçamento da sessão ou o global
+        """
+        with self._lock:
+            agora = time.time()
+            self._expirar(agora)
+
+            if tamanho_bytes > self.orcamento_sessao:
+                self._stats['recusadas_sessao'] += 1
+                raise OrcamentoExcedido(
+                    f"~{tamanho_bytes / MB:,.0f} MB excede o limite por sessão "
+                    f"({self.orcamento_sessao / MB:,.0f} MB)",
+                    tamanho_bytes, self.orcamento_sessao,
+                )
+
+            uso, conjuntos = self._uso_global(ignorar_sessao=sessao)
+            if chave not in conjuntos and uso + tamanho_bytes > self.orcamento_global:
+                self._stats['recusadas_global'] += 1
+                raise OrcamentoExcedido(
+                    f"~{tamanho_bytes / MB:,.0f} MB excede a memória disponível no "
+                    f"servidor ({(self.orcamento_global - uso) / MB:,.0f} MB livres)",
+                    tamanho_bytes, self.orcamento_global - uso,
+                )
+
+            self._sessoes[sessao] = (chave, tamanho_bytes, agora)
+            self._stats['reservas'] += 1
+
+    def liberar(self, sessao):
+        """Remove a reserva da sessão"""
+        with self._lock:
+            self._sessoes.pop(sessao, None)
+
+    def get_stats(self):
+        """Retorna estatísticas de uso do orçamento"""
+        with self._lock:
+            self._expirar(time.time())
+            uso, conjuntos = self._uso_global()
+            stats = self._stats.copy()
+            stats.update({
+                'sessoes_ativas': len(self._sessoes),
+                'conjuntos_ativos': len(conjuntos),
+                'uso_global_mb': round(uso / MB, 1),
+                'orcamento_sessao_mb': round(self.orcamento_sessao / MB, 1),
+                'orcamento_global_mb': round(self.orcamento_global / MB, 1),
+            })
+            return stats
+
+
+# Instância global (compartilhada por todas as sessões do processo)
+controle_memoria = ControleMemoria()
+
+
+if __name__ == "__main__":
+    # Demonstração do controle com orçamentos pequenos
+    controle = ControleMemoria(orcamento_sessao=100 * MB, orcamento_global=150 * MB)
+    print("🧮 TESTE DO ORÇAMENTO DE MEMÓRIA")
+    print("=" * 40)
+    controle.reservar('sessao_a', 'todos_municipios', 80 * MB)
+    controle.reservar('sessao_b', 'todos_municipios', 80 * MB)  # compartilhado
+    try:
+        controle.reservar('sessao_c', 'outra_selecao', 90 * MB)
+    except OrcamentoExcedido as e:
+        print(f"Recusada: {e}")
+    print(controle.get_stats())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Perfil de inicialização (cold start) dos apps Streamlit do SAEV
+
+Substitui a medição por ``curl`` de ``test_streamlit_performance.sh``, que
+só dizia quando o servidor respondia, não quanto cada app demorava para
+desenhar a primeira tela nem de onde vinha o tempo.
+
+Cada app é executado em um processo Python novo (importações frias),
+com ``-X importtime``, pelo ``AppTest`` do Streamlit. São registrados:
+- primeiro_elemento_s: do início da execução do script até o primeiro
+  elemento enviado à tela;
+- primeira_execucao_s: execução completa da primeira tela;
+- importacoes: tempo de cada módulo importado pelo app (próprio e
+  acumulado), excluindo o que o Streamlit já havia carregado.
+
+O resultado é gravado em JSON, para comparar execuções entre versões
+(``--comparar``) sem depender de uma ferramenta de CI.
+
+Uso:
+    python perfil_inicializacao.py                       # todos os apps
+    python perfil_inicializacao.py streamlit_app.py -n 5
+    python perfil_inicializacao.py --comparar reports/perfil_anterior.json
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+APPS_PADRAO = [
+    'streamlit_app.py',
+    'saev_streamlit.py',
+    'saev_streamlit2.py',
+    'saev_rankings.py',
+    'dashboard_leitura.py',
+]
+
+SAIDA_PADRAO = 'reports/perfil_inicializacao.json'
+
+# Separa, na saída do -X importtime, o que o app importou
+MARCA_INICIO_APP = 'SAEV_INICIO_APP'
+
+# Quantidade de módulos listados por app
+MODULOS_LISTADOS = 15
+
+
+def _executar_filho(app, timeout):
+    """Processo filho: executa a primeira tela do app e imprime os tempos"""
+    from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+    from streamlit.testing.v1 import AppTest
+
+    tempos = {}
+    enqueue_original = ScriptRunContext.enqueue
+
+    def enqueue_medido(self, msg):
+        if 'primeiro_elemento' not in tempos and msg.WhichOneof('type') == 'delta':
+            tempos['primeiro_elemento'] = time.perf_counter()
+        return enqueue_original(self, msg)
+
+    ScriptRunContext.enqueue = enqueue_medido
+
+    at = AppTest.from_file(app, default_timeout=timeout)
+    print(MARCA_INICIO_APP, file=sys.stderr, flush=True)
+    inicio = time.perf_counter()
+    at.run()
+    fim = time.perf_counter()
+
+    print(json.dumps({
+        'primeiro_elemento_s': round(tempos.get('primeiro_elemento', fim) - inicio, 4),
+        'primeira_execucao_s': round(fim - inicio, 4),
+        'excecoes': [str(e.value) for e in at.exception],
+    }))
+
+
+def analisar_importtime(stderr):
+    """
+    Extrai as importações feitas pelo app da saída de ``-X importtime``
+
+    Returns:
+        list: [{'modulo', 'proprio_ms', 'acumulado_ms'}] das importações de
+            primeiro nível (as feitas diretamente pelo app e seus módulos
+            locais), da mais cara para a mais barata
+    """
+    _, _, trecho_app = stderr.partition(MARCA_INICIO_APP)
+    modulos = []
+    for linha in trecho_app.splitlines():
+        if not linha.startswith('import time:') or 'imported package' in linha:
+            continue
+        proprio, acumulado, nome = linha[len('import time:'):].split('|', 2)
+        # Importações aninhadas são indentadas; o primeiro nível não
+        if nome.startswith(' ') and not nome.startswith('  '):
+            modulos.append({
+                'modulo': nome.strip(),
+                'proprio_ms': round(int(proprio) / 1000, 2),
+                'acumulado_ms': round(int(acumulado) / 1000, 2),
+            })
+    return sorted(modulos, key=lambda m: m['acumulado_ms'], reverse=True)
+
+
+def medir_app(app, diretorio, repeticoes=3, timeout=120):
+    """
+    Mede a inicialização de um app em ``repeticoes`` processos novos
+
+    Args:
+        app (Path): Arquivo do app
+        diretorio (Path): Diretório de trabalho (onde está ``db/``)
+        repeticoes (int): Número de processos medidos
+        timeout (int): Tempo máximo da primeira execução, em segundos
+
+    Returns:
+        dict: Medianas, amostras e importações da primeira amostra
+    """
+    amostras = []
+    importacoes = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        processo = subprocess.run(
+            [sys.executable, '-X', 'importtime', __file__, '--filho', str(app),
+             '--timeout', str(timeout)],
+            cwd=diretorio, capture_output=True, text=True,
+        )
+        total = time.perf_counter() - inicio
+        if processo.returncode != 0:
+            raise RuntimeError(f"{app.name}: falha ao executar\n{processo.stderr[-2000:]}")
+
+        amostra = json.loads(processo.stdout.strip().splitlines()[-1])
+        amostra['processo_s'] = round(total, 4)
+        amostras.append(amostra)
+        if importacoes is None:
+            importacoes = analisar_importtime(processo.stderr)
+
+    def mediana(campo):
+        return round(statistics.median(a[campo] for a in amostras), 4)
+
+    return {
+        'primeiro_elemento_s': mediana('primeiro_elemento_s'),
+        'primeira_execucao_s': mediana('primeira_execucao_s'),
+        'processo_s': mediana('processo_s'),
+        'importacoes_ms': round(sum(m['acumulado_ms'] for m in importacoes), 2),
+        'importacoes': importacoes[:MODULOS_LISTADOS],
+        'excecoes': amostras[0]['excecoes'],
+        'amostras': amostras,
+    }
+
+
+def comparar(atual, anterior, tolerancia):
+    """
+    Imprime a variação por app e indica regressões acima da tolerância
+
+    Returns:
+        bool: True se algum app ficou mais lento que a tolerância (em %)
+    """
+    regressao = False
+    print("\n📈 Comparação com a execução anterior (primeira_execucao_s):")
+    for app, medida in atual['apps'].items():
+        antes = anterior.get('apps', {}).get(app)
+        if not antes:
+            print(f"   {app}: sem medida anterior")
+            continue
+        variacao = (medida['primeira_execucao_s'] / antes['primeira_execucao_s'] - 1) * 100
+        marca = "🔴" if variacao > tolerancia else "🟢"
+        regressao |= variacao > tolerancia
+        print(f"   {marca} {app}: {antes['primeira_execucao_s']:.3f}s → "
+              f"{medida['primeira_execucao_s']:.3f}s ({variacao:+.1f}%)")
+    return regressao
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de inicialização dos apps Streamlit do SAEV")
+    parser.add_argument('apps', nargs='*', default=APPS_PADRAO, help="Apps a medir")
+    parser.add_argument('-n', '--repeticoes', type=int, default=3, help="Processos por app")
+    parser.add_argument('--diretorio', default='.', help="Diretório de trabalho (com db/)")
+    parser.add_argument('--saida', default=SAIDA_PADRAO, help="Arquivo JSON de saída")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior")
+    parser.add_argument('--tolerancia', type=float, default=10.0,
+                        help="Regressão aceita na comparação, em %% (padrão 10)")
+    parser.add_argument('--timeout', type=int, default=120, help=argparse.SUPPRESS)
+    parser.add_argument('--filho', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        _executar_filho(args.filho, args.timeout)
+        return 0
+
+    raiz = Path(__file__).resolve().parent
+    diretorio = Path(args.diretorio).resolve()
+    resultado = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'repeticoes': args.repeticoes,
+        'apps': {},
+    }
+
+    print("🚀 PERFIL DE INICIALIZAÇÃO DOS APPS")
+    print("=" * 40)
+    for app in args.apps:
+        caminho = (raiz / app) if not Path(app).is_absolute() else Path(app)
+        medida = medir_app(caminho, diretorio, args.repeticoes, args.timeout)
+        resultado['apps'][caminho.name] = medida
+        print(f"\n📊 {caminho.name}")
+        print(f"   Primeiro elemento: {medida['primeiro_elemento_s']:.3f}s")
+        print(f"   Primeira execução: {medida['primeira_execucao_s']:.3f}s "
+              f"(processo: {medida['processo_s']:.3f}s)")
+        for modulo in medida['importacoes'][:5]:
+            print(f"   📦 {modulo['modulo']}: {modulo['acumulado_ms']:.1f} ms")
+        if medida['excecoes']:
+            print(f"   ❌ Exceções: {medida['excecoes']}")
+
+    saida = Path(args.saida)
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"\n💾 Resultado salvo em {saida}")
+
+    if args.comparar:
+        anterior = json.loads(Path(args.comparar).read_text(encoding='utf-8'))
+        if comparar(resultado, anterior, args.tolerancia):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Estimação de proficiência pela Teoria de Resposta ao Item (Rasch/1PL e 2PL)
+
+Toda a proficiência dos relatórios era a taxa de acerto bruta, que não é
+comparável entre testes de dificuldades diferentes. Este módulo calibra os
+itens e estima a habilidade (theta) dos alunos direto das respostas da
+tabela ``avaliacao``.
+
+Calibração (por disciplina, ano e série):
+- Matrizes esparsas aluno × item (respondidos e acertos); item não
+  respondido simplesmente não entra na verossimilhança.
+- Máxima verossimilhança marginal por EM (Bock-Aitkin) com quadratura de
+  Gauss-Hermite. O passo E é vetorizado e processado em blocos de alunos,
+  distribuídos entre threads (as multiplicações esparsas liberam o GIL).
+- Rasch: discriminação 1, variância da habilidade estimada. 2PL:
+  discriminação por item, habilidade N(0, 1).
+- Os testes de uma série (diagnóstica, formativas...) são calibrados
+  juntos: os alunos que fizeram mais de uma avaliação ligam esses testes na
+  mesma escala.
+
+Com os itens calibrados, cada aplicação (aluno × teste) recebe um theta
+EAP e seu erro-padrão. A escala é a de cada disciplina, ano e série: os
+thetas são comparáveis entre avaliações da mesma série, mas NÃO entre
+séries. Séries diferentes fazem testes diferentes, sem alunos nem itens em
+comum que liguem as escalas, e em cada uma a média da habilidade é fixada
+em 0. Resultados nas tabelas ``tri_itens`` e ``tri_proficiencia`` (com
+DIS_NOME, AVA_ANO e SER_NOME, a chave da escala).
+
+Uso:
+    python proficiencia_tri.py                          # Rasch, todas as disciplinas
+    python proficiencia_tri.py --modelo 2pl --disciplina Matemática --sem-gravar
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from numpy.polynomial.hermite_e import hermegauss
+from scipy import sparse
+from scipy.special import expit, log_expit, logsumexp
+
+from saev_query import construir_where
+
+MODELOS = ('rasch', '2pl')
+
+# Pontos de quadratura da distribuição da habilidade
+PONTOS_QUADRATURA = 41
+
+# Alunos (ou aplicações) por bloco do passo E
+ALUNOS_POR_BLOCO = 50_000
+
+# Threads do passo E
+THREADS_TRI = int(os.environ.get("SAEV_TRI_THREADS", os.cpu_count() or 1))
+
+MAX_ITERACOES = 200
+TOLERANCIA = 1e-4
+
+# Limites dos parâmetros (evitam divergência em itens sem variação)
+LIMITE_DIFICULDADE = 6.0
+LIMITES_DISCRIMINACAO = (0.05, 5.0)
+
+TABELA_ITENS_TRI = "tri_itens"
+TABELA_PROFICIENCIA_TRI = "tri_proficiencia"
+
+# Respostas de uma disciplina/ano com índices densos de aluno, item e teste
+SQL_RESPOSTAS_TRI = """
+WITH respostas AS (
+    SELECT ALU_ID, TES_NOME, TEG_ORDEM, MAX(COALESCE(ATR_CERTO, 0)) AS ACERTO
+    FROM avaliacao
+    WHERE DIS_NOME != 'Leitura' AND {where_clause}
+    GROUP BY ALU_ID, TES_NOME, TEG_ORDEM
+)
+SELECT
+    ALU_ID,
+    CAST(DENSE_RANK() OVER (ORDER BY ALU_ID) - 1 AS INTEGER) AS ALUNO,
+    CAST(DENSE_RANK() OVER (ORDER BY TES_NOME, TEG_ORDEM) - 1 AS INTEGER) AS ITEM,
+    CAST(DENSE_RANK() OVER (ORDER BY TES_NOME) - 1 AS INTEGER) AS TESTE,
+    CAST(ACERTO AS TINYINT) AS ACERTO
+FROM respostas
+"""
+
+# Itens na mesma ordem dos índices densos de SQL_RESPOSTAS_TRI
+SQL_ITENS_TRI = """
+SELECT
+    TES_NOME,
+    CAST(TEG_ORDEM AS SMALLINT) AS TEG_ORDEM,
+    ANY_VALUE(AVA_NOME) AS AVA_NOME,
+    ANY_VALUE(SER_NOME) AS SER_NOME,
+    ANY_VALUE(MTI_CODIGO) AS MTI_CODIGO
+FROM avaliacao
+WHERE DIS_NOME != 'Leitura' AND {where_clause}
+GROUP BY TES_NOME, TEG_ORDEM
+ORDER BY TES_NOME, TEG_ORDEM
+"""
+
+# Grupos de calibração: cada um tem a própria escala de theta
+SQL_GRUPOS_TRI = """
+SELECT DISTINCT DIS_NOME, AVA_ANO, SER_NOME
+FROM avaliacao
+WHERE DIS_NOME != 'Leitura' AND {where_clause}
+ORDER BY DIS_NOME, AVA_ANO, SER_NOME
+"""
+
+
+def quadratura(desvio=1.0, pontos=PONTOS_QUADRATURA):
+    """Nós e log-pesos da quadratura de uma normal N(0, desvio²)"""
+    nos, pesos = hermegauss(pontos)
+    return nos * desvio, np.log(pesos / pesos.sum())
+
+
+def matrizes_esparsas(linhas, colunas, acertos, forma):
+    """Matrizes CSR de itens respondidos e de acertos (linhas × itens)"""
+    respondidos = sparse.csr_matrix(
+        (np.ones(len(linhas)), (linhas, colunas)), shape=forma
+    )
+    corretos = sparse.csr_matrix(
+        (acertos.astype(np.float64), (linhas, colunas)), shape=forma
+    )
+    return respondidos, corretos
+
+
+def _blocos(qtd_linhas, tamanho=ALUNOS_POR_BLOCO):
+    return [(inicio, min(inicio + tamanho, qtd_linhas))
+            for inicio in range(0, qtd_linhas, tamanho)]
+
+
+def _posterior_bloco(respondidos, corretos, log_p, log_q, log_prior):
+    """Log-verossimilhança e posterior (linhas × nós) de um bloco"""
+    log_vero = corretos @ (log_p - log_q) + respondidos @ log_q + log_prior
+    log_marginal = logsumexp(log_vero, axis=1, keepdims=True)
+    return np.exp(log_vero - log_marginal), float(log_marginal.sum())
+
+
+def passo_e(respondidos, corretos, nos, log_prior, dificuldade, discriminacao,
+            threads=THREADS_TRI):
+    """
+    Passo E: contagens esperadas de respostas e acertos por item × nó
+
+    Returns:
+        tuple: (respostas esperadas J×Q, acertos esperados J×Q, soma de
+            theta² posterior, log-verossimilhança marginal)
+    """
+    eta = discriminacao[:, None] * (nos[None, :] - dificuldade[:, None])
+    log_p, log_q = log_expit(eta), log_expit(-eta)
+
+    def processar(bloco):
+        inicio, fim = bloco
+        r, c = respondidos[inicio:fim], corretos[inicio:fim]
+        posterior, log_vero = _posterior_bloco(r, c, log_p, log_q, log_prior)
+        return (
+            np.asarray(r.T @ posterior),
+            np.asarray(c.T @ posterior),
+            float(posterior.sum(axis=0) @ nos ** 2),
+            log_vero,
+        )
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="saev-tri") as executor:
+        parciais = list(executor.map(processar, _blocos(respondidos.shape[0])))
+
+    return tuple(sum(parte[i] for parte in parciais) for i in range(4))
+
+
+def passo_m(n, r, nos, dificuldade, discriminacao, modelo, passos=3):
+    """
+    Passo M: escore de Fisher vetorizado para todos os itens
+
+    Args:
+        n, r (numpy.ndarray): Respostas e acertos esperados (itens × nós)
+        nos (numpy.ndarray): Nós da quadratura
+        dificuldade, discriminacao (numpy.ndarray): Parâmetros atuais
+        modelo (str): 'rasch' ou '2pl'
+        passos (int): Iterações de Fisher por passo M
+
+    Returns:
+        tuple: (dificuldade, discriminacao)
+    """
+    b, a = dificuldade.copy(), discriminacao.copy()
+    for _ in range(passos):
+        centrado = nos[None, :] - b[:, None]
+        p = expit(a[:, None] * centrado)
+        residuo = r - n * p
+        informacao = n * p * (1 - p)
+
+        if modelo == 'rasch':
+            delta_b = -residuo.sum(axis=1) / np.maximum(informacao.sum(axis=1), 1e-10)
+            b = np.clip(b + np.clip(delta_b, -1, 1), -LIMITE_DIFICULDADE, LIMITE_DIFICULDADE)
+            continue
+
+        # 2PL: sistema 2×2 (a, b) resolvido para todos os itens de uma vez
+        escore = np.stack([(residuo * centrado).sum(axis=1), -a * residuo.sum(axis=1)], axis=1)
+        i_aa = (informacao * centrado ** 2).sum(axis=1)
+        i_ab = -a * (informacao * centrado).sum(axis=1)
+        i_bb = a ** 2 * informacao.sum(axis=1)
+        det = np.maximum(i_aa * i_bb - i_ab ** 2, 1e-10)
+        delta_a = (i_bb * escore[:, 0] - i_ab * escore[:, 1]) / det
+        delta_b = (i_aa * escore[:, 1] - i_ab * escore[:, 0]) / det
+        a = np.clip(a + np.clip(delta_a, -1, 1), *LIMITES_DISCRIMINACAO)
+        b = np.clip(b + np.clip(delta_b, -1, 1), -LIMITE_DIFICULDADE, LIMITE_DIFICULDADE)
+    return b, a
+
+
+def calibrar(respondidos, corretos, modelo='rasch', max_iteracoes=MAX_ITERACOES,
+             tolerancia=TOLERANCIA, threads=THREADS_TRI):
+    """
+    Calibra os itens por máxima verossimilhança marginal (EM)
+
+    Args:
+        respondidos, corretos (scipy.sparse.csr_matrix): Alunos × itens
+        modelo (str): 'rasch' ou '2pl'
+
+    Returns:
+        dict: dificuldade, discriminacao, desvio (da habilidade),
+            iteracoes, log_verossimilhanca e convergiu
+    """
+    if modelo not in MODELOS:
+        raise ValueError(f"Modelo desconhecido: {modelo} (use {', '.join(MODELOS)})")
+
+    qtd_alunos, qtd_itens = respondidos.shape
+    respostas_item = np.asarray(respondidos.sum(axis=0)).ravel()
+    p_item = np.asarray(corretos.sum(axis=0)).ravel() / np.maximum(respostas_item, 1)
+    p_item = np.clip(p_item, 0.01, 0.99)
+
+    # Início: dificuldade pelo logito da proporção de erro
+    dificuldade = np.log((1 - p_item) / p_item)
+    discriminacao = np.ones(qtd_itens)
+    desvio = 1.0
+    log_vero, convergiu, iteracao = np.nan, False, 0
+
+    for iteracao in range(1, max_iteracoes + 1):
+        nos, log_prior = quadratura(desvio)
+        n, r, soma_theta2, log_vero = passo_e(
+            respondidos, corretos, nos, log_prior, dificuldade, discriminacao, threads
+        )
+        nova_dificuldade, nova_discriminacao = passo_m(
+            n, r, nos, dificuldade, discriminacao, modelo
+        )
+        novo_desvio = np.sqrt(soma_theta2 / qtd_alunos) if modelo == 'rasch' else 1.0
+
+        variacao = max(
+            np.abs(nova_dificuldade - dificuldade).max(initial=0),
+            np.abs(nova_discriminacao - discriminacao).max(initial=0),
+            abs(novo_desvio - desvio),
+        )
+        dificuldade, discriminacao, desvio = nova_dificuldade, nova_discriminacao, novo_desvio
+        if variacao < tolerancia:
+            convergiu = True
+            break
+
+    return {
+        'dificuldade': dificuldade,
+        'discriminacao': discriminacao,
+        'desvio': desvio,
+        'respostas': respostas_item.astype(np.int64),
+        'iteracoes': iteracao,
+        'log_verossimilhanca': log_vero,
+        'convergiu': convergiu,
+    }
+
+
+def estimar_theta(respondidos, corretos, calibracao, threads=THREADS_TRI):
+    """
+    Theta EAP e erro-padrão de cada linha com os itens já calibrados
+
+    Returns:
+        tuple: (theta, erro_padrao)
+    """
+    nos, log_prior = quadratura(calibracao['desvio'])
+    eta = calibracao['discriminacao'][:, None] * (nos[None, :] - calibracao['dificuldade'][:, None])
+    log_p, log_q = log_expit(eta), log_expit(-eta)
+
+    def processar(bloco):
+        inicio, fim = bloco
+        posterior, _ = _posterior_bloco(
+            respondidos[inicio:fim], corretos[inicio:fim], log_p, log_q, log_prior
+        )
+        media = posterior @ nos
+        return media, np.sqrt(np.maximum(posterior @ nos ** 2 - media ** 2, 0))
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="saev-tri") as executor:
+        partes = list(executor.map(processar, _blocos(respondidos.shape[0])))
+
+    if not partes:
+        return np.empty(0), np.empty(0)
+    return np.concatenate([p[0] for p in partes]), np.concatenate([p[1] for p in partes])
+
+
+def estimar_grupo(conn, filtros, modelo='rasch', threads=THREADS_TRI):
+    """
+    Calibra e pontua uma disciplina/ano/série (uma escala de theta)
+
+    Args:
+        conn: Conexão DuckDB
+        filtros (dict): Filtros de ``construir_where`` (uma disciplina, um
+            ano e uma série)
+        modelo (str): 'rasch' ou '2pl'
+
+    Returns:
+        tuple: (DataFrame de itens, DataFrame de proficiências, calibração)
+    """
+    where_clause, params = construir_where(filtros, alias='')
+    dados = conn.execute(SQL_RESPOSTAS_TRI.format(where_clause=where_clause), params).fetchnumpy()
+    itens = conn.execute(SQL_ITENS_TRI.format(where_clause=where_clause), params).df()
+
+    aluno = np.asarray(dados['ALUNO'])
+    item = np.asarray(dados['ITEM'])
+    teste = np.asarray(dados['TESTE'])
+    acerto = np.asarray(dados['ACERTO'])
+    qtd_alunos = int(aluno.max()) + 1 if len(aluno) else 0
+    qtd_testes = int(teste.max()) + 1 if len(teste) else 0
+
+    # Calibração: uma linha por aluno (todas as avaliações do ano juntas)
+    respondidos, corretos = matrizes_esparsas(aluno, item, acerto, (qtd_alunos, len(itens)))
+    calibracao = calibrar(respondidos, corretos, modelo, threads=threads)
+
+    # Pontuação: uma linha por aplicação (aluno × teste)
+    codigo = aluno.astype(np.int64) * qtd_testes + teste
+    aplicacoes, linha = np.unique(codigo, return_inverse=True)
+    respondidos, corretos = matrizes_esparsas(linha, item, acerto, (len(aplicacoes), len(itens)))
+    theta, erro = estimar_theta(respondidos, corretos, calibracao, threads)
+
+    alu_id = np.empty(qtd_alunos, dtype=np.asarray(dados['ALU_ID']).dtype)
+    alu_id[aluno] = dados['ALU_ID']
+    testes = itens['TES_NOME'].drop_duplicates().to_numpy()
+    avaliacoes = itens.drop_duplicates('TES_NOME')['AVA_NOME'].to_numpy()
+
+    itens = itens.assign(
+        MODELO=modelo,
+        DIFICULDADE=calibracao['dificuldade'],
+        DISCRIMINACAO=calibracao['discriminacao'],
+        N_RESPOSTAS=calibracao['respostas'],
+    )
+    proficiencia = pd.DataFrame({
+        'ALU_ID': alu_id[aplicacoes // qtd_testes],
+        'TES_NOME': testes[aplicacoes % qtd_testes],
+        'AVA_NOME': avaliacoes[aplicacoes % qtd_testes],
+        'MODELO': modelo,
+        'THETA': theta,
+        'ERRO_PADRAO': erro,
+        'N_ITENS': np.bincount(linha, minlength=len(aplicacoes)),
+        'ACERTOS': np.bincount(linha, weights=acerto, minlength=len(aplicacoes)).astype(np.int64),
+    })
+    return itens, proficiencia, calibracao
+
+
+def estimar_tri(conn, filtros=None, modelo='rasch', threads=THREADS_TRI, verbose=False):
+    """
+    Calibração e proficiências de todas as disciplinas/anos/séries selecionados
+
+    Cada disciplina, ano e série é calibrada à parte: os thetas só são
+    comparáveis dentro do mesmo grupo (ver o cabeçalho do módulo).
+
+    Args:
+        conn: Conexão DuckDB
+        filtros (dict): Filtros no formato de ``construir_where``
+        modelo (str): 'rasch' ou '2pl'
+        threads (int): Threads do passo E
+        verbose (bool): Mostra o resumo de cada calibração
+
+    Returns:
+        dict: DataFrames 'itens' e 'proficiencia'
+    """
+    where_clause, params = construir_where(filtros, alias='')
+    grupos = conn.execute(SQL_GRUPOS_TRI.format(where_clause=where_clause), params).fetchall()
+
+    itens, proficiencias = [], []
+    for disciplina, ano, serie in grupos:
+        inicio = time.perf_counter()
+        itens_grupo, proficiencia, calibracao = estimar_grupo(
+            conn, {**(filtros or {}), 'disciplinas': disciplina, 'anos': ano, 'series': serie},
+            modelo, threads
+        )
+        itens.append(itens_grupo.assign(DIS_NOME=disciplina, AVA_ANO=ano))
+        proficiencias.append(proficiencia.assign(DIS_NOME=disciplina, AVA_ANO=ano, SER_NOME=serie))
+        if verbose:
+            situacao = "convergiu" if calibracao['convergiu'] else "sem convergir"
+            print(f"   {disciplina} {ano} {serie}: {len(itens_grupo):,} itens, {len(proficiencia):,} "
+                  f"aplicações, {calibracao['iteracoes']} iterações ({situacao}), "
+                  f"desvio {calibracao['desvio']:.2f}, {time.perf_counter() - inicio:.1f}s")
+
+    colunas_itens = ['DIS_NOME', 'AVA_ANO', 'TES_NOME', 'TEG_ORDEM', 'AVA_NOME', 'SER_NOME',
+                     'MTI_CODIGO', 'MODELO', 'DIFICULDADE', 'DISCRIMINACAO', 'N_RESPOSTAS']
+    colunas_proficiencia = ['ALU_ID', 'DIS_NOME', 'AVA_ANO', 'SER_NOME', 'TES_NOME', 'AVA_NOME',
+                            'MODELO', 'THETA', 'ERRO_PADRAO', 'N_ITENS', 'ACERTOS']
+    return {
+        'itens': pd.concat(itens, ignore_index=True)[colunas_itens] if itens
+        else pd.DataFrame(columns=colunas_itens),
+        'proficiencia': pd.concat(proficiencias, ignore_index=True)[colunas_proficiencia]
+        if proficiencias else pd.DataFrame(columns=colunas_proficiencia),
+    }
+
+
+def gravar_tri(conn, resultados):
+    """Grava os resultados de ``estimar_tri`` nas tabelas do banco"""
+    for tabela, chave in ((TABELA_ITENS_TRI, 'itens'), (TABELA_PROFICIENCIA_TRI, 'proficiencia')):
+        conn.register('_tri', resultados[chave])
+        try:
+            conn.execute(f"CREATE OR REPLACE TABLE {tabela} AS SELECT * FROM _tri")
+        finally:
+            conn.unregister('_tri')
+
+
+def main():
+    import duckdb
+
+    parser = argparse.ArgumentParser(description="Proficiência pela TRI (Rasch/2PL)")
+    parser.add_argument('--banco', default="db/avaliacao_prod.duckdb", help="Banco DuckDB")
+    parser.add_argument('--modelo', choices=MODELOS, default='rasch', help="Modelo da TRI")
+    parser.add_argument('--disciplina', action='append', help="Disciplina (repetível)")
+    parser.add_argument('--ano', action='append', type=int, help="Ano da avaliação (repetível)")
+    parser.add_argument('--serie', action='append', help="Série (repetível)")
+    parser.add_argument('--threads', type=int, default=THREADS_TRI, help="Threads do passo E")
+    parser.add_argument('--sem-gravar', action='store_true', help="Só mostra o resumo, sem gravar tabelas")
+    args = parser.parse_args()
+
+    print(f"📐 PROFICIÊNCIA PELA TRI ({args.modelo.upper()})")
+    print("=" * 60)
+
+    conn = duckdb.connect(args.banco, read_only=args.sem_gravar)
+    try:
+        inicio = time.perf_counter()
+        resultados = estimar_tri(conn, {'disciplinas': args.disciplina, 'anos': args.ano,
+                                        'series': args.serie},
+                                 args.modelo, args.threads, verbose=True)
+        duracao = time.perf_counter() - inicio
+        if not args.sem_gravar:
+            gravar_tri(conn, resultados)
+    finally:
+        conn.close()
+
+    itens, proficiencia = resultados['itens'], resultados['proficiencia']
+    print(f"\n📋 {len(itens):,} itens · {len(proficiencia):,} aplicações em {duracao:.1f}s")
+    if len(proficiencia):
+        # Uma escala por disciplina, ano e série
+        resumo = proficiencia.groupby(['DIS_NOME', 'AVA_ANO', 'SER_NOME', 'TES_NOME'])['THETA'] \
+            .agg(['count', 'mean', 'std']).round(3)
+        print(resumo.to_string())
+    if not args.sem_gravar:
+        print(f"💾 Tabelas: {TABELA_ITENS_TRI}, {TABELA_PROFICIENCIA_TRI}")
+
+
+if __name__ == "__main__":
+    main()
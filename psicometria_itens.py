@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Análise clássica dos itens de cada teste (TCT) com NumPy
+
+As respostas brutas (``avaliacao``: TEG_ORDEM, ATR_RESPOSTA e ATR_CERTO por
+aluno e teste) têm tudo o que a análise de itens precisa, mas nada no
+projeto a calculava.
+
+As respostas são lidas do DuckDB em uma única varredura ordenada por teste
+e aluno, em lotes Arrow com colunas compactas (inteiros de 8/16/32 bits). Ao
+fechar cada teste, as linhas viram matrizes aluno × item (acerto e
+alternativa escolhida) e todas as estatísticas saem de operações vetoriais
+sobre elas:
+- p-valor (proporção de acerto) de cada item
+- discriminação ponto-bisserial corrigida (item × escore sem o item)
+- alfa de Cronbach do teste e alfa sem cada item
+- frequência de cada alternativa (distratores), com o escore médio de quem
+  a escolheu
+
+Só um teste fica em memória por vez. Os resultados são gravados nas tabelas
+``psicometria_testes``, ``psicometria_itens`` e ``psicometria_distratores``
+(por este script ou pelo ETL, com ``--analises``; o ETL calcula a partir do
+armazém de ``matrizes_respostas``, sem varrer as respostas de novo). Uma
+carga do ETL sem ``--analises`` remove as tabelas, que ficariam
+desatualizadas.
+
+Item sem resposta do aluno conta como erro no escore total, mas fica fora
+do p-valor e da ponto-bisserial do item. O gabarito é a alternativa mais
+marcada entre as respostas certas. Leitura (níveis, sem acerto/erro) não
+entra na análise.
+
+Uso:
+    python psicometria_itens.py                       # todos os testes
+    python psicometria_itens.py --disciplina Matemática --sem-gravar
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+
+from saev_query import construir_where
+
+# Alternativas codificadas na consulta (0 = em branco ou inválida)
+ALTERNATIVAS = ['', 'A', 'B', 'C', 'D', 'E']
+
+# Linhas por lote Arrow lido do DuckDB
+LINHAS_POR_LOTE = 1_000_000
+
+TABELA_TESTES = "psicometria_testes"
+TABELA_ITENS = "psicometria_itens"
+TABELA_DISTRATORES = "psicometria_distratores"
+
+# Respostas em formato compacto, agrupadas por teste (ordem do fluxo)
+SQL_RESPOSTAS = f"""
+SELECT
+    TES_NOME,
+    CAST(ALU_ID AS INTEGER) AS ALU_ID,
+    CAST(TEG_ORDEM AS SMALLINT) AS TEG_ORDEM,
+    CAST(COALESCE(ATR_CERTO, 0) AS TINYINT) AS ATR_CERTO,
+    CAST(COALESCE(list_position({ALTERNATIVAS[1:]}, upper(ATR_RESPOSTA)), 0) AS TINYINT) AS ALTERNATIVA
+FROM avaliacao
+WHERE DIS_NOME != 'Leitura' AND {{where_clause}}
+ORDER BY TES_NOME, ALU_ID
+"""
+
+# Metadados de cada item (uma linha por teste e ordem)
+SQL_ITENS = """
+SELECT
+    TES_NOME,
+    ANY_VALUE(DIS_NOME) AS DIS_NOME,
+    ANY_VALUE(SER_NOME) AS SER_NOME,
+    ANY_VALUE(AVA_NOME) AS AVA_NOME,
+    ANY_VALUE(AVA_ANO) AS AVA_ANO,
+    CAST(TEG_ORDEM AS SMALLINT) AS TEG_ORDEM,
+    ANY_VALUE(MTI_CODIGO) AS MTI_CODIGO
+FROM avaliacao
+WHERE DIS_NOME != 'Leitura' AND {where_clause}
+GROUP BY TES_NOME, TEG_ORDEM
+"""
+
+
+def _filtros_sql(filtros):
+    """Cláusula WHERE para a tabela avaliacao (sem alias)"""
+    return construir_where(filtros, alias='')
+
+
+def fluxo_testes(conn, filtros=None, linhas_por_lote=LINHAS_POR_LOTE):
+    """
+    Lê as respostas em lotes e devolve um teste completo por vez
+
+    Args:
+        conn: Conexão DuckDB
+        filtros (dict): Filtros no formato de ``construir_where``
+        linhas_por_lote (int): Tamanho dos lotes Arrow
+
+    Yields:
+        tuple: (TES_NOME, dict de arrays ALU_ID, TEG_ORDEM, ATR_CERTO, ALTERNATIVA)
+    """
+    where_clause, params = _filtros_sql(filtros)
+    resultado = conn.execute(SQL_RESPOSTAS.format(where_clause=where_clause), params)
+    ler = getattr(resultado, 'to_arrow_reader', None) or resultado.fetch_record_batch
+    leitor = ler(linhas_por_lote)
+    colunas = ['ALU_ID', 'TEG_ORDEM', 'ATR_CERTO', 'ALTERNATIVA']
+
+    atual, pedacos = None, []
+
+    def concluir():
+        return atual, {c: np.concatenate([p[c] for p in pedacos]) for c in colunas}
+
+    for lote in leitor:
+        # Fronteiras entre testes dentro do lote (o fluxo é ordenado por teste)
+        codificado = pc.dictionary_encode(lote.column('TES_NOME'))
+        indices = codificado.indices.to_numpy(zero_copy_only=False)
+        nomes = codificado.dictionary.to_pylist()
+        inicios = np.flatnonzero(np.r_[True, indices[1:] != indices[:-1]])
+        fins = np.r_[inicios[1:], len(indices)]
+        dados = {c: lote.column(c).to_numpy(zero_copy_only=False) for c in colunas}
+
+        for inicio, fim in zip(inicios, fins):
+            nome = nomes[indices[inicio]]
+            if nome != atual and pedacos:
+                yield concluir()
+                pedacos = []
+            atual = nome
+            pedacos.append({c: dados[c][inicio:fim] for c in colunas})
+
+    if pedacos:
+        yield concluir()
+
+
+def matrizes_teste(respostas):
+    """
+    Monta as matrizes aluno × item de um teste
+
+    Args:
+        respostas (dict): Arrays do teste (ordenados por ALU_ID)
+
+    Returns:
+        tuple: (ordens dos itens, acertos int8, alternativas int8, presença bool)
+    """
+    alunos = respostas['ALU_ID']
+    linha = np.cumsum(np.r_[False, alunos[1:] != alunos[:-1]])
+    ordens, coluna = np.unique(respostas['TEG_ORDEM'], return_inverse=True)
+
+    forma = (int(linha[-1]) + 1 if len(linha) else 0, len(ordens))
+    acertos = np.zeros(forma, dtype=np.int8)
+    alternativas = np.zeros(forma, dtype=np.int8)
+    presenca = np.zeros(forma, dtype=bool)
+    acertos[linha, coluna] = respostas['ATR_CERTO']
+    alternativas[linha, coluna] = respostas['ALTERNATIVA']
+    presenca[linha, coluna] = True
+    return ordens, acertos, alternativas, presenca
+
+
+def analisar_teste(acertos, alternativas, presenca):
+    """
+    Estatísticas clássicas de um teste a partir das matrizes aluno × item
+
+    Args:
+        acertos (numpy.ndarray): 1 = acerto (alunos × itens)
+        alternativas (numpy.ndarray): Código da alternativa (0 = branco)
+        presenca (numpy.ndarray): Item respondido pelo aluno
+
+    Returns:
+        tuple: (dict do teste, dict de arrays por item, matrizes de
+            distratores: contagem e escore médio por item × alternativa)
+    """
+    x = acertos.astype(np.float64)
+    escore = x.sum(axis=1)
+    resto = escore[:, None] - x
+    qtd_alunos, qtd_itens = x.shape
+
+    # p-valor e ponto-bisserial corrigida, só entre quem respondeu o item
+    n = presenca.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = x.sum(axis=0) / n
+        media_resto = (resto * presenca).sum(axis=0) / n
+        var_resto = (resto ** 2 * presenca).sum(axis=0) / n - media_resto ** 2
+        covariancia = (x * resto).sum(axis=0) / n - p * media_resto
+        bisserial = covariancia / np.sqrt(p * (1 - p) * var_resto)
+
+        # Alfa de Cronbach (todos os alunos, item ausente = erro)
+        var_itens = x.var(axis=0)
+        var_escore = escore.var()
+        k = qtd_itens
+        alfa = k / (k - 1) * (1 - var_itens.sum() / var_escore) if k > 1 else np.nan
+        var_sem_item = resto.var(axis=0)
+        alfa_sem_item = (k - 1) / (k - 2) * (1 - (var_itens.sum() - var_itens) / var_sem_item) \
+            if k > 2 else np.full(k, np.nan)
+
+    # Distratores: contagem e escore médio por item × alternativa (uma bincount)
+    qtd_alt = len(ALTERNATIVAS)
+    chave = (np.arange(qtd_itens) * qtd_alt + alternativas)[presenca]
+    pesos = np.broadcast_to(escore[:, None], x.shape)[presenca]
+    contagem = np.bincount(chave, minlength=qtd_itens * qtd_alt).reshape(qtd_itens, qtd_alt)
+    soma_escore = np.bincount(chave, weights=pesos, minlength=qtd_itens * qtd_alt) \
+        .reshape(qtd_itens, qtd_alt)
+    acertos_alt = np.bincount(chave, weights=x[presenca], minlength=qtd_itens * qtd_alt) \
+        .reshape(qtd_itens, qtd_alt)
+    gabarito = np.where(acertos_alt.max(axis=1) > 0, acertos_alt.argmax(axis=1), 0)
+
+    teste = {
+        'N_ALUNOS': qtd_alunos,
+        'N_ITENS': qtd_itens,
+        'ALFA_CRONBACH': float(alfa),
+        'MEDIA_ESCORE': float(escore.mean()) if qtd_alunos else np.nan,
+        'DP_ESCORE': float(escore.std()) if qtd_alunos else np.nan,
+    }
+    itens = {
+        'N_RESPOSTAS': n,
+        'P_VALOR': p,
+        'PONTO_BISSERIAL': bisserial,
+        'ALFA_SEM_ITEM': alfa_sem_item,
+        'GABARITO': np.array(ALTERNATIVAS, dtype=object)[gabarito],
+    }
+    return teste, itens, (contagem, soma_escore, gabarito)
+
+
+def psicometria_das_matrizes(matrizes, metadados):
+    """
+    Análise de itens a partir das matrizes já montadas de cada teste
+
+    Args:
+        matrizes (iterable): (TES_NOME, ordens, acertos, alternativas,
+            presença) de cada teste, como em ``matrizes_teste``
+        metadados (pandas.DataFrame): Colunas de ``SQL_ITENS``
+
+    Returns:
+        dict: DataFrames 'testes', 'itens' e 'distratores'
+    """
+    testes, itens, distratores = [], [], []
+    for nome, ordens, acertos, alternativas, presenca in matrizes:
+        teste, por_item, (contagem, soma_escore, gabarito) = analisar_teste(
+            acertos, alternativas, presenca
+        )
+        testes.append({'TES_NOME': nome, **teste})
+        itens.append(pd.DataFrame({'TES_NOME': nome, 'TEG_ORDEM': ordens, **por_item}))
+
+        item, alternativa = np.nonzero(contagem)
+        qtd = contagem[item, alternativa]
+        distratores.append(pd.DataFrame({
+            'TES_NOME': nome,
+            'TEG_ORDEM': ordens[item],
+            'ALTERNATIVA': np.array(ALTERNATIVAS, dtype=object)[alternativa],
+            'QTD': qtd,
+            'PROPORCAO': qtd / contagem.sum(axis=1)[item],
+            'GABARITO': alternativa == gabarito[item],
+            'MEDIA_ESCORE': soma_escore[item, alternativa] / qtd,
+        }))
+
+    colunas_teste = ['TES_NOME', 'DIS_NOME', 'SER_NOME', 'AVA_NOME', 'AVA_ANO']
+    testes = pd.DataFrame(testes, columns=['TES_NOME', 'N_ALUNOS', 'N_ITENS', 'ALFA_CRONBACH',
+                                           'MEDIA_ESCORE', 'DP_ESCORE'])
+    testes = metadados[colunas_teste].drop_duplicates('TES_NOME').merge(testes, on='TES_NOME')
+    itens = pd.concat(itens, ignore_index=True) if itens else pd.DataFrame(
+        columns=['TES_NOME', 'TEG_ORDEM', 'N_RESPOSTAS', 'P_VALOR', 'PONTO_BISSERIAL',
+                 'ALFA_SEM_ITEM', 'GABARITO'])
+    itens = itens.merge(metadados[['TES_NOME', 'TEG_ORDEM', 'MTI_CODIGO']],
+                        on=['TES_NOME', 'TEG_ORDEM'], how='left')
+    distratores = pd.concat(distratores, ignore_index=True) if distratores else pd.DataFrame(
+        columns=['TES_NOME', 'TEG_ORDEM', 'ALTERNATIVA', 'QTD', 'PROPORCAO', 'GABARITO',
+                 'MEDIA_ESCORE'])
+
+    return {
+        'testes': testes.sort_values('TES_NOME', ignore_index=True),
+        'itens': itens.sort_values(['TES_NOME', 'TEG_ORDEM'], ignore_index=True),
+        'distratores': distratores,
+    }
+
+
+def calcular_psicometria(conn, filtros=None, linhas_por_lote=LINHAS_POR_LOTE):
+    """
+    Análise de itens de todos os testes (uma varredura das respostas)
+
+    Args:
+        conn: Conexão DuckDB
+        filtros (dict): Filtros no formato de ``construir_where``
+        linhas_por_lote (int): Tamanho dos lotes Arrow
+
+    Returns:
+        dict: DataFrames 'testes', 'itens' e 'distratores'
+    """
+    where_clause, params = _filtros_sql(filtros)
+    metadados = conn.execute(SQL_ITENS.format(where_clause=where_clause), params).df()
+    matrizes = (
+        (nome, *matrizes_teste(respostas))
+        for nome, respostas in fluxo_testes(conn, filtros, linhas_por_lote)
+    )
+    return psicometria_das_matrizes(matrizes, metadados)
+
+
+def gravar_psicometria(conn, resultados):
+    """Grava os resultados de ``calcular_psicometria`` nas tabelas do banco"""
+    for tabela, chave in ((TABELA_TESTES, 'testes'), (TABELA_ITENS, 'itens'),
+                          (TABELA_DISTRATORES, 'distratores')):
+        conn.register('_psicometria', resultados[chave])
+        try:
+            conn.execute(f"CREATE OR REPLACE TABLE {tabela} AS SELECT * FROM _psicometria")
+        finally:
+            conn.unregister('_psicometria')
+
+
+def main():
+    import duckdb
+
+    parser = argparse.ArgumentParser(description="Análise clássica de itens (TCT) de todos os testes")
+    parser.add_argument('--banco', default="db/avaliacao_prod.duckdb", help="Banco DuckDB")
+    parser.add_argument('--disciplina', action='append', help="Disciplina (repetível)")
+    parser.add_argument('--teste', action='append', help="Teste (repetível)")
+    parser.add_argument('--sem-gravar', action='store_true', help="Só mostra o resumo, sem gravar tabelas")
+    args = parser.parse_args()
+
+    conn = duckdb.connect(args.banco, read_only=args.sem_gravar)
+    try:
+        inicio = time.perf_counter()
+        resultados = calcular_psicometria(conn, {'disciplinas': args.disciplina, 'testes': args.teste})
+        duracao = time.perf_counter() - inicio
+        if not args.sem_gravar:
+            gravar_psicometria(conn, resultados)
+    finally:
+        conn.close()
+
+    testes, itens = resultados['testes'], resultados['itens']
+    print("🧪 ANÁLISE DE ITENS (TCT)")
+    print("=" * 60)
+    print(f"📋 {len(testes):,} testes · {len(itens):,} itens · "
+          f"{testes['N_ALUNOS'].sum():,} alunos×teste em {duracao:.1f}s")
+    if len(testes):
+        print(testes[['TES_NOME', 'N_ALUNOS', 'N_ITENS', 'ALFA_CRONBACH']].to_string(index=False))
+        fracos = itens[itens['PONTO_BISSERIAL'] < 0.2]
+        print(f"\n⚠️ Itens com discriminação baixa (ponto-bisserial < 0,20): {len(fracos):,}")
+    if not args.sem_gravar:
+        print(f"💾 Tabelas: {TABELA_TESTES}, {TABELA_ITENS}, {TABELA_DISTRATORES}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Relatório de descritores problemáticos para todas as séries e disciplinas
+
+O relatório de analise_descritores_problematicos.py só cobria Matemática do
+1º Ano (``SER_NOME LIKE '%1%Ano%'``) e fazia quatro varreduras completas da
+tabela bruta ``avaliacao`` (panorama, top 10, municípios e evolução). Para
+outra combinação era preciso copiar o script e varrer tudo de novo.
+
+O ETL passa a gerar a tabela ``rollup_descritores``: respostas, acertos e
+alunos por (ano, série, disciplina, avaliação, município, escola, descritor),
+mais as linhas de "todas as avaliações" (AVA_NOME nulo) e de "todos os
+descritores" (MTI_CODIGO nulo), marcadas por TODAS_AVALIACOES e
+TODOS_DESCRITORES. Os alunos são distintos dentro de cada escola, então as
+somas entre escolas e municípios continuam exatas.
+
+Este módulo lê o rollup com quatro consultas pequenas e monta o relatório
+de todas as combinações (ano, série, disciplina) em uma execução.
+
+Uso:
+    python relatorio_descritores.py                          # todas as combinações
+    python relatorio_descritores.py --disciplina Matemática --serie "1º Ano"
+    python relatorio_descritores.py --json reports/descritores.json
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import argparse
+import json
+import sys
+
+from consultas_concorrentes import executar_concorrente
+from saev_query import construir_where, tabela_existe
+from transicoes_leitura import SQL_ORDEM_AVALIACAO
+
+TABELA_ROLLUP = "rollup_descritores"
+
+# Chave de cada relatório
+CHAVES_COMBINACAO = ['AVA_ANO', 'SER_NUMBER', 'SER_NOME', 'DIS_NOME']
+
+# Representatividade mínima (mesmos critérios do relatório original)
+MIN_RESPOSTAS_DESCRITOR = 1000
+MIN_RESPOSTAS_MUNICIPIO = 100
+
+# Consulta usada pelo ETL para materializar o rollup (Leitura não tem acerto/erro)
+SQL_ROLLUP_DESCRITORES = """
+SELECT
+    f.AVA_ANO,
+    f.SER_NUMBER,
+    f.SER_NOME,
+    f.DIS_NOME,
+    f.AVA_NOME,
+    f.MUN_NOME,
+    f.ESC_INEP,
+    f.MTI_CODIGO,
+    GROUPING(f.AVA_NOME) = 1 AS TODAS_AVALIACOES,
+    GROUPING(f.MTI_CODIGO) = 1 AS TODOS_DESCRITORES,
+    CAST(SUM(f.ACERTO + f.ERRO) AS BIGINT) AS RESPOSTAS,
+    CAST(SUM(f.ACERTO) AS BIGINT) AS ACERTOS,
+    COUNT(DISTINCT f.ALU_ID) AS ALUNOS
+FROM fato_resposta_aluno f
+WHERE f.DIS_NOME != 'Leitura'
+  AND f.MTI_CODIGO IS NOT NULL
+  AND (f.ACERTO + f.ERRO) > 0
+GROUP BY GROUPING SETS (
+    (f.AVA_ANO, f.SER_NUMBER, f.SER_NOME, f.DIS_NOME, f.AVA_NOME, f.MUN_NOME, f.ESC_INEP, f.MTI_CODIGO),
+    (f.AVA_ANO, f.SER_NUMBER, f.SER_NOME, f.DIS_NOME, f.MUN_NOME, f.ESC_INEP, f.MTI_CODIGO),
+    (f.AVA_ANO, f.SER_NUMBER, f.SER_NOME, f.DIS_NOME, f.AVA_NOME, f.MUN_NOME, f.ESC_INEP),
+    (f.AVA_ANO, f.SER_NUMBER, f.SER_NOME, f.DIS_NOME, f.MUN_NOME, f.ESC_INEP)
+)
+"""
+
+# Colunas do rollup usadas pelos filtros (formato de construir_where)
+COLUNAS_FILTRO_ROLLUP = {
+    'anos': 'AVA_ANO',
+    'series': 'SER_NOME',
+    'numeros_serie': 'SER_NUMBER',
+    'disciplinas': 'DIS_NOME',
+}
+
+
+def _taxa(df):
+    """Taxa de acerto (%) das colunas RESPOSTAS/ACERTOS"""
+    return (df['ACERTOS'] * 100.0 / df['RESPOSTAS']).round(2)
+
+
+def carregar_rollup(conn, filtros=None):
+    """
+    Lê do rollup tudo o que o relatório precisa, para todas as combinações
+
+    Args:
+        conn: Conexão DuckDB
+        filtros (dict): anos, series, numeros_serie, disciplinas
+
+    Returns:
+        dict: DataFrames 'panorama', 'descritores', 'municipios' e 'evolucao'
+    """
+    where_clause, params = construir_where(filtros, alias='', colunas=COLUNAS_FILTRO_ROLLUP)
+    chaves = ", ".join(CHAVES_COMBINACAO)
+    consultas = {}
+
+    consultas['panorama'] = (f"""
+    SELECT {chaves},
+        CAST(SUM(RESPOSTAS) AS BIGINT) AS RESPOSTAS,
+        CAST(SUM(ACERTOS) AS BIGINT) AS ACERTOS,
+        CAST(SUM(ALUNOS) AS BIGINT) AS ALUNOS,
+        COUNT(DISTINCT ESC_INEP) AS ESCOLAS, COUNT(DISTINCT MUN_NOME) AS MUNICIPIOS
+    FROM {TABELA_ROLLUP}
+    WHERE TODAS_AVALIACOES AND TODOS_DESCRITORES AND {where_clause}
+    GROUP BY {chaves}
+    ORDER BY AVA_ANO, SER_NUMBER, DIS_NOME
+    """, params)
+
+    consultas['descritores'] = (f"""
+    SELECT {chaves}, r.MTI_CODIGO, COALESCE(d.MTI_DESCRITOR, r.MTI_CODIGO) AS MTI_DESCRITOR,
+        CAST(SUM(RESPOSTAS) AS BIGINT) AS RESPOSTAS,
+        CAST(SUM(ACERTOS) AS BIGINT) AS ACERTOS,
+        CAST(SUM(ALUNOS) AS BIGINT) AS ALUNOS
+    FROM {TABELA_ROLLUP} r
+    LEFT JOIN dim_descritor d ON r.MTI_CODIGO = d.MTI_CODIGO
+    WHERE TODAS_AVALIACOES AND NOT TODOS_DESCRITORES AND {where_clause}
+    GROUP BY ALL
+    """, params)
+
+    consultas['municipios'] = (f"""
+    SELECT {chaves}, MTI_CODIGO, MUN_NOME,
+        CAST(SUM(RESPOSTAS) AS BIGINT) AS RESPOSTAS,
+        CAST(SUM(ACERTOS) AS BIGINT) AS ACERTOS,
+        CAST(SUM(ALUNOS) AS BIGINT) AS ALUNOS
+    FROM {TABELA_ROLLUP}
+    WHERE TODAS_AVALIACOES AND NOT TODOS_DESCRITORES AND {where_clause}
+    GROUP BY ALL
+    """, params)
+
+    consultas['evolucao'] = (f"""
+    SELECT * FROM (
+        SELECT {chaves}, MTI_CODIGO, AVA_NOME,
+            CAST(SUM(RESPOSTAS) AS BIGINT) AS RESPOSTAS,
+            CAST(SUM(ACERTOS) AS BIGINT) AS ACERTOS
+        FROM {TABELA_ROLLUP}
+        WHERE NOT TODAS_AVALIACOES AND NOT TODOS_DESCRITORES AND {where_clause}
+        GROUP BY ALL
+    )
+    ORDER BY {chaves}, MTI_CODIGO, {SQL_ORDEM_AVALIACAO}
+    """, params)
+
+    # As quatro leituras são independentes: executadas em paralelo
+    return executar_concorrente(conn, consultas)
+
+
+def status_descritor(diferenca):
+    """Classificação pela diferença (pontos percentuais) da média geral"""
+    if diferenca <= -15:
+        return "🔴 CRÍTICO"
+    if diferenca <= -5:
+        return "🟡 ATENÇÃO"
+    return "🟢 PRÓXIMO"
+
+
+def montar_relatorios(dados, top=10, min_respostas=MIN_RESPOSTAS_DESCRITOR,
+                      min_respostas_municipio=MIN_RESPOSTAS_MUNICIPIO, top_evolucao=5):
+    """
+    Monta o relatório de descritores problemáticos de cada combinação
+
+    Args:
+        dados (dict): Saída de ``carregar_rollup``
+        top (int): Descritores problemáticos listados
+        min_respostas (int): Respostas mínimas para um descritor entrar no top
+        min_respostas_municipio (int): Respostas mínimas por município
+        top_evolucao (int): Descritores (piores taxas) na evolução
+
+    Returns:
+        list: Um dicionário por (ano, série, disciplina)
+    """
+    descritores = dados['descritores'].assign(TAXA=_taxa(dados['descritores']))
+    municipios = dados['municipios'].assign(TAXA=_taxa(dados['municipios']))
+    evolucao = dados['evolucao'].assign(TAXA=_taxa(dados['evolucao']))
+
+    grupos_descritores = dict(tuple(descritores.groupby(CHAVES_COMBINACAO, sort=False)))
+    grupos_municipios = dict(tuple(municipios.groupby(CHAVES_COMBINACAO, sort=False)))
+    grupos_evolucao = dict(tuple(evolucao.groupby(CHAVES_COMBINACAO, sort=False)))
+
+    relatorios = []
+    for linha in dados['panorama'].itertuples(index=False):
+        chave = tuple(getattr(linha, coluna) for coluna in CHAVES_COMBINACAO)
+        taxa_geral = round(linha.ACERTOS * 100.0 / linha.RESPOSTAS, 2)
+        desc = grupos_descritores.get(chave, descritores.iloc[:0])
+
+        problematicos = desc[desc['RESPOSTAS'] >= min_respostas].sort_values(
+            ['TAXA', 'MTI_CODIGO'], kind='stable'
+        ).head(top)
+        problematicos = problematicos.assign(
+            ERROS=problematicos['RESPOSTAS'] - problematicos['ACERTOS'],
+            PCT_RESPOSTAS=(problematicos['RESPOSTAS'] * 100.0 / desc['RESPOSTAS'].sum()).round(2),
+            DIFERENCA=(problematicos['TAXA'] - taxa_geral).round(2),
+        )
+        problematicos['STATUS'] = problematicos['DIFERENCA'].map(status_descritor)
+
+        # Municípios com mais dificuldade no descritor mais crítico
+        criticos_municipio = []
+        if len(problematicos):
+            codigo_critico = problematicos['MTI_CODIGO'].iloc[0]
+            mun = grupos_municipios.get(chave, municipios.iloc[:0])
+            mun = mun[(mun['MTI_CODIGO'] == codigo_critico)
+                      & (mun['RESPOSTAS'] >= min_respostas_municipio)]
+            criticos_municipio = mun.sort_values(['TAXA', 'MUN_NOME'], kind='stable').head(5)[
+                ['MUN_NOME', 'RESPOSTAS', 'ACERTOS', 'TAXA', 'ALUNOS']
+            ].to_dict('records')
+
+        # Evolução entre avaliações dos descritores com piores taxas
+        piores = desc.sort_values(['TAXA', 'MTI_CODIGO'], kind='stable').head(top_evolucao)['MTI_CODIGO']
+        evo = grupos_evolucao.get(chave, evolucao.iloc[:0])
+        evolucao_descritores = [
+            {'MTI_CODIGO': codigo, 'taxas': dict(zip(linhas['AVA_NOME'], linhas['TAXA']))}
+            for codigo, linhas in evo[evo['MTI_CODIGO'].isin(piores)].groupby('MTI_CODIGO', sort=False)
+        ]
+
+        urgentes = problematicos.head(3)
+        urgentes = urgentes[urgentes['TAXA'] < taxa_geral - 10]
+
+        relatorios.append({
+            'ano': int(linha.AVA_ANO),
+            'serie': linha.SER_NOME,
+            'disciplina': linha.DIS_NOME,
+            'panorama': {
+                'alunos': int(linha.ALUNOS),
+                'respostas': int(linha.RESPOSTAS),
+                'taxa_geral': taxa_geral,
+                'descritores': int(desc['MTI_CODIGO'].nunique()),
+                'escolas': int(linha.ESCOLAS),
+                'municipios': int(linha.MUNICIPIOS),
+            },
+            'problematicos': problematicos[
+                ['STATUS', 'MTI_CODIGO', 'MTI_DESCRITOR', 'RESPOSTAS', 'ACERTOS', 'ERROS',
+                 'TAXA', 'ALUNOS', 'PCT_RESPOSTAS', 'DIFERENCA']
+            ].to_dict('records'),
+            'municipios_criticos': criticos_municipio,
+            'evolucao': evolucao_descritores,
+            'urgentes': [
+                {'MTI_CODIGO': u.MTI_CODIGO, 'TAXA': u.TAXA,
+                 'erros_por_aluno': round(u.ERROS / u.ALUNOS, 1) if u.ALUNOS else 0.0}
+                for u in urgentes.itertuples(index=False)
+            ],
+            'alunos_impactados': int(problematicos.head(3)['ALUNOS'].sum()),
+        })
+    return relatorios
+
+
+def imprimir_relatorio(relatorio):
+    """Imprime o relatório de uma combinação no formato do relatório original"""
+    titulo = f"{relatorio['disciplina'].upper()} {relatorio['serie'].upper()} ({relatorio['ano']})"
+    panorama = relatorio['panorama']
+
+    print(f"\n🔍 ANÁLISE DETALHADA: DESCRITORES PROBLEMÁTICOS - {titulo}")
+    print("=" * 80)
+    print(f"\n📊 PANORAMA GERAL:")
+    print(f"   🎓 Alunos avaliados (soma por escola): {panorama['alunos']:,}")
+    print(f"   📝 Total de respostas: {panorama['respostas']:,}")
+    print(f"   ✅ Taxa de acerto geral: {panorama['taxa_geral']}%")
+    print(f"   🎯 Descritores avaliados: {panorama['descritores']}")
+    print(f"   🏫 Escolas envolvidas: {panorama['escolas']:,}")
+    print(f"   🏛️ Municípios: {panorama['municipios']}")
+
+    if not relatorio['problematicos']:
+        print(f"\n   ℹ️ Nenhum descritor com respostas suficientes para o ranking")
+        return
+
+    print(f"\n🎯 TOP {len(relatorio['problematicos'])} DESCRITORES MAIS PROBLEMÁTICOS:")
+    print("=" * 80)
+    for i, d in enumerate(relatorio['problematicos'], 1):
+        print(f"\n{i:2d}. {d['STATUS']} | CÓDIGO: {d['MTI_CODIGO']} | TAXA: {d['TAXA']}%")
+        print(f"    📊 Diferença da média geral: {d['DIFERENCA']:+.1f} pontos percentuais")
+        print(f"    📝 {d['ACERTOS']:,} acertos / {d['RESPOSTAS']:,} respostas ({d['ALUNOS']:,} alunos)")
+        print(f"    ❌ {d['ERROS']:,} erros ({d['ERROS'] / d['RESPOSTAS'] * 100:.1f}% de erro)")
+        print(f"    📈 Representa {d['PCT_RESPOSTAS']}% das respostas de {relatorio['disciplina']}")
+        print(f"    🎯 DESCRITOR: {d['MTI_DESCRITOR']}")
+
+    codigo_critico = relatorio['problematicos'][0]['MTI_CODIGO']
+    print(f"\n🏛️ MUNICÍPIOS COM MAIOR DIFICULDADE NO DESCRITOR MAIS CRÍTICO ({codigo_critico}):")
+    for i, m in enumerate(relatorio['municipios_criticos'], 1):
+        print(f"   {i}. {m['MUN_NOME']}: {m['TAXA']}% ({m['ACERTOS']:,}/{m['RESPOSTAS']:,}) - {m['ALUNOS']:,} alunos")
+
+    print(f"\n📅 EVOLUÇÃO ENTRE AVALIAÇÕES:")
+    for e in relatorio['evolucao']:
+        taxas = list(e['taxas'].values())
+        if len(taxas) < 2:
+            continue
+        variacao = taxas[-1] - taxas[0]
+        tendencia = "📈 MELHORA" if variacao > 0 else "📉 PIORA" if variacao < 0 else "➡️ ESTÁVEL"
+        sequencia = " → ".join(f"{taxa}%" for taxa in taxas)
+        print(f"   {e['MTI_CODIGO']}: {sequencia} ({variacao:+.1f}pp) {tendencia}")
+
+    if relatorio['urgentes']:
+        print(f"\n🔴 INTERVENÇÃO URGENTE NECESSÁRIA:")
+        for i, u in enumerate(relatorio['urgentes'], 1):
+            print(f"   {i}. {u['MTI_CODIGO']}: {u['TAXA']}% - {u['erros_por_aluno']:.1f} erros por aluno em média")
+
+    print(f"\n📊 Alunos que se beneficiariam de intervenção nos 3 primeiros: ~{relatorio['alunos_impactados']:,}")
+
+
+def gerar_relatorios(conn, filtros=None, **opcoes):
+    """
+    Lê o rollup e monta os relatórios (ver ``montar_relatorios``)
+
+    Raises:
+        RuntimeError: Banco sem a tabela ``rollup_descritores``
+    """
+    if not tabela_existe(conn, TABELA_ROLLUP):
+        raise RuntimeError(f"Tabela {TABELA_ROLLUP} não encontrada. "
+                           "Execute: python saev_etl.py --mode derived")
+    return montar_relatorios(carregar_rollup(conn, filtros), **opcoes)
+
+
+def main(argv=None):
+    import duckdb
+
+    parser = argparse.ArgumentParser(description="Relatório de descritores problemáticos (todas as combinações)")
+    parser.add_argument('--banco', default="db/avaliacao_prod.duckdb", help="Banco DuckDB")
+    parser.add_argument('--ano', type=int, action='append', help="Ano (repetível)")
+    parser.add_argument('--serie', action='append', help="Série, ex.: '1º Ano' (repetível)")
+    parser.add_argument('--disciplina', action='append', help="Disciplina (repetível)")
+    parser.add_argument('--top', type=int, default=10, help="Descritores problemáticos por relatório")
+    parser.add_argument('--min-respostas', type=int, default=MIN_RESPOSTAS_DESCRITOR,
+                        help="Respostas mínimas por descritor")
+    parser.add_argument('--min-respostas-municipio', type=int, default=MIN_RESPOSTAS_MUNICIPIO,
+                        help="Respostas mínimas por município")
+    parser.add_argument('--json', help="Grava os relatórios em JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    conn = duckdb.connect(args.banco, read_only=True)
+    try:
+        relatorios = gerar_relatorios(
+            conn,
+            {'anos': args.ano, 'series': args.serie, 'disciplinas': args.disciplina},
+            top=args.top,
+            min_respostas=args.min_respostas,
+            min_respostas_municipio=args.min_respostas_municipio,
+        )
+    except Exception as e:
+        print(f"❌ Erro durante a análise: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    for relatorio in relatorios:
+        imprimir_relatorio(relatorio)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorios, arquivo, ensure_ascii=False, indent=2, default=str)
+        print(f"\n💾 Relatórios gravados em {args.json}")
+
+    print(f"\n" + "=" * 80)
+    print(f"✅ {len(relatorios)} relatórios gerados (ano × série × disciplina)")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
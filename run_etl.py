@@ -6,6 +6,8 @@ Script principal para executar o ETL do Sistema SAEV
 Uso:
     python run_etl.py full         # Carga completa
     python run_etl.py incremental  # Carga incremental
+    python run_etl.py derived      # Recria apenas tabelas derivadas
+    python run_etl.py derived --analises  # ...e as análises estatísticas
     
 Exemplos:
     python run_etl.py full --db-path db/teste.duckdb
@@ -19,15 +21,17 @@ from saev_etl import main
 if __name__ == "__main__":
     # Adiciona argumentos padrão se não fornecidos
     if len(sys.argv) == 1:
-        print("Uso: python run_etl.py [full|incremental] [opções]")
+        print("Uso: python run_etl.py [full|incremental|derived] [opções]")
         print("\nExemplos:")
         print("  python run_etl.py full")
         print("  python run_etl.py incremental")
+        print("  python run_etl.py derived")
+        print("  python run_etl.py derived --analises")
         print("  python run_etl.py full --db-path db/teste.duckdb")
         sys.exit(1)
     
-    # Se apenas o modo foi fornecido, adiciona --mode
-    if len(sys.argv) == 2 and sys.argv[1] in ['full', 'incremental']:
+    # Se o modo foi fornecido sem --mode, adiciona --mode
+    if sys.argv[1] in ['full', 'incremental', 'derived']:
         sys.argv.insert(1, '--mode')
     
     main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Camada de agregados dos dashboards SAEV (uma varredura por página)
+
+Cada página filtrada calculava agregados por município, por série ×
+disciplina, por disciplina e por descritor com consultas separadas: o mesmo
+predicado, uma varredura completa da tabela fato para cada gráfico.
+
+Aqui a página declara os agregados de que precisa (``Agregado``) e a camada
+os compila em uma única consulta ``GROUPING SETS`` sobre a varredura
+filtrada. O resultado combinado é então separado em um DataFrame por
+gráfico, com HAVING, ORDER BY e LIMIT aplicados em memória (o volume já
+agregado é pequeno). Agregados com as mesmas dimensões compartilham o mesmo
+conjunto de agrupamento.
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+from saev_query import consultar_df
+
+# Medidas disponíveis (nome -> expressão SQL sobre a tabela fato 'f')
+MEDIDAS = {
+    'total_questoes': "SUM(f.ACERTO + f.ERRO)",
+    'acertos': "SUM(f.ACERTO)",
+    'erros': "SUM(f.ERRO)",
+    'taxa_acerto': "ROUND(100.0 * SUM(f.ACERTO) / SUM(f.ACERTO + f.ERRO), 2)",
+    'total_alunos': "COUNT(DISTINCT f.ALU_ID)",
+    'total_escolas': "COUNT(DISTINCT f.ESC_INEP)",
+    'total_municipios': "COUNT(DISTINCT f.MUN_NOME)",
+    'total_testes': "COUNT(DISTINCT f.TES_NOME)",
+    # Leitura (níveis de proficiência; contam registros, como o dashboard de Leitura)
+    'total_registros': "COUNT(*)",
+    'nivel_medio_leitura': "AVG(f.NIVEL_NUMERICO)",
+    'leitores_fluentes': "COUNT(*) FILTER (WHERE f.NIVEL_LEITURA = 'fluente')",
+    'nao_leitores': "COUNT(*) FILTER (WHERE f.NIVEL_LEITURA = 'nao_leitor')",
+    'pct_fluentes': "ROUND(100.0 * COUNT(*) FILTER (WHERE f.NIVEL_LEITURA = 'fluente') / COUNT(*), 2)",
+}
+
+# Junção usada pelos agregados por descritor (a dimensão tem MTI_CODIGO como
+# chave primária, então o LEFT JOIN não duplica linhas da fato)
+JUNCAO_DESCRITOR = "LEFT JOIN dim_descritor d ON f.MTI_CODIGO = d.MTI_CODIGO"
+
+
+class Agregado:
+    """Declaração de um agregado (um gráfico/tabela) de uma página"""
+
+    def __init__(self, nome, dimensoes, medidas, minimo=None, ordem=None,
+                 limite=None, excluir_nulos=False, renomear=None):
+        """
+        Args:
+            nome (str): Nome do resultado
+            dimensoes (dict): Coluna de saída -> expressão SQL de agrupamento
+                (vazio = total geral)
+            medidas (list): Nomes de ``MEDIDAS``, na ordem de saída
+            minimo (tuple): (medida, valor) - equivalente a HAVING medida >= valor
+            ordem (list): [(coluna, ascendente), ...]
+            limite (int): Quantidade máxima de linhas
+            excluir_nulos (bool): Descarta grupos com dimensão nula
+                (equivalente a um INNER JOIN com a dimensão)
+            renomear (dict): Renomeação final de colunas
+        """
+        desconhecidas = [m for m in medidas if m not in MEDIDAS]
+        if desconhecidas:
+            raise ValueError(f"Medidas desconhecidas: {desconhecidas}")
+
+        self.nome = nome
+        self.dimensoes = dict(dimensoes)
+        self.medidas = list(medidas)
+        self.minimo = minimo
+        self.ordem = list(ordem or [])
+        self.limite = limite
+        self.excluir_nulos = excluir_nulos
+        self.renomear = dict(renomear or {})
+
+
+def compilar_consulta(agregados, where_clause="1=1", juncoes=""):
+    """
+    Compila os agregados em uma única consulta GROUPING SETS
+
+    Args:
+        agregados (list): Lista de ``Agregado``
+        where_clause (str): Cláusula WHERE (ex.: de ``construir_where``)
+        juncoes (str): JOINs adicionais (ex.: ``JUNCAO_DESCRITOR``)
+
+    Returns:
+        tuple: (sql, plano), onde ``plano`` mapeia cada expressão de
+            dimensão para a coluna ``dim_N`` do resultado
+    """
+    expressoes = []
+    for agregado in agregados:
+        for expressao in agregado.dimensoes.values():
+            if expressao not in expressoes:
+                expressoes.append(expressao)
+    plano = {expressao: f"dim_{i}" for i, expressao in enumerate(expressoes)}
+
+    medidas = []
+    for agregado in agregados:
+        for medida in agregado.medidas:
+            if medida not in medidas:
+                medidas.append(medida)
+    # O HAVING em memória precisa da medida mesmo que não seja exibida
+    for agregado in agregados:
+        if agregado.minimo and agregado.minimo[0] not in medidas:
+            medidas.append(agregado.minimo[0])
+
+    # Conjuntos normalizados: as mesmas dimensões em outra ordem (ou
+    # repetidas) geram um único conjunto de agrupamento
+    conjuntos = []
+    for agregado in agregados:
+        conjunto = tuple(sorted(set(agregado.dimensoes.values())))
+        if conjunto not in conjuntos:
+            conjuntos.append(conjunto)
+
+    colunas = [f"{expressao} AS {coluna}" for expressao, coluna in plano.items()]
+    if expressoes:
+        colunas.append(f"GROUPING({', '.join(expressoes)}) AS grupo")
+    else:
+        colunas.append("0 AS grupo")
+    colunas += [f"{MEDIDAS[medida]} AS {medida}" for medida in medidas]
+
+    lista_colunas = ",\n        ".join(colunas)
+    sql = f"""
+    SELECT
+        {lista_colunas}
+    FROM fato_resposta_aluno f
+    {juncoes}
+    WHERE {where_clause}
+    """
+    if expressoes:
+        sets = ", ".join(f"({', '.join(conjunto)})" for conjunto in conjuntos)
+        sql += f"GROUP BY GROUPING SETS ({sets})\n"
+
+    return sql, plano
+
+
+def _mascara_grupo(agregado, plano):
+    """Valor de GROUPING(...) que identifica o conjunto do agregado"""
+    # GROUPING liga o bit das expressões que NÃO fazem parte do conjunto;
+    # a primeira expressão corresponde ao bit mais significativo.
+    expressoes = list(plano)
+    mascara = 0
+    for i, expressao in enumerate(expressoes):
+        if expressao not in agregado.dimensoes.values():
+            mascara |= 1 << (len(expressoes) - 1 - i)
+    return mascara
+
+
+def dividir_resultado(agregados, resultado, plano):
+    """
+    Separa o resultado combinado em um DataFrame por agregado
+
+    Args:
+        agregados (list): Lista de ``Agregado``
+        resultado (pandas.DataFrame): Saída da consulta de ``compilar_consulta``
+        plano (dict): Expressão de dimensão -> coluna ``dim_N``
+
+    Returns:
+        dict: Nome do agregado -> DataFrame
+    """
+    frames = {}
+    for agregado in agregados:
+        linhas = resultado[resultado['grupo'] == _mascara_grupo(agregado, plano)]
+
+        dimensoes = {plano[expr]: coluna for coluna, expr in agregado.dimensoes.items()}
+        if agregado.excluir_nulos and dimensoes:
+            linhas = linhas.dropna(subset=list(dimensoes))
+        if agregado.minimo:
+            medida, valor = agregado.minimo
+            linhas = linhas[linhas[medida] >= valor]
+
+        df = linhas[list(dimensoes) + agregado.medidas].rename(columns=dimensoes)
+        if agregado.ordem:
+            # Como o NULLS LAST padrão do DuckDB: nulos e NaN (ex.: taxa 0/0 de
+            # Leitura) ficam no fim em qualquer sentido
+            df = df.sort_values(
+                [coluna for coluna, _ in agregado.ordem],
+                ascending=[ascendente for _, ascendente in agregado.ordem],
+                kind='stable',
+                na_position='last',
+            )
+        if agregado.limite is not None:
+            df = df.head(agregado.limite)
+
+        frames[agregado.nome] = df.rename(columns=agregado.renomear).reset_index(drop=True)
+    return frames
+
+
+def carregar_agregados(conn, agregados, where_clause="1=1", params=None, juncoes=""):
+    """
+    Calcula todos os agregados de uma página com uma única varredura
+
+    Args:
+        conn: Conexão DuckDB
+        agregados (list): Lista de ``Agregado``
+        where_clause (str): Cláusula WHERE parametrizada
+        params (list): Parâmetros da cláusula
+        juncoes (str): JOINs adicionais
+
+    Returns:
+        dict: Nome do agregado -> DataFrame
+    """
+    sql, plano = compilar_consulta(agregados, where_clause, juncoes)
+    resultado = consultar_df(conn, sql, params)
+    return dividir_resultado(agregados, resultado, plano)
+
+
+if __name__ == "__main__":
+    # Demonstração da consulta compilada
+    agregados = [
+        Agregado('metricas', {}, ['total_alunos', 'taxa_acerto']),
+        Agregado('por_municipio', {'municipio': 'f.MUN_NOME'}, ['total_alunos'],
+                 ordem=[('total_alunos', False)], limite=15),
+        Agregado('por_serie', {'serie': 'f.SER_NOME', 'disciplina': 'f.DIS_NOME'},
+                 ['taxa_acerto']),
+    ]
+    sql, _ = compilar_consulta(agregados)
+    print("🔍 CONSULTA GROUPING SETS COMPILADA")
+    print("=" * 40)
+    print(sql)
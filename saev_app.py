@@ -0,0 +1,41 @@
+"""
+📊 SAEV - Oficinas de IA do Espírito Santo
+🧭 Aplicativo único com todos os dashboards
+
+Substitui os servidores separados (um processo e uma porta por dashboard)
+por um único app multipágina. As páginas rodam no mesmo processo e
+compartilham a conexão DuckDB, os caches e o catálogo de filtros
+(ver saev_recursos.py).
+
+Execução:
+    streamlit run saev_app.py
+"""
+
+import streamlit as st
+
+# Cada página ainda define o próprio título/ícone com st.set_page_config
+st.set_page_config(
+    page_title="SAEV - Painéis Educacionais",
+    page_icon="📊",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+PAGINAS = {
+    "Painéis": [
+        st.Page("streamlit_app.py", title="Galeria de Painéis", icon="📊", default=True),
+        st.Page("saev_streamlit.py", title="Painel Principal", icon="🎯"),
+        st.Page("saev_streamlit2.py", title="Dashboard com Filtros", icon="🔍"),
+    ],
+    "Análises": [
+        st.Page("saev_rankings.py", title="Rankings", icon="🏆"),
+        st.Page("dashboard_leitura.py", title="Leitura", icon="📚"),
+        st.Page("dashboard_progressao_leitura.py", title="Progressão da Leitura", icon="🔀"),
+        st.Page("dashboard_agrupamento_escolas.py", title="Perfis de Escolas", icon="🏫"),
+    ],
+    "Sistema": [
+        st.Page("diagnostico.py", title="Diagnóstico", icon="🩺"),
+    ],
+}
+
+st.navigation(PAGINAS).run()
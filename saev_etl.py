@@ -16,6 +16,9 @@ import hashlib
 from datetime import datetime
 import logging
 
+# Os módulos das tabelas derivadas (pandas, NumPy, scikit-learn, SciPy) são
+# importados dentro de cada etapa: a carga em si só precisa do DuckDB
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -27,10 +30,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Tabelas das análises estatísticas (só recalculadas com --analises)
+TABELAS_ANALISES = [
+    'ranking_escolas_intervalos', 'ranking_municipios_intervalos',
+    'psicometria_testes', 'psicometria_itens', 'psicometria_distratores',
+    'tri_itens', 'tri_proficiencia',
+    'agrupamento_escolas', 'agrupamento_centroides',
+]
+
+# Critérios mínimos para entrar nos rankings (mesmos dos dashboards)
+RANKING_MIN_QUESTOES_ALUNO = 5
+RANKING_MIN_ALUNOS_ESCOLA = 10
+RANKING_MIN_QUESTOES_ESCOLA = 100
+
 class SAEVETLFinal:
-    def __init__(self, db_path="db/avaliacao_prod.duckdb", data_path="data/raw"):
+    def __init__(self, db_path="db/avaliacao_prod.duckdb", data_path="data/raw", analises=False):
         self.db_path = db_path
         self.data_path = data_path
+        # Análises estatísticas pesadas (bootstrap, TRI, psicometria, matrizes,
+        # agrupamento): só com --analises
+        self.analises = analises
         self.metadata_file = "etl_metadata.json"
         
         # Cria diretórios
@@ -324,6 +343,260 @@ class SAEVETLFinal:
         logger.info(f"   - dim_descritor: {descritores:,}")
         logger.info(f"   - fato_resposta_aluno: {fatos:,}")
     
+    def create_ranking_tables(self, conn):
+        """Materializa rankings de alunos e escolas por (disciplina, teste)"""
+        logger.info("🏆 Criando tabelas de ranking...")
+        
+        conn.execute("DROP TABLE IF EXISTS ranking_alunos;")
+        conn.execute("DROP TABLE IF EXISTS ranking_escolas;")
+        
+        # Ranking de alunos: posição calculada apenas entre os elegíveis
+        # (mínimo de questões), ordenado por (disciplina, teste, posição) para
+        # que o recorte top-N leia só os blocos necessários (zonemaps).
+        conn.execute(f"""
+        CREATE TABLE ranking_alunos AS
+        WITH agregado AS (
+            SELECT 
+                f.DIS_NOME,
+                f.TES_NOME,
+                f.ALU_ID,
+                a.ALU_NOME,
+                f.ESC_INEP,
+                e.ESC_NOME,
+                f.MUN_NOME,
+                f.SER_NOME,
+                f.TUR_PERIODO,
+                SUM(f.ACERTO) AS total_acertos,
+                SUM(f.ERRO) AS total_erros,
+                SUM(f.ACERTO + f.ERRO) AS total_questoes,
+                ROUND(SUM(f.ACERTO) * 100.0 / SUM(f.ACERTO + f.ERRO), 2) AS taxa_acerto,
+                COUNT(DISTINCT f.MTI_CODIGO) AS descritores_avaliados
+            FROM fato_resposta_aluno f
+            JOIN dim_aluno a ON f.ALU_ID = a.ALU_ID
+            JOIN dim_escola e ON f.ESC_INEP = e.ESC_INEP
+            WHERE (f.ACERTO + f.ERRO) > 0
+            GROUP BY 
+                f.DIS_NOME, f.TES_NOME, f.ALU_ID, a.ALU_NOME, f.ESC_INEP, 
+                e.ESC_NOME, f.MUN_NOME, f.SER_NOME, f.TUR_PERIODO
+        ),
+        classificado AS (
+            SELECT 
+                *,
+                total_questoes >= {RANKING_MIN_QUESTOES_ALUNO} AS elegivel
+            FROM agregado
+        )
+        SELECT 
+            *,
+            CASE WHEN elegivel THEN ROW_NUMBER() OVER (
+                PARTITION BY DIS_NOME, TES_NOME, elegivel
+                ORDER BY taxa_acerto DESC, total_acertos DESC, ALU_ID
+            ) END AS posicao
+        FROM classificado
+        ORDER BY DIS_NOME, TES_NOME, posicao NULLS LAST;
+        """)
+        
+        # Ranking de escolas: mesmos critérios mínimos do dashboard
+        conn.execute(f"""
+        CREATE TABLE ranking_escolas AS
+        WITH agregado AS (
+            SELECT 
+                f.DIS_NOME,
+                f.TES_NOME,
+                f.ESC_INEP,
+                e.ESC_NOME,
+                f.MUN_NOME,
+                COUNT(DISTINCT f.ALU_ID) AS total_alunos,
+                SUM(f.ACERTO) AS total_acertos,
+                SUM(f.ERRO) AS total_erros,
+                SUM(f.ACERTO + f.ERRO) AS total_questoes,
+                ROUND(SUM(f.ACERTO) * 100.0 / SUM(f.ACERTO + f.ERRO), 2) AS taxa_acerto,
+                COUNT(DISTINCT f.MTI_CODIGO) AS descritores_avaliados,
+                COUNT(DISTINCT f.SER_NOME) AS series_atendidas
+            FROM fato_resposta_aluno f
+            JOIN dim_escola e ON f.ESC_INEP = e.ESC_INEP
+            WHERE (f.ACERTO + f.ERRO) > 0
+            GROUP BY f.DIS_NOME, f.TES_NOME, f.ESC_INEP, e.ESC_NOME, f.MUN_NOME
+        ),
+        classificado AS (
+            SELECT 
+                *,
+                (total_alunos >= {RANKING_MIN_ALUNOS_ESCOLA}
+                 AND total_questoes >= {RANKING_MIN_QUESTOES_ESCOLA}) AS elegivel
+            FROM agregado
+        )
+        SELECT 
+            *,
+            CASE WHEN elegivel THEN ROW_NUMBER() OVER (
+                PARTITION BY DIS_NOME, TES_NOME, elegivel
+                ORDER BY taxa_acerto DESC, total_alunos DESC, ESC_INEP
+            ) END AS posicao
+        FROM classificado
+        ORDER BY DIS_NOME, TES_NOME, posicao NULLS LAST;
+        """)
+        
+        alunos = conn.execute("SELECT COUNT(*) FROM ranking_alunos").fetchone()[0]
+        escolas = conn.execute("SELECT COUNT(*) FROM ranking_escolas").fetchone()[0]
+        logger.info(f"   - ranking_alunos: {alunos:,}")
+        logger.info(f"   - ranking_escolas: {escolas:,}")
+    
+    def create_ranking_intervals(self, conn):
+        """Intervalos de confiança (bootstrap) das taxas e posições de escolas e municípios"""
+        from incerteza_rankings import calcular_intervalos, gravar_intervalos
+        
+        logger.info("🎲 Calculando intervalos dos rankings (bootstrap)...")
+        
+        resultados = calcular_intervalos(conn)
+        gravar_intervalos(conn, resultados)
+        
+        logger.info(f"   - ranking_escolas_intervalos: {len(resultados['escolas']):,}")
+        logger.info(f"   - ranking_municipios_intervalos: {len(resultados['municipios']):,}")
+    
+    def create_filter_catalog(self, conn):
+        """Materializa o catálogo de combinações válidas para os filtros"""
+        from filtros_catalogo import SQL_CATALOGO_FILTROS
+        
+        logger.info("🗂️ Criando catálogo de filtros...")
+        
+        conn.execute("DROP TABLE IF EXISTS catalogo_filtros;")
+        conn.execute(f"""
+        CREATE TABLE catalogo_filtros AS
+        {SQL_CATALOGO_FILTROS}
+        ORDER BY MUN_NOME, ESC_INEP, SER_NUMBER, DIS_NOME, TES_NOME;
+        """)
+        
+        combinacoes = conn.execute("SELECT COUNT(*) FROM catalogo_filtros").fetchone()[0]
+        logger.info(f"   - catalogo_filtros: {combinacoes:,}")
+    
+    def create_leitura_transitions(self, conn):
+        """Materializa as matrizes de transição de níveis de Leitura entre avaliações"""
+        from transicoes_leitura import SQL_TRANSICOES_ESCOLA, SQL_TRANSICOES_MUNICIPIO
+        
+        logger.info("🔀 Criando transições de níveis de Leitura...")
+        
+        conn.execute("DROP TABLE IF EXISTS transicao_leitura_municipio;")
+        conn.execute("DROP TABLE IF EXISTS transicao_leitura_escola;")
+        conn.execute(f"""
+        CREATE TABLE transicao_leitura_escola AS
+        {SQL_TRANSICOES_ESCOLA}
+        ORDER BY AVA_ANO, AVA_ORIGEM, AVA_DESTINO, MUN_NOME, ESC_INEP, SER_NOME,
+                 NIVEL_ORIGEM, NIVEL_DESTINO;
+        """)
+        conn.execute(f"""
+        CREATE TABLE transicao_leitura_municipio AS
+        {SQL_TRANSICOES_MUNICIPIO}
+        ORDER BY AVA_ANO, AVA_ORIGEM, AVA_DESTINO, MUN_NOME, SER_NOME,
+                 NIVEL_ORIGEM, NIVEL_DESTINO;
+        """)
+        
+        escolas = conn.execute("SELECT COUNT(*) FROM transicao_leitura_escola").fetchone()[0]
+        municipios = conn.execute("SELECT COUNT(*) FROM transicao_leitura_municipio").fetchone()[0]
+        logger.info(f"   - transicao_leitura_escola: {escolas:,}")
+        logger.info(f"   - transicao_leitura_municipio: {municipios:,}")
+    
+    def create_descriptor_rollup(self, conn):
+        """Materializa o rollup de descritores (série, disciplina, avaliação, município, escola)"""
+        from relatorio_descritores import SQL_ROLLUP_DESCRITORES
+        
+        logger.info("🎯 Criando rollup de descritores...")
+        
+        conn.execute("DROP TABLE IF EXISTS rollup_descritores;")
+        conn.execute(f"""
+        CREATE TABLE rollup_descritores AS
+        {SQL_ROLLUP_DESCRITORES}
+        ORDER BY AVA_ANO, SER_NUMBER, DIS_NOME, TODAS_AVALIACOES, TODOS_DESCRITORES,
+                 MTI_CODIGO, MUN_NOME, ESC_INEP;
+        """)
+        
+        linhas = conn.execute("SELECT COUNT(*) FROM rollup_descritores").fetchone()[0]
+        logger.info(f"   - rollup_descritores: {linhas:,}")
+    
+    def create_item_psychometrics(self, conn):
+        """Calcula a análise clássica de itens (p-valor, ponto-bisserial, alfa, distratores)"""
+        from psicometria_itens import gravar_psicometria
+        from matrizes_respostas import pasta_padrao, psicometria_do_armazem
+        
+        logger.info("🧪 Calculando psicometria dos itens...")
+        
+        # A partir das matrizes exportadas (sem varrer as respostas de novo)
+        resultados = psicometria_do_armazem(pasta_padrao(self.db_path))
+        gravar_psicometria(conn, resultados)
+        
+        logger.info(f"   - psicometria_testes: {len(resultados['testes']):,}")
+        logger.info(f"   - psicometria_itens: {len(resultados['itens']):,}")
+        logger.info(f"   - psicometria_distratores: {len(resultados['distratores']):,}")
+    
+    def create_irt_estimates(self, conn):
+        """Calibra os itens e estima a proficiência dos alunos pela TRI (Rasch)"""
+        from proficiencia_tri import estimar_tri, gravar_tri
+        
+        logger.info("📐 Estimando proficiência pela TRI (Rasch)...")
+        
+        resultados = estimar_tri(conn, modelo='rasch')
+        gravar_tri(conn, resultados)
+        
+        logger.info(f"   - tri_itens: {len(resultados['itens']):,}")
+        logger.info(f"   - tri_proficiencia: {len(resultados['proficiencia']):,}")
+    
+    def export_response_matrices(self, conn):
+        """Exporta as matrizes aluno × item de cada teste (arquivos .npy mapeáveis)"""
+        from matrizes_respostas import exportar_matrizes, pasta_padrao
+        
+        logger.info("🧮 Exportando matrizes aluno × item...")
+        
+        destino = pasta_padrao(self.db_path)
+        manifesto = exportar_matrizes(conn, destino)
+        
+        logger.info(f"   - {len(manifesto['testes']):,} testes em {destino}")
+    
+    def create_school_clusters(self, conn):
+        """Agrupa as escolas por perfil de domínio dos descritores (MiniBatchKMeans)"""
+        from agrupamento_escolas import agrupar_escolas, gravar_agrupamento
+        
+        logger.info("🏫 Agrupando escolas por perfil de descritores...")
+        
+        resultados = agrupar_escolas(conn, min_alunos=RANKING_MIN_ALUNOS_ESCOLA)
+        gravar_agrupamento(conn, resultados)
+        
+        logger.info(f"   - agrupamento_escolas: {len(resultados['escolas']):,}")
+        logger.info(f"   - agrupamento_centroides: {len(resultados['centroides']):,}")
+    
+    def create_analysis_tables(self, conn):
+        """Análises estatísticas sobre o Star Schema (bootstrap, TRI, psicometria, clustering)"""
+        self.create_ranking_intervals(conn)
+        self.export_response_matrices(conn)
+        self.create_item_psychometrics(conn)
+        self.create_irt_estimates(conn)
+        self.create_school_clusters(conn)
+    
+    def drop_analysis_tables(self, conn):
+        """Remove as análises estatísticas e o armazém de matrizes (desatualizados)"""
+        from matrizes_respostas import descartar_armazem, pasta_padrao
+        
+        for tabela in TABELAS_ANALISES:
+            conn.execute(f"DROP TABLE IF EXISTS {tabela};")
+        descartar_armazem(pasta_padrao(self.db_path))
+    
+    def create_derived_tables(self, conn, dados_novos=False):
+        """
+        Cria tabelas derivadas do Star Schema usadas pelos dashboards
+        
+        Com ``dados_novos`` (carga completa ou incremental) e sem --analises,
+        as análises da execução anterior não valem mais e são removidas.
+        """
+        self.create_ranking_tables(conn)
+        self.create_filter_catalog(conn)
+        self.create_leitura_transitions(conn)
+        self.create_descriptor_rollup(conn)
+        if self.analises:
+            self.create_analysis_tables(conn)
+        elif dados_novos:
+            self.drop_analysis_tables(conn)
+            logger.info("ℹ️ Análises estatísticas removidas: desatualizadas pela carga "
+                        "(use --analises para recalcular)")
+        else:
+            logger.info("ℹ️ Análises estatísticas não recalculadas (use --analises)")
+        conn.execute("CHECKPOINT;")
+    
     def update_metadata(self, csv_files):
         """Atualiza metadados após processamento"""
         metadata = self.load_metadata()
@@ -367,6 +640,7 @@ class SAEVETLFinal:
             
             # Star Schema
             self.create_star_schema(conn)
+            self.create_derived_tables(conn, dados_novos=True)
             
             # Atualiza metadados
             self.update_metadata(csv_files)
@@ -406,6 +680,7 @@ class SAEVETLFinal:
             
             # Recria Star Schema (necessário devido às agregações)
             self.create_star_schema(conn)
+            self.create_derived_tables(conn, dados_novos=True)
             
             # Atualiza metadados
             self.update_metadata(new_files)
@@ -415,6 +690,19 @@ class SAEVETLFinal:
         finally:
             conn.close()
     
+    def execute_derived_refresh(self):
+        """Recria apenas as tabelas derivadas a partir do Star Schema existente"""
+        logger.info("🔁 === ATUALIZAÇÃO DE TABELAS DERIVADAS ===")
+        
+        conn = duckdb.connect(self.db_path)
+        logger.info(f"🔌 Conectado: {self.db_path}")
+        
+        try:
+            self.create_derived_tables(conn)
+            logger.info("✅ === TABELAS DERIVADAS ATUALIZADAS ===")
+        finally:
+            conn.close()
+    
     def show_stats(self):
         """Mostra estatísticas do banco"""
         conn = duckdb.connect(self.db_path)
@@ -422,7 +710,13 @@ class SAEVETLFinal:
         try:
             logger.info("📊 === ESTATÍSTICAS FINAIS ===")
             
-            tables = ['avaliacao', 'dim_aluno', 'dim_escola', 'dim_descritor', 'fato_resposta_aluno']
+            tables = ['avaliacao', 'dim_aluno', 'dim_escola', 'dim_descritor', 'fato_resposta_aluno',
+                      'ranking_alunos', 'ranking_escolas', 'ranking_escolas_intervalos',
+                      'ranking_municipios_intervalos', 'catalogo_filtros',
+                      'transicao_leitura_escola', 'transicao_leitura_municipio',
+                      'rollup_descritores', 'psicometria_testes', 'psicometria_itens',
+                      'psicometria_distratores', 'tri_itens', 'tri_proficiencia',
+                      'agrupamento_escolas', 'agrupamento_centroides']
             for table in tables:
                 try:
                     count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
@@ -436,17 +730,23 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='ETL SAEV Final')
-    parser.add_argument('--mode', choices=['full', 'incremental'], required=True)
+    parser.add_argument('--mode', choices=['full', 'incremental', 'derived'], required=True,
+                        help='derived: recria apenas as tabelas derivadas (rankings, transições, rollups etc.)')
     parser.add_argument('--db-path', default='db/avaliacao_prod.duckdb')
     parser.add_argument('--data-path', default='data/raw')
+    parser.add_argument('--analises', action='store_true',
+                        help='recalcula também as análises estatísticas (intervalos dos rankings, '
+                             'psicometria, TRI, matrizes aluno × item e perfis de escolas)')
     
     args = parser.parse_args()
     
-    etl = SAEVETLFinal(db_path=args.db_path, data_path=args.data_path)
+    etl = SAEVETLFinal(db_path=args.db_path, data_path=args.data_path, analises=args.analises)
     
     try:
         if args.mode == 'full':
             etl.execute_full_load()
+        elif args.mode == 'derived':
+            etl.execute_derived_refresh()
         else:
             etl.execute_incremental_load()
         
@@ -21,8 +21,8 @@ class SAEVETLLinuxOptimized(SAEVETLFinal):
     Versão otimizada do ETL para Linux com grandes volumes de dados
     """
     
-    def __init__(self, db_path="db/avaliacao_prod.duckdb", data_path="data/raw"):
-        super().__init__(db_path, data_path)
+    def __init__(self, db_path="db/avaliacao_prod.duckdb", data_path="data/raw", analises=False):
+        super().__init__(db_path, data_path, analises)
         self.chunk_size = 1000000  # Processa 1M registros por vez
         
     def get_system_info(self):
@@ -257,18 +257,24 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='ETL SAEV Otimizado para Linux')
-    parser.add_argument('--mode', choices=['full', 'incremental'], required=True)
+    parser.add_argument('--mode', choices=['full', 'incremental', 'derived'], required=True)
     parser.add_argument('--db-path', default='db/avaliacao_prod.duckdb')
     parser.add_argument('--data-path', default='data/raw')
+    parser.add_argument('--analises', action='store_true',
+                        help='recalcula também as análises estatísticas (intervalos dos rankings, '
+                             'psicometria, TRI, matrizes aluno × item e perfis de escolas)')
     
     args = parser.parse_args()
     
     # Usa a versão otimizada
-    etl = SAEVETLLinuxOptimized(db_path=args.db_path, data_path=args.data_path)
+    etl = SAEVETLLinuxOptimized(db_path=args.db_path, data_path=args.data_path,
+                                analises=args.analises)
     
     try:
         if args.mode == 'full':
             etl.execute_full_load()
+        elif args.mode == 'derived':
+            etl.execute_derived_refresh()
         else:
             etl.execute_incremental_load()
         
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Construtor de consultas parametrizadas compartilhado pelos dashboards SAEV
+
+Os dashboards montavam cláusulas ``IN ('a', 'b')`` concatenando strings e
+interpolavam disciplina/teste em f-strings. Cada combinação de filtros gerava
+um texto SQL diferente, que o DuckDB precisava analisar e planejar do zero.
+
+Este módulo resolve isso em duas partes:
+- ``construir_where``: gera cláusulas WHERE com texto estável. Listas de
+  valores viram um único parâmetro (``IN (SELECT UNNEST(?))``), seja qual
+  for o tamanho da seleção. Valores nunca são inseridos no SQL.
+- ``CachePreparadas``: mantém, por conexão, os prepared statements já
+  criados (``PREPARE``/``EXECUTE``), de modo que recarregar a mesma página
+  não passa de novo pelo planejamento.
+
+Os resultados são lidos em formato Arrow. Em ``consultar_df`` as colunas de
+texto (MUN_NOME, ESC_NOME...) continuam apoiadas em Arrow, em vez de virarem
+objetos Python, o que reduz a memória e o custo de serialização do cache do
+Streamlit.
+
+Toda execução passa pela vigia de ``cancelamento_consultas`` (tempo limite
+e cancelamento quando a execução Streamlit é substituída) e é registrada
+em ``telemetria_consultas`` (duração, volume e espera pelo lock). Consultas
+acima do limiar têm o perfil capturado por ``consultas_lentas``.
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import hashlib
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from cancelamento_consultas import vigiar_consulta
+from consultas_lentas import avaliar_consulta_lenta
+from telemetria_consultas import medir_consulta
+
+# Mapeamento padrão: chave do dicionário de filtros -> coluna da tabela fato
+COLUNAS_FILTRO = {
+    'anos': 'AVA_ANO',
+    'municipios': 'MUN_NOME',
+    'escolas': 'ESC_INEP',
+    'disciplinas': 'DIS_NOME',
+    'series': 'SER_NOME',
+    'testes': 'TES_NOME',
+    'avaliacoes': 'AVA_NOME',
+}
+
+# Variável de sessão usada para passar os argumentos ao EXECUTE
+_VARIAVEL_ARGS = 'saev_args'
+
+# Texto apoiado em Arrow com NaN como valor ausente (o mesmo comportamento
+# das colunas de objeto); pandas < 2.3 usa o nome antigo do dtype
+try:
+    DTYPE_TEXTO = pd.StringDtype('pyarrow', na_value=np.nan)
+except TypeError:
+    DTYPE_TEXTO = pd.StringDtype('pyarrow_numpy')
+
+
+def construir_where(filtros, alias='f', colunas=None):
+    """
+    Constrói uma cláusula WHERE parametrizada a partir dos filtros
+
+    Filtros vazios ou None são ignorados. Listas viram um único parâmetro do
+    tipo LIST, de forma que o texto da consulta depende apenas de quais
+    filtros estão ativos, e não de quantos valores foram selecionados.
+
+    Args:
+        filtros (dict): Chave do filtro -> valor escalar ou lista de valores
+        alias (str): Alias da tabela fato na consulta
+        colunas (dict): Mapeamento chave -> coluna (padrão: COLUNAS_FILTRO).
+            Colunas que já contêm alias (ex.: 'e.ESC_NOME') são usadas como estão.
+
+    Returns:
+        tuple: (cláusula SQL, lista de parâmetros)
+    """
+    colunas = colunas or COLUNAS_FILTRO
+    condicoes = []
+    params = []
+
+    for chave, coluna in colunas.items():
+        valores = filtros.get(chave) if filtros else None
+        if valores is None:
+            continue
+
+        referencia = coluna if '.' in coluna or not alias else f"{alias}.{coluna}"
+
+        if isinstance(valores, (list, tuple, set, frozenset)):
+            if not valores:
+                continue
+            condicoes.append(f"{referencia} IN (SELECT UNNEST(?))")
+            params.append(list(valores))
+        else:
+            condicoes.append(f"{referencia} = ?")
+            params.append(valores)
+
+    where_clause = " AND ".join(condicoes) if condicoes else "1=1"
+    return where_clause, params
+
+
+def chave_filtros(filtros):
+    """
+    Normaliza o dicionário de filtros em uma tupla ordenada e hashable
+
+    Útil para chaves de cache: seleções com os mesmos valores em ordem
+    diferente produzem a mesma chave.
+
+    Args:
+        filtros (dict): Dicionário de filtros
+
+    Returns:
+        tuple: Representação canônica dos filtros
+    """
+    itens = []
+    for chave in sorted(filtros or {}):
+        valores = filtros[chave]
+        if isinstance(valores, (list, tuple, set, frozenset)):
+            valores = tuple(sorted(valores, key=str))
+        itens.append((chave, valores))
+    return tuple(itens)
+
+
+class CachePreparadas:
+    """Cache de prepared statements por conexão DuckDB (chave: texto SQL)"""
+
+    def __init__(self):
+        self._por_conexao = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._stats = {'preparadas': 0, 'reutilizadas': 0, 'invalidadas': 0}
+
+    def _statements(self, conn):
+        """Retorna o dicionário sql -> nome do statement da conexão"""
+        with self._lock:
+            statements = self._por_conexao.get(conn)
+            if statements is None:
+                statements = self._por_conexao[conn] = {}
+            return statements
+
+    @staticmethod
+    def _nome_statement(sql):
+        """Nome determinístico do prepared statement para um texto SQL"""
+        return "saev_q_" + hashlib.sha1(sql.encode('utf-8')).hexdigest()[:16]
+
+    def executar(self, conn, sql, params=None):
+        """
+        Prepara (na primeira vez) e executa a consulta na conexão
+
+        O chamador deve deter o lock da conexão (ver ``executar_consulta``).
+
+        Args:
+            conn: Conexão DuckDB
+            sql (str): Consulta com placeholders '?'
+            params (list): Parâmetros posicionais
+
+        Returns:
+            A conexão com o resultado pendente
+        """
+        statements = self._statements(conn)
+        nome = statements.get(sql)
+        if nome is None:
+            nome = self._nome_statement(sql)
+            conn.execute(f"PREPARE {nome} AS {sql}")
+            statements[sql] = nome
+            self._stats['preparadas'] += 1
+        else:
+            self._stats['reutilizadas'] += 1
+
+        try:
+            if not params:
+                return conn.execute(f"EXECUTE {nome}")
+
+            # O EXECUTE não aceita parâmetros do cliente; os valores são
+            # passados por uma variável de sessão STRUCT, sem nunca entrar
+            # no texto SQL.
+            args = {f"p{i}": valor for i, valor in enumerate(params, start=1)}
+            conn.execute(f"SET VARIABLE {_VARIAVEL_ARGS} = ?", [args])
+            argumentos = ", ".join(
+                f"getvariable('{_VARIAVEL_ARGS}').p{i}" for i in range(1, len(params) + 1)
+            )
+            return conn.execute(f"EXECUTE {nome}({argumentos})")
+        except Exception:
+            # Statement pode ter sido invalidado (ex.: schema recriado pelo ETL)
+            statements.pop(sql, None)
+            self._stats['invalidadas'] += 1
+            raise
+
+    def limpar(self, conn=None):
+        """Esquece os prepared statements de uma conexão (ou de todas)"""
+        with self._lock:
+            if conn is None:
+                self._por_conexao.clear()
+            else:
+                self._por_conexao.pop(conn, None)
+
+    def get_stats(self):
+        """Retorna estatísticas de uso do cache"""
+        return self._stats.copy()
+
+
+# Instância global
+cache_preparadas = CachePreparadas()
+
+
+# Lock por conexão: um resultado pendente não pode ser intercalado com outra consulta
+_locks_conexao = weakref.WeakKeyDictionary()
+_lock_registro = threading.Lock()
+
+
+# Cursores cuja captura de consultas lentas deve abrir um cursor próprio fora
+# da árvore deles (ver ``registrar_abridor_captura``)
+_abridores_captura = weakref.WeakKeyDictionary()
+
+
+def registrar_abridor_captura(conn, abrir_cursor):
+    """
+    Define como abrir o cursor da captura de consultas lentas de ``conn``
+
+    O padrão é ``conn.cursor()``, mas fechar um cursor fecha os derivados
+    dele: quem entrega cursores que são fechados logo após a consulta (ex.:
+    ``saev_recursos.nova_conexao``) registra aqui uma função que abre o
+    cursor a partir da conexão raiz.
+
+    Args:
+        conn: Cursor ou conexão DuckDB
+        abrir_cursor (callable): Função sem argumentos que retorna um cursor
+    """
+    with _lock_registro:
+        _abridores_captura[conn] = abrir_cursor
+
+
+def _lock_da_conexao(conn):
+    """Retorna o lock associado à conexão (criado sob demanda)"""
+    with _lock_registro:
+        lock = _locks_conexao.get(conn)
+        if lock is None:
+            lock = _locks_conexao[conn] = threading.RLock()
+        return lock
+
+
+def executar_consulta(conn, sql, params=None, fetch=None):
+    """
+    Executa uma consulta parametrizada reaproveitando o prepared statement
+
+    Args:
+        conn: Conexão DuckDB
+        sql (str): Consulta com placeholders '?'
+        params (list): Parâmetros posicionais
+        fetch (callable): Função aplicada ao resultado ainda sob o lock da
+            conexão (ex.: ``lambda r: r.df()``). Sem ela, o resultado
+            pendente é retornado e deve ser consumido pelo chamador.
+
+    Returns:
+        Resultado de ``fetch`` ou a conexão com o resultado pendente
+
+    Raises:
+        ConsultaCancelada: Tempo limite excedido ou execução substituída
+    """
+    lock_conexao = _lock_da_conexao(conn)
+    inicio_espera = time.perf_counter()
+    with lock_conexao:
+        espera = time.perf_counter() - inicio_espera
+        # Tempo limite e cancelamento ao trocar filtros (ver cancelamento_consultas)
+        with medir_consulta(sql, espera) as medida, vigiar_consulta(conn, sql):
+            inicio = time.perf_counter()
+            resultado = cache_preparadas.executar(conn, sql, params)
+            if fetch:
+                resultado = medida['resultado'] = fetch(resultado)
+        avaliar_consulta_lenta(conn, sql, params, time.perf_counter() - inicio,
+                               abrir_cursor=_abridores_captura.get(conn))
+        return resultado
+
+
+def _tabela_arrow(resultado):
+    """Lê o resultado pendente como pyarrow.Table (API nova e antiga do DuckDB)"""
+    ler = getattr(resultado, 'to_arrow_table', None) or resultado.fetch_arrow_table
+    return ler()
+
+
+def _mapear_tipo(tipo):
+    """Mapeia colunas de texto Arrow para DTYPE_TEXTO (demais: padrão)"""
+    if pa.types.is_string(tipo) or pa.types.is_large_string(tipo):
+        return DTYPE_TEXTO
+    return None
+
+
+def arrow_para_pandas(tabela):
+    """
+    Converte uma pyarrow.Table em DataFrame sem materializar objetos Python
+
+    Colunas de texto ficam apoiadas em Arrow; colunas numéricas viram NumPy.
+    DECIMAL (ex.: SUM de inteiros) vira float64 e DATE vira datetime64, como
+    no ``.df()`` do DuckDB.
+    """
+    campos = [
+        pa.field(campo.name, pa.float64()) if pa.types.is_decimal(campo.type) else campo
+        for campo in tabela.schema
+    ]
+    tabela = tabela.cast(pa.schema(campos))
+    return tabela.to_pandas(types_mapper=_mapear_tipo, date_as_object=False)
+
+
+def consultar_arrow(conn, sql, params=None):
+    """Executa consulta parametrizada e retorna pyarrow.Table"""
+    return executar_consulta(conn, sql, params, fetch=_tabela_arrow)
+
+
+def consultar_df(conn, sql, params=None):
+    """Executa consulta parametrizada e retorna DataFrame (texto em Arrow)"""
+    return arrow_para_pandas(consultar_arrow(conn, sql, params))
+
+
+def consultar(conn, sql, params=None):
+    """Executa consulta parametrizada e retorna lista de tuplas"""
+    return executar_consulta(conn, sql, params, fetch=lambda r: r.fetchall())
+
+
+def consultar_um(conn, sql, params=None):
+    """Executa consulta parametrizada e retorna a primeira linha"""
+    return executar_consulta(conn, sql, params, fetch=lambda r: r.fetchone())
+
+
+def tabela_existe(conn, nome_tabela):
+    """Verifica se uma tabela (ex.: derivada pelo ETL) existe no banco"""
+    resultado = consultar_um(
+        conn,
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
+        [nome_tabela],
+    )
+    return bool(resultado and resultado[0])
+
+
+if __name__ == "__main__":
+    # Demonstração do construtor
+    print("🔍 TESTE DO CONSTRUTOR DE CONSULTAS")
+    print("=" * 40)
+
+    filtros = {
+        'municipios': ['Vitória', 'Serra'],
+        'disciplinas': ['Matemática'],
+        'series': [],
+        'anos': 2025,
+    }
+    where_clause, params = construir_where(filtros)
+    print(f"WHERE {where_clause}")
+    print(f"Parâmetros: {params}")
+    print(f"Chave de cache: {chave_filtros(filtros)}")
@@ -1,9 +1,16 @@
 import streamlit as st
-import duckdb
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from saev_query import consultar_df, tabela_existe
+from filtros_catalogo import opcoes
+from saev_recursos import catalogo_filtros, conexao
+from tabela_paginada import exibir_tabela_paginada
+from importacao_tardia import modulo_tardio
+from telemetria_consultas import cache_com_telemetria
+from cancelamento_consultas import ConsultaCancelada
+from incerteza_rankings import TABELA_ESCOLAS as TABELA_INTERVALOS_ESCOLAS, formatar_faixa_posicao
+
+# Plotly só é importado ao desenhar o primeiro gráfico
+px = modulo_tardio("plotly.express")
 
 # Configuração da página
 st.set_page_config(
@@ -17,52 +24,47 @@ st.set_page_config(
 st.title("🏆 SAEV - Rankings e Classificações por Teste")
 st.markdown("---")
 
-# Cache para conexão com banco
-@st.cache_resource
+# Conexão compartilhada pelas páginas (cursor da thread, ver saev_recursos)
 def get_database_connection():
     """Conecta ao banco DuckDB"""
     try:
-        conn = duckdb.connect('db/avaliacao_prod.duckdb', read_only=True)
-        return conn
+        return conexao()
     except Exception as e:
         st.error(f"Erro ao conectar com o banco de dados: {e}")
         return None
 
-# Cache para opções dos filtros
-@st.cache_data
-def load_filter_options():
-    """Carrega opções para os filtros"""
-    conn = get_database_connection()
-    if not conn:
-        return [], []
-    
+# Catálogo de filtros (gerado pelo ETL), compartilhado pelas páginas
+def load_filter_catalog():
+    """Carrega o catálogo de combinações válidas para os filtros"""
     try:
-        # Disciplinas
-        disciplinas_query = """
-        SELECT DISTINCT DIS_NOME 
-        FROM fato_resposta_aluno
-        WHERE DIS_NOME IS NOT NULL
-        ORDER BY DIS_NOME
-        """
-        disciplinas = conn.execute(disciplinas_query).df()['DIS_NOME'].tolist()
-        
-        # Testes
-        testes_query = """
-        SELECT DISTINCT TES_NOME 
-        FROM fato_resposta_aluno
-        WHERE TES_NOME IS NOT NULL
-        ORDER BY TES_NOME
-        """
-        testes = conn.execute(testes_query).df()['TES_NOME'].tolist()
-        
-        return disciplinas, testes
+        return catalogo_filtros()
         
     except Exception as e:
         st.error(f"Erro ao carregar opções dos filtros: {e}")
-        return [], []
+        return pd.DataFrame()
+
+# Rankings materializados pelo ETL (ranking_alunos / ranking_escolas):
+# verificados de novo a cada hora, para não guardar um "não" para sempre
+@cache_com_telemetria(ttl=3600, show_spinner=False)
+def usar_rankings_materializados():
+    """Indica se o banco já possui as tabelas de ranking geradas pelo ETL"""
+    conn = get_database_connection()
+    if not conn:
+        return False
+    return tabela_existe(conn, 'ranking_alunos') and tabela_existe(conn, 'ranking_escolas')
+
+# Intervalos de confiança das escolas (bootstrap, ver incerteza_rankings.py),
+# gerados só com --analises: verificados de novo a cada hora
+@cache_com_telemetria(ttl=3600, show_spinner=False)
+def usar_intervalos():
+    """Indica se o banco já possui os intervalos dos rankings gerados pelo ETL"""
+    conn = get_database_connection()
+    if not conn:
+        return False
+    return usar_rankings_materializados() and tabela_existe(conn, TABELA_INTERVALOS_ESCOLAS)
 
 # Cache para ranking de alunos
-@st.cache_data
+@cache_com_telemetria
 def get_ranking_alunos(disciplina, teste, limite=50):
     """Obter ranking dos melhores alunos por disciplina e teste"""
     conn = get_database_connection()
@@ -70,7 +72,31 @@ def get_ranking_alunos(disciplina, teste, limite=50):
         return pd.DataFrame()
     
     try:
-        query = f"""
+        if usar_rankings_materializados():
+            # Recorte top-N da tabela materializada pelo ETL
+            query = """
+            SELECT 
+                ALU_NOME as nome_aluno,
+                ALU_ID as id_aluno,
+                ESC_NOME as nome_escola,
+                ESC_INEP as codigo_escola,
+                MUN_NOME as municipio,
+                SER_NOME as serie,
+                TUR_PERIODO as turno,
+                total_acertos,
+                total_erros,
+                total_questoes,
+                taxa_acerto,
+                descritores_avaliados
+            FROM ranking_alunos
+            WHERE DIS_NOME = ?
+              AND TES_NOME = ?
+              AND posicao <= ?
+            ORDER BY posicao
+            """
+            return consultar_df(conn, query, [disciplina, teste, limite])
+        
+        query = """
         SELECT 
             a.ALU_NOME as nome_aluno,
             f.ALU_ID as id_aluno,
@@ -87,26 +113,29 @@ def get_ranking_alunos(disciplina, teste, limite=50):
         FROM fato_resposta_aluno f
         JOIN dim_aluno a ON f.ALU_ID = a.ALU_ID
         JOIN dim_escola e ON f.ESC_INEP = e.ESC_INEP
-        WHERE f.DIS_NOME = '{disciplina}'
-          AND f.TES_NOME = '{teste}'
+        WHERE f.DIS_NOME = ?
+          AND f.TES_NOME = ?
           AND (f.ACERTO + f.ERRO) > 0
         GROUP BY 
             a.ALU_NOME, f.ALU_ID, e.ESC_NOME, f.ESC_INEP, 
             f.MUN_NOME, f.SER_NOME, f.TUR_PERIODO
         HAVING SUM(f.ACERTO + f.ERRO) >= 5  -- Filtro: pelo menos 5 questões
         ORDER BY taxa_acerto DESC, total_acertos DESC
-        LIMIT {limite}
+        LIMIT ?
         """
         
-        resultado = conn.execute(query).df()
+        resultado = consultar_df(conn, query, [disciplina, teste, limite])
         return resultado
         
+    except ConsultaCancelada:
+        # Não guardar no cache um resultado vazio por tempo limite
+        raise
     except Exception as e:
         st.error(f"Erro ao carregar ranking de alunos: {e}")
         return pd.DataFrame()
 
 # Cache para ranking de escolas
-@st.cache_data
+@cache_com_telemetria
 def get_ranking_escolas(disciplina, teste, limite=10):
     """Obter ranking das melhores escolas por disciplina e teste"""
     conn = get_database_connection()
@@ -114,7 +143,37 @@ def get_ranking_escolas(disciplina, teste, limite=10):
         return pd.DataFrame()
     
     try:
-        query = f"""
+        if usar_rankings_materializados():
+            # Recorte top-N da tabela materializada pelo ETL
+            intervalos = """
+                i.taxa_ic_inf,
+                i.taxa_ic_sup,
+                i.posicao_ic_melhor,
+                i.posicao_ic_pior,""" if usar_intervalos() else ""
+            juncao = f"""
+            LEFT JOIN {TABELA_INTERVALOS_ESCOLAS} i
+              ON i.DIS_NOME = r.DIS_NOME AND i.TES_NOME = r.TES_NOME AND i.ESC_INEP = r.ESC_INEP""" if usar_intervalos() else ""
+            query = f"""
+            SELECT 
+                r.ESC_NOME as nome_escola,
+                r.ESC_INEP as codigo_escola,
+                r.MUN_NOME as municipio,
+                r.total_alunos,
+                r.total_acertos,
+                r.total_erros,
+                r.total_questoes,
+                r.taxa_acerto,{intervalos}
+                r.descritores_avaliados,
+                r.series_atendidas
+            FROM ranking_escolas r{juncao}
+            WHERE r.DIS_NOME = ?
+              AND r.TES_NOME = ?
+              AND r.posicao <= ?
+            ORDER BY r.posicao
+            """
+            return consultar_df(conn, query, [disciplina, teste, limite])
+        
+        query = """
         SELECT 
             e.ESC_NOME as nome_escola,
             f.ESC_INEP as codigo_escola,
@@ -129,8 +188,8 @@ def get_ranking_escolas(disciplina, teste, limite=10):
             COUNT(DISTINCT f.SER_NOME) as series_atendidas
         FROM fato_resposta_aluno f
         JOIN dim_escola e ON f.ESC_INEP = e.ESC_INEP
-        WHERE f.DIS_NOME = '{disciplina}'
-          AND f.TES_NOME = '{teste}'
+        WHERE f.DIS_NOME = ?
+          AND f.TES_NOME = ?
           AND (f.ACERTO + f.ERRO) > 0
         GROUP BY 
             e.ESC_NOME, f.ESC_INEP, f.MUN_NOME
@@ -138,18 +197,163 @@ def get_ranking_escolas(disciplina, teste, limite=10):
             COUNT(DISTINCT f.ALU_ID) >= 10  -- Pelo menos 10 alunos
             AND SUM(f.ACERTO + f.ERRO) >= 100  -- Pelo menos 100 questões
         ORDER BY taxa_acerto DESC, total_alunos DESC
-        LIMIT {limite}
+        LIMIT ?
         """
         
-        resultado = conn.execute(query).df()
+        resultado = consultar_df(conn, query, [disciplina, teste, limite])
         return resultado
         
+    except ConsultaCancelada:
+        # Não guardar no cache um resultado vazio por tempo limite
+        raise
     except Exception as e:
         st.error(f"Erro ao carregar ranking de escolas: {e}")
         return pd.DataFrame()
 
+# Fontes das listagens paginadas (todos os elegíveis, não só o top-N)
+FONTE_ALUNOS_MATERIALIZADA = """
+SELECT 
+    posicao,
+    COALESCE(ALU_NOME, '') as nome_aluno,
+    ALU_ID as id_aluno,
+    COALESCE(ESC_NOME, '') as nome_escola,
+    COALESCE(MUN_NOME, '') as municipio,
+    SER_NOME as serie,
+    TUR_PERIODO as turno,
+    total_acertos,
+    total_questoes,
+    taxa_acerto,
+    descritores_avaliados
+FROM ranking_alunos
+WHERE DIS_NOME = ? AND TES_NOME = ? AND elegivel
+"""
+
+FONTE_ALUNOS_AGREGADA = """
+SELECT 
+    ROW_NUMBER() OVER (ORDER BY taxa_acerto DESC, total_acertos DESC, id_aluno) as posicao,
+    *
+FROM (
+    SELECT 
+        COALESCE(a.ALU_NOME, '') as nome_aluno,
+        f.ALU_ID as id_aluno,
+        COALESCE(e.ESC_NOME, '') as nome_escola,
+        COALESCE(f.MUN_NOME, '') as municipio,
+        f.SER_NOME as serie,
+        f.TUR_PERIODO as turno,
+        SUM(f.ACERTO) as total_acertos,
+        SUM(f.ACERTO + f.ERRO) as total_questoes,
+        ROUND(SUM(f.ACERTO) * 100.0 / SUM(f.ACERTO + f.ERRO), 2) as taxa_acerto,
+        COUNT(DISTINCT f.MTI_CODIGO) as descritores_avaliados
+    FROM fato_resposta_aluno f
+    JOIN dim_aluno a ON f.ALU_ID = a.ALU_ID
+    JOIN dim_escola e ON f.ESC_INEP = e.ESC_INEP
+    WHERE f.DIS_NOME = ?
+      AND f.TES_NOME = ?
+      AND (f.ACERTO + f.ERRO) > 0
+    GROUP BY 
+        a.ALU_NOME, f.ALU_ID, e.ESC_NOME, f.ESC_INEP, 
+        f.MUN_NOME, f.SER_NOME, f.TUR_PERIODO
+    HAVING SUM(f.ACERTO + f.ERRO) >= 5
+)
+"""
+
+FONTE_ESCOLAS_MATERIALIZADA = """
+SELECT 
+    posicao,
+    COALESCE(ESC_NOME, '') as nome_escola,
+    ESC_INEP as codigo_escola,
+    COALESCE(MUN_NOME, '') as municipio,
+    total_alunos,
+    taxa_acerto,
+    series_atendidas
+FROM ranking_escolas
+WHERE DIS_NOME = ? AND TES_NOME = ? AND elegivel
+"""
+
+FONTE_ESCOLAS_COM_INTERVALOS = f"""
+SELECT 
+    r.posicao,
+    COALESCE(r.ESC_NOME, '') as nome_escola,
+    r.ESC_INEP as codigo_escola,
+    COALESCE(r.MUN_NOME, '') as municipio,
+    r.total_alunos,
+    r.taxa_acerto,
+    i.taxa_ic_inf,
+    i.taxa_ic_sup,
+    i.posicao_ic_melhor,
+    i.posicao_ic_pior,
+    r.series_atendidas
+FROM ranking_escolas r
+LEFT JOIN {TABELA_INTERVALOS_ESCOLAS} i
+  ON i.DIS_NOME = r.DIS_NOME AND i.TES_NOME = r.TES_NOME AND i.ESC_INEP = r.ESC_INEP
+WHERE r.DIS_NOME = ? AND r.TES_NOME = ? AND r.elegivel
+"""
+
+FONTE_ESCOLAS_AGREGADA = """
+SELECT 
+    ROW_NUMBER() OVER (ORDER BY taxa_acerto DESC, total_alunos DESC, codigo_escola) as posicao,
+    *
+FROM (
+    SELECT 
+        COALESCE(e.ESC_NOME, '') as nome_escola,
+        f.ESC_INEP as codigo_escola,
+        COALESCE(f.MUN_NOME, '') as municipio,
+        COUNT(DISTINCT f.ALU_ID) as total_alunos,
+        ROUND(SUM(f.ACERTO) * 100.0 / SUM(f.ACERTO + f.ERRO), 2) as taxa_acerto,
+        COUNT(DISTINCT f.SER_NOME) as series_atendidas
+    FROM fato_resposta_aluno f
+    JOIN dim_escola e ON f.ESC_INEP = e.ESC_INEP
+    WHERE f.DIS_NOME = ?
+      AND f.TES_NOME = ?
+      AND (f.ACERTO + f.ERRO) > 0
+    GROUP BY e.ESC_NOME, f.ESC_INEP, f.MUN_NOME
+    HAVING COUNT(DISTINCT f.ALU_ID) >= 10
+       AND SUM(f.ACERTO + f.ERRO) >= 100
+)
+"""
+
+ORDENACOES_ALUNOS = {
+    "🏆 Posição no ranking": [('posicao', True)],
+    "🔤 Nome do aluno": [('nome_aluno', True)],
+    "🏫 Escola": [('nome_escola', True), ('posicao', True)],
+    "🏙️ Município": [('municipio', True), ('posicao', True)],
+}
+
+ORDENACOES_ESCOLAS = {
+    "🏆 Posição no ranking": [('posicao', True)],
+    "🔤 Nome da escola": [('nome_escola', True)],
+    "🏙️ Município": [('municipio', True), ('posicao', True)],
+}
+
+def formatar_pagina_alunos(pagina):
+    """Colunas de exibição da listagem de alunos"""
+    return pagina.assign(
+        taxa_formatada=pagina['taxa_acerto'].map("{:.2f}%".format),
+        questoes_info=pagina['total_acertos'].astype(int).astype(str) + '/' + pagina['total_questoes'].astype(int).astype(str),
+    )
+
+def formatar_pagina_escolas(pagina):
+    """Colunas de exibição da listagem de escolas"""
+    pagina = pagina.assign(taxa_formatada=pagina['taxa_acerto'].map("{:.2f}%".format))
+    if 'taxa_ic_inf' in pagina:
+        pagina = pagina.assign(
+            ic_formatado=[
+                f"{inf:.1f}–{sup:.1f}%" if pd.notna(inf) else ""
+                for inf, sup in zip(pagina['taxa_ic_inf'], pagina['taxa_ic_sup'])
+            ],
+            faixa_posicao=[
+                formatar_faixa_posicao(melhor, pior)
+                for melhor, pior in zip(pagina['posicao_ic_melhor'], pagina['posicao_ic_pior'])
+            ],
+        )
+    return pagina
+
+def consultar_ranking(sql, params):
+    """Executa uma consulta da listagem paginada"""
+    return consultar_df(get_database_connection(), sql, params)
+
 # Cache para estatísticas gerais
-@st.cache_data
+@cache_com_telemetria
 def get_estatisticas_gerais(disciplina, teste):
     """Obter estatísticas gerais do teste"""
     conn = get_database_connection()
@@ -157,7 +361,7 @@ def get_estatisticas_gerais(disciplina, teste):
         return {}
     
     try:
-        query = f"""
+        query = """
         SELECT 
             COUNT(DISTINCT f.ALU_ID) as total_alunos,
             COUNT(DISTINCT f.ESC_INEP) as total_escolas,
@@ -177,31 +381,36 @@ def get_estatisticas_gerais(disciplina, teste):
                 ALU_ID,
                 ROUND(SUM(ACERTO) * 100.0 / SUM(ACERTO + ERRO), 2) as taxa_aluno
             FROM fato_resposta_aluno
-            WHERE DIS_NOME = '{disciplina}' AND TES_NOME = '{teste}'
+            WHERE DIS_NOME = ? AND TES_NOME = ?
               AND (ACERTO + ERRO) > 0
             GROUP BY ALU_ID
             HAVING SUM(ACERTO + ERRO) >= 5
         ) sub ON f.ALU_ID = sub.ALU_ID
-        WHERE f.DIS_NOME = '{disciplina}'
-          AND f.TES_NOME = '{teste}'
+        WHERE f.DIS_NOME = ?
+          AND f.TES_NOME = ?
         """
         
-        resultado = conn.execute(query).df()
+        resultado = consultar_df(conn, query, [disciplina, teste, disciplina, teste])
         return resultado.iloc[0].to_dict()
         
+    except ConsultaCancelada:
+        # Não guardar no cache um resultado vazio por tempo limite
+        raise
     except Exception as e:
         st.error(f"Erro ao carregar estatísticas gerais: {e}")
         return {}
 
 # Interface principal
 def main():
-    # Carregar opções dos filtros
-    disciplinas_opcoes, testes_opcoes = load_filter_options()
+    # Carregar catálogo dos filtros
+    catalogo = load_filter_catalog()
     
-    if not disciplinas_opcoes or not testes_opcoes:
+    if catalogo.empty:
         st.error("Não foi possível carregar as opções de filtros. Verifique a conexão com o banco de dados.")
         return
     
+    disciplinas_opcoes = opcoes(catalogo, 'DIS_NOME')
+    
     # Sidebar para filtros
     st.sidebar.header("🎯 Filtros para Ranking")
     st.sidebar.markdown("Selecione a disciplina e o teste:")
@@ -213,7 +422,8 @@ def main():
         index=0
     )
     
-    # Filtro por Teste
+    # Filtro por Teste (apenas testes da disciplina escolhida)
+    testes_opcoes = opcoes(catalogo, 'TES_NOME', {'DIS_NOME': disciplina_selecionada})
     teste_selecionado = st.sidebar.selectbox(
         "📝 Teste:",
         options=testes_opcoes,
@@ -226,7 +436,7 @@ def main():
     st.sidebar.markdown("### 🔢 Configurações de Ranking")
     
     limite_alunos = st.sidebar.slider(
-        "👥 Número de alunos no ranking:",
+        "👥 Alunos por página:",
         min_value=10,
         max_value=100,
         value=50,
@@ -234,7 +444,7 @@ def main():
     )
     
     limite_escolas = st.sidebar.slider(
-        "🏫 Número de escolas no ranking:",
+        "🏫 Escolas por página:",
         min_value=5,
         max_value=20,
         value=10,
@@ -325,39 +535,34 @@ def main():
         
         # Ranking de Alunos
         with col_alunos:
-            st.subheader(f"🏆 Top {limite_alunos} Alunos - {disciplina_selecionada}")
+            st.subheader(f"🏆 Ranking de Alunos - {disciplina_selecionada}")
             st.markdown(f"**Teste:** {teste_selecionado}")
             
             if not ranking_alunos.empty:
-                # Criar tabela formatada
-                ranking_display = ranking_alunos.copy()
-                ranking_display['ranking'] = range(1, len(ranking_display) + 1)
-                ranking_display['taxa_formatada'] = ranking_display['taxa_acerto'].apply(lambda x: f"{x:.2f}%")
-                ranking_display['questoes_info'] = ranking_display.apply(
-                    lambda row: f"{row['total_acertos']}/{row['total_questoes']}", axis=1
-                )
-                
-                # Selecionar e renomear colunas para exibição
-                colunas_exibicao = {
-                    'ranking': '#',
-                    'nome_aluno': 'Aluno',
-                    'nome_escola': 'Escola',
-                    'municipio': 'Município',
-                    'serie': 'Série',
-                    'turno': 'Turno',
-                    'questoes_info': 'Acertos/Total',
-                    'taxa_formatada': 'Taxa (%)',
-                    'descritores_avaliados': 'Descritores'
-                }
-                
-                df_display = ranking_display[list(colunas_exibicao.keys())].rename(columns=colunas_exibicao)
-                
-                # Exibir tabela
-                st.dataframe(
-                    df_display,
-                    use_container_width=True,
-                    height=600,
-                    hide_index=True
+                # Lista completa, paginada no servidor (só uma tela vai ao navegador)
+                exibir_tabela_paginada(
+                    chave="tabela_alunos",
+                    consultar=consultar_ranking,
+                    fonte=FONTE_ALUNOS_MATERIALIZADA if usar_rankings_materializados() else FONTE_ALUNOS_AGREGADA,
+                    params=[disciplina_selecionada, teste_selecionado],
+                    colunas={
+                        'posicao': '#',
+                        'nome_aluno': 'Aluno',
+                        'nome_escola': 'Escola',
+                        'municipio': 'Município',
+                        'serie': 'Série',
+                        'turno': 'Turno',
+                        'questoes_info': 'Acertos/Total',
+                        'taxa_formatada': 'Taxa (%)',
+                        'descritores_avaliados': 'Descritores'
+                    },
+                    ordenacoes=ORDENACOES_ALUNOS,
+                    chave_unica=['posicao'],
+                    coluna_busca='nome_aluno',
+                    rotulo_busca="🔎 Buscar aluno:",
+                    tamanho=limite_alunos,
+                    formatar=formatar_pagina_alunos,
+                    altura=600
                 )
                 
                 # Gráfico de barras dos top 10
@@ -394,33 +599,43 @@ def main():
         
         # Ranking de Escolas
         with col_escolas:
-            st.subheader(f"🏫 Top {limite_escolas} Escolas - {disciplina_selecionada}")
+            st.subheader(f"🏫 Ranking de Escolas - {disciplina_selecionada}")
             st.markdown(f"**Teste:** {teste_selecionado}")
             
             if not ranking_escolas.empty:
-                # Criar tabela formatada
-                ranking_escolas_display = ranking_escolas.copy()
-                ranking_escolas_display['ranking'] = range(1, len(ranking_escolas_display) + 1)
-                ranking_escolas_display['taxa_formatada'] = ranking_escolas_display['taxa_acerto'].apply(lambda x: f"{x:.2f}%")
-                
-                # Selecionar e renomear colunas para exibição
+                # Lista completa, paginada no servidor (com a faixa de posições, se gerada)
                 colunas_escolas = {
-                    'ranking': '#',
+                    'posicao': '#',
                     'nome_escola': 'Escola',
                     'municipio': 'Município',
                     'total_alunos': 'Alunos',
                     'taxa_formatada': 'Taxa (%)',
-                    'series_atendidas': 'Séries'
                 }
+                if usar_intervalos():
+                    fonte_escolas = FONTE_ESCOLAS_COM_INTERVALOS
+                    colunas_escolas.update({
+                        'ic_formatado': 'IC 95%',
+                        'faixa_posicao': 'Faixa de posição',
+                    })
+                elif usar_rankings_materializados():
+                    fonte_escolas = FONTE_ESCOLAS_MATERIALIZADA
+                else:
+                    fonte_escolas = FONTE_ESCOLAS_AGREGADA
+                colunas_escolas['series_atendidas'] = 'Séries'
                 
-                df_escolas_display = ranking_escolas_display[list(colunas_escolas.keys())].rename(columns=colunas_escolas)
-                
-                # Exibir tabela
-                st.dataframe(
-                    df_escolas_display,
-                    use_container_width=True,
-                    height=400,
-                    hide_index=True
+                exibir_tabela_paginada(
+                    chave="tabela_escolas",
+                    consultar=consultar_ranking,
+                    fonte=fonte_escolas,
+                    params=[disciplina_selecionada, teste_selecionado],
+                    colunas=colunas_escolas,
+                    ordenacoes=ORDENACOES_ESCOLAS,
+                    chave_unica=['posicao'],
+                    coluna_busca='nome_escola',
+                    rotulo_busca="🔎 Buscar escola:",
+                    tamanho=limite_escolas,
+                    formatar=formatar_pagina_escolas,
+                    altura=400
                 )
                 
                 # Gráfico de barras das escolas
@@ -435,6 +650,14 @@ def main():
                     labels={'taxa_acerto': 'Taxa de Acerto (%)', 'nome_escola': 'Escola', 'total_alunos': 'Nº Alunos'},
                     text='taxa_acerto'
                 )
+                if 'taxa_ic_inf' in ranking_escolas:
+                    # Barras de erro com o intervalo de confiança de 95%
+                    fig_escolas.update_traces(error_x=dict(
+                        type='data',
+                        symmetric=False,
+                        array=ranking_escolas['taxa_ic_sup'] - ranking_escolas['taxa_acerto'],
+                        arrayminus=ranking_escolas['taxa_acerto'] - ranking_escolas['taxa_ic_inf'],
+                    ))
                 fig_escolas.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
                 fig_escolas.update_layout(height=400, yaxis={'categoryorder':'total ascending'})
                 st.plotly_chart(fig_escolas, use_container_width=True)
@@ -465,6 +688,8 @@ def main():
         - **Filtro mínimo:** 10 alunos e 100 questões respondidas
         - **Ordenação:** Taxa de acerto (DESC) → Total de alunos (DESC)
         - **Dados exibidos:** Nome, município, nº alunos, taxa, séries atendidas
+        - **Incerteza:** IC 95% da taxa e faixa de posições por bootstrap dos alunos
+          (escolas pequenas têm faixas largas: a posição exata é pouco estável)
         
         ### 📊 **Métricas Calculadas:**
         - **Taxa de Acerto:** (Acertos ÷ Total de Questões) × 100
@@ -473,7 +698,7 @@ def main():
         
         ### 🔧 **Funcionalidades:**
         - **Filtros Interativos:** Disciplina e teste específicos
-        - **Limites Configuráveis:** Quantidade de resultados no ranking
+        - **Listas Paginadas:** Ranking completo, com busca e ordenação no servidor
         - **Download CSV:** Dados completos para análise externa
         - **Visualizações:** Gráficos interativos dos top performers
         """)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Recursos compartilhados pelas páginas do app SAEV (saev_app.py)
+
+Os dashboards rodavam como quatro servidores Streamlit separados, cada um
+com seu interpretador, sua instância DuckDB, seus caches e sua cópia do
+catálogo de filtros. Reunidos como páginas de um único app, eles passam a
+compartilhar, por processo:
+- Uma conexão DuckDB somente leitura (``conexao_base``). Cada sessão
+  consulta por um cursor próprio derivado dela (``conexao``), e funções
+  que fecham a conexão ao final usam ``nova_conexao``.
+- Um catálogo de filtros (``catalogo_filtros``), somente leitura.
+
+O caminho do banco pode ser alterado com a variável SAEV_BANCO.
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import os
+import threading
+import weakref
+
+import duckdb
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from filtros_catalogo import carregar_catalogo
+from saev_query import registrar_abridor_captura
+
+CAMINHO_BANCO = os.environ.get("SAEV_BANCO", "db/avaliacao_prod.duckdb")
+
+_lock = threading.Lock()
+_conexao_base = None
+_cursores_thread = threading.local()
+
+CHAVE_CURSOR_SESSAO = "_saev_cursor"
+
+
+def conexao_base():
+    """Conexão somente leitura do processo (aberta no primeiro uso)"""
+    global _conexao_base
+    with _lock:
+        if _conexao_base is None:
+            _conexao_base = duckdb.connect(CAMINHO_BANCO, read_only=True)
+        return _conexao_base
+
+
+def nova_conexao():
+    """
+    Novo cursor sobre a conexão do processo
+
+    Para funções que fecham a conexão ao final: fechar o cursor não afeta
+    as demais páginas nem a conexão base.
+    """
+    return _cursor_da_base(conexao_base())
+
+
+def _cursor_da_base(base):
+    """
+    Cursor sobre a conexão base
+
+    A captura de consultas lentas (``consultas_lentas``) roda depois que a
+    consulta retorna, quando o chamador pode já ter fechado o cursor. Ela
+    abre então o próprio cursor na conexão base, e não um derivado deste.
+    """
+    cursor = base.cursor()
+    registrar_abridor_captura(cursor, nova_conexao)
+    return cursor
+
+
+def conexao():
+    """
+    Cursor da sessão atual sobre a conexão do processo (não deve ser fechado)
+
+    Cada sessão do Streamlit consulta em seu próprio cursor, sem disputar o
+    lock de uma conexão única com as outras sessões. O cursor fica no
+    ``session_state`` (o Streamlit usa uma thread nova a cada execução), de
+    modo que os prepared statements do ``saev_query`` são reaproveitados
+    entre execuções e liberados quando a sessão termina. Fora do Streamlit
+    (ex.: threads de ``consultas_concorrentes``) o cursor é da thread.
+    """
+    base = conexao_base()
+    if get_script_run_ctx(suppress_warning=True) is not None:
+        cursor = st.session_state.get(CHAVE_CURSOR_SESSAO)
+        if cursor is None:
+            cursor = _cursor_da_base(base)
+            st.session_state[CHAVE_CURSOR_SESSAO] = cursor
+        return cursor
+
+    cursores = getattr(_cursores_thread, "cursores", None)
+    if cursores is None:
+        cursores = weakref.WeakKeyDictionary()
+        _cursores_thread.cursores = cursores
+
+    cursor = cursores.get(base)
+    if cursor is None:
+        cursor = _cursor_da_base(base)
+        cursores[base] = cursor
+    return cursor
+
+
+# Compartilhado entre páginas e sessões sem cópia: NÃO modificar o DataFrame
+@st.cache_resource(ttl=3600, show_spinner=False)
+def catalogo_filtros():
+    """Catálogo de combinações válidas de filtros (somente leitura)"""
+    conn = nova_conexao()
+    try:
+        return carregar_catalogo(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    # Demonstração (fora do Streamlit): cursores por thread sobre uma única conexão
+    print("🔌 TESTE DOS RECURSOS COMPARTILHADOS")
+    print("=" * 40)
+    cursores = []
+
+    def registrar():
+        cursores.append(conexao())
+
+    threads = [threading.Thread(target=registrar) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"Conexão base: {conexao_base()}")
+    print(f"Cursores distintos por thread: {len({id(c) for c in cursores})}")
+    print(conexao().execute("SELECT COUNT(*) FROM fato_resposta_aluno").fetchone())
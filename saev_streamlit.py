@@ -8,11 +8,15 @@ dos dados SAEV com base no Star Schema documentado.
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import duckdb
-import numpy as np
 from datetime import datetime
+from saev_agregados import Agregado, JUNCAO_DESCRITOR, carregar_agregados
+from importacao_tardia import modulo_tardio
+from saev_recursos import nova_conexao
+from telemetria_consultas import cache_com_telemetria
+from cancelamento_consultas import ConsultaCancelada
+
+# Plotly só é importado ao desenhar o primeiro gráfico
+px = modulo_tardio("plotly.express")
 
 # =================== CONFIGURAÇÃO DA PÁGINA ===================
 st.set_page_config(
@@ -25,109 +29,59 @@ st.set_page_config(
 # =================== FUNÇÕES AUXILIARES ===================
 
 def conectar_banco():
-    """Conecta ao banco DuckDB"""
+    """Conecta ao banco DuckDB (cursor da conexão compartilhada, ver saev_recursos)"""
     try:
-        return duckdb.connect('db/avaliacao_prod.duckdb', read_only=True)
+        return nova_conexao()
     except Exception as e:
         st.error(f"❌ Erro ao conectar ao banco: {e}")
         return None
 
-@st.cache_data
+# Agregados do painel: compilados em uma única consulta GROUPING SETS
+AGREGADOS_PAINEL = [
+    # 1. Métricas gerais
+    Agregado('metricas', {}, [
+        'total_alunos', 'total_escolas', 'total_municipios', 'total_testes',
+        'total_questoes', 'acertos', 'taxa_acerto',
+    ], renomear={'acertos': 'total_acertos', 'taxa_acerto': 'taxa_acerto_geral'}),
+    # 2. Top 10 Municípios por performance
+    Agregado('top_municipios', {'MUN_NOME': 'f.MUN_NOME'},
+             ['total_alunos', 'acertos', 'erros', 'taxa_acerto'],
+             minimo=('total_questoes', 1000), ordem=[('taxa_acerto', False)], limite=10),
+    # 3. Performance por disciplina
+    Agregado('por_disciplina', {'DIS_NOME': 'f.DIS_NOME'},
+             ['total_alunos', 'total_testes', 'acertos', 'erros', 'taxa_acerto'],
+             ordem=[('DIS_NOME', True)]),
+    # 4. Performance por série
+    Agregado('por_serie', {'SER_NOME': 'f.SER_NOME', 'DIS_NOME': 'f.DIS_NOME'},
+             ['total_alunos', 'acertos', 'erros', 'taxa_acerto'],
+             ordem=[('SER_NOME', True), ('DIS_NOME', True)]),
+    # 5. Descritores mais difíceis
+    Agregado('descritores_dificeis',
+             {'MTI_CODIGO': 'd.MTI_CODIGO', 'MTI_DESCRITOR': 'd.MTI_DESCRITOR'},
+             ['acertos', 'erros', 'taxa_acerto'],
+             minimo=('total_questoes', 500), ordem=[('taxa_acerto', True)], limite=10,
+             excluir_nulos=True),
+    # 6. Distribuição de alunos por município
+    Agregado('alunos_municipio', {'MUN_NOME': 'f.MUN_NOME'}, ['total_alunos'],
+             ordem=[('total_alunos', False)], limite=15),
+]
+
+@cache_com_telemetria
 def carregar_dados_principais():
-    """Carrega dados principais para o painel"""
+    """Carrega dados principais para o painel (uma única varredura da fato)"""
     con = conectar_banco()
     if not con:
         return {}
     
     try:
-        dados = {}
-        
-        # 1. Métricas gerais
-        dados['metricas'] = con.execute("""
-            SELECT 
-                COUNT(DISTINCT ALU_ID) as total_alunos,
-                COUNT(DISTINCT ESC_INEP) as total_escolas,
-                COUNT(DISTINCT MUN_NOME) as total_municipios,
-                COUNT(DISTINCT TES_NOME) as total_testes,
-                SUM(ACERTO + ERRO) as total_questoes,
-                SUM(ACERTO) as total_acertos,
-                ROUND(100.0 * SUM(ACERTO) / SUM(ACERTO + ERRO), 2) as taxa_acerto_geral
-            FROM fato_resposta_aluno
-        """).fetchdf()
-        
-        # 2. Top 10 Municípios por performance
-        dados['top_municipios'] = con.execute("""
-            SELECT 
-                MUN_NOME,
-                COUNT(DISTINCT ALU_ID) as total_alunos,
-                SUM(ACERTO) as acertos,
-                SUM(ERRO) as erros,
-                ROUND(100.0 * SUM(ACERTO) / SUM(ACERTO + ERRO), 2) as taxa_acerto
-            FROM fato_resposta_aluno
-            GROUP BY MUN_NOME
-            HAVING SUM(ACERTO + ERRO) >= 1000
-            ORDER BY taxa_acerto DESC
-            LIMIT 10
-        """).fetchdf()
-        
-        # 3. Performance por disciplina
-        dados['por_disciplina'] = con.execute("""
-            SELECT 
-                DIS_NOME,
-                COUNT(DISTINCT ALU_ID) as total_alunos,
-                COUNT(DISTINCT TES_NOME) as total_testes,
-                SUM(ACERTO) as acertos,
-                SUM(ERRO) as erros,
-                ROUND(100.0 * SUM(ACERTO) / SUM(ACERTO + ERRO), 2) as taxa_acerto
-            FROM fato_resposta_aluno
-            GROUP BY DIS_NOME
-            ORDER BY DIS_NOME
-        """).fetchdf()
-        
-        # 4. Performance por série
-        dados['por_serie'] = con.execute("""
-            SELECT 
-                SER_NOME,
-                DIS_NOME,
-                COUNT(DISTINCT ALU_ID) as total_alunos,
-                SUM(ACERTO) as acertos,
-                SUM(ERRO) as erros,
-                ROUND(100.0 * SUM(ACERTO) / SUM(ACERTO + ERRO), 2) as taxa_acerto
-            FROM fato_resposta_aluno
-            GROUP BY SER_NOME, DIS_NOME
-            ORDER BY SER_NOME, DIS_NOME
-        """).fetchdf()
-        
-        # 5. Descritores mais difíceis
-        dados['descritores_dificeis'] = con.execute("""
-            SELECT 
-                d.MTI_CODIGO,
-                d.MTI_DESCRITOR,
-                SUM(f.ACERTO) as acertos,
-                SUM(f.ERRO) as erros,
-                ROUND(100.0 * SUM(f.ACERTO) / SUM(f.ACERTO + f.ERRO), 2) as taxa_acerto
-            FROM fato_resposta_aluno f
-            JOIN dim_descritor d ON f.MTI_CODIGO = d.MTI_CODIGO
-            GROUP BY d.MTI_CODIGO, d.MTI_DESCRITOR
-            HAVING SUM(f.ACERTO + f.ERRO) >= 500
-            ORDER BY taxa_acerto ASC
-            LIMIT 10
-        """).fetchdf()
-        
-        # 6. Distribuição de alunos por município
-        dados['alunos_municipio'] = con.execute("""
-            SELECT 
-                MUN_NOME,
-                COUNT(DISTINCT ALU_ID) as total_alunos
-            FROM fato_resposta_aluno
-            GROUP BY MUN_NOME
-            ORDER BY total_alunos DESC
-            LIMIT 15
-        """).fetchdf()
-        
+        dados = carregar_agregados(con, AGREGADOS_PAINEL, juncoes=JUNCAO_DESCRITOR)
         con.close()
         return dados
         
+    except ConsultaCancelada:
+        # Não guardar no cache um resultado vazio por tempo limite
+        con.close()
+        raise
     except Exception as e:
         st.error(f"❌ Erro ao carregar dados: {e}")
         con.close()
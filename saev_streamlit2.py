@@ -1,9 +1,16 @@
 import streamlit as st
-import duckdb
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from saev_query import construir_where, consultar_df, tabela_existe
+from filtros_catalogo import opcoes, podar_estado_widget
+from saev_recursos import catalogo_filtros, conexao
+from saev_agregados import Agregado, JUNCAO_DESCRITOR, carregar_agregados
+from importacao_tardia import modulo_tardio
+from telemetria_consultas import cache_com_telemetria
+from cancelamento_consultas import ConsultaCancelada
+from incerteza_rankings import TABELA_MUNICIPIOS as TABELA_INTERVALOS_MUNICIPIOS, formatar_faixa_posicao
+
+# Plotly só é importado ao desenhar o primeiro gráfico
+px = modulo_tardio("plotly.express")
 
 # Configuração da página
 st.set_page_config(
@@ -17,250 +24,133 @@ st.set_page_config(
 st.title("📊 SAEV - Sistema de Avaliação da Educação do ES (com Filtros)")
 st.markdown("---")
 
-# Cache para conexão com banco
-@st.cache_resource
+# Conexão compartilhada pelas páginas (cursor da thread, ver saev_recursos)
 def get_database_connection():
     """Conecta ao banco DuckDB"""
     try:
-        conn = duckdb.connect('db/avaliacao_prod.duckdb', read_only=True)
-        return conn
+        return conexao()
     except Exception as e:
         st.error(f"Erro ao conectar com o banco de dados: {e}")
         return None
 
-# Cache para dados dos filtros
-@st.cache_data
-def load_filter_options():
-    """Carrega opções para os filtros"""
-    conn = get_database_connection()
-    if not conn:
-        return {}, {}, {}, {}
-    
+# Catálogo de filtros (gerado pelo ETL), compartilhado pelas páginas
+def load_filter_catalog():
+    """Carrega o catálogo de combinações válidas para os filtros"""
     try:
-        # Municípios
-        municipios_query = """
-        SELECT DISTINCT f.MUN_NOME 
-        FROM fato_resposta_aluno f
-        WHERE f.MUN_NOME IS NOT NULL
-        ORDER BY f.MUN_NOME
-        """
-        municipios = conn.execute(municipios_query).df()['MUN_NOME'].tolist()
-        
-        # Disciplinas
-        disciplinas_query = """
-        SELECT DISTINCT DIS_NOME 
-        FROM fato_resposta_aluno
-        WHERE DIS_NOME IS NOT NULL
-        ORDER BY DIS_NOME
-        """
-        disciplinas = conn.execute(disciplinas_query).df()['DIS_NOME'].tolist()
-        
-        # Séries
-        series_query = """
-        SELECT DISTINCT SER_NOME 
-        FROM fato_resposta_aluno
-        WHERE SER_NOME IS NOT NULL
-        ORDER BY SER_NOME
-        """
-        series = conn.execute(series_query).df()['SER_NOME'].tolist()
-        
-        # Testes
-        testes_query = """
-        SELECT DISTINCT TES_NOME 
-        FROM fato_resposta_aluno
-        WHERE TES_NOME IS NOT NULL
-        ORDER BY TES_NOME
-        """
-        testes = conn.execute(testes_query).df()['TES_NOME'].tolist()
-        
-        return municipios, disciplinas, series, testes
+        return catalogo_filtros()
         
     except Exception as e:
         st.error(f"Erro ao carregar opções dos filtros: {e}")
-        return [], [], [], []
+        return pd.DataFrame()
 
-# Cache para métricas principais com filtros
-@st.cache_data
-def load_main_metrics(municipios_selecionados, disciplinas_selecionadas, series_selecionadas, testes_selecionados):
-    """Carrega métricas principais com filtros aplicados"""
+# Agregados da página: compilados em uma única consulta GROUPING SETS
+AGREGADOS_PAINEL = [
+    Agregado('metricas', {}, [
+        'total_alunos', 'total_escolas', 'total_municipios', 'total_testes',
+        'total_questoes', 'acertos', 'taxa_acerto',
+    ], renomear={'acertos': 'total_acertos', 'taxa_acerto': 'taxa_acerto_geral'}),
+    # 1. Top Municípios por Taxa de Acerto
+    Agregado('top_municipios', {'municipio': 'f.MUN_NOME'},
+             ['total_questoes', 'acertos', 'taxa_acerto'],
+             minimo=('total_questoes', 1000), ordem=[('taxa_acerto', False)], limite=10),
+    # 2. Distribuição de Alunos por Município
+    Agregado('alunos_municipio', {'municipio': 'f.MUN_NOME'}, ['total_alunos'],
+             ordem=[('total_alunos', False)], limite=15),
+    # 3. Taxa de Acerto por Série e Disciplina
+    Agregado('serie_disciplina', {'serie': 'f.SER_NOME', 'disciplina': 'f.DIS_NOME'},
+             ['acertos', 'total_questoes', 'taxa_acerto'],
+             ordem=[('serie', True), ('disciplina', True)]),
+    # 4. Performance por Disciplina
+    Agregado('performance_disciplina', {'disciplina': 'f.DIS_NOME'},
+             ['acertos', 'total_questoes', 'taxa_acerto'],
+             ordem=[('taxa_acerto', False)]),
+    # 5. Detalhes dos Municípios (Tabela)
+    Agregado('detalhes_municipios', {'municipio': 'f.MUN_NOME'},
+             ['total_alunos', 'total_questoes', 'taxa_acerto'],
+             minimo=('total_questoes', 500), ordem=[('taxa_acerto', False)], limite=20,
+             renomear={'total_alunos': 'alunos', 'total_questoes': 'questoes'}),
+    # 6. Descritores Mais Difíceis
+    Agregado('descritores_dificeis', {'descritor': 'd.MTI_DESCRITOR'},
+             ['total_questoes', 'acertos', 'taxa_acerto'],
+             minimo=('total_questoes', 500), ordem=[('taxa_acerto', True)], limite=10,
+             excluir_nulos=True),
+]
+
+# Cache para todos os agregados da página (uma varredura por combinação de filtros)
+@cache_com_telemetria
+def load_dashboard_data(municipios_selecionados, disciplinas_selecionadas, series_selecionadas, testes_selecionados):
+    """Calcula métricas e dados dos gráficos em uma única consulta"""
     conn = get_database_connection()
     if not conn:
         return {}
     
-    # Construir condições WHERE baseadas nos filtros
-    where_conditions = ["1=1"]  # Condição base sempre verdadeira
-    
-    if municipios_selecionados:
-        municipios_str = "', '".join(municipios_selecionados)
-        where_conditions.append(f"f.MUN_NOME IN ('{municipios_str}')")
-    
-    if disciplinas_selecionadas:
-        disciplinas_str = "', '".join(disciplinas_selecionadas)
-        where_conditions.append(f"f.DIS_NOME IN ('{disciplinas_str}')")
-    
-    if series_selecionadas:
-        series_str = "', '".join(series_selecionadas)
-        where_conditions.append(f"f.SER_NOME IN ('{series_str}')")
-    
-    if testes_selecionados:
-        testes_str = "', '".join(testes_selecionados)
-        where_conditions.append(f"f.TES_NOME IN ('{testes_str}')")
-    
-    where_clause = " AND ".join(where_conditions)
+    # Construir condições WHERE parametrizadas (texto SQL estável)
+    where_clause, params = construir_where({
+        'municipios': municipios_selecionados,
+        'disciplinas': disciplinas_selecionadas,
+        'series': series_selecionadas,
+        'testes': testes_selecionados,
+    })
     
     try:
-        metrics_query = f"""
-        SELECT 
-            COUNT(DISTINCT f.ALU_ID) as total_alunos,
-            COUNT(DISTINCT f.ESC_INEP) as total_escolas,
-            COUNT(DISTINCT f.MUN_NOME) as total_municipios,
-            COUNT(DISTINCT f.TES_NOME) as total_testes,
-            SUM(f.ACERTO + f.ERRO) as total_questoes,
-            SUM(f.ACERTO) as total_acertos,
-            ROUND(SUM(f.ACERTO) * 100.0 / SUM(f.ACERTO + f.ERRO), 2) as taxa_acerto_geral
-        FROM fato_resposta_aluno f
-        WHERE {where_clause}
-        """
+        dados = carregar_agregados(conn, AGREGADOS_PAINEL, where_clause, params,
+                                   juncoes=JUNCAO_DESCRITOR)
         
-        result = conn.execute(metrics_query).df()
-        return result.iloc[0].to_dict()
+        descritores = dados['descritores_dificeis']
+        descritores['descritor'] = descritores['descritor'].str.slice(0, 80) + '...'
+        return dados
         
+    except ConsultaCancelada:
+        # Não guardar no cache um resultado vazio por tempo limite
+        raise
     except Exception as e:
-        st.error(f"Erro ao calcular métricas: {e}")
+        st.error(f"Erro ao carregar dados do painel: {e}")
         return {}
 
-# Cache para dados dos gráficos com filtros
-@st.cache_data
+def load_main_metrics(municipios_selecionados, disciplinas_selecionadas, series_selecionadas, testes_selecionados):
+    """Carrega métricas principais com filtros aplicados"""
+    dados = load_dashboard_data(municipios_selecionados, disciplinas_selecionadas,
+                                series_selecionadas, testes_selecionados)
+    if not dados or dados['metricas'].empty:
+        return {}
+    return dados['metricas'].iloc[0].to_dict()
+
 def load_chart_data(municipios_selecionados, disciplinas_selecionadas, series_selecionadas, testes_selecionados):
     """Carrega dados para os gráficos com filtros aplicados"""
-    conn = get_database_connection()
-    if not conn:
-        return {}, {}, {}, {}, {}, {}
-    
-    # Construir condições WHERE
-    where_conditions = ["1=1"]
-    
-    if municipios_selecionados:
-        municipios_str = "', '".join(municipios_selecionados)
-        where_conditions.append(f"f.MUN_NOME IN ('{municipios_str}')")
-    
-    if disciplinas_selecionadas:
-        disciplinas_str = "', '".join(disciplinas_selecionadas)
-        where_conditions.append(f"f.DIS_NOME IN ('{disciplinas_str}')")
-    
-    if series_selecionadas:
-        series_str = "', '".join(series_selecionadas)
-        where_conditions.append(f"f.SER_NOME IN ('{series_str}')")
-    
-    if testes_selecionados:
-        testes_str = "', '".join(testes_selecionados)
-        where_conditions.append(f"f.TES_NOME IN ('{testes_str}')")
-    
-    where_clause = " AND ".join(where_conditions)
-    
-    try:
-        # 1. Top Municípios por Taxa de Acerto
-        top_municipios_query = f"""
-        SELECT 
-            f.MUN_NOME as municipio,
-            SUM(f.ACERTO + f.ERRO) as total_questoes,
-            SUM(f.ACERTO) as acertos,
-            ROUND(SUM(f.ACERTO) * 100.0 / SUM(f.ACERTO + f.ERRO), 2) as taxa_acerto
-        FROM fato_resposta_aluno f
-        WHERE {where_clause}
-        GROUP BY f.MUN_NOME
-        HAVING SUM(f.ACERTO + f.ERRO) >= 1000
-        ORDER BY taxa_acerto DESC
-        LIMIT 10
-        """
-        top_municipios = conn.execute(top_municipios_query).df()
-        
-        # 2. Distribuição de Alunos por Município
-        alunos_municipio_query = f"""
-        SELECT 
-            f.MUN_NOME as municipio,
-            COUNT(DISTINCT f.ALU_ID) as total_alunos
-        FROM fato_resposta_aluno f
-        WHERE {where_clause}
-        GROUP BY f.MUN_NOME
-        ORDER BY total_alunos DESC
-        LIMIT 15
-        """
-        alunos_municipio = conn.execute(alunos_municipio_query).df()
-        
-        # 3. Taxa de Acerto por Série e Disciplina
-        serie_disciplina_query = f"""
-        SELECT 
-            f.SER_NOME as serie,
-            f.DIS_NOME as disciplina,
-            SUM(f.ACERTO) as acertos,
-            SUM(f.ACERTO + f.ERRO) as total_questoes,
-            ROUND(SUM(f.ACERTO) * 100.0 / SUM(f.ACERTO + f.ERRO), 2) as taxa_acerto
-        FROM fato_resposta_aluno f
-        WHERE {where_clause}
-        GROUP BY f.SER_NOME, f.DIS_NOME
-        ORDER BY f.SER_NOME, f.DIS_NOME
-        """
-        serie_disciplina = conn.execute(serie_disciplina_query).df()
-        
-        # 4. Performance por Disciplina
-        performance_disciplina_query = f"""
-        SELECT 
-            f.DIS_NOME as disciplina,
-            SUM(f.ACERTO) as acertos,
-            SUM(f.ACERTO + f.ERRO) as total_questoes,
-            ROUND(SUM(f.ACERTO) * 100.0 / SUM(f.ACERTO + f.ERRO), 2) as taxa_acerto
-        FROM fato_resposta_aluno f
-        WHERE {where_clause}
-        GROUP BY f.DIS_NOME
-        ORDER BY taxa_acerto DESC
-        """
-        performance_disciplina = conn.execute(performance_disciplina_query).df()
-        
-        # 5. Detalhes dos Municípios (Tabela)
-        detalhes_municipios_query = f"""
-        SELECT 
-            f.MUN_NOME as municipio,
-            COUNT(DISTINCT f.ALU_ID) as alunos,
-            SUM(f.ACERTO + f.ERRO) as questoes,
-            ROUND(SUM(f.ACERTO) * 100.0 / SUM(f.ACERTO + f.ERRO), 2) as taxa_acerto
-        FROM fato_resposta_aluno f
-        WHERE {where_clause}
-        GROUP BY f.MUN_NOME
-        HAVING SUM(f.ACERTO + f.ERRO) >= 500
-        ORDER BY taxa_acerto DESC
-        LIMIT 20
-        """
-        detalhes_municipios = conn.execute(detalhes_municipios_query).df()
-        
-        # 6. Descritores Mais Difíceis
-        descritores_dificeis_query = f"""
-        SELECT 
-            SUBSTR(d.MTI_DESCRITOR, 1, 80) || '...' as descritor,
-            SUM(f.ACERTO + f.ERRO) as total_questoes,
-            SUM(f.ACERTO) as acertos,
-            ROUND(SUM(f.ACERTO) * 100.0 / SUM(f.ACERTO + f.ERRO), 2) as taxa_acerto
-        FROM fato_resposta_aluno f
-        JOIN dim_descritor d ON f.MTI_CODIGO = d.MTI_CODIGO
-        WHERE {where_clause}
-        GROUP BY d.MTI_DESCRITOR
-        HAVING SUM(f.ACERTO + f.ERRO) >= 500
-        ORDER BY taxa_acerto ASC
-        LIMIT 10
-        """
-        descritores_dificeis = conn.execute(descritores_dificeis_query).df()
-        
-        return (top_municipios, alunos_municipio, serie_disciplina, 
-                performance_disciplina, detalhes_municipios, descritores_dificeis)
-        
-    except Exception as e:
-        st.error(f"Erro ao carregar dados dos gráficos: {e}")
+    dados = load_dashboard_data(municipios_selecionados, disciplinas_selecionadas,
+                                series_selecionadas, testes_selecionados)
+    if not dados:
         return {}, {}, {}, {}, {}, {}
+    return (
+        dados['top_municipios'],
+        dados['alunos_municipio'],
+        dados['serie_disciplina'],
+        dados['performance_disciplina'],
+        dados['detalhes_municipios'],
+        dados['descritores_dificeis'],
+    )
+
+# Intervalos dos municípios em um teste (bootstrap materializado pelo ETL,
+# entre todos os municípios do estado e com todas as séries do teste)
+@cache_com_telemetria
+def load_intervalos_municipios(disciplina, teste):
+    """IC 95% da taxa e faixa de posições de cada município no teste"""
+    conn = get_database_connection()
+    if not conn or not tabela_existe(conn, TABELA_INTERVALOS_MUNICIPIOS):
+        return pd.DataFrame()
+    return consultar_df(conn, f"""
+    SELECT MUN_NOME AS municipio, taxa_ic_inf, taxa_ic_sup, posicao_ic_melhor, posicao_ic_pior
+    FROM {TABELA_INTERVALOS_MUNICIPIOS}
+    WHERE DIS_NOME = ? AND TES_NOME = ?
+    """, [disciplina, teste])
 
 # Interface principal
 def main():
-    # Carregar opções dos filtros
-    municipios_opcoes, disciplinas_opcoes, series_opcoes, testes_opcoes = load_filter_options()
+    # Carregar catálogo dos filtros
+    catalogo = load_filter_catalog()
+    if catalogo.empty:
+        st.error("Não foi possível carregar as opções de filtros. Verifique a conexão com o banco de dados.")
+        return
     
     # Sidebar para filtros
     st.sidebar.header("🎯 Filtros Interativos")
@@ -268,40 +158,54 @@ def main():
     
     # Botão para limpar filtros
     if st.sidebar.button("🗑️ Limpar Todos os Filtros"):
+        for chave in ['filtro_municipios', 'filtro_disciplinas', 'filtro_series', 'filtro_testes']:
+            st.session_state.pop(chave, None)
         st.rerun()
     
     st.sidebar.markdown("---")
     
     # Filtro por Município
+    municipios_opcoes = opcoes(catalogo, 'MUN_NOME')
     municipios_selecionados = st.sidebar.multiselect(
         "🏙️ Município:",
         options=municipios_opcoes,
-        default=[],
-        placeholder="Selecione municípios..."
+        placeholder="Selecione municípios...",
+        key="filtro_municipios"
     )
     
+    # Filtros seguintes em cascata: opções restritas às seleções anteriores
+    selecoes = {'MUN_NOME': municipios_selecionados}
+    
     # Filtro por Disciplina
+    disciplinas_opcoes = opcoes(catalogo, 'DIS_NOME', selecoes)
+    podar_estado_widget(st.session_state, "filtro_disciplinas", disciplinas_opcoes)
     disciplinas_selecionadas = st.sidebar.multiselect(
         "📚 Disciplina:",
         options=disciplinas_opcoes,
-        default=[],
-        placeholder="Selecione disciplinas..."
+        placeholder="Selecione disciplinas...",
+        key="filtro_disciplinas"
     )
+    selecoes['DIS_NOME'] = disciplinas_selecionadas
     
     # Filtro por Série
+    series_opcoes = opcoes(catalogo, 'SER_NOME', selecoes)
+    podar_estado_widget(st.session_state, "filtro_series", series_opcoes)
     series_selecionadas = st.sidebar.multiselect(
         "🎓 Série:",
         options=series_opcoes,
-        default=[],
-        placeholder="Selecione séries..."
+        placeholder="Selecione séries...",
+        key="filtro_series"
     )
+    selecoes['SER_NOME'] = series_selecionadas
     
     # Filtro por Teste
+    testes_opcoes = opcoes(catalogo, 'TES_NOME', selecoes)
+    podar_estado_widget(st.session_state, "filtro_testes", testes_opcoes)
     testes_selecionados = st.sidebar.multiselect(
         "📝 Teste:",
         options=testes_opcoes,
-        default=[],
-        placeholder="Selecione testes..."
+        placeholder="Selecione testes...",
+        key="filtro_testes"
     )
     
     # Mostrar filtros aplicados
@@ -476,14 +380,47 @@ def main():
                 # Formatar a tabela
                 detalhes_municipios_display = detalhes_municipios.copy()
                 detalhes_municipios_display['Taxa (%)'] = detalhes_municipios_display['taxa_acerto'].apply(lambda x: f"{x}%")
-                detalhes_municipios_display = detalhes_municipios_display[['municipio', 'alunos', 'Taxa (%)']]
-                detalhes_municipios_display.columns = ['Município', 'Alunos', 'Taxa (%)']
+                colunas_detalhes = {'municipio': 'Município', 'alunos': 'Alunos', 'Taxa (%)': 'Taxa (%)'}
+                
+                # Com um único teste e sem filtro de município ou série, mostra a
+                # estabilidade da posição de cada município: os intervalos são do
+                # estado inteiro, com todas as séries, e só então valem para a tabela
+                intervalos = pd.DataFrame()
+                if len(testes_selecionados) == 1 and not municipios_selecionados \
+                        and not series_selecionadas:
+                    disciplinas_teste = opcoes(catalogo, 'DIS_NOME', {
+                        'TES_NOME': testes_selecionados, 'DIS_NOME': disciplinas_selecionadas,
+                    })
+                    if len(disciplinas_teste) == 1:
+                        intervalos = load_intervalos_municipios(disciplinas_teste[0],
+                                                                testes_selecionados[0])
+                if not intervalos.empty:
+                    detalhes_municipios_display = detalhes_municipios_display.merge(
+                        intervalos, on='municipio', how='left'
+                    )
+                    detalhes_municipios_display['IC 95%'] = [
+                        f"{inf:.1f}–{sup:.1f}%" if pd.notna(inf) else ""
+                        for inf, sup in zip(detalhes_municipios_display['taxa_ic_inf'],
+                                            detalhes_municipios_display['taxa_ic_sup'])
+                    ]
+                    detalhes_municipios_display['Faixa de posição'] = [
+                        formatar_faixa_posicao(melhor, pior)
+                        for melhor, pior in zip(detalhes_municipios_display['posicao_ic_melhor'],
+                                                detalhes_municipios_display['posicao_ic_pior'])
+                    ]
+                    colunas_detalhes.update({'IC 95%': 'IC 95%', 'Faixa de posição': 'Faixa de posição'})
+                
+                detalhes_municipios_display = detalhes_municipios_display[list(colunas_detalhes)]
+                detalhes_municipios_display.columns = list(colunas_detalhes.values())
                 
                 st.dataframe(
                     detalhes_municipios_display,
                     use_container_width=True,
                     height=400
                 )
+                if not intervalos.empty:
+                    st.caption("IC 95% e faixa de posição: bootstrap entre todos os municípios "
+                               "do estado, com todas as séries do teste.")
             else:
                 st.info("Sem dados suficientes para exibir esta tabela com os filtros aplicados.")
         
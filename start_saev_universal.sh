@@ -251,7 +251,7 @@ echo "1) SAEV Streamlit 1 - Dashboard Geral (porta 8501)"
 echo "2) SAEV Streamlit 2 - Dashboard com Filtros (porta 8502)"
 echo "3) SAEV Rankings - Rankings e Classificações (porta 8503)"
 echo "4) SAEV Leitura - Análise de Proficiência em Leitura (porta 8504)"
-echo "5) Todos os aplicativos (portas 8501, 8502, 8503 e 8504)"
+echo "5) Todos os dashboards em um único app (porta 8501)"
 echo ""
 
 read -p "Digite sua escolha (1, 2, 3, 4 ou 5): " choice
@@ -288,69 +288,11 @@ case $choice in
         APP_NAME="SAEV Leitura - Análise de Proficiência em Leitura"
         ;;
     5)
-        print_info "Iniciando todos os aplicativos..."
-        if [ -f "saev_streamlit.py" ]; then
-            print_info "Iniciando SAEV Dashboard Geral em background (porta 8501)..."
-            nohup $PYTHON_CMD -m streamlit run saev_streamlit.py --server.port=8501 --server.headless=true > streamlit1.log 2>&1 &
-            STREAMLIT1_PID=$!
-            sleep 2
-        fi
-        if [ -f "saev_streamlit2.py" ]; then
-            print_info "Iniciando SAEV Dashboard com Filtros em background (porta 8502)..."
-            nohup $PYTHON_CMD -m streamlit run saev_streamlit2.py --server.port=8502 --server.headless=true > streamlit2.log 2>&1 &
-            STREAMLIT2_PID=$!
-            sleep 2
-        fi
-        if [ -f "saev_rankings.py" ]; then
-            print_info "Iniciando SAEV Rankings em background (porta 8503)..."
-            nohup $PYTHON_CMD -m streamlit run saev_rankings.py --server.port=8503 --server.headless=true > streamlit3.log 2>&1 &
-            STREAMLIT3_PID=$!
-            sleep 2
-        fi
-        if [ -f "dashboard_leitura.py" ]; then
-            print_info "Iniciando SAEV Leitura em background (porta 8504)..."
-            nohup $PYTHON_CMD -m streamlit run dashboard_leitura.py --server.port=8504 --server.headless=true > streamlit4.log 2>&1 &
-            STREAMLIT4_PID=$!
-            sleep 2
-        fi
-        
-        echo ""
-        print_status "Todos os aplicativos iniciados!"
-        print_info "URLs disponíveis:"
-        print_info "  SAEV Dashboard Geral: http://localhost:8501"
-        print_info "  SAEV Dashboard Filtros: http://localhost:8502"
-        print_info "  SAEV Rankings: http://localhost:8503"
-        print_info "  SAEV Análise de Leitura: http://localhost:8504"
-        if [ "$LOCAL_IP" != "localhost" ]; then
-            print_info "  SAEV Dashboard Geral (rede): http://$LOCAL_IP:8501"
-            print_info "  SAEV Dashboard Filtros (rede): http://$LOCAL_IP:8502"
-            print_info "  SAEV Rankings (rede): http://$LOCAL_IP:8503"
-            print_info "  SAEV Análise de Leitura (rede): http://$LOCAL_IP:8504"
-        fi
-        print_info ""
-        print_info "Para parar os aplicativos, execute: pkill -f streamlit"
-        print_info "Logs: streamlit1.log, streamlit2.log, streamlit3.log e streamlit4.log"
-        echo ""
-        
-        # Abrir navegadores se solicitado
-        if [[ "$open_browser_choice" =~ ^[Yy]$ ]]; then
-            print_info "🌐 Abrindo navegadores automaticamente..."
-            (open_browser "http://localhost:8501" 3) &
-            (open_browser "http://localhost:8502" 6) &
-            (open_browser "http://localhost:8503" 9) &
-            (open_browser "http://localhost:8504" 12) &
-            print_status "Navegadores sendo abertos em background"
-        else
-            print_info "🌐 Navegadores não serão abertos automaticamente"
-            print_info "Acesse manualmente:"
-            print_info "  SAEV Dashboard Geral: http://localhost:8501"
-            print_info "  SAEV Dashboard Filtros: http://localhost:8502"
-            print_info "  SAEV Rankings: http://localhost:8503"
-            print_info "  SAEV Análise de Leitura: http://localhost:8504"
-        fi
-        
-        print_warning "Para parar todos os serviços: pkill -f streamlit"
-        exit 0
+        # Um único servidor com todos os dashboards como páginas
+        # (mesma conexão DuckDB, caches e catálogo de filtros)
+        APP_FILE="saev_app.py"
+        PORT=8501
+        APP_NAME="SAEV - Todos os dashboards (app multipágina)"
         ;;
     *)
         print_error "Escolha inválida!"
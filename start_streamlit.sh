@@ -1,14 +1,15 @@
 #!/bin/bash
 
 # 🚀 Script de Inicialização do SAEV Streamlit
-# Executa o aplicativo web simples e funcional
+# Executa o app multipágina (saev_app.py): todos os dashboards em um único
+# servidor, compartilhando conexão DuckDB, caches e catálogo de filtros
 
 echo "📊 SAEV - Oficinas de IA"
 echo "🚀 Iniciando aplicativo Streamlit..."
 echo "=========================================="
 
 # Verificar se estamos na pasta correta
-if [ ! -f "saev_streamlit.py" ]; then
+if [ ! -f "saev_app.py" ]; then
     echo "❌ Erro: Execute este script na pasta raiz do projeto OficinaSAEV"
     exit 1
 fi
@@ -70,7 +71,7 @@ echo ""
 echo "💡 Dica: Use Ctrl+C para parar o servidor"
 echo "=========================================="
 
-streamlit run saev_streamlit.py \
+streamlit run saev_app.py \
     --server.port=8501 \
     --server.headless=true \
     --browser.gatherUsageStats=false \
@@ -8,12 +8,24 @@ com múltiplos painéis e filtros dinâmicos.
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import duckdb
-import numpy as np
 from datetime import datetime
+from saev_query import chave_filtros, construir_where, consultar_df
+from saev_agregados import Agregado, carregar_agregados
+from orcamento_memoria import (
+    MAX_CONJUNTOS_CACHE, OrcamentoExcedido, controle_memoria, estimar_bytes_por_linha,
+    estimar_linhas_catalogo, estimar_linhas_explain, id_sessao
+)
+from graficos_sql import (
+    amostra_estratificada, figura_box, figura_histograma, resumo_box, resumo_histograma
+)
+from filtros_catalogo import opcoes, podar_estado_widget
+from saev_recursos import catalogo_filtros, nova_conexao
+from cancelamento_consultas import TIMEOUT, ConsultaCancelada
+from importacao_tardia import modulo_tardio
+from telemetria_consultas import cache_com_telemetria
+
+# Plotly só é importado ao desenhar o primeiro gráfico
+px = modulo_tardio("plotly.express")
 
 # =================== CONFIGURAÇÃO DA PÁGINA ===================
 st.set_page_config(
@@ -26,65 +38,37 @@ st.set_page_config(
 # =================== FUNÇÕES AUXILIARES ===================
 
 def conectar_banco():
-    """Conecta ao banco DuckDB e retorna a conexão"""
+    """Conecta ao banco DuckDB e retorna a conexão (cursor da conexão compartilhada)"""
     try:
-        con = duckdb.connect('db/avaliacao_prod.duckdb', read_only=True)
-        return con
+        return nova_conexao()
     except Exception as e:
         st.error(f"❌ Erro ao conectar ao banco: {e}")
         return None
 
-@st.cache_data
-def carregar_opcoes_filtros():
-    """Carrega todas as opções disponíveis para os filtros"""
-    con = conectar_banco()
-    if not con:
-        return {}
-    
+def carregar_catalogo_filtros():
+    """Carrega o catálogo de combinações válidas para os filtros (compartilhado pelas páginas)"""
     try:
-        opcoes = {}
-        
-        # Anos
-        opcoes['anos'] = [row[0] for row in con.execute(
-            "SELECT DISTINCT AVA_ANO FROM fato_resposta_aluno ORDER BY AVA_ANO"
-        ).fetchall()]
-        
-        # Municípios
-        opcoes['municipios'] = [row[0] for row in con.execute(
-            "SELECT DISTINCT MUN_NOME FROM fato_resposta_aluno ORDER BY MUN_NOME"
-        ).fetchall()]
-        
-        # Escolas
-        opcoes['escolas'] = [row[0] for row in con.execute(
-            "SELECT DISTINCT e.ESC_NOME FROM dim_escola e INNER JOIN fato_resposta_aluno f ON e.ESC_INEP = f.ESC_INEP ORDER BY e.ESC_NOME"
-        ).fetchall()]
-        
-        # Disciplinas
-        opcoes['disciplinas'] = [row[0] for row in con.execute(
-            "SELECT DISTINCT DIS_NOME FROM fato_resposta_aluno ORDER BY DIS_NOME"
-        ).fetchall()]
-        
-        # Séries
-        opcoes['series'] = [row[0] for row in con.execute(
-            "SELECT DISTINCT SER_NOME FROM fato_resposta_aluno ORDER BY SER_NUMBER"
-        ).fetchall()]
-        
-        # Testes
-        opcoes['testes'] = [row[0] for row in con.execute(
-            "SELECT DISTINCT TES_NOME FROM fato_resposta_aluno ORDER BY TES_NOME"
-        ).fetchall()]
-        
-        con.close()
-        return opcoes
+        return catalogo_filtros()
         
     except Exception as e:
         st.error(f"❌ Erro ao carregar opções: {e}")
-        con.close()
-        return {}
+        return pd.DataFrame()
+
+# Filtros do painel -> colunas (escolas são filtradas pelo nome na dimensão)
+COLUNAS_FILTROS_PAINEL = {
+    'anos': 'AVA_ANO',
+    'municipios': 'MUN_NOME',
+    'escolas': 'e.ESC_NOME',
+    'disciplinas': 'DIS_NOME',
+    'series': 'SER_NOME',
+    'testes': 'TES_NOME',
+}
 
 def construir_query_base(filtros):
     """Constrói a query base com os filtros aplicados"""
-    query = """
+    where_clause, params = construir_where(filtros, colunas=COLUNAS_FILTROS_PAINEL)
+    
+    query = f"""
     SELECT 
         f.*,
         e.ESC_NOME,
@@ -92,54 +76,175 @@ def construir_query_base(filtros):
     FROM fato_resposta_aluno f
     LEFT JOIN dim_escola e ON f.ESC_INEP = e.ESC_INEP
     LEFT JOIN dim_descritor d ON f.MTI_CODIGO = d.MTI_CODIGO
-    WHERE 1=1
+    WHERE {where_clause}
     """
     
-    params = []
-    
-    if filtros['anos']:
-        query += f" AND AVA_ANO IN ({','.join(['?' for _ in filtros['anos']])})"
-        params.extend(filtros['anos'])
-    
-    if filtros['municipios']:
-        query += f" AND MUN_NOME IN ({','.join(['?' for _ in filtros['municipios']])})"
-        params.extend(filtros['municipios'])
-    
-    if filtros['escolas']:
-        query += f" AND e.ESC_NOME IN ({','.join(['?' for _ in filtros['escolas']])})"
-        params.extend(filtros['escolas'])
-    
-    if filtros['disciplinas']:
-        query += f" AND DIS_NOME IN ({','.join(['?' for _ in filtros['disciplinas']])})"
-        params.extend(filtros['disciplinas'])
-    
-    if filtros['series']:
-        query += f" AND SER_NOME IN ({','.join(['?' for _ in filtros['series']])})"
-        params.extend(filtros['series'])
-    
-    if filtros['testes']:
-        query += f" AND TES_NOME IN ({','.join(['?' for _ in filtros['testes']])})"
-        params.extend(filtros['testes'])
-    
     return query, params
 
-@st.cache_data
+# Compartilhado entre sessões sem cópia: o DataFrame retornado NÃO deve ser
+# modificado (as taxas de acerto são calculadas em agregações novas, ex.:
+# taxa_acerto_por, ou direto no DuckDB). O número de entradas segue o
+# orçamento de memória (ver orcamento_memoria.MAX_CONJUNTOS_CACHE)
+@cache_com_telemetria(recurso=True, max_entries=MAX_CONJUNTOS_CACHE, ttl=3600)
 def carregar_dados_filtrados(filtros):
-    """Carrega dados com filtros aplicados"""
+    """Carrega dados com filtros aplicados (somente leitura)"""
     con = conectar_banco()
     if not con:
         return pd.DataFrame()
     
     try:
         query, params = construir_query_base(filtros)
-        df = con.execute(query, params).fetchdf()
+        df = consultar_df(con, query, params)
         con.close()
         return df
+    except ConsultaCancelada:
+        # Não guardar no cache um resultado vazio por tempo limite
+        con.close()
+        raise
     except Exception as e:
         st.error(f"❌ Erro ao carregar dados: {e}")
         con.close()
         return pd.DataFrame()
 
+# Filtros do painel -> colunas do catálogo (para estimar o tamanho sem consultar a fato)
+COLUNAS_CATALOGO_PAINEL = {
+    'anos': 'AVA_ANO',
+    'municipios': 'MUN_NOME',
+    'escolas': 'ESC_NOME',
+    'disciplinas': 'DIS_NOME',
+    'series': 'SER_NOME',
+    'testes': 'TES_NOME',
+}
+
+@cache_com_telemetria(max_entries=256)
+def estimar_tamanho_dados(filtros):
+    """Estima (linhas, bytes) de carregar_dados_filtrados sem executá-la"""
+    selecoes = {COLUNAS_CATALOGO_PAINEL[chave]: valores for chave, valores in filtros.items()}
+    linhas = estimar_linhas_catalogo(carregar_catalogo_filtros(), selecoes)
+    
+    con = conectar_banco()
+    if not con:
+        return 0, 0
+    
+    try:
+        query, params = construir_query_base(filtros)
+        if linhas is None:
+            linhas = estimar_linhas_explain(con, query, params)
+        return linhas, linhas * estimar_bytes_por_linha(con, query, params)
+    finally:
+        con.close()
+
+# Fallback quando o conjunto filtrado excede o orçamento: apenas agregados
+AGREGADOS_RESUMO = [
+    Agregado('metricas', {}, ['total_alunos', 'total_escolas', 'total_municipios', 'total_testes']),
+    Agregado(
+        'por_municipio', {'MUN_NOME': 'f.MUN_NOME'},
+        ['total_alunos', 'total_questoes', 'taxa_acerto'],
+        ordem=[('total_alunos', False), ('MUN_NOME', True)], limite=15
+    ),
+    Agregado(
+        'por_disciplina_serie', {'DIS_NOME': 'f.DIS_NOME', 'SER_NOME': 'f.SER_NOME'},
+        ['total_questoes', 'taxa_acerto'],
+        ordem=[('DIS_NOME', True), ('SER_NOME', True)]
+    ),
+]
+
+@cache_com_telemetria(max_entries=64)
+def carregar_resumo_agregado(filtros):
+    """Agregados do resumo, calculados no banco em uma única varredura"""
+    con = conectar_banco()
+    if not con:
+        return {}
+    
+    try:
+        where_clause, params = construir_where(filtros, colunas=COLUNAS_FILTROS_PAINEL)
+        return carregar_agregados(
+            con, AGREGADOS_RESUMO, where_clause, params,
+            juncoes="LEFT JOIN dim_escola e ON f.ESC_INEP = e.ESC_INEP"
+        )
+    finally:
+        con.close()
+
+# Resumos dos gráficos estatísticos, calculados no banco (ver graficos_sql)
+@cache_com_telemetria
+def carregar_box_disciplina(filtros):
+    """Quartis da taxa de acerto por resposta, por disciplina"""
+    con = conectar_banco()
+    if not con:
+        return pd.DataFrame()
+    
+    try:
+        query, params = construir_query_base(filtros)
+        return resumo_box(
+            con, query, params,
+            valor="ACERTO * 100.0 / NULLIF(ACERTO + ERRO, 0)",
+            grupo='DIS_NOME'
+        )
+    finally:
+        con.close()
+
+@cache_com_telemetria
+def carregar_amostra_escolas(filtros):
+    """Amostra estratificada (por disciplina) das taxas por escola"""
+    con = conectar_banco()
+    if not con:
+        return pd.DataFrame()
+    
+    try:
+        query, params = construir_query_base(filtros)
+        fonte = f"""
+        SELECT 
+            ESC_NOME, DIS_NOME, MUN_NOME,
+            SUM(ACERTO + ERRO) as total_questoes,
+            ROUND(SUM(ACERTO) * 100.0 / SUM(ACERTO + ERRO), 2) as taxa_acerto
+        FROM ({query}) base
+        WHERE ESC_NOME IS NOT NULL AND DIS_NOME IS NOT NULL AND MUN_NOME IS NOT NULL
+        GROUP BY ESC_NOME, DIS_NOME, MUN_NOME
+        """
+        return amostra_estratificada(
+            con, fonte, params, estrato='DIS_NOME', chave="ESC_NOME || MUN_NOME"
+        )
+    finally:
+        con.close()
+
+@cache_com_telemetria
+def carregar_histograma_descritores(filtros):
+    """Faixas da taxa de acerto por descritor (mínimo de 100 questões)"""
+    con = conectar_banco()
+    if not con:
+        return pd.DataFrame()
+    
+    try:
+        query, params = construir_query_base(filtros)
+        fonte = f"""
+        SELECT 
+            MTI_DESCRITOR, DIS_NOME,
+            ROUND(SUM(ACERTO) * 100.0 / SUM(ACERTO + ERRO), 2) as taxa_acerto
+        FROM ({query}) base
+        WHERE MTI_DESCRITOR IS NOT NULL AND DIS_NOME IS NOT NULL
+        GROUP BY MTI_DESCRITOR, DIS_NOME
+        HAVING SUM(ACERTO + ERRO) >= 100
+        """
+        return resumo_histograma(con, fonte, params, valor='taxa_acerto', cor='DIS_NOME')
+    finally:
+        con.close()
+
+@cache_com_telemetria(max_entries=256)
+def taxa_acerto_por(filtros, colunas):
+    """Agrega acertos/erros por ``colunas`` e calcula a taxa de acerto
+    
+    Cacheado por (filtros, colunas): cada gráfico só é recalculado quando os
+    filtros mudam, e não a cada interação com outros widgets.
+    """
+    df = carregar_dados_filtrados(filtros)
+    taxa = df.groupby(list(colunas)).agg({
+        'ACERTO': 'sum',
+        'ERRO': 'sum'
+    }).reset_index()
+    taxa['total_questoes'] = taxa['ACERTO'] + taxa['ERRO']
+    taxa['taxa_acerto'] = (taxa['ACERTO'] / taxa['total_questoes'] * 100).round(2)
+    return taxa
+
 # =================== INTERFACE DOS FILTROS ===================
 
 def criar_filtros():
@@ -147,9 +252,9 @@ def criar_filtros():
     st.sidebar.header("🔍 Filtros de Análise")
     st.sidebar.markdown("---")
     
-    # Carregar opções
-    opcoes = carregar_opcoes_filtros()
-    if not opcoes:
+    # Carregar catálogo (opções em cascata, sem consultas à tabela fato)
+    catalogo = carregar_catalogo_filtros()
+    if catalogo.empty:
         st.sidebar.error("❌ Não foi possível carregar as opções de filtro")
         return {}
     
@@ -160,78 +265,94 @@ def criar_filtros():
         st.session_state.todos_escolas_clicked = False
     
     filtros = {}
+    selecoes = {}
     
     # Filtro Ano
     st.sidebar.subheader("📅 Ano")
     filtros['anos'] = st.sidebar.multiselect(
         "Selecione os anos:",
-        options=opcoes['anos'],
-        default=[],
+        options=opcoes(catalogo, 'AVA_ANO'),
         key="filtro_anos"
     )
+    selecoes['AVA_ANO'] = filtros['anos']
     
     # Filtro Município
     st.sidebar.subheader("🏙️ Município")
     col1, col2 = st.sidebar.columns([3, 1])
     
+    opcoes_municipios = opcoes(catalogo, 'MUN_NOME', selecoes)
+    podar_estado_widget(st.session_state, "filtro_municipios", opcoes_municipios)
+    
     # Verificar se botão "Todos" foi clicado
-    default_municipios = opcoes['municipios'] if st.session_state.todos_municipios_clicked else []
+    if st.session_state.todos_municipios_clicked:
+        st.session_state.filtro_municipios = opcoes_municipios
+        st.session_state.todos_municipios_clicked = False
     
     with col1:
         filtros['municipios'] = st.sidebar.multiselect(
             "Selecione os municípios:",
-            options=opcoes['municipios'],
-            default=default_municipios,
+            options=opcoes_municipios,
             key="filtro_municipios"
         )
     with col2:
         if st.sidebar.button("Todos", key="btn_todos_municipios"):
             st.session_state.todos_municipios_clicked = True
             st.rerun()
+    selecoes['MUN_NOME'] = filtros['municipios']
     
-    # Filtro Escola
+    # Filtro Escola (restrito aos municípios selecionados)
     st.sidebar.subheader("🏫 Escola")
     col1, col2 = st.sidebar.columns([3, 1])
     
+    opcoes_escolas = opcoes(catalogo, 'ESC_NOME', selecoes)
+    podar_estado_widget(st.session_state, "filtro_escolas", opcoes_escolas)
+    
     # Verificar se botão "Todos" foi clicado
-    default_escolas = opcoes['escolas'] if st.session_state.todos_escolas_clicked else []
+    if st.session_state.todos_escolas_clicked:
+        st.session_state.filtro_escolas = opcoes_escolas
+        st.session_state.todos_escolas_clicked = False
     
     with col1:
         filtros['escolas'] = st.sidebar.multiselect(
             "Selecione as escolas:",
-            options=opcoes['escolas'],
-            default=default_escolas,
+            options=opcoes_escolas,
             key="filtro_escolas"
         )
     with col2:
         if st.sidebar.button("Todos", key="btn_todos_escolas"):
             st.session_state.todos_escolas_clicked = True
             st.rerun()
+    selecoes['ESC_NOME'] = filtros['escolas']
     
     # Filtro Disciplina
     st.sidebar.subheader("📚 Disciplina")
+    opcoes_disciplinas = opcoes(catalogo, 'DIS_NOME', selecoes)
+    podar_estado_widget(st.session_state, "filtro_disciplinas", opcoes_disciplinas)
     filtros['disciplinas'] = st.sidebar.multiselect(
         "Selecione as disciplinas:",
-        options=opcoes['disciplinas'],
-        default=[],
+        options=opcoes_disciplinas,
         key="filtro_disciplinas"
     )
+    selecoes['DIS_NOME'] = filtros['disciplinas']
     
     # Filtro Série
     st.sidebar.subheader("🎓 Série")
+    opcoes_series = opcoes(catalogo, 'SER_NOME', selecoes)
+    podar_estado_widget(st.session_state, "filtro_series", opcoes_series)
     filtros['series'] = st.sidebar.multiselect(
         "Selecione as séries:",
-        options=opcoes['series'],
-        default=[],
+        options=opcoes_series,
         key="filtro_series"
     )
+    selecoes['SER_NOME'] = filtros['series']
     
     # Filtro Teste
     st.sidebar.subheader("📝 Teste")
+    opcoes_testes = opcoes(catalogo, 'TES_NOME', selecoes)
+    podar_estado_widget(st.session_state, "filtro_testes", opcoes_testes)
     filtros['testes'] = st.sidebar.multiselect(
         "Selecione os testes:",
-        options=opcoes['testes'],
-        default=[],
+        options=opcoes_testes,
         key="filtro_testes"
     )
     
@@ -252,10 +373,11 @@ def criar_filtros():
 
 # =================== PAINÉIS ===================
 
-def painel_visao_geral(df):
+def painel_visao_geral(filtros):
     """Painel 1: Visão Geral dos Dados"""
     st.header("📊 Painel 1: Visão Geral dos Dados")
     
+    df = carregar_dados_filtrados(filtros)
     if df.empty:
         st.warning("⚠️ Nenhum dado encontrado com os filtros selecionados.")
         return
@@ -303,12 +425,7 @@ def painel_visao_geral(df):
         
         # Municípios com maiores taxas de acerto
         st.subheader("🏆 Municípios - Maiores Taxas de Acerto")
-        taxa_mun = df.groupby(['MUN_NOME', 'DIS_NOME', 'SER_NOME']).agg({
-            'ACERTO': 'sum',
-            'ERRO': 'sum'
-        }).reset_index()
-        taxa_mun['total_questoes'] = taxa_mun['ACERTO'] + taxa_mun['ERRO']
-        taxa_mun['taxa_acerto'] = (taxa_mun['ACERTO'] / taxa_mun['total_questoes'] * 100).round(2)
+        taxa_mun = taxa_acerto_por(filtros, ['MUN_NOME', 'DIS_NOME', 'SER_NOME'])
         
         top_municipios = taxa_mun.groupby('MUN_NOME')['taxa_acerto'].mean().reset_index()
         top_municipios = top_municipios.sort_values('taxa_acerto', ascending=False).head(10)
@@ -342,12 +459,7 @@ def painel_visao_geral(df):
         
         # Taxa de acerto por disciplina e série
         st.subheader("📈 Taxa de Acerto por Disciplina e Série")
-        taxa_disc_serie = df.groupby(['DIS_NOME', 'SER_NOME']).agg({
-            'ACERTO': 'sum',
-            'ERRO': 'sum'
-        }).reset_index()
-        taxa_disc_serie['total_questoes'] = taxa_disc_serie['ACERTO'] + taxa_disc_serie['ERRO']
-        taxa_disc_serie['taxa_acerto'] = (taxa_disc_serie['ACERTO'] / taxa_disc_serie['total_questoes'] * 100).round(2)
+        taxa_disc_serie = taxa_acerto_por(filtros, ['DIS_NOME', 'SER_NOME'])
         
         fig = px.bar(
             taxa_disc_serie,
@@ -361,248 +473,313 @@ def painel_visao_geral(df):
         fig.update_layout(height=400, xaxis_tickangle=-45)
         st.plotly_chart(fig, use_container_width=True)
 
-def painel_taxas_acerto(df):
-    """Painel 2: Gráficos com Taxa de Acerto"""
-    st.header("📈 Painel 2: Taxa de Acerto - Análises Detalhadas")
-    
-    if df.empty:
-        st.warning("⚠️ Nenhum dado encontrado com os filtros selecionados.")
-        return
-    
-    # Calcular taxas de acerto
-    df['taxa_acerto'] = (df['ACERTO'] / (df['ACERTO'] + df['ERRO']) * 100)
-    
-    # Layout em abas
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "🏙️ Por Município", 
-        "🏫 Por Escola", 
-        "📚 Por Disciplina", 
-        "🎯 Por Descritor"
-    ])
+def aba_municipio(filtros):
+    """Aba Por Município"""
+    st.subheader("Taxa de Acerto por Município")
+    
+    # Agrupamento por município
+    taxa_municipio = taxa_acerto_por(filtros, ['MUN_NOME', 'DIS_NOME'])
+    
+    # Gráfico de barras por município
+    fig = px.bar(
+        taxa_municipio,
+        x='MUN_NOME',
+        y='taxa_acerto',
+        color='DIS_NOME',
+        title="Taxa de Acerto por Município e Disciplina",
+        labels={'taxa_acerto': 'Taxa de Acerto (%)', 'MUN_NOME': 'Município'},
+        barmode='group'
+    )
+    fig.update_layout(height=500, xaxis_tickangle=-45)
+    st.plotly_chart(fig, use_container_width=True)
     
-    with tab1:
-        st.subheader("Taxa de Acerto por Município")
+    # Heatmap por município e série
+    col1, col2 = st.columns(2)
+    with col1:
+        taxa_mun_serie = taxa_acerto_por(filtros, ['MUN_NOME', 'SER_NOME'])
         
-        # Agrupamento por município
-        taxa_municipio = df.groupby(['MUN_NOME', 'DIS_NOME']).agg({
-            'ACERTO': 'sum',
-            'ERRO': 'sum'
-        }).reset_index()
-        taxa_municipio['total_questoes'] = taxa_municipio['ACERTO'] + taxa_municipio['ERRO']
-        taxa_municipio['taxa_acerto'] = (taxa_municipio['ACERTO'] / taxa_municipio['total_questoes'] * 100).round(2)
+        # Pivot para heatmap
+        heatmap_data = taxa_mun_serie.pivot(index='MUN_NOME', columns='SER_NOME', values='taxa_acerto')
         
-        # Gráfico de barras por município
-        fig = px.bar(
-            taxa_municipio,
-            x='MUN_NOME',
-            y='taxa_acerto',
-            color='DIS_NOME',
-            title="Taxa de Acerto por Município e Disciplina",
-            labels={'taxa_acerto': 'Taxa de Acerto (%)', 'MUN_NOME': 'Município'},
-            barmode='group'
+        fig = px.imshow(
+            heatmap_data,
+            title="Heatmap: Taxa de Acerto por Município e Série",
+            aspect="auto",
+            color_continuous_scale='RdYlGn'
         )
-        fig.update_layout(height=500, xaxis_tickangle=-45)
+        fig.update_layout(height=400)
         st.plotly_chart(fig, use_container_width=True)
-        
-        # Heatmap por município e série
-        col1, col2 = st.columns(2)
-        with col1:
-            taxa_mun_serie = df.groupby(['MUN_NOME', 'SER_NOME']).agg({
-                'ACERTO': 'sum',
-                'ERRO': 'sum'
-            }).reset_index()
-            taxa_mun_serie['taxa_acerto'] = (taxa_mun_serie['ACERTO'] / (taxa_mun_serie['ACERTO'] + taxa_mun_serie['ERRO']) * 100).round(2)
-            
-            # Pivot para heatmap
-            heatmap_data = taxa_mun_serie.pivot(index='MUN_NOME', columns='SER_NOME', values='taxa_acerto')
-            
-            fig = px.imshow(
-                heatmap_data,
-                title="Heatmap: Taxa de Acerto por Município e Série",
-                aspect="auto",
-                color_continuous_scale='RdYlGn'
-            )
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            # Ranking de municípios
-            ranking_mun = taxa_municipio.groupby('MUN_NOME')['taxa_acerto'].mean().reset_index()
-            ranking_mun = ranking_mun.sort_values('taxa_acerto', ascending=False).head(15)
-            
-            fig = px.bar(
-                ranking_mun,
-                x='taxa_acerto',
-                y='MUN_NOME',
-                orientation='h',
-                title="Ranking: Top 15 Municípios",
-                labels={'taxa_acerto': 'Taxa de Acerto Média (%)', 'MUN_NOME': 'Município'},
-                color='taxa_acerto',
-                color_continuous_scale='RdYlGn'
-            )
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
-    
-    with tab2:
-        st.subheader("Taxa de Acerto por Escola")
-        
-        # Agrupamento por escola
-        taxa_escola = df.groupby(['ESC_NOME', 'DIS_NOME', 'MUN_NOME']).agg({
-            'ACERTO': 'sum',
-            'ERRO': 'sum'
-        }).reset_index()
-        taxa_escola['total_questoes'] = taxa_escola['ACERTO'] + taxa_escola['ERRO']
-        taxa_escola['taxa_acerto'] = (taxa_escola['ACERTO'] / taxa_escola['total_questoes'] * 100).round(2)
-        
-        # Top escolas
-        top_escolas = taxa_escola.groupby('ESC_NOME')['taxa_acerto'].mean().reset_index()
-        top_escolas = top_escolas.sort_values('taxa_acerto', ascending=False).head(20)
+    
+    with col2:
+        # Ranking de municípios
+        ranking_mun = taxa_municipio.groupby('MUN_NOME')['taxa_acerto'].mean().reset_index()
+        ranking_mun = ranking_mun.sort_values('taxa_acerto', ascending=False).head(15)
         
         fig = px.bar(
-            top_escolas,
+            ranking_mun,
             x='taxa_acerto',
-            y='ESC_NOME',
+            y='MUN_NOME',
             orientation='h',
-            title="Top 20 Escolas - Taxa de Acerto Média",
-            labels={'taxa_acerto': 'Taxa de Acerto (%)', 'ESC_NOME': 'Escola'},
+            title="Ranking: Top 15 Municípios",
+            labels={'taxa_acerto': 'Taxa de Acerto Média (%)', 'MUN_NOME': 'Município'},
             color='taxa_acerto',
             color_continuous_scale='RdYlGn'
         )
-        fig.update_layout(height=600)
+        fig.update_layout(height=400)
         st.plotly_chart(fig, use_container_width=True)
-        
-        # Scatter plot: Escola vs Taxa de Acerto
-        fig = px.scatter(
-            taxa_escola,
-            x='total_questoes',
+
+def aba_escola(filtros):
+    """Aba Por Escola"""
+    st.subheader("Taxa de Acerto por Escola")
+    
+    # Agrupamento por escola
+    taxa_escola = taxa_acerto_por(filtros, ['ESC_NOME', 'DIS_NOME', 'MUN_NOME'])
+    
+    # Top escolas
+    top_escolas = taxa_escola.groupby('ESC_NOME')['taxa_acerto'].mean().reset_index()
+    top_escolas = top_escolas.sort_values('taxa_acerto', ascending=False).head(20)
+    
+    fig = px.bar(
+        top_escolas,
+        x='taxa_acerto',
+        y='ESC_NOME',
+        orientation='h',
+        title="Top 20 Escolas - Taxa de Acerto Média",
+        labels={'taxa_acerto': 'Taxa de Acerto (%)', 'ESC_NOME': 'Escola'},
+        color='taxa_acerto',
+        color_continuous_scale='RdYlGn'
+    )
+    fig.update_layout(height=600)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Scatter plot: Escola vs Taxa de Acerto (amostra limitada por disciplina)
+    amostra_escolas = carregar_amostra_escolas(filtros)
+    fig = px.scatter(
+        amostra_escolas,
+        x='total_questoes',
+        y='taxa_acerto',
+        color='DIS_NOME',
+        size='total_questoes',
+        hover_data=['ESC_NOME', 'MUN_NOME'],
+        title="Relação: Número de Questões vs Taxa de Acerto por Escola"
+    )
+    fig.update_layout(height=500)
+    st.plotly_chart(fig, use_container_width=True)
+    if not amostra_escolas.empty:
+        total_pontos = amostra_escolas.groupby('DIS_NOME')['total_estrato'].first().sum()
+        if total_pontos > len(amostra_escolas):
+            st.caption(f"Amostra de {len(amostra_escolas):,} de {total_pontos:,} pontos (estratificada por disciplina)")
+
+def aba_disciplina(filtros):
+    """Aba Por Disciplina"""
+    st.subheader("Taxa de Acerto por Disciplina")
+    
+    # Por disciplina e série
+    taxa_disc_serie = taxa_acerto_por(filtros, ['DIS_NOME', 'SER_NOME'])
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Gráfico de linhas por série
+        fig = px.line(
+            taxa_disc_serie,
+            x='SER_NOME',
             y='taxa_acerto',
             color='DIS_NOME',
-            size='total_questoes',
-            hover_data=['ESC_NOME', 'MUN_NOME'],
-            title="Relação: Número de Questões vs Taxa de Acerto por Escola"
+            title="Evolução da Taxa de Acerto por Série",
+            labels={'taxa_acerto': 'Taxa de Acerto (%)', 'SER_NOME': 'Série'},
+            markers=True
         )
-        fig.update_layout(height=500)
+        fig.update_layout(height=400)
         st.plotly_chart(fig, use_container_width=True)
     
-    with tab3:
-        st.subheader("Taxa de Acerto por Disciplina")
-        
-        # Por disciplina e série
-        taxa_disc_serie = df.groupby(['DIS_NOME', 'SER_NOME']).agg({
-            'ACERTO': 'sum',
-            'ERRO': 'sum'
-        }).reset_index()
-        taxa_disc_serie['taxa_acerto'] = (taxa_disc_serie['ACERTO'] / (taxa_disc_serie['ACERTO'] + taxa_disc_serie['ERRO']) * 100).round(2)
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Gráfico de linhas por série
-            fig = px.line(
-                taxa_disc_serie,
-                x='SER_NOME',
-                y='taxa_acerto',
-                color='DIS_NOME',
-                title="Evolução da Taxa de Acerto por Série",
-                labels={'taxa_acerto': 'Taxa de Acerto (%)', 'SER_NOME': 'Série'},
-                markers=True
-            )
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            # Box plot por disciplina
-            fig = px.box(
-                df,
-                x='DIS_NOME',
-                y='taxa_acerto',
-                title="Distribuição da Taxa de Acerto por Disciplina",
-                labels={'taxa_acerto': 'Taxa de Acerto (%)', 'DIS_NOME': 'Disciplina'}
-            )
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
-        
-        # Por teste
-        taxa_teste = df.groupby(['TES_NOME', 'DIS_NOME']).agg({
-            'ACERTO': 'sum',
-            'ERRO': 'sum'
-        }).reset_index()
-        taxa_teste['taxa_acerto'] = (taxa_teste['ACERTO'] / (taxa_teste['ACERTO'] + taxa_teste['ERRO']) * 100).round(2)
+    with col2:
+        # Box plot por disciplina (quartis calculados no banco)
+        fig = figura_box(
+            carregar_box_disciplina(filtros),
+            grupo='DIS_NOME',
+            titulo="Distribuição da Taxa de Acerto por Disciplina",
+            rotulo_valor='Taxa de Acerto (%)',
+            rotulo_grupo='Disciplina'
+        )
+        fig.update_layout(height=400)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Por teste
+    taxa_teste = taxa_acerto_por(filtros, ['TES_NOME', 'DIS_NOME'])
+    
+    fig = px.bar(
+        taxa_teste,
+        x='TES_NOME',
+        y='taxa_acerto',
+        color='DIS_NOME',
+        title="Taxa de Acerto por Teste",
+        labels={'taxa_acerto': 'Taxa de Acerto (%)', 'TES_NOME': 'Teste'}
+    )
+    fig.update_layout(height=500, xaxis_tickangle=-90)
+    st.plotly_chart(fig, use_container_width=True)
+
+def aba_descritor(filtros):
+    """Aba Por Descritor"""
+    st.subheader("Taxa de Acerto por Descritor (Habilidades)")
+    
+    # Agrupamento por descritor
+    taxa_descritor = taxa_acerto_por(filtros, ['MTI_DESCRITOR', 'DIS_NOME'])
+    
+    # Filtrar apenas descritores com dados significativos
+    taxa_descritor = taxa_descritor[taxa_descritor['total_questoes'] >= 100]
+    
+    # Top e Bottom descritores
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Descritores mais difíceis
+        bottom_descritores = taxa_descritor.nsmallest(15, 'taxa_acerto')
         
         fig = px.bar(
-            taxa_teste,
-            x='TES_NOME',
-            y='taxa_acerto',
+            bottom_descritores,
+            x='taxa_acerto',
+            y='MTI_DESCRITOR',
+            orientation='h',
             color='DIS_NOME',
-            title="Taxa de Acerto por Teste",
-            labels={'taxa_acerto': 'Taxa de Acerto (%)', 'TES_NOME': 'Teste'}
+            title="15 Descritores Mais Difíceis",
+            labels={'taxa_acerto': 'Taxa de Acerto (%)', 'MTI_DESCRITOR': 'Descritor'}
         )
-        fig.update_layout(height=500, xaxis_tickangle=-90)
+        fig.update_layout(height=500)
         st.plotly_chart(fig, use_container_width=True)
     
-    with tab4:
-        st.subheader("Taxa de Acerto por Descritor (Habilidades)")
-        
-        # Agrupamento por descritor
-        taxa_descritor = df.groupby(['MTI_DESCRITOR', 'DIS_NOME']).agg({
-            'ACERTO': 'sum',
-            'ERRO': 'sum'
-        }).reset_index()
-        taxa_descritor['total_questoes'] = taxa_descritor['ACERTO'] + taxa_descritor['ERRO']
-        taxa_descritor['taxa_acerto'] = (taxa_descritor['ACERTO'] / taxa_descritor['total_questoes'] * 100).round(2)
-        
-        # Filtrar apenas descritores com dados significativos
-        taxa_descritor = taxa_descritor[taxa_descritor['total_questoes'] >= 100]
-        
-        # Top e Bottom descritores
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Descritores mais difíceis
-            bottom_descritores = taxa_descritor.nsmallest(15, 'taxa_acerto')
-            
-            fig = px.bar(
-                bottom_descritores,
-                x='taxa_acerto',
-                y='MTI_DESCRITOR',
-                orientation='h',
-                color='DIS_NOME',
-                title="15 Descritores Mais Difíceis",
-                labels={'taxa_acerto': 'Taxa de Acerto (%)', 'MTI_DESCRITOR': 'Descritor'}
-            )
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            # Descritores mais fáceis
-            top_descritores = taxa_descritor.nlargest(15, 'taxa_acerto')
-            
-            fig = px.bar(
-                top_descritores,
-                x='taxa_acerto',
-                y='MTI_DESCRITOR',
-                orientation='h',
-                color='DIS_NOME',
-                title="15 Descritores Mais Fáceis",
-                labels={'taxa_acerto': 'Taxa de Acerto (%)', 'MTI_DESCRITOR': 'Descritor'}
-            )
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        # Descritores mais fáceis
+        top_descritores = taxa_descritor.nlargest(15, 'taxa_acerto')
         
-        # Histograma de distribuição
-        fig = px.histogram(
-            taxa_descritor,
+        fig = px.bar(
+            top_descritores,
             x='taxa_acerto',
+            y='MTI_DESCRITOR',
+            orientation='h',
             color='DIS_NOME',
-            title="Distribuição das Taxas de Acerto por Descritor",
-            labels={'taxa_acerto': 'Taxa de Acerto (%)', 'count': 'Número de Descritores'},
-            nbins=20
+            title="15 Descritores Mais Fáceis",
+            labels={'taxa_acerto': 'Taxa de Acerto (%)', 'MTI_DESCRITOR': 'Descritor'}
+        )
+        fig.update_layout(height=500)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Histograma de distribuição (faixas contadas no banco)
+    fig = figura_histograma(
+        carregar_histograma_descritores(filtros),
+        titulo="Distribuição das Taxas de Acerto por Descritor",
+        rotulo_valor='Taxa de Acerto (%)',
+        cor='DIS_NOME',
+        rotulo_contagem='Número de Descritores'
+    )
+    fig.update_layout(height=400)
+    st.plotly_chart(fig, use_container_width=True)
+
+# Abas do Painel 2 (somente a aba visível é calculada)
+ABAS_TAXAS_ACERTO = {
+    "🏙️ Por Município": aba_municipio,
+    "🏫 Por Escola": aba_escola,
+    "📚 Por Disciplina": aba_disciplina,
+    "🎯 Por Descritor": aba_descritor,
+}
+
+def painel_taxas_acerto(filtros):
+    """Painel 2: Gráficos com Taxa de Acerto"""
+    st.header("📈 Painel 2: Taxa de Acerto - Análises Detalhadas")
+    
+    if carregar_dados_filtrados(filtros).empty:
+        st.warning("⚠️ Nenhum dado encontrado com os filtros selecionados.")
+        return
+    
+    # Seletor de aba: diferente de st.tabs, não executa as abas ocultas
+    aba = st.radio(
+        "Aba",
+        options=list(ABAS_TAXAS_ACERTO),
+        horizontal=True,
+        label_visibility="collapsed",
+        key="aba_taxas_acerto"
+    )
+    
+    ABAS_TAXAS_ACERTO[aba](filtros)
+
+def painel_resumo_agregado(filtros):
+    """Resumo agregado (usado quando os filtros excedem o orçamento de memória)"""
+    st.header("📊 Resumo Agregado")
+    
+    resumo = carregar_resumo_agregado(filtros)
+    if not resumo or resumo['metricas'].empty:
+        st.warning("⚠️ Nenhum dado encontrado com os filtros selecionados.")
+        return
+    
+    metricas = resumo['metricas'].iloc[0]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("👨‍🎓 Total de Alunos", f"{int(metricas['total_alunos']):,}")
+    col2.metric("🏫 Total de Escolas", f"{int(metricas['total_escolas']):,}")
+    col3.metric("🏙️ Total de Municípios", f"{int(metricas['total_municipios']):,}")
+    col4.metric("📝 Total de Testes", f"{int(metricas['total_testes']):,}")
+    
+    st.markdown("---")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        fig = px.bar(
+            resumo['por_municipio'],
+            x='total_alunos',
+            y='MUN_NOME',
+            orientation='h',
+            color='taxa_acerto',
+            color_continuous_scale='RdYlGn',
+            title="Top 15 Municípios por Número de Alunos",
+            labels={'total_alunos': 'Número de Alunos', 'MUN_NOME': 'Município',
+                    'taxa_acerto': 'Taxa de Acerto (%)'}
         )
         fig.update_layout(height=400)
         st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        fig = px.bar(
+            resumo['por_disciplina_serie'],
+            x='SER_NOME',
+            y='taxa_acerto',
+            color='DIS_NOME',
+            title="Taxa de Acerto por Série e Disciplina",
+            labels={'taxa_acerto': 'Taxa de Acerto (%)', 'SER_NOME': 'Série', 'DIS_NOME': 'Disciplina'},
+            barmode='group'
+        )
+        fig.update_layout(height=400, xaxis_tickangle=-45)
+        st.plotly_chart(fig, use_container_width=True)
 
 # =================== APLICATIVO PRINCIPAL ===================
 
+@st.fragment
+def exibir_painel(filtros):
+    """Seletor e painel visível
+    
+    Executado como fragmento: trocar de painel ou de aba reexecuta apenas este
+    trecho, sem passar de novo pelos filtros e pelo restante da página.
+    """
+    # Seletor de painel
+    painel = st.selectbox(
+        "📋 Selecione o painel para visualização:",
+        options=[
+            "📊 Painel 1: Visão Geral dos Dados",
+            "📈 Painel 2: Taxa de Acerto - Análises Detalhadas"
+        ]
+    )
+    
+    st.markdown("---")
+    
+    # Renderizar painel selecionado
+    try:
+        if "Painel 1" in painel:
+            painel_visao_geral(filtros)
+        elif "Painel 2" in painel:
+            painel_taxas_acerto(filtros)
+    except ConsultaCancelada as e:
+        if e.motivo == TIMEOUT:
+            st.warning(f"⏱️ {e}. Refine os filtros e tente novamente.")
+
+
 def main():
     """Função principal do aplicativo"""
     
@@ -646,9 +823,28 @@ def main():
         """)
         return
     
+    # Estimar o tamanho antes de materializar as linhas (orçamento de memória)
+    linhas_estimadas, bytes_estimados = estimar_tamanho_dados(filtros)
+    try:
+        controle_memoria.reservar(id_sessao(), chave_filtros(filtros), bytes_estimados)
+    except OrcamentoExcedido as e:
+        st.warning(
+            f"⚠️ A seleção tem cerca de **{linhas_estimadas:,} registros** ({e}). "
+            "Exibindo apenas o resumo agregado; refine os filtros para ver os painéis detalhados."
+        )
+        painel_resumo_agregado(filtros)
+        return
+    
     # Carregar dados com filtros aplicados
-    with st.spinner("📊 Carregando dados..."):
-        df = carregar_dados_filtrados(filtros)
+    try:
+        with st.spinner("📊 Carregando dados..."):
+            df = carregar_dados_filtrados(filtros)
+    except ConsultaCancelada as e:
+        # Execução substituída: a nova execução já está a caminho
+        if e.motivo == TIMEOUT:
+            st.warning(f"⏱️ {e}. Exibindo apenas o resumo agregado.")
+            painel_resumo_agregado(filtros)
+        return
     
     if df.empty:
         st.warning("⚠️ Nenhum dado encontrado com os filtros selecionados. Tente ajustar os filtros.")
@@ -657,22 +853,7 @@ def main():
     # Mostrar resumo dos filtros aplicados
     st.success(f"✅ **{len(df):,} registros** encontrados com os filtros aplicados")
     
-    # Seletor de painel
-    painel = st.selectbox(
-        "📋 Selecione o painel para visualização:",
-        options=[
-            "📊 Painel 1: Visão Geral dos Dados",
-            "📈 Painel 2: Taxa de Acerto - Análises Detalhadas"
-        ]
-    )
-    
-    st.markdown("---")
-    
-    # Renderizar painel selecionado
-    if "Painel 1" in painel:
-        painel_visao_geral(df)
-    elif "Painel 2" in painel:
-        painel_taxas_acerto(df)
+    exibir_painel(filtros)
     
     # Rodapé
     st.markdown("---")
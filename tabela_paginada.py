@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Tabela paginada (keyset) para listagens grandes nos dashboards SAEV
+
+Os rankings enviavam o resultado inteiro para ``st.dataframe`` e o painel de
+Leitura carregava todas as linhas de alunos. Para listas estaduais (centenas
+de milhares de alunos) isso trava a aplicação.
+
+Este componente busca apenas uma tela de linhas por vez:
+- Paginação por keyset: a próxima página é ``WHERE (ordem, chave) > cursor``
+  com ``LIMIT``, e não ``OFFSET`` (o custo não cresce com o número da página).
+- Ordenação e busca textual são feitas no SQL.
+- A contagem total é limitada (``LIMITE_CONTAGEM``): acima dela exibimos
+  apenas "mais de N", sem varrer a fonte inteira.
+
+A fonte é uma consulta SQL qualquer (com seus próprios parâmetros). As colunas
+de ordenação e a chave não podem ser nulas; use COALESCE na fonte se preciso.
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import streamlit as st
+
+TAMANHO_PAGINA_PADRAO = 50
+LIMITE_CONTAGEM = 100_000
+
+
+def _valor_python(valor):
+    """Converte escalares NumPy em tipos Python (para bind de parâmetros)"""
+    return valor.item() if hasattr(valor, 'item') else valor
+
+
+def _colunas_keyset(ordem, chave_unica):
+    """Ordem completa: colunas escolhidas + chave única (desempate estável)"""
+    colunas = list(ordem)
+    usadas = {coluna for coluna, _ in colunas}
+    colunas += [(coluna, True) for coluna in chave_unica if coluna not in usadas]
+    return colunas
+
+
+def _condicao_busca(coluna_busca, busca):
+    """Condição ILIKE da busca textual (ou None)"""
+    if not coluna_busca or not busca:
+        return None, []
+    return f"CAST({coluna_busca} AS VARCHAR) ILIKE ?", [f"%{busca.strip()}%"]
+
+
+def montar_consulta_pagina(fonte, ordem, chave_unica, cursor=None,
+                           coluna_busca=None, busca=None, tamanho=TAMANHO_PAGINA_PADRAO):
+    """
+    Monta a consulta de uma página por keyset
+
+    Args:
+        fonte (str): Consulta SQL de origem
+        ordem (list): [(coluna, ascendente), ...] escolhida pelo usuário
+        chave_unica (list): Colunas que identificam uma linha da fonte
+        cursor (tuple): Valores das colunas de ordenação da última linha da
+            página anterior (None = primeira página)
+        coluna_busca (str): Coluna usada na busca textual
+        busca (str): Termo buscado
+        tamanho (int): Linhas por página
+
+    Returns:
+        tuple: (sql, params) - os params devem ser anexados aos da fonte.
+            A consulta traz ``tamanho + 1`` linhas para indicar se há próxima.
+    """
+    colunas = _colunas_keyset(ordem, chave_unica)
+    condicoes = []
+    params = []
+
+    condicao, params_busca = _condicao_busca(coluna_busca, busca)
+    if condicao:
+        condicoes.append(condicao)
+        params += params_busca
+
+    if cursor is not None:
+        # (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ... respeitando a direção de cada coluna
+        alternativas = []
+        for i, (coluna, ascendente) in enumerate(colunas):
+            termos = [f"{anterior} = ?" for anterior, _ in colunas[:i]]
+            termos.append(f"{coluna} {'>' if ascendente else '<'} ?")
+            alternativas.append("(" + " AND ".join(termos) + ")")
+            params += [_valor_python(v) for v in cursor[:i + 1]]
+        condicoes.append("(" + " OR ".join(alternativas) + ")")
+
+    where_clause = " AND ".join(condicoes) if condicoes else "1=1"
+    order_by = ", ".join(f"{coluna} {'ASC' if asc else 'DESC'}" for coluna, asc in colunas)
+
+    sql = f"""
+    SELECT *
+    FROM ({fonte}) pagina
+    WHERE {where_clause}
+    ORDER BY {order_by}
+    LIMIT ?
+    """
+    params.append(tamanho + 1)
+    return sql, params
+
+
+def montar_consulta_contagem(fonte, coluna_busca=None, busca=None, limite=LIMITE_CONTAGEM):
+    """
+    Monta a contagem limitada de linhas da fonte
+
+    Returns:
+        tuple: (sql, params) - o resultado é no máximo ``limite + 1``
+    """
+    condicao, params = _condicao_busca(coluna_busca, busca)
+    sql = f"""
+    SELECT COUNT(*) AS total
+    FROM (
+        SELECT 1 FROM ({fonte}) contagem
+        WHERE {condicao or '1=1'}
+        LIMIT ?
+    )
+    """
+    return sql, params + [limite + 1]
+
+
+def cursor_da_linha(linha, ordem, chave_unica):
+    """Extrai o cursor (valores de ordenação) de uma linha do DataFrame"""
+    return tuple(_valor_python(linha[coluna]) for coluna, _ in _colunas_keyset(ordem, chave_unica))
+
+
+@st.fragment
+def exibir_tabela_paginada(chave, consultar, fonte, params, colunas, ordenacoes,
+                           chave_unica, coluna_busca=None, rotulo_busca="🔎 Buscar:",
+                           tamanho=TAMANHO_PAGINA_PADRAO, formatar=None, altura=None):
+    """
+    Exibe uma tabela paginada no servidor
+
+    Executado como fragmento: trocar de página, de ordenação ou buscar
+    reexecuta apenas a tabela.
+
+    Args:
+        chave (str): Prefixo único dos widgets/estado desta tabela
+        consultar (callable): (sql, params) -> DataFrame
+        fonte (str): Consulta SQL de origem
+        params (list): Parâmetros da fonte
+        colunas (dict): Coluna -> rótulo exibido (define as colunas visíveis)
+        ordenacoes (dict): Rótulo -> [(coluna, ascendente), ...]; a primeira é o padrão
+        chave_unica (list): Colunas que identificam uma linha
+        coluna_busca (str): Coluna para a busca textual (None = sem busca)
+        rotulo_busca (str): Rótulo do campo de busca
+        tamanho (int): Linhas por página
+        formatar (callable): Ajuste opcional do DataFrame da página antes da exibição
+        altura (int): Altura da tabela
+    """
+    params = list(params or [])
+
+    col_ordem, col_busca = st.columns([1, 2])
+    with col_ordem:
+        rotulo_ordem = st.selectbox("↕️ Ordenar por:", options=list(ordenacoes), key=f"{chave}_ordem")
+    busca = None
+    if coluna_busca:
+        with col_busca:
+            busca = st.text_input(rotulo_busca, key=f"{chave}_busca").strip() or None
+    ordem = ordenacoes[rotulo_ordem]
+
+    # Qualquer mudança de fonte, ordenação ou busca volta para a primeira página
+    assinatura = (fonte, tuple(map(str, params)), rotulo_ordem, busca, tamanho)
+    estado_pilha = f"{chave}_pilha"
+    if st.session_state.get(f"{chave}_assinatura") != assinatura:
+        st.session_state[f"{chave}_assinatura"] = assinatura
+        st.session_state[estado_pilha] = [None]
+    pilha = st.session_state[estado_pilha]
+
+    sql, params_pagina = montar_consulta_pagina(
+        fonte, ordem, chave_unica, pilha[-1], coluna_busca, busca, tamanho
+    )
+    pagina = consultar(sql, params + params_pagina)
+    tem_proxima = len(pagina) > tamanho
+    pagina = pagina.head(tamanho)
+
+    sql_contagem, params_contagem = montar_consulta_contagem(fonte, coluna_busca, busca)
+    total = int(consultar(sql_contagem, params + params_contagem).iloc[0, 0])
+
+    if pagina.empty:
+        st.info("Nenhum registro encontrado.")
+    else:
+        exibicao = formatar(pagina) if formatar else pagina
+        exibicao = exibicao[list(colunas)].rename(columns=colunas)
+        opcoes_tabela = {'use_container_width': True, 'hide_index': True}
+        if altura:
+            opcoes_tabela['height'] = altura
+        st.dataframe(exibicao, **opcoes_tabela)
+
+    def _anterior():
+        if len(pilha) > 1:
+            pilha.pop()
+
+    def _proxima():
+        pilha.append(cursor_da_linha(pagina.iloc[-1], ordem, chave_unica))
+
+    inicio = (len(pilha) - 1) * tamanho
+    total_txt = f"mais de {LIMITE_CONTAGEM:,}" if total > LIMITE_CONTAGEM else f"{total:,}"
+
+    col_ant, col_info, col_prox = st.columns([1, 3, 1])
+    with col_ant:
+        st.button("⬅️ Anterior", key=f"{chave}_anterior", on_click=_anterior,
+                  disabled=len(pilha) <= 1)
+    with col_info:
+        if not pagina.empty:
+            st.caption(f"Página {len(pilha)} · registros {inicio + 1:,}–{inicio + len(pagina):,} de {total_txt}")
+    with col_prox:
+        st.button("Próxima ➡️", key=f"{chave}_proxima", on_click=_proxima,
+                  disabled=not tem_proxima)
+
+
+if __name__ == "__main__":
+    # Demonstração das consultas geradas
+    sql, params = montar_consulta_pagina(
+        "SELECT * FROM ranking_alunos WHERE DIS_NOME = ?",
+        [('taxa_acerto', False)], ['posicao'],
+        cursor=(87.5, 12), coluna_busca='ALU_NOME', busca='maria', tamanho=50,
+    )
+    print("🔍 TESTE DA PAGINAÇÃO KEYSET")
+    print("=" * 40)
+    print(sql)
+    print(f"Parâmetros (após os da fonte): {params}")
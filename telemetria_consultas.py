@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Telemetria das consultas dos dashboards SAEV
+
+Os gerenciadores de conexão só contavam consultas, tentativas e falhas
+(``get_stats``): não havia como saber quais consultas eram lentas, quanto
+devolviam, nem se o cache do Streamlit estava sendo aproveitado.
+
+Cada consulta executada por ``saev_query``, ``duckdb_concurrent_solution``
+ou ``duckdb_manager`` gera um registro com:
+- impressão digital do SQL (texto normalizado, sem valores literais) e
+  duração;
+- linhas e bytes devolvidos;
+- cache: ``hit`` (resultado servido pelo cache do Streamlit, sem consultar
+  o banco), ``miss`` (consulta feita dentro de uma função cacheada) ou
+  vazio (consulta sem cache);
+- espera na fila (lock da conexão ou semáforo do gerenciador).
+
+Os registros ficam em um buffer circular em memória
+(SAEV_TELEMETRIA_REGISTROS, padrão 5000) e, se SAEV_TELEMETRIA_ARQUIVO
+estiver definido, também são gravados em JSON Lines (em lotes). A página
+``diagnostico.py`` mostra percentis e as impressões digitais mais lentas.
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import atexit
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+CAPACIDADE_PADRAO = int(os.environ.get("SAEV_TELEMETRIA_REGISTROS", "5000"))
+ARQUIVO_PADRAO = os.environ.get("SAEV_TELEMETRIA_ARQUIVO") or None
+
+# Registros acumulados antes de gravar no arquivo
+LOTE_PERSISTENCIA = 100
+
+# Tamanho máximo do SQL normalizado guardado em cada registro
+TAMANHO_SQL = 500
+
+CACHE_HIT = 'hit'
+CACHE_MISS = 'miss'
+
+_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_TEXTOS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACOS = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def impressao_digital(sql):
+    """
+    Normaliza o SQL e calcula sua impressão digital
+
+    Comentários, espaços e valores literais (textos e números) são
+    removidos, e listas ``(?, ?, ?)`` viram ``(?)``: consultas que só
+    diferem nos valores recebem a mesma impressão.
+
+    Returns:
+        tuple: (impressão de 12 caracteres, SQL normalizado)
+    """
+    texto = _COMENTARIOS.sub(" ", sql or "")
+    texto = _TEXTOS.sub("?", texto)
+    texto = _NUMEROS.sub("?", texto)
+    texto = _LISTAS.sub("(?)", texto)
+    texto = _ESPACOS.sub(" ", texto).strip()
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:12], texto
+
+
+def descrever_resultado(resultado):
+    """
+    Linhas e bytes de um resultado (Arrow, DataFrame, lista ou tupla)
+
+    Dicionários de DataFrames (ex.: ``carregar_agregados``) somam as partes.
+
+    Returns:
+        tuple: (linhas, bytes); None quando não se aplica
+    """
+    if resultado is None:
+        return None, None
+    if isinstance(resultado, dict):
+        partes = [descrever_resultado(valor) for valor in resultado.values()]
+        partes = [(linhas, bytes_) for linhas, bytes_ in partes if linhas is not None]
+        if not partes:
+            return None, None
+        return sum(p[0] for p in partes), sum(p[1] or 0 for p in partes)
+    if hasattr(resultado, 'num_rows') and hasattr(resultado, 'nbytes'):
+        return resultado.num_rows, resultado.nbytes
+    if hasattr(resultado, 'memory_usage'):
+        return len(resultado), int(resultado.memory_usage(index=False).sum())
+    if isinstance(resultado, list):
+        return len(resultado), None
+    if isinstance(resultado, tuple):
+        return 1, None
+    return None, None
+
+
+def _percentis(valores):
+    """
+    p50/p95/p99 e máximo (ms) de uma lista de durações em ms
+
+    As chaves existem mesmo sem durações (ex.: impressão só com erros), com
+    NaN, para que as tabelas do diagnóstico tenham sempre as mesmas colunas.
+    """
+    if not valores:
+        return dict.fromkeys(('p50_ms', 'p95_ms', 'p99_ms', 'max_ms'), float('nan'))
+    p50, p95, p99 = np.percentile(valores, (50, 95, 99))
+    return {
+        'p50_ms': round(float(p50), 1),
+        'p95_ms': round(float(p95), 1),
+        'p99_ms': round(float(p99), 1),
+        'max_ms': round(float(max(valores)), 1),
+    }
+
+
+class TelemetriaConsultas:
+    """Buffer circular de registros de consultas, com persistência opcional"""
+
+    def __init__(self, capacidade=CAPACIDADE_PADRAO, arquivo=ARQUIVO_PADRAO):
+        self.capacidade = capacidade
+        self.arquivo = arquivo
+        self._lock = threading.Lock()
+        self._registros = deque(maxlen=capacidade)
+        self._pendentes = []
+        self._local = threading.local()
+        self._stats = {'registradas': 0, 'erros': 0, 'cache_hits': 0, 'cache_misses': 0}
+
+    def _chamada_cacheada(self):
+        """Função cacheada em execução nesta thread (topo da pilha)"""
+        pilha = getattr(self._local, 'pilha', None)
+        return pilha[-1] if pilha else None
+
+    def origem_atual(self):
+        """Função cacheada (``cache_com_telemetria``) em execução nesta thread"""
+        chamada = self._chamada_cacheada()
+        return chamada['origem'] if chamada else None
+
+    def registrar(self, sql, duracao, linhas=None, bytes_=None, cache=None,
+                  espera=0.0, origem=None, erro=None):
+        """
+        Registra uma consulta
+
+        Args:
+            sql (str): Consulta executada
+            duracao (float): Duração em segundos
+            linhas (int): Linhas devolvidas
+            bytes_ (int): Bytes devolvidos
+            cache (str): CACHE_HIT, CACHE_MISS ou None (sem cache). Consultas
+                dentro de uma função de ``cache_com_telemetria`` são ``miss``.
+            espera (float): Espera na fila antes da execução, em segundos
+            origem (str): Função ou componente que fez a consulta
+            erro (Exception): Erro da consulta, se houve
+        """
+        chamada = self._chamada_cacheada()
+        if chamada is not None and cache is None:
+            chamada['executou'] = True
+            cache = CACHE_MISS
+            origem = origem or chamada['origem']
+
+        impressao, normalizado = impressao_digital(sql)
+        registro = {
+            'instante': time.time(),
+            'impressao': impressao,
+            'sql': normalizado[:TAMANHO_SQL],
+            'origem': origem,
+            'duracao_ms': round(duracao * 1000, 2),
+            'espera_ms': round(espera * 1000, 2),
+            'linhas': linhas,
+            'bytes': bytes_,
+            'cache': cache,
+            'erro': type(erro).__name__ if erro is not None else None,
+        }
+
+        with self._lock:
+            self._registros.append(registro)
+            self._stats['registradas'] += 1
+            self._stats['erros'] += erro is not None
+            self._stats['cache_hits'] += cache == CACHE_HIT
+            self._stats['cache_misses'] += cache == CACHE_MISS
+            if self.arquivo:
+                self._pendentes.append(registro)
+                if len(self._pendentes) >= LOTE_PERSISTENCIA:
+                    self._gravar_pendentes()
+
+    @contextmanager
+    def medir(self, sql, espera=0.0, origem=None):
+        """
+        Mede a consulta executada dentro do bloco
+
+        O bloco recebe um dicionário em que pode informar ``resultado``
+        (para contar linhas e bytes) ou ``linhas``/``bytes`` diretamente.
+
+        Exemplo:
+            with telemetria.medir(sql) as medida:
+                medida['resultado'] = conn.execute(sql).df()
+        """
+        medida = {}
+        inicio = time.perf_counter()
+        try:
+            yield medida
+        except Exception as erro:
+            self.registrar(sql, time.perf_counter() - inicio, espera=espera,
+                           origem=origem, erro=erro)
+            raise
+        duracao = time.perf_counter() - inicio
+        linhas, bytes_ = descrever_resultado(medida.get('resultado'))
+        self.registrar(sql, duracao, medida.get('linhas', linhas), medida.get('bytes', bytes_),
+                       espera=espera, origem=origem)
+
+    def _gravar_pendentes(self):
+        """Grava os registros pendentes; chamador deve deter o lock"""
+        if not self._pendentes:
+            return
+        try:
+            pasta = os.path.dirname(self.arquivo)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            with open(self.arquivo, 'a', encoding='utf-8') as arquivo:
+                for registro in self._pendentes:
+                    arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"⚠️ Telemetria: não foi possível gravar {self.arquivo}: {e}")
+        self._pendentes.clear()
+
+    def persistir(self):
+        """Grava imediatamente os registros pendentes (se houver arquivo)"""
+        with self._lock:
+            self._gravar_pendentes()
+
+    def registros(self):
+        """Cópia dos registros em memória, do mais antigo ao mais recente"""
+        with self._lock:
+            return list(self._registros)
+
+    def limpar(self):
+        """Descarta os registros em memória (o arquivo não é alterado)"""
+        with self._lock:
+            self._registros.clear()
+
+    def percentis(self, registros=None):
+        """
+        Percentis de duração (ms) por estado de cache
+
+        Returns:
+            dict: 'todas', 'hit', 'miss' e 'sem_cache' -> consultas e percentis
+        """
+        registros = self.registros() if registros is None else registros
+        grupos = defaultdict(list)
+        for registro in registros:
+            if registro['erro'] is None:
+                grupos['todas'].append(registro['duracao_ms'])
+                grupos[registro['cache'] or 'sem_cache'].append(registro['duracao_ms'])
+        return {
+            grupo: {'consultas': len(grupos[grupo]), **_percentis(grupos[grupo])}
+            for grupo in ('todas', CACHE_HIT, CACHE_MISS, 'sem_cache')
+        }
+
+    def resumo_por_impressao(self, registros=None, limite=20):
+        """
+        Agrega os registros por impressão digital, das mais lentas (p95)
+        para as mais rápidas
+
+        Returns:
+            list: Dicionários com impressão, SQL, origem, contagens,
+                percentis, tempo total, espera e volume devolvido
+        """
+        registros = self.registros() if registros is None else registros
+        grupos = defaultdict(list)
+        for registro in registros:
+            grupos[registro['impressao']].append(registro)
+
+        resumo = []
+        for impressao, itens in grupos.items():
+            ok = [r for r in itens if r['erro'] is None]
+            duracoes = [r['duracao_ms'] for r in ok]
+            linhas = [r['linhas'] for r in ok if r['linhas'] is not None]
+            resumo.append({
+                'impressao': impressao,
+                'sql': itens[-1]['sql'],
+                'origem': itens[-1]['origem'],
+                'consultas': len(itens),
+                'erros': len(itens) - len(ok),
+                'cache_hits': sum(r['cache'] == CACHE_HIT for r in itens),
+                **_percentis(duracoes),
+                'total_ms': round(sum(duracoes), 1),
+                'espera_media_ms': round(float(np.mean([r['espera_ms'] for r in itens])), 2),
+                'linhas_media': round(float(np.mean(linhas)), 1) if linhas else None,
+                'bytes_total': sum(r['bytes'] or 0 for r in ok),
+            })
+        resumo.sort(key=lambda r: -1.0 if np.isnan(r['p95_ms']) else r['p95_ms'], reverse=True)
+        return resumo[:limite]
+
+    def get_stats(self):
+        """Retorna contadores da telemetria"""
+        with self._lock:
+            stats = self._stats.copy()
+            stats['em_memoria'] = len(self._registros)
+            stats['capacidade'] = self.capacidade
+            stats['arquivo'] = self.arquivo
+            stats['pendentes'] = len(self._pendentes)
+            return stats
+
+    def cache_com_telemetria(self, funcao=None, *, recurso=False, **opcoes):
+        """
+        Substitui ``st.cache_data``/``st.cache_resource`` registrando hits
+
+        Quando o Streamlit devolve o resultado do cache, a função não executa
+        e nenhuma consulta é registrada; este decorador registra então um
+        ``hit`` (impressão ``[cache] modulo.funcao``) com o tempo da chamada
+        e o volume devolvido. As consultas feitas quando a função executa
+        são marcadas como ``miss``.
+
+        Args:
+            funcao (callable): Função decorada (uso sem parênteses)
+            recurso (bool): Usa ``st.cache_resource`` em vez de ``st.cache_data``
+            **opcoes: Opções repassadas ao decorador do Streamlit (ttl, max_entries...)
+        """
+        import streamlit as st
+
+        def decorar(original):
+            modulo = original.__module__
+            if modulo == '__main__':
+                # Páginas são executadas como script: usa o nome do arquivo
+                modulo = os.path.splitext(os.path.basename(original.__code__.co_filename))[0]
+            nome = f"{modulo}.{original.__qualname__}"
+
+            @functools.wraps(original)
+            def executar(*args, **kwargs):
+                chamada = self._chamada_cacheada()
+                if chamada is not None:
+                    chamada['executou'] = True
+                return original(*args, **kwargs)
+
+            cache = st.cache_resource if recurso else st.cache_data
+            cacheada = cache(**opcoes)(executar)
+
+            @functools.wraps(original)
+            def chamar(*args, **kwargs):
+                pilha = getattr(self._local, 'pilha', None)
+                if pilha is None:
+                    pilha = self._local.pilha = []
+                chamada = {'origem': nome, 'executou': False}
+                pilha.append(chamada)
+                inicio = time.perf_counter()
+                try:
+                    resultado = cacheada(*args, **kwargs)
+                finally:
+                    pilha.pop()
+                if not chamada['executou']:
+                    linhas, bytes_ = descrever_resultado(resultado)
+                    self.registrar(f"[cache] {nome}", time.perf_counter() - inicio,
+                                   linhas, bytes_, cache=CACHE_HIT, origem=nome)
+                return resultado
+
+            # Mesma interface da função cacheada do Streamlit
+            chamar.clear = cacheada.clear
+            chamar.__wrapped__ = original
+            return chamar
+
+        return decorar(funcao) if funcao is not None else decorar
+
+
+def ler_registros(caminho):
+    """Lê os registros persistidos em JSON Lines (para análise fora do app)"""
+    with open(caminho, encoding='utf-8') as arquivo:
+        return [json.loads(linha) for linha in arquivo if linha.strip()]
+
+
+# Instância global (compartilhada pelas páginas do processo)
+telemetria = TelemetriaConsultas()
+medir_consulta = telemetria.medir
+cache_com_telemetria = telemetria.cache_com_telemetria
+atexit.register(telemetria.persistir)
+
+
+if __name__ == "__main__":
+    # Demonstração: impressões digitais e resumo das consultas
+    import duckdb
+
+    print("📡 TESTE DA TELEMETRIA DE CONSULTAS")
+    print("=" * 40)
+    conn = duckdb.connect()
+    for limite in (10, 1000, 100000, 10, 1000):
+        sql = f"SELECT * FROM range({limite}) WHERE range % 7 IN (1, 2, 3)"
+        with medir_consulta(sql, origem='demo') as medida:
+            medida['resultado'] = conn.execute(sql).df()
+
+    print(f"Impressão digital: {impressao_digital('SELECT 1 FROM t WHERE x IN (1, 2)')}")
+    print(f"Percentis: {telemetria.percentis()['todas']}")
+    for item in telemetria.resumo_por_impressao():
+        print(f"   {item['impressao']}: {item['consultas']} consultas, "
+              f"p95 {item['p95_ms']} ms, {item['bytes_total']:,} bytes")
+    print(telemetria.get_stats())
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Teste de carga dos dashboards SAEV com usuários simultâneos simulados
+
+``test_concurrent_solution`` (duckdb_concurrent_solution.py) executava três
+consultas fixas com pausas e só contava sucessos; não servia para
+dimensionar o servidor para os dias de aplicação em toda a rede estadual.
+
+Este teste:
+1. Gera (com semente) um banco sintético pelo próprio ETL: mesmas tabelas,
+   tabelas derivadas e catálogo de filtros do banco de produção.
+2. Simula N usuários simultâneos. Cada um repete sessões de um dashboard
+   (escolhido pelo ``--mix``), com filtros sorteados do catálogo e pausas
+   entre as interações, chamando as mesmas funções de carga das páginas
+   (e os mesmos caches; ``--sem-cache`` mede só o custo do banco).
+3. Reporta vazão e latências p50/p95/p99 por tipo de consulta.
+
+Uso:
+    python teste_carga.py --usuarios 20 --duracao 60
+    python teste_carga.py --alunos 200000 --recriar --usuarios 50 --sem-cache
+    python teste_carga.py --mix "saev_rankings=3,dashboard_leitura=1" --saida reports/carga.json
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import duckdb
+import numpy as np
+
+BANCO_PADRAO = 'db/carga_sintetica.duckdb'
+SEMENTE_PADRAO = 42
+PERCENTIS = (50, 95, 99)
+
+# Peso padrão de cada dashboard no sorteio das sessões
+MIX_PADRAO = {
+    'streamlit_app': 1,
+    'saev_streamlit': 1,
+    'saev_streamlit2': 1,
+    'saev_rankings': 1,
+    'dashboard_leitura': 1,
+}
+
+# Respostas brutas no formato dos CSVs (tabela avaliacao). Todo sorteio usa
+# HASH(semente, ...): a mesma semente gera o mesmo banco.
+SQL_AVALIACAO_SINTETICA = """
+INSERT INTO avaliacao
+WITH alunos AS (
+    SELECT
+        i AS ALU_ID,
+        (HASH({semente}, 'escola', i) % {escolas})::BIGINT AS esc,
+        1 + (HASH({semente}, 'serie', i) % 9)::BIGINT AS ser,
+        (HASH({semente}, 'habilidade', i) % 61)::BIGINT AS habilidade
+    FROM range(1, {alunos} + 1) t(i)
+),
+alunos_escola AS (
+    SELECT
+        *,
+        esc % {municipios} AS mun,
+        (HASH({semente}, 'efeito_escola', esc) % 21)::BIGINT - 10 AS efeito_escola
+    FROM alunos
+),
+itens AS (
+    SELECT d.dis, a.ava, q.q
+    FROM (VALUES ('Matemática'), ('Língua Portuguesa')) d(dis),
+         (VALUES ('Diagnóstica'), ('Formativa I')) a(ava),
+         range(1, {questoes} + 1) q(q)
+)
+SELECT
+    'ES', 'Municipio ' || mun, LPAD((32000000 + esc)::VARCHAR, 8, '0'), 'Escola ' || esc,
+    ser, ser || 'º Ano', CASE WHEN ALU_ID % 2 = 0 THEN 'Manhã' ELSE 'Tarde' END, 'Turma A',
+    ALU_ID, 'Aluno ' || ALU_ID, NULL,
+    ava, 2025, dis, dis || ' - ' || ser || 'º Ano - ' || ava, q,
+    CHR(65 + ((HASH({semente}, 'alternativa', ALU_ID, q, ava) % 4)::BIGINT)::INT),
+    CASE WHEN (HASH({semente}, 'acerto', ALU_ID, q, dis, ava) % 100)::BIGINT
+              < 20 + habilidade + efeito_escola - 2 * q THEN 1 ELSE 0 END,
+    dis[1] || 'D' || LPAD((1 + q % 6)::VARCHAR, 2, '0'), 'Descritor ' || dis[1] || (1 + q % 6)
+FROM alunos_escola, itens
+UNION ALL
+SELECT
+    'ES', 'Municipio ' || mun, LPAD((32000000 + esc)::VARCHAR, 8, '0'), 'Escola ' || esc,
+    ser, ser || 'º Ano', 'Manhã', 'Turma A', ALU_ID, 'Aluno ' || ALU_ID, NULL,
+    ava, 2025, 'Leitura', 'Leitura - ' || ava, 1,
+    (['nao_leitor', 'silabas', 'palavras', 'frases', 'nao_fluente', 'fluente'])[
+        (1 + LEAST(5, habilidade // 15 + CASE WHEN ava = 'Formativa I' THEN 1 ELSE 0 END))::BIGINT
+    ],
+    0, NULL, NULL
+FROM alunos_escola, (VALUES ('Diagnóstica'), ('Formativa I')) a(ava)
+WHERE ser <= 3
+"""
+
+
+def gerar_banco_sintetico(caminho, alunos=20000, municipios=78, escolas=800,
+                          questoes=15, semente=SEMENTE_PADRAO):
+    """
+    Gera um banco sintético com a estrutura de produção, usando o ETL
+
+    Args:
+        caminho (str): Arquivo DuckDB a criar (substituído se existir)
+        alunos (int): Número de alunos
+        municipios (int): Número de municípios
+        escolas (int): Número de escolas (cada uma em um município)
+        questoes (int): Questões por teste de Matemática/Língua Portuguesa
+        semente (int): Semente dos sorteios
+    """
+    from saev_etl import SAEVETLFinal
+
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    pasta_raw = os.path.join(os.path.dirname(caminho) or '.', 'raw_sintetico')
+    etl = SAEVETLFinal(db_path=caminho, data_path=pasta_raw)
+
+    conn = duckdb.connect(caminho)
+    try:
+        etl.create_database_structure(conn)
+        conn.execute(SQL_AVALIACAO_SINTETICA.format(
+            alunos=int(alunos), municipios=int(municipios), escolas=int(escolas),
+            questoes=int(questoes), semente=int(semente),
+        ))
+        etl.create_star_schema(conn)
+        etl.create_derived_tables(conn)
+    except Exception:
+        # Não deixa um banco incompleto para a próxima execução reaproveitar
+        conn.close()
+        os.remove(caminho)
+        raise
+    conn.close()
+
+
+class Metricas:
+    """Latências por tipo de consulta, coletadas por todas as threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencias = defaultdict(list)
+        self._erros = defaultdict(int)
+        self._ultimo_erro = {}
+        self.sessoes = 0
+
+    def registrar(self, tipo, duracao, erro=None):
+        with self._lock:
+            if erro is None:
+                self._latencias[tipo].append(duracao)
+            else:
+                self._erros[tipo] += 1
+                self._ultimo_erro[tipo] = f"{type(erro).__name__}: {erro}"[:300]
+
+    def sessao_concluida(self):
+        with self._lock:
+            self.sessoes += 1
+
+    def relatorio(self, duracao_total):
+        """Resumo por tipo: contagem, erros, vazão e percentis (ms)"""
+        with self._lock:
+            tipos = sorted(set(self._latencias) | set(self._erros))
+            por_tipo = {}
+            for tipo in tipos:
+                latencias = np.array(self._latencias.get(tipo, [])) * 1000
+                resumo = {
+                    'consultas': len(latencias),
+                    'erros': self._erros.get(tipo, 0),
+                    'vazao_por_s': round(len(latencias) / duracao_total, 2),
+                }
+                if tipo in self._ultimo_erro:
+                    resumo['ultimo_erro'] = self._ultimo_erro[tipo]
+                if len(latencias):
+                    resumo['media_ms'] = round(float(latencias.mean()), 1)
+                    for p, valor in zip(PERCENTIS, np.percentile(latencias, PERCENTIS)):
+                        resumo[f'p{p}_ms'] = round(float(valor), 1)
+                por_tipo[tipo] = resumo
+
+            total = sum(len(v) for v in self._latencias.values())
+            return {
+                'duracao_s': round(duracao_total, 2),
+                'sessoes': self.sessoes,
+                'consultas': total,
+                'erros': sum(self._erros.values()),
+                'vazao_por_s': round(total / duracao_total, 2),
+                'por_tipo': por_tipo,
+            }
+
+
+class Sessao:
+    """Um usuário simulado: sorteios, pausas e medição das interações"""
+
+    def __init__(self, usuario, rng, catalogo, metricas, pausa, sem_cache):
+        self.usuario = usuario
+        self.rng = rng
+        self.catalogo = catalogo
+        self.metricas = metricas
+        self.pausa = pausa
+        self.sem_cache = sem_cache
+
+    def medir(self, tipo, funcao, *args):
+        """Executa uma interação e registra sua latência"""
+        if self.sem_cache:
+            funcao = getattr(funcao, '__wrapped__', funcao)
+        inicio = time.perf_counter()
+        try:
+            resultado = funcao(*args)
+        except Exception as erro:
+            self.metricas.registrar(tipo, time.perf_counter() - inicio, erro)
+            return None
+        self.metricas.registrar(tipo, time.perf_counter() - inicio)
+        return resultado
+
+    def pausar(self):
+        """Tempo de leitura da tela entre interações (exponencial)"""
+        if self.pausa > 0:
+            time.sleep(self.rng.expovariate(1 / self.pausa))
+
+    def sortear(self, coluna, quantidade=1, filtro=None):
+        """Sorteia valores distintos de uma coluna do catálogo"""
+        catalogo = self.catalogo if filtro is None else self.catalogo[filtro(self.catalogo)]
+        valores = sorted(catalogo[coluna].dropna().unique().tolist(), key=str)
+        if not valores:
+            return []
+        return self.rng.sample(valores, min(quantidade, len(valores)))
+
+
+def _sem_leitura(catalogo):
+    return catalogo['DIS_NOME'] != 'Leitura'
+
+
+def roteiro_galeria(sessao):
+    """streamlit_app.py: filtros por ano/município, painéis e refinamento"""
+    import streamlit_app as app
+    from orcamento_memoria import controle_memoria
+
+    filtros = {
+        'anos': sessao.sortear('AVA_ANO'),
+        # Algumas sessões pedem "Todos" os municípios (o caso mais caro)
+        'municipios': (sessao.sortear('MUN_NOME', 10_000) if sessao.rng.random() < 0.05
+                       else sessao.sortear('MUN_NOME', sessao.rng.randint(1, 3))),
+        'escolas': [], 'disciplinas': [], 'series': [], 'testes': [],
+    }
+    for refinamento in range(2):
+        estimativa = sessao.medir('galeria.estimativa', app.estimar_tamanho_dados, filtros)
+        if estimativa and estimativa[1] > controle_memoria.orcamento_sessao:
+            sessao.medir('galeria.resumo_agregado', app.carregar_resumo_agregado, filtros)
+        else:
+            sessao.medir('galeria.dados_filtrados', app.carregar_dados_filtrados, filtros)
+            sessao.pausar()
+            aba = sessao.rng.choice(['box', 'escolas', 'descritores'])
+            if aba == 'box':
+                sessao.medir('galeria.box_disciplina', app.carregar_box_disciplina, filtros)
+            elif aba == 'escolas':
+                sessao.medir('galeria.amostra_escolas', app.carregar_amostra_escolas, filtros)
+            else:
+                sessao.medir('galeria.histograma', app.carregar_histograma_descritores, filtros)
+        sessao.pausar()
+        filtros = dict(filtros, disciplinas=sessao.sortear('DIS_NOME', filtro=_sem_leitura))
+
+
+def roteiro_principal(sessao):
+    """saev_streamlit.py: painel sem filtros (uma varredura agregada)"""
+    import saev_streamlit as app
+
+    sessao.medir('principal.agregados', app.carregar_dados_principais)
+    sessao.pausar()
+
+
+def roteiro_filtros(sessao):
+    """saev_streamlit2.py: o usuário ajusta filtros algumas vezes"""
+    import saev_streamlit2 as app
+
+    municipios = sessao.sortear('MUN_NOME', sessao.rng.randint(1, 3))
+    disciplinas, series, testes = [], [], []
+    for _ in range(sessao.rng.randint(2, 4)):
+        sessao.medir('filtros.agregados', app.load_dashboard_data,
+                     municipios, disciplinas, series, testes)
+        sessao.pausar()
+        mudanca = sessao.rng.choice(['municipio', 'disciplina', 'serie'])
+        if mudanca == 'municipio':
+            municipios = sessao.sortear('MUN_NOME', sessao.rng.randint(1, 3))
+        elif mudanca == 'disciplina':
+            disciplinas = sessao.sortear('DIS_NOME', filtro=_sem_leitura)
+        else:
+            series = sessao.sortear('SER_NOME')
+
+
+def _paginar(sessao, tipo, consultar, fonte, params, ordenacoes, chave_unica, paginas):
+    """Primeira página, contagem e algumas páginas seguintes (keyset)"""
+    from tabela_paginada import (
+        TAMANHO_PAGINA_PADRAO, cursor_da_linha, montar_consulta_contagem, montar_consulta_pagina
+    )
+
+    ordem = ordenacoes[sessao.rng.choice(list(ordenacoes))]
+    sql, params_contagem = montar_consulta_contagem(fonte)
+    sessao.medir(f'{tipo}.contagem', consultar, sql, params + params_contagem)
+
+    cursor = None
+    for _ in range(paginas):
+        sql, params_pagina = montar_consulta_pagina(fonte, ordem, chave_unica, cursor)
+        pagina = sessao.medir(f'{tipo}.pagina', consultar, sql, params + params_pagina)
+        if pagina is None or len(pagina) <= TAMANHO_PAGINA_PADRAO:
+            break
+        cursor = cursor_da_linha(pagina.iloc[TAMANHO_PAGINA_PADRAO - 1], ordem, chave_unica)
+        sessao.pausar()
+
+
+def roteiro_rankings(sessao):
+    """saev_rankings.py: disciplina/teste, tops e listagens paginadas"""
+    import saev_rankings as app
+
+    combinacoes = sessao.catalogo.loc[_sem_leitura(sessao.catalogo), ['DIS_NOME', 'TES_NOME']]
+    disciplina, teste = combinacoes.drop_duplicates().sample(
+        1, random_state=sessao.rng.randrange(2**32)
+    ).iloc[0]
+
+    sessao.medir('rankings.estatisticas', app.get_estatisticas_gerais, disciplina, teste)
+    sessao.medir('rankings.top_alunos', app.get_ranking_alunos, disciplina, teste, 50)
+    sessao.medir('rankings.top_escolas', app.get_ranking_escolas, disciplina, teste, 10)
+    sessao.pausar()
+
+    materializados = app.usar_rankings_materializados()
+    if sessao.rng.random() < 0.5:
+        fonte = app.FONTE_ALUNOS_MATERIALIZADA if materializados else app.FONTE_ALUNOS_AGREGADA
+        _paginar(sessao, 'rankings.alunos', app.consultar_ranking, fonte, [disciplina, teste],
+                 app.ORDENACOES_ALUNOS, ['posicao'], sessao.rng.randint(1, 4))
+    else:
+        fonte = app.FONTE_ESCOLAS_MATERIALIZADA if materializados else app.FONTE_ESCOLAS_AGREGADA
+        _paginar(sessao, 'rankings.escolas', app.consultar_ranking, fonte, [disciplina, teste],
+                 app.ORDENACOES_ESCOLAS, ['posicao'], sessao.rng.randint(1, 3))
+
+
+def roteiro_leitura(sessao):
+    """dashboard_leitura.py: agregados de Leitura e ranking paginado por filtros"""
+    import dashboard_leitura as app
+    from duckdb_concurrent_solution import safe_dataframe
+
+    leitura = lambda c: c['DIS_NOME'] == 'Leitura'
+    municipios = sessao.sortear('MUN_NOME', filtro=leitura) if sessao.rng.random() < 0.7 else []
+    series = sessao.sortear('SER_NOME', filtro=leitura) if sessao.rng.random() < 0.5 else []
+    municipio = municipios[0] if municipios else 'Todos'
+    serie = series[0] if series else 'Todas'
+
+    sessao.medir('leitura.agregados', app.carregar_agregados_leitura, municipio, serie, 'Todas')
+    sessao.pausar()
+
+    where_clause, params = app.filtros_leitura(municipio, serie, 'Todas')
+    _paginar(sessao, 'leitura.ranking', safe_dataframe,
+             app.SQL_RANKING_LEITURA.format(where_clause=where_clause), params,
+             app.ORDENACOES_RANKING_LEITURA, ['ALU_ID', 'ESC_NOME', 'MUN_NOME', 'SER_NOME'],
+             sessao.rng.randint(1, 3))
+
+
+ROTEIROS = {
+    'streamlit_app': roteiro_galeria,
+    'saev_streamlit': roteiro_principal,
+    'saev_streamlit2': roteiro_filtros,
+    'saev_rankings': roteiro_rankings,
+    'dashboard_leitura': roteiro_leitura,
+}
+
+
+def _preparar_dashboards():
+    """Importa os dashboards fora do servidor Streamlit (modo bare)"""
+    from streamlit import config
+    from streamlit.logger import set_log_level
+
+    # Os apps chamam st.* no nível do módulo; fora do servidor isso só gera
+    # avisos. A configuração é lida antes para não restaurar o nível "info".
+    config.get_option('logger.level')
+    set_log_level('error')
+    for nome in ('streamlit_app', 'saev_streamlit', 'saev_streamlit2', 'saev_rankings',
+                 'dashboard_leitura'):
+        __import__(nome)
+    from saev_recursos import catalogo_filtros
+    return catalogo_filtros()
+
+
+def executar_carga(usuarios, duracao, mix=None, pausa=1.0, rampa=0.0, sem_cache=False,
+                   semente=SEMENTE_PADRAO):
+    """
+    Executa a carga com usuários simultâneos (threads) por ``duracao`` segundos
+
+    O banco usado é o de SAEV_BANCO (defina antes de chamar).
+
+    Args:
+        usuarios (int): Usuários simultâneos
+        duracao (float): Duração da carga em segundos
+        mix (dict): Dashboard -> peso no sorteio das sessões
+        pausa (float): Pausa média entre interações, em segundos
+        rampa (float): Intervalo para iniciar todos os usuários
+        sem_cache (bool): Ignora os caches do Streamlit (custo do banco)
+        semente (int): Semente dos sorteios dos usuários
+
+    Returns:
+        dict: Relatório (ver ``Metricas.relatorio``)
+    """
+    mix = mix or MIX_PADRAO
+    dashboards = list(mix)
+    pesos = [mix[d] for d in dashboards]
+    catalogo = _preparar_dashboards()
+    metricas = Metricas()
+    fim = time.monotonic() + rampa + duracao
+
+    def usuario(indice):
+        rng = random.Random(semente * 100_003 + indice)
+        time.sleep(rampa * indice / max(usuarios, 1))
+        while time.monotonic() < fim:
+            dashboard = rng.choices(dashboards, weights=pesos)[0]
+            ROTEIROS[dashboard](Sessao(indice, rng, catalogo, metricas, pausa, sem_cache))
+            metricas.sessao_concluida()
+
+    inicio = time.monotonic()
+    threads = [threading.Thread(target=usuario, args=(i,), name=f'saev-usuario-{i}', daemon=True)
+               for i in range(usuarios)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return metricas.relatorio(time.monotonic() - inicio)
+
+
+def _ler_mix(texto):
+    """Converte 'saev_rankings=3,dashboard_leitura=1' em dicionário"""
+    mix = {}
+    for item in texto.split(','):
+        nome, _, peso = item.partition('=')
+        nome = nome.strip()
+        if nome not in ROTEIROS:
+            raise argparse.ArgumentTypeError(f"Dashboard desconhecido: {nome}")
+        mix[nome] = float(peso or 1)
+    return mix
+
+
+def imprimir_relatorio(relatorio):
+    """Tabela de latências por tipo de consulta"""
+    print(f"\n📊 {relatorio['consultas']:,} consultas em {relatorio['duracao_s']:.1f}s "
+          f"({relatorio['vazao_por_s']:.1f}/s), {relatorio['sessoes']:,} sessões, "
+          f"{relatorio['erros']} erros")
+    print(f"\n{'Tipo de consulta':<28} {'n':>7} {'erros':>6} {'/s':>7} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print("-" * 80)
+    for tipo, resumo in relatorio['por_tipo'].items():
+        print(f"{tipo:<28} {resumo['consultas']:>7} {resumo['erros']:>6} "
+              f"{resumo['vazao_por_s']:>7.2f} {resumo.get('p50_ms', 0):>9.1f} "
+              f"{resumo.get('p95_ms', 0):>9.1f} {resumo.get('p99_ms', 0):>9.1f}")
+    for tipo, resumo in relatorio['por_tipo'].items():
+        if 'ultimo_erro' in resumo:
+            print(f"❌ {tipo}: {resumo['ultimo_erro']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga dos dashboards SAEV")
+    parser.add_argument('--banco', default=BANCO_PADRAO, help="Banco sintético")
+    parser.add_argument('--recriar', action='store_true', help="Gera o banco mesmo se existir")
+    parser.add_argument('--alunos', type=int, default=20000, help="Alunos do banco sintético")
+    parser.add_argument('--municipios', type=int, default=78, help="Municípios do banco sintético")
+    parser.add_argument('--escolas', type=int, default=800, help="Escolas do banco sintético")
+    parser.add_argument('--semente', type=int, default=SEMENTE_PADRAO, help="Semente dos sorteios")
+    parser.add_argument('--usuarios', type=int, default=10, help="Usuários simultâneos")
+    parser.add_argument('--duracao', type=float, default=30, help="Duração da carga (s)")
+    parser.add_argument('--pausa', type=float, default=1.0, help="Pausa média entre interações (s)")
+    parser.add_argument('--rampa', type=float, default=0.0, help="Tempo para iniciar todos os usuários (s)")
+    parser.add_argument('--mix', type=_ler_mix, help="Pesos dos dashboards (ex.: saev_rankings=3,dashboard_leitura=1)")
+    parser.add_argument('--sem-cache', action='store_true', help="Ignora os caches do Streamlit")
+    parser.add_argument('--saida', help="Arquivo JSON com o relatório")
+    args = parser.parse_args()
+
+    print("🧪 TESTE DE CARGA DOS DASHBOARDS SAEV")
+    print("=" * 40)
+    if args.recriar or not os.path.exists(args.banco):
+        print(f"🏗️ Gerando banco sintético ({args.alunos:,} alunos, semente {args.semente})...")
+        inicio = time.perf_counter()
+        gerar_banco_sintetico(args.banco, args.alunos, args.municipios, args.escolas,
+                              semente=args.semente)
+        print(f"✅ Banco gerado em {time.perf_counter() - inicio:.1f}s: {args.banco}")
+
+    # Precisa ser definido antes de importar os dashboards (saev_recursos)
+    os.environ['SAEV_BANCO'] = args.banco
+
+    print(f"🚀 {args.usuarios} usuários por {args.duracao:.0f}s "
+          f"(pausa média {args.pausa}s{', sem cache' if args.sem_cache else ''})...")
+    relatorio = executar_carga(args.usuarios, args.duracao, args.mix, args.pausa, args.rampa,
+                               args.sem_cache, args.semente)
+    imprimir_relatorio(relatorio)
+
+    if args.saida:
+        relatorio['parametros'] = {k: v for k, v in vars(args).items()}
+        relatorio['gerado_em'] = datetime.now().isoformat(timespec='seconds')
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+        print(f"\n💾 Relatório salvo em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
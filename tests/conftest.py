@@ -0,0 +1,53 @@
+"""
+Configuração comum dos testes SAEV
+
+Os módulos do projeto ficam na raiz do repositório (sem pacote), por isso a
+raiz é colocada no ``sys.path``. O fixture ``banco`` cria um banco DuckDB
+pequeno, com a tabela fato e a dimensão de descritores usadas pelas páginas.
+"""
+
+import os
+import sys
+
+import duckdb
+import numpy as np
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+MUNICIPIOS = ['Serra', 'Vitória', 'Vila Velha']
+SERIES = ['1º Ano', '2º Ano']
+DISCIPLINAS = ['Matemática', 'Língua Portuguesa']
+DESCRITORES = ['D01', 'D02', 'D03']
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Conexão com um banco sintético (fato_resposta_aluno e dim_descritor)"""
+    rng = np.random.default_rng(7)
+    linhas = []
+    for aluno in range(60):
+        municipio = MUNICIPIOS[aluno % len(MUNICIPIOS)]
+        serie = SERIES[aluno % len(SERIES)]
+        escola = 3200000 + aluno % 6
+        for disciplina in DISCIPLINAS:
+            for descritor in DESCRITORES:
+                acerto = int(rng.random() < 0.6)
+                linhas.append((2025, municipio, escola, f"Escola {escola}", serie, disciplina,
+                               f"{disciplina} - {serie}", descritor, aluno, acerto, 1 - acerto))
+
+    conn = duckdb.connect(str(tmp_path / "saev.duckdb"))
+    conn.execute("""
+    CREATE TABLE fato_resposta_aluno (
+        AVA_ANO INTEGER, MUN_NOME VARCHAR, ESC_INEP BIGINT, ESC_NOME VARCHAR,
+        SER_NOME VARCHAR, DIS_NOME VARCHAR, TES_NOME VARCHAR, MTI_CODIGO VARCHAR,
+        ALU_ID INTEGER, ACERTO INTEGER, ERRO INTEGER
+    )""")
+    conn.executemany("INSERT INTO fato_resposta_aluno VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", linhas)
+    conn.execute("CREATE TABLE dim_descritor (MTI_CODIGO VARCHAR PRIMARY KEY, MTI_DESCRITOR VARCHAR)")
+    conn.executemany("INSERT INTO dim_descritor VALUES (?, ?)",
+                     [(codigo, f"Descritor {codigo}") for codigo in DESCRITORES[:-1]])
+    yield conn
+    conn.close()
@@ -0,0 +1,75 @@
+"""Testes da captura de consultas lentas (consultas_lentas.py)"""
+
+import threading
+import time
+
+import saev_query
+import saev_recursos
+from consultas_lentas import CapturaConsultasLentas, ler_capturas
+
+
+class CapturaAposFechamento(CapturaConsultasLentas):
+    """Só inicia a captura depois do sinal ``fechado``
+
+    Reproduz o caso das páginas em que o EXPLAIN ANALYZE começa quando o
+    cursor da consulta já foi fechado.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.fechado = threading.Event()
+
+    def _capturar(self, cursor, contexto):
+        self.fechado.wait(30)
+        super()._capturar(cursor, contexto)
+
+
+def _esperar_conclusao(captura, espera_max_s=30.0):
+    limite = time.monotonic() + espera_max_s
+    while time.monotonic() < limite:
+        stats = captura.get_stats()
+        if stats['capturadas'] + stats['falhas']:
+            return stats
+        time.sleep(0.05)
+    return captura.get_stats()
+
+
+def test_captura_com_cursor_fechado(banco, tmp_path, monkeypatch):
+    """Consulta lenta em cursor de ``nova_conexao`` gera um perfil gravado"""
+    captura = CapturaAposFechamento(limiar_ms=1e-6, intervalo_impressao=0.0,
+                                    intervalo_global=0.0, arquivo=str(tmp_path / "lentas.jsonl"))
+    monkeypatch.setattr(saev_query, 'avaliar_consulta_lenta', captura.avaliar)
+    monkeypatch.setattr(saev_recursos, '_conexao_base', banco)
+
+    conn = saev_recursos.nova_conexao()
+    try:
+        saev_query.consultar(conn, "SELECT COUNT(*) FROM fato_resposta_aluno WHERE DIS_NOME = ?",
+                             ['Matemática'])
+    finally:
+        conn.close()
+        captura.fechado.set()
+
+    stats = _esperar_conclusao(captura)
+    assert stats['capturadas'] == 1 and stats['falhas'] == 0, stats
+    capturas = ler_capturas(captura.arquivo)
+    assert len(capturas) == 1
+    assert capturas[0]['params'] == ['Matemática']
+    assert capturas[0]['operadores']
+
+
+def test_limite_por_impressao(banco, tmp_path):
+    """A mesma consulta não é capturada de novo dentro do intervalo"""
+    captura = CapturaConsultasLentas(limiar_ms=1e-6, intervalo_impressao=600.0,
+                                     intervalo_global=0.0, arquivo=str(tmp_path / "lentas.jsonl"))
+    sql = "SELECT COUNT(*) FROM fato_resposta_aluno"
+
+    assert captura.avaliar(banco, sql, None, 1.0)
+    _esperar_conclusao(captura)
+    assert not captura.avaliar(banco, sql, None, 1.0)
+    assert captura.get_stats()['limitadas'] == 1
+
+
+def test_abaixo_do_limiar(banco, tmp_path):
+    captura = CapturaConsultasLentas(limiar_ms=1000, arquivo=str(tmp_path / "lentas.jsonl"))
+    assert not captura.avaliar(banco, "SELECT 1", None, 0.5)
+    assert captura.get_stats()['lentas'] == 0
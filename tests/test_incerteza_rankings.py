@@ -0,0 +1,51 @@
+"""Testes dos intervalos bootstrap dos rankings (incerteza_rankings.py)"""
+
+import numpy as np
+
+from incerteza_rankings import bootstrap_unidades, formatar_faixa_posicao
+
+# Taxas verdadeiras bem separadas, exceto as duas últimas unidades (empatadas)
+TAXAS = [0.8, 0.6, 0.4, 0.3, 0.3]
+ALUNOS_POR_UNIDADE = [40, 40, 40, 40, 3]
+
+
+def _dados(semente=11):
+    rng = np.random.default_rng(semente)
+    unidade = np.repeat(np.arange(len(TAXAS)), ALUNOS_POR_UNIDADE)
+    questoes = np.full(len(unidade), 20)
+    acertos = rng.binomial(questoes, np.array(TAXAS)[unidade])
+    return unidade, acertos, questoes
+
+
+def test_intervalos_contem_estimativa_pontual():
+    unidade, acertos, questoes = _dados()
+    resultado = bootstrap_unidades(unidade, acertos, questoes, minimos=(5, 50), replicas=500, semente=42)
+
+    np.testing.assert_array_equal(resultado['alunos'], ALUNOS_POR_UNIDADE)
+    taxa = np.bincount(unidade, acertos) / np.bincount(unidade, questoes) * 100
+    np.testing.assert_allclose(resultado['taxa'], taxa)
+    assert (resultado['taxa_ic_inf'] <= resultado['taxa']).all()
+    assert (resultado['taxa'] <= resultado['taxa_ic_sup']).all()
+    assert (resultado['erro_padrao'] > 0).all()
+
+
+def test_faixa_de_posicao_so_para_elegiveis():
+    unidade, acertos, questoes = _dados()
+    resultado = bootstrap_unidades(unidade, acertos, questoes, minimos=(5, 50), replicas=500, semente=42)
+
+    # A unidade com 3 alunos fica fora da faixa de posições
+    np.testing.assert_array_equal(resultado['elegivel'], [True, True, True, True, False])
+    assert np.isnan(resultado['posicao_ic_melhor'][4]) and np.isnan(resultado['posicao_ic_pior'][4])
+    melhor, pior = resultado['posicao_ic_melhor'][:4], resultado['posicao_ic_pior'][:4]
+    assert (melhor <= pior).all()
+    # Taxas bem separadas: a primeira unidade é sempre a 1ª
+    assert (melhor[0], pior[0]) == (1, 1)
+    assert formatar_faixa_posicao(melhor[0], pior[0]) == "1º"
+
+
+def test_semente_fixa_reproduz_resultado():
+    unidade, acertos, questoes = _dados()
+    a = bootstrap_unidades(unidade, acertos, questoes, minimos=(5, 50), replicas=200, semente=7)
+    b = bootstrap_unidades(unidade, acertos, questoes, minimos=(5, 50), replicas=200, semente=7)
+    for chave in a:
+        np.testing.assert_array_equal(a[chave], b[chave])
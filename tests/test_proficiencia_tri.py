@@ -0,0 +1,74 @@
+"""Testes da calibração TRI (proficiencia_tri.py): recuperação de parâmetros simulados"""
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from proficiencia_tri import calibrar, estimar_theta, matrizes_esparsas
+
+ALUNOS = 3000
+DIFICULDADES = np.linspace(-1.5, 1.5, 12)
+
+
+def _simular(discriminacao, semente=2026):
+    """Respostas 0/1 de alunos com theta ~ N(0, 1), todos os itens respondidos"""
+    rng = np.random.default_rng(semente)
+    theta = rng.normal(0, 1, ALUNOS)
+    p = 1 / (1 + np.exp(-discriminacao * (theta[:, None] - DIFICULDADES)))
+    acertos = (rng.random(p.shape) < p).astype(np.float64)
+    return theta, sparse.csr_matrix(np.ones_like(acertos)), sparse.csr_matrix(acertos)
+
+
+def test_rasch_recupera_dificuldades():
+    theta, respondidos, corretos = _simular(np.ones(len(DIFICULDADES)))
+    calibracao = calibrar(respondidos, corretos, 'rasch')
+
+    assert calibracao['convergiu']
+    np.testing.assert_allclose(calibracao['dificuldade'], DIFICULDADES, atol=0.15)
+    np.testing.assert_array_equal(calibracao['discriminacao'], 1.0)
+    assert calibracao['desvio'] == pytest.approx(1.0, abs=0.1)
+
+    estimado, erro_padrao = estimar_theta(respondidos, corretos, calibracao)
+    assert np.corrcoef(estimado, theta)[0, 1] > 0.75
+    assert abs(estimado.mean()) < 0.05
+    assert (erro_padrao > 0).all()
+
+
+def test_2pl_recupera_dificuldades_e_discriminacoes():
+    discriminacao = np.tile([0.7, 1.2, 1.8], len(DIFICULDADES) // 3)
+    theta, respondidos, corretos = _simular(discriminacao)
+    calibracao = calibrar(respondidos, corretos, '2pl')
+
+    assert calibracao['convergiu']
+    np.testing.assert_allclose(calibracao['dificuldade'], DIFICULDADES, atol=0.3)
+    np.testing.assert_allclose(calibracao['discriminacao'], discriminacao, atol=0.3)
+    assert calibracao['desvio'] == 1.0
+
+    estimado, _ = estimar_theta(respondidos, corretos, calibracao)
+    assert np.corrcoef(estimado, theta)[0, 1] > 0.8
+
+
+def test_itens_nao_respondidos():
+    """Itens fora do caderno do aluno não contam como erro"""
+    rng = np.random.default_rng(1)
+    theta = rng.normal(0, 1, ALUNOS)
+    linhas, colunas, acertos = [], [], []
+    for aluno in range(ALUNOS):
+        # Dois cadernos com metade dos itens cada
+        for item in range(aluno % 2, len(DIFICULDADES), 2):
+            linhas.append(aluno)
+            colunas.append(item)
+            p = 1 / (1 + np.exp(-(theta[aluno] - DIFICULDADES[item])))
+            acertos.append(int(rng.random() < p))
+    respondidos, corretos = matrizes_esparsas(np.array(linhas), np.array(colunas), np.array(acertos),
+                                              (ALUNOS, len(DIFICULDADES)))
+    calibracao = calibrar(respondidos, corretos, 'rasch')
+
+    assert calibracao['respostas'].tolist() == [ALUNOS // 2] * len(DIFICULDADES)
+    np.testing.assert_allclose(calibracao['dificuldade'], DIFICULDADES, atol=0.2)
+
+
+def test_modelo_desconhecido():
+    _, respondidos, corretos = _simular(np.ones(len(DIFICULDADES)))
+    with pytest.raises(ValueError):
+        calibrar(respondidos, corretos, '3pl')
@@ -0,0 +1,84 @@
+"""Testes da análise clássica de itens (psicometria_itens.py)"""
+
+import duckdb
+import numpy as np
+import pytest
+
+from psicometria_itens import analisar_teste, fluxo_testes, matrizes_teste
+
+# 4 alunos × 3 itens (gabaritos A, B e C); o aluno 4 deixou o item 3 em branco
+ACERTOS = np.array([
+    [1, 1, 1],   # escore 3
+    [1, 1, 0],   # escore 2
+    [1, 0, 0],   # escore 1
+    [0, 0, 0],   # escore 0
+], dtype=np.int8)
+ALTERNATIVAS = np.array([
+    [1, 2, 3],
+    [1, 2, 4],
+    [1, 3, 1],
+    [2, 1, 0],
+], dtype=np.int8)
+
+
+def test_estatisticas_calculadas_a_mao():
+    presenca = np.ones_like(ACERTOS, dtype=bool)
+    teste, itens, (contagem, soma_escore, gabarito) = analisar_teste(ACERTOS, ALTERNATIVAS, presenca)
+
+    np.testing.assert_allclose(itens['P_VALOR'], [3 / 4, 2 / 4, 1 / 4])
+    # Item 1: x = [1,1,1,0], resto = [2,1,0,0] -> cov 3/16, var(resto) 11/16
+    #   r = (3/16) / sqrt(3/16 · 11/16) = sqrt(3/11)
+    # Item 2: x = [1,1,0,0], resto = [2,1,1,0] -> cov 1/4, var(resto) 1/2
+    #   r = (1/4) / sqrt(1/4 · 1/2) = sqrt(1/2)
+    np.testing.assert_allclose(itens['PONTO_BISSERIAL'],
+                               [np.sqrt(3 / 11), np.sqrt(1 / 2), np.sqrt(3 / 11)])
+    # Variâncias dos itens 3/16 + 1/4 + 3/16 = 5/8; do escore [3,2,1,0] = 5/4
+    #   alfa = 3/2 · (1 - (5/8) / (5/4)) = 3/4
+    assert teste['ALFA_CRONBACH'] == pytest.approx(0.75)
+    # Sem o item 1: 2 · (1 - (7/16) / (11/16)) = 8/11; sem o item 2: 2 · (1 - 3/4) = 1/2
+    np.testing.assert_allclose(itens['ALFA_SEM_ITEM'], [8 / 11, 1 / 2, 8 / 11])
+    assert teste['MEDIA_ESCORE'] == pytest.approx(1.5)
+
+    assert list(itens['GABARITO']) == ['A', 'B', 'C']
+    np.testing.assert_array_equal(gabarito, [1, 2, 3])
+    # Branco (código 0) do item 3 contado como alternativa própria, escore 0
+    np.testing.assert_array_equal(contagem[2], [1, 1, 0, 1, 1, 0])
+    np.testing.assert_array_equal(soma_escore[2], [0, 1, 0, 3, 2, 0])
+
+
+def test_item_nao_apresentado_fica_fora_do_p_valor():
+    presenca = np.ones_like(ACERTOS, dtype=bool)
+    presenca[3, 2] = False
+    _, itens, (contagem, _, _) = analisar_teste(ACERTOS, ALTERNATIVAS, presenca)
+
+    np.testing.assert_array_equal(itens['N_RESPOSTAS'], [4, 4, 3])
+    assert itens['P_VALOR'][2] == pytest.approx(1 / 3)
+    # Item 3 entre os alunos 1-3: x = [1,0,0], resto = [2,2,1]
+    #   cov 1/9, var(resto) 2/9, p(1-p) 2/9 -> r = 1/2
+    assert itens['PONTO_BISSERIAL'][2] == pytest.approx(0.5)
+    assert contagem[2, 0] == 0
+
+
+def test_resposta_em_branco_codificada_como_zero():
+    """Branco, nulo e inválido viram 0; minúsculas são aceitas"""
+    conn = duckdb.connect()
+    conn.execute("""
+    CREATE TABLE avaliacao AS SELECT * FROM (VALUES
+        ('T1', 1, 1, 1, 'A', 'Matemática'),
+        ('T1', 1, 2, 0, '', 'Matemática'),
+        ('T1', 2, 1, 0, 'e', 'Matemática'),
+        ('T1', 2, 2, 0, NULL, 'Matemática'),
+        ('T1', 3, 1, 0, 'X', 'Matemática'),
+        ('T1', 3, 2, 1, 'B', 'Matemática'),
+        ('T2', 1, 1, 1, 'C', 'Leitura')
+    ) t(TES_NOME, ALU_ID, TEG_ORDEM, ATR_CERTO, ATR_RESPOSTA, DIS_NOME)
+    """)
+    testes = list(fluxo_testes(conn))
+    conn.close()
+
+    assert [nome for nome, _ in testes] == ['T1']
+    ordens, acertos, alternativas, presenca = matrizes_teste(testes[0][1])
+    np.testing.assert_array_equal(ordens, [1, 2])
+    np.testing.assert_array_equal(alternativas, [[1, 0], [5, 0], [0, 2]])
+    np.testing.assert_array_equal(acertos, [[1, 0], [0, 0], [0, 1]])
+    assert presenca.all()
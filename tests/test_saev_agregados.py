@@ -0,0 +1,91 @@
+"""Testes da camada de agregados (saev_agregados.py)"""
+
+import pandas as pd
+import pytest
+
+from saev_agregados import JUNCAO_DESCRITOR, Agregado, carregar_agregados, compilar_consulta
+from saev_query import construir_where
+
+AGREGADOS = [
+    Agregado('metricas', {}, ['total_alunos', 'total_escolas', 'taxa_acerto']),
+    Agregado('por_municipio', {'municipio': 'f.MUN_NOME'}, ['total_alunos', 'taxa_acerto'],
+             ordem=[('taxa_acerto', False), ('municipio', True)], limite=2),
+    Agregado('por_serie', {'serie': 'f.SER_NOME', 'disciplina': 'f.DIS_NOME'},
+             ['acertos', 'erros'], ordem=[('serie', True), ('disciplina', True)]),
+    Agregado('por_descritor', {'codigo': 'f.MTI_CODIGO', 'descritor': 'd.MTI_DESCRITOR'},
+             ['total_questoes', 'erros'], minimo=('total_questoes', 50),
+             ordem=[('codigo', True)], excluir_nulos=True),
+]
+
+# As mesmas agregações, uma consulta GROUP BY por gráfico
+SEPARADAS = {
+    'metricas': """
+        SELECT COUNT(DISTINCT f.ALU_ID) AS total_alunos, COUNT(DISTINCT f.ESC_INEP) AS total_escolas,
+            ROUND(100.0 * SUM(f.ACERTO) / SUM(f.ACERTO + f.ERRO), 2) AS taxa_acerto
+        FROM fato_resposta_aluno f {juncoes} WHERE {where}
+    """,
+    'por_municipio': """
+        SELECT f.MUN_NOME AS municipio, COUNT(DISTINCT f.ALU_ID) AS total_alunos,
+            ROUND(100.0 * SUM(f.ACERTO) / SUM(f.ACERTO + f.ERRO), 2) AS taxa_acerto
+        FROM fato_resposta_aluno f {juncoes} WHERE {where}
+        GROUP BY f.MUN_NOME ORDER BY taxa_acerto DESC, municipio LIMIT 2
+    """,
+    'por_serie': """
+        SELECT f.SER_NOME AS serie, f.DIS_NOME AS disciplina, SUM(f.ACERTO) AS acertos,
+            SUM(f.ERRO) AS erros
+        FROM fato_resposta_aluno f {juncoes} WHERE {where}
+        GROUP BY f.SER_NOME, f.DIS_NOME ORDER BY serie, disciplina
+    """,
+    'por_descritor': """
+        SELECT f.MTI_CODIGO AS codigo, d.MTI_DESCRITOR AS descritor,
+            SUM(f.ACERTO + f.ERRO) AS total_questoes, SUM(f.ERRO) AS erros
+        FROM fato_resposta_aluno f JOIN dim_descritor d ON f.MTI_CODIGO = d.MTI_CODIGO
+        WHERE {where}
+        GROUP BY f.MTI_CODIGO, d.MTI_DESCRITOR HAVING total_questoes >= 50 ORDER BY codigo
+    """,
+}
+
+
+@pytest.mark.parametrize('filtros', [None, {'municipios': ['Serra', 'Vitória'], 'anos': 2025}])
+def test_grouping_sets_igual_a_consultas_separadas(banco, filtros):
+    where_clause, params = construir_where(filtros)
+    frames = carregar_agregados(banco, AGREGADOS, where_clause, params, JUNCAO_DESCRITOR)
+
+    assert list(frames) == [agregado.nome for agregado in AGREGADOS]
+    for nome, sql in SEPARADAS.items():
+        esperado = banco.execute(sql.format(where=where_clause, juncoes=JUNCAO_DESCRITOR),
+                                 params).df()
+        pd.testing.assert_frame_equal(frames[nome], esperado, check_dtype=False)
+
+
+def test_descritor_sem_dimensao_excluido(banco):
+    frames = carregar_agregados(banco, AGREGADOS, juncoes=JUNCAO_DESCRITOR)
+    # D03 não está em dim_descritor (equivalente ao INNER JOIN)
+    assert list(frames['por_descritor']['codigo']) == ['D01', 'D02']
+
+
+def test_conjuntos_normalizados():
+    """As mesmas dimensões em outra ordem compartilham um único conjunto"""
+    agregados = [
+        Agregado('a', {'s': 'f.SER_NOME', 'd': 'f.DIS_NOME'}, ['acertos']),
+        Agregado('b', {'d': 'f.DIS_NOME', 's': 'f.SER_NOME'}, ['erros']),
+    ]
+    sql, plano = compilar_consulta(agregados)
+    assert "GROUPING SETS ((f.DIS_NOME, f.SER_NOME))" in sql
+    assert len(plano) == 2
+
+
+def test_nulos_no_fim_em_ordem_decrescente(banco):
+    banco.execute("INSERT INTO fato_resposta_aluno VALUES "
+                  "(2025, 'Aracruz', 1, 'E', '1º Ano', 'Matemática', 'T', 'D01', 999, 0, 0)")
+    agregados = [Agregado('m', {'municipio': 'f.MUN_NOME'}, ['taxa_acerto'],
+                          ordem=[('taxa_acerto', False)])]
+    df = carregar_agregados(banco, agregados)['m']
+    # Aracruz não tem questões: taxa indefinida, último mesmo em ordem decrescente
+    assert df['municipio'].iloc[-1] == 'Aracruz'
+    assert df['taxa_acerto'].iloc[:-1].is_monotonic_decreasing
+
+
+def test_medida_desconhecida():
+    with pytest.raises(ValueError):
+        Agregado('x', {}, ['inexistente'])
@@ -0,0 +1,59 @@
+"""Testes do construtor de consultas (saev_query.py)"""
+
+from saev_query import chave_filtros, consultar, construir_where
+
+
+def test_construir_where_listas_e_escalares():
+    where_clause, params = construir_where({
+        'municipios': ['Vitória', 'Serra'],
+        'disciplinas': ['Matemática'],
+        'series': [],
+        'anos': 2025,
+        'testes': None,
+    })
+    # Ordem de COLUNAS_FILTRO; filtros vazios ou None são ignorados
+    assert where_clause == ("f.AVA_ANO = ? AND f.MUN_NOME IN (SELECT UNNEST(?)) "
+                            "AND f.DIS_NOME IN (SELECT UNNEST(?))")
+    assert params == [2025, ['Vitória', 'Serra'], ['Matemática']]
+
+
+def test_construir_where_texto_estavel():
+    """O texto depende de quais filtros estão ativos, não de quantos valores"""
+    um, _ = construir_where({'municipios': ['Serra']})
+    tres, params = construir_where({'municipios': ['Serra', 'Vitória', 'Vila Velha']})
+    assert um == tres
+    assert params == [['Serra', 'Vitória', 'Vila Velha']]
+
+
+def test_construir_where_sem_filtros():
+    assert construir_where(None) == ("1=1", [])
+    assert construir_where({'anos': [], 'municipios': None}) == ("1=1", [])
+
+
+def test_construir_where_alias_e_colunas():
+    colunas = {'escolas': 'e.ESC_NOME', 'anos': 'AVA_ANO'}
+    where_clause, params = construir_where({'escolas': ('A',), 'anos': 2024}, alias='', colunas=colunas)
+    assert where_clause == "e.ESC_NOME IN (SELECT UNNEST(?)) AND AVA_ANO = ?"
+    assert params == [['A'], 2024]
+
+
+def test_construir_where_executa(banco):
+    where_clause, params = construir_where({'municipios': ['Serra', 'Vitória'], 'anos': 2025})
+    resultado = consultar(banco, f"SELECT COUNT(*) FROM fato_resposta_aluno f WHERE {where_clause}",
+                          params)
+    esperado = banco.execute("SELECT COUNT(*) FROM fato_resposta_aluno "
+                             "WHERE MUN_NOME IN ('Serra', 'Vitória') AND AVA_ANO = 2025").fetchall()
+    assert resultado == esperado
+
+
+def test_chave_filtros_canonica():
+    a = chave_filtros({'municipios': ['Vitória', 'Serra'], 'anos': 2025})
+    b = chave_filtros({'anos': 2025, 'municipios': ('Serra', 'Vitória')})
+    assert a == b == (('anos', 2025), ('municipios', ('Serra', 'Vitória')))
+    assert hash(a) == hash(b)
+
+
+def test_chave_filtros_valores_mistos():
+    # Ordenação por str: valores de tipos diferentes não quebram a chave
+    assert chave_filtros({'escolas': [32000010, '32000002']}) == (('escolas', ('32000002', 32000010)),)
+    assert chave_filtros(None) == ()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Matrizes de transição de níveis de Leitura entre avaliações consecutivas
+
+Para ver como os alunos passam de um nível de leitura para outro (ex.: da
+Diagnóstica para a Formativa 1) era preciso cruzar o histórico de cada
+aluno consigo mesmo a cada consulta.
+
+O ETL passa a materializar as contagens de transição 6×6 (nível na
+avaliação de origem × nível na avaliação seguinte):
+- ``transicao_leitura_escola``: por (ano, par de avaliações, município,
+  escola, série, nível de origem, nível de destino)
+- ``transicao_leitura_municipio``: a mesma contagem somada por município
+
+Só as células com alunos são gravadas. Uma tela lê no máximo algumas
+centenas de células e completa a matriz 6×6 em memória.
+
+O nível do aluno em cada avaliação é o maior nível atingido nela. As
+avaliações de um ano são ordenadas pela Diagnóstica, depois pelas
+Formativas (pelo número no nome) e pelas demais. O aluno é contado na
+escola e na série da avaliação de origem.
+
+Autor: Sistema SAEV
+Data: 18/10/2026
+"""
+
+import numpy as np
+import pandas as pd
+
+from saev_query import consultar_df, construir_where
+from utils_leitura import NIVEIS_LEITURA, TABELA_NIVEIS
+
+TABELA_ESCOLA = "transicao_leitura_escola"
+TABELA_MUNICIPIO = "transicao_leitura_municipio"
+
+# Numerais romanos aceitos no fim do nome da avaliação (ex.: "Formativa II")
+NUMERAIS_ROMANOS = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
+
+# Ordem das avaliações dentro do ano:
+# 1. tipo: Diagnóstica -> Formativas -> demais
+# 2. número no fim do nome, em algarismos (1, 2...) ou romanos de I a X; os
+#    nomes sem número vêm antes dos numerados do mesmo tipo
+# 3. o próprio nome, como desempate (ex.: "Formativa 2" e "Formativa II")
+# O banco não tem data nem sequência das avaliações, só o nome.
+SQL_ORDEM_AVALIACAO = f"""
+    CASE
+        WHEN AVA_NOME ILIKE '%diagn%' THEN 0
+        WHEN AVA_NOME ILIKE '%formativa%' THEN 1
+        ELSE 2
+    END,
+    COALESCE(
+        TRY_CAST(regexp_extract(AVA_NOME, '(\\d+)\\s*$', 1) AS INTEGER),
+        CASE upper(regexp_extract(AVA_NOME, '\\s([IVXivx]+)\\s*$', 1))
+            {' '.join(f"WHEN '{romano}' THEN {numero}" for numero, romano in enumerate(NUMERAIS_ROMANOS, 1))}
+        END
+    ) NULLS FIRST,
+    AVA_NOME
+"""
+
+# Consulta usada pelo ETL para materializar as transições por escola
+SQL_TRANSICOES_ESCOLA = f"""
+WITH nivel_aluno AS (
+    SELECT
+        ALU_ID,
+        AVA_ANO,
+        AVA_NOME,
+        ARG_MAX(MUN_NOME, NIVEL_NUMERICO) AS MUN_NOME,
+        ARG_MAX(ESC_INEP, NIVEL_NUMERICO) AS ESC_INEP,
+        ARG_MAX(SER_NOME, NIVEL_NUMERICO) AS SER_NOME,
+        MAX(NIVEL_NUMERICO) AS NIVEL
+    FROM fato_resposta_aluno
+    WHERE DIS_NOME = 'Leitura' AND NIVEL_NUMERICO BETWEEN 1 AND {len(NIVEIS_LEITURA)}
+    GROUP BY ALU_ID, AVA_ANO, AVA_NOME
+),
+sequencia AS (
+    SELECT
+        *,
+        LEAD(AVA_NOME) OVER historico AS AVA_DESTINO,
+        LEAD(NIVEL) OVER historico AS NIVEL_DESTINO
+    FROM nivel_aluno
+    WINDOW historico AS (PARTITION BY ALU_ID, AVA_ANO ORDER BY {SQL_ORDEM_AVALIACAO})
+)
+SELECT
+    AVA_ANO,
+    AVA_NOME AS AVA_ORIGEM,
+    AVA_DESTINO,
+    MUN_NOME,
+    ESC_INEP,
+    SER_NOME,
+    CAST(NIVEL AS TINYINT) AS NIVEL_ORIGEM,
+    CAST(NIVEL_DESTINO AS TINYINT) AS NIVEL_DESTINO,
+    COUNT(*) AS QTD_ALUNOS
+FROM sequencia
+WHERE AVA_DESTINO IS NOT NULL
+GROUP BY ALL
+"""
+
+# Transições por município, somadas a partir da tabela por escola
+SQL_TRANSICOES_MUNICIPIO = f"""
+SELECT
+    AVA_ANO, AVA_ORIGEM, AVA_DESTINO, MUN_NOME, SER_NOME,
+    NIVEL_ORIGEM, NIVEL_DESTINO,
+    CAST(SUM(QTD_ALUNOS) AS BIGINT) AS QTD_ALUNOS
+FROM {TABELA_ESCOLA}
+GROUP BY ALL
+"""
+
+# Filtros aceitos pelas consultas das matrizes
+COLUNAS_FILTRO_TRANSICAO = {
+    'anos': 'AVA_ANO',
+    'origens': 'AVA_ORIGEM',
+    'destinos': 'AVA_DESTINO',
+    'municipios': 'MUN_NOME',
+    'escolas': 'ESC_INEP',
+    'series': 'SER_NOME',
+}
+
+ROTULOS_NIVEIS = TABELA_NIVEIS.set_index('NIVEL_NUMERICO')['DESCRICAO_NIVEL']
+
+
+def pares_avaliacoes(conn):
+    """
+    Lista os pares de avaliações consecutivas com transições materializadas
+
+    Args:
+        conn: Conexão DuckDB
+
+    Returns:
+        pandas.DataFrame: AVA_ANO, AVA_ORIGEM, AVA_DESTINO e QTD_ALUNOS
+    """
+    return consultar_df(conn, f"""
+    SELECT AVA_ANO, AVA_ORIGEM, AVA_DESTINO, CAST(SUM(QTD_ALUNOS) AS BIGINT) AS QTD_ALUNOS
+    FROM {TABELA_MUNICIPIO}
+    GROUP BY ALL
+    ORDER BY AVA_ANO DESC, AVA_ORIGEM, AVA_DESTINO
+    """)
+
+
+def carregar_matriz(conn, filtros):
+    """
+    Matriz 6×6 de transições para os filtros (soma das células gravadas)
+
+    Sem filtro de escola a consulta usa a tabela por município, menor.
+
+    Args:
+        conn: Conexão DuckDB
+        filtros (dict): Chaves de ``COLUNAS_FILTRO_TRANSICAO``
+
+    Returns:
+        pandas.DataFrame: Contagens, linhas = nível de origem (1-6) e
+            colunas = nível de destino (1-6)
+    """
+    tabela = TABELA_ESCOLA if filtros.get('escolas') else TABELA_MUNICIPIO
+    where_clause, params = construir_where(filtros, alias='', colunas=COLUNAS_FILTRO_TRANSICAO)
+    celulas = consultar_df(conn, f"""
+    SELECT NIVEL_ORIGEM, NIVEL_DESTINO, CAST(SUM(QTD_ALUNOS) AS BIGINT) AS QTD_ALUNOS
+    FROM {tabela}
+    WHERE {where_clause}
+    GROUP BY NIVEL_ORIGEM, NIVEL_DESTINO
+    """, params)
+    return montar_matriz(celulas)
+
+
+def montar_matriz(celulas):
+    """Completa as células gravadas em uma matriz 6×6 (níveis sem alunos = 0)"""
+    niveis = TABELA_NIVEIS['NIVEL_NUMERICO'].tolist()
+    matriz = np.zeros((len(niveis), len(niveis)), dtype=np.int64)
+    if len(celulas):
+        origem = celulas['NIVEL_ORIGEM'].to_numpy(dtype=np.int64) - 1
+        destino = celulas['NIVEL_DESTINO'].to_numpy(dtype=np.int64) - 1
+        np.add.at(matriz, (origem, destino), celulas['QTD_ALUNOS'].to_numpy(dtype=np.int64))
+    return pd.DataFrame(
+        matriz,
+        index=pd.Index(niveis, name='NIVEL_ORIGEM'),
+        columns=pd.Index(niveis, name='NIVEL_DESTINO'),
+    )
+
+
+def percentuais_por_origem(matriz):
+    """Percentual de cada destino dentro do nível de origem (linhas somam 100)"""
+    totais = matriz.sum(axis=1)
+    return matriz.div(totais.where(totais > 0), axis=0).mul(100).fillna(0).round(1)
+
+
+def resumo_progressao(matriz):
+    """
+    Resume a matriz em alunos que avançaram, mantiveram ou regrediram
+
+    Args:
+        matriz (pandas.DataFrame): Saída de ``carregar_matriz``
+
+    Returns:
+        dict: total, avancaram, mantiveram, regrediram e percentuais
+    """
+    valores = matriz.to_numpy()
+    total = int(valores.sum())
+    resumo = {
+        'total': total,
+        'avancaram': int(np.triu(valores, k=1).sum()),
+        'mantiveram': int(np.trace(valores)),
+        'regrediram': int(np.tril(valores, k=-1).sum()),
+    }
+    for chave in ('avancaram', 'mantiveram', 'regrediram'):
+        resumo[f"pct_{chave}"] = resumo[chave] / total * 100 if total else 0.0
+    return resumo
+
+
+def rotular_matriz(matriz):
+    """Troca os níveis numéricos pelos nomes dos níveis nas linhas e colunas"""
+    return matriz.rename(index=ROTULOS_NIVEIS, columns=ROTULOS_NIVEIS)
+
+
+if __name__ == "__main__":
+    import sys
+    import duckdb
+
+    # Demonstração: matriz geral do primeiro par de avaliações
+    banco = sys.argv[1] if len(sys.argv) > 1 else "db/avaliacao_prod.duckdb"
+    conn = duckdb.connect(banco, read_only=True)
+    print("🔀 TRANSIÇÕES DE NÍVEIS DE LEITURA")
+    print("=" * 40)
+    pares = pares_avaliacoes(conn)
+    print(pares)
+    if len(pares):
+        par = pares.iloc[0]
+        matriz = carregar_matriz(conn, {
+            'anos': int(par['AVA_ANO']),
+            'origens': par['AVA_ORIGEM'],
+            'destinos': par['AVA_DESTINO'],
+        })
+        print(rotular_matriz(matriz))
+        print(resumo_progressao(matriz))
@@ -11,6 +11,8 @@ Autor: Sistema SAEV
 Data: 08/08/2025
 """
 
+import pandas as pd
+
 def get_nivel_leitura_numerico(atr_resposta):
     """
     Converte resposta de leitura em nível numérico
@@ -74,43 +76,41 @@ def get_cor_nivel_leitura(atr_resposta):
     
     return cores.get(atr_resposta, '#666666')
 
-def calcular_metricas_leitura(df):
+def calcular_metricas_leitura(df, coluna='ATR_RESPOSTA'):
     """
     Calcula métricas específicas para disciplina Leitura
     
+    Não modifica o DataFrame recebido. Para métricas por grupo (ex.: todas
+    as escolas de uma vez) use ``metricas_leitura.metricas_por_grupo``.
+    
     Args:
         df (pandas.DataFrame): DataFrame com dados de leitura
+        coluna (str): Coluna com o nível de leitura
         
     Returns:
         dict: Métricas calculadas
     """
+    from metricas_leitura import metricas_por_grupo
+    
     if df.empty:
         return {}
     
-    # Adicionar nível numérico
-    df['NIVEL_NUMERICO'] = df['ATR_RESPOSTA'].apply(get_nivel_leitura_numerico)
-    
-    total_alunos = len(df)
+    linha = metricas_por_grupo(df, coluna=coluna).iloc[0]
     
-    # Distribuição por nível
-    distribuicao = df['ATR_RESPOSTA'].value_counts()
-    distribuicao_pct = (distribuicao / total_alunos * 100).round(2)
-    
-    # Nível médio
-    nivel_medio = df['NIVEL_NUMERICO'].mean()
-    
-    # Percentuais por categoria
-    fluentes = (df['ATR_RESPOSTA'] == 'fluente').sum()
-    nao_leitores = (df['ATR_RESPOSTA'] == 'nao_leitor').sum()
+    # Distribuição por nível (somente níveis presentes, do mais frequente)
+    distribuicao = pd.Series(
+        {nivel: int(linha[f"qtd_{nivel}"]) for nivel in NIVEIS_LEITURA}
+    )
+    distribuicao = distribuicao[distribuicao > 0].sort_values(ascending=False, kind='stable')
     
     metricas = {
-        'total_alunos': total_alunos,
-        'nivel_medio': nivel_medio,
-        'percentual_fluentes': (fluentes / total_alunos * 100) if total_alunos > 0 else 0,
-        'percentual_nao_leitores': (nao_leitores / total_alunos * 100) if total_alunos > 0 else 0,
+        'total_alunos': int(linha['total_alunos']),
+        'nivel_medio': float(linha['nivel_medio']),
+        'percentual_fluentes': float(linha['percentual_fluentes']),
+        'percentual_nao_leitores': float(linha['percentual_nao_leitores']),
         'distribuicao': distribuicao.to_dict(),
-        'distribuicao_percentual': distribuicao_pct.to_dict(),
-        'nivel_predominante': distribuicao.index[0] if len(distribuicao) > 0 else None
+        'distribuicao_percentual': {nivel: float(linha[f"pct_{nivel}"]) for nivel in distribuicao.index},
+        'nivel_predominante': linha['nivel_predominante']
     }
     
     return metricas
@@ -219,6 +219,32 @@ def gerar_sql_ranking_leitura():
 NIVEIS_LEITURA = ['nao_leitor', 'silabas', 'palavras', 'frases', 'nao_fluente', 'fluente']
 CORES_NIVEIS = ['#ff4444', '#ff8800', '#ffbb00', '#88dd44', '#44bb88', '#0088cc']
 
+# Tabela de consulta dos níveis (um registro por nível, na ordem crescente),
+# para rotular resultados já agregados sem aplicar funções linha a linha
+TABELA_NIVEIS = pd.DataFrame({
+    'NIVEL_LEITURA': NIVEIS_LEITURA,
+    'NIVEL_NUMERICO': [get_nivel_leitura_numerico(nivel) for nivel in NIVEIS_LEITURA],
+    'DESCRICAO_NIVEL': [get_descricao_nivel_leitura(nivel) for nivel in NIVEIS_LEITURA],
+    'COR_NIVEL': CORES_NIVEIS,
+})
+
+def rotular_niveis(df, coluna='NIVEL_LEITURA'):
+    """
+    Acrescenta descrição e cor do nível a um DataFrame pela tabela de consulta
+    
+    Args:
+        df (pandas.DataFrame): DataFrame com a coluna de nível
+        coluna (str): Nome da coluna com o nível de leitura
+        
+    Returns:
+        pandas.DataFrame: Cópia com DESCRICAO_NIVEL e COR_NIVEL
+    """
+    niveis = TABELA_NIVEIS.set_index('NIVEL_LEITURA')
+    return df.assign(
+        DESCRICAO_NIVEL=df[coluna].map(niveis['DESCRICAO_NIVEL']).fillna('Nível Desconhecido'),
+        COR_NIVEL=df[coluna].map(niveis['COR_NIVEL']).fillna('#666666'),
+    )
+
 if __name__ == "__main__":
     # Teste das funções
     print("🔍 TESTE DO UTILITÁRIO DE LEITURA")